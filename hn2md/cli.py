@@ -130,17 +130,37 @@ def fetch(ctx_obj):
 
 @main.command()
 @click.option("--concurrency", default=3, type=int)
+@click.option("--record-responses", is_flag=True, help="Archive raw HTTP responses under output/responses/")
+@click.option(
+    "--replay-day",
+    default=None,
+    metavar="YYYYMMDD",
+    help="Re-extract that day's stories offline from its response archive (no DB writes)",
+)
 @click.pass_context
-def collect(ctx_obj, concurrency):
+def collect(ctx_obj, concurrency, record_responses, replay_day):
     """Scrape article content and discussions."""
     rt = ctx_obj.obj["ctx"]
+    if replay_day:
+        # Replay only reads the archive and writes a snapshot: it must not move today's job
+        from hn2md.stages.base import NonRetryableStageError
+
+        try:
+            summary = _load_stage(Stage.COLLECTING).execute(rt, None, concurrency=concurrency, replay_day=replay_day)
+        except NonRetryableStageError as e:
+            _print(f"Replay failed: {e}", "red")
+            sys.exit(1)
+        _print(f"Replay complete: {summary}", "green")
+        return
+
     date_str = datetime.now().strftime("%Y%m%d")
     machine, _ = JobStateMachine.load_or_create(rt.job_dir, date_str)
     lock_path = rt.job_dir / f".lock_{date_str}"
     try:
         with daily_lock(lock_path):
             stage = _load_stage(Stage.COLLECTING)
-            receipt = stage.run(rt, machine, concurrency=concurrency)
+            archive_options = {"record_responses": True} if record_responses else {}
+            receipt = stage.run(rt, machine, concurrency=concurrency, **archive_options)
             _print(f"Collect complete: {receipt.output_summary}", "green")
     except LockError as e:
         _print(f"Lock error: {e}", "red")
@@ -148,7 +168,7 @@ def collect(ctx_obj, concurrency):
 
 
 @main.command()
-@click.option("--llm", default=None, help="LLM provider (grok/gemini/moonshot)")
+@click.option("--llm", default=None, help="LLM provider (grok/gemini/moonshot, or auto to route by expected latency)")
 @click.option(
     "--manual-plan",
     "manual_plan_file",
@@ -156,8 +176,16 @@ def collect(ctx_obj, concurrency):
     default=None,
     help="Import a Codex-generated plan without calling an external LLM",
 )
+@click.option("--concurrency", default=None, type=int, help="LLM requests kept in flight (default 4)")
+@click.option("--no-llm-cache", is_flag=True, default=False, help="Ignore cached LLM responses for this run")
+@click.option(
+    "--batch-size",
+    default=None,
+    type=click.IntRange(min=0),
+    help="Stories per summary/title request, bounded by the model context (0 = one request per field)",
+)
 @click.pass_context
-def plan(ctx_obj, llm, manual_plan_file):
+def plan(ctx_obj, llm, manual_plan_file, concurrency, no_llm_cache, batch_size):
     """Generate summaries via LLM, output plan JSON."""
     rt = ctx_obj.obj["ctx"]
     date_str = datetime.now().strftime("%Y%m%d")
@@ -166,11 +194,17 @@ def plan(ctx_obj, llm, manual_plan_file):
     try:
         with daily_lock(lock_path):
             stage = _load_stage(Stage.PLANNING)
+            plan_options = {"concurrency": concurrency} if concurrency is not None else {}
+            if no_llm_cache:
+                plan_options["llm_cache"] = False
+            if batch_size is not None:
+                plan_options["batch_size"] = batch_size
             receipt = stage.run(
                 rt,
                 machine,
                 llm=llm,
                 manual_plan_file=manual_plan_file,
+                **plan_options,
             )
             _print(f"Plan complete: {receipt.output_summary}", "green")
     except LockError as e:
@@ -285,9 +319,17 @@ def publish(ctx_obj, markdown_file, cover_image):
 @click.option("--dry-run", is_flag=True, help="Preview without publishing to WeChat")
 @click.option("--backup/--no-backup", default=True, help="Auto-backup database before pipeline")
 @click.option("--force", is_flag=True, help="Override stale daily lock")
+@click.option(
+    "--time-budget",
+    default=0.0,
+    type=float,
+    help="Minutes the release may take; retries never wait past it (0 = no limit)",
+)
 @click.pass_context
-def release(ctx_obj, date_str, from_stage, skip_cover, skip_publish, dry_run, backup, force):
+def release(ctx_obj, date_str, from_stage, skip_cover, skip_publish, dry_run, backup, force, time_budget):
     """Full pipeline: fetch -> collect -> capture -> plan -> apply -> render -> cover -> publish."""
+    from src.llm.retry import run_deadline
+
     rt = ctx_obj.obj["ctx"]
     if not date_str:
         date_str = datetime.now().strftime("%Y%m%d")
@@ -322,7 +364,7 @@ def release(ctx_obj, date_str, from_stage, skip_cover, skip_publish, dry_run, ba
         _print("[DRY-RUN] Pipeline will run but skip WeChat publish", "yellow")
 
     try:
-        with daily_lock(lock_path):
+        with daily_lock(lock_path), run_deadline(time_budget * 60 if time_budget > 0 else None):
             for stage_enum in stages_to_run:
                 if machine.stage_completed_successfully(stage_enum):
                     _print(f"  Skipping {stage_enum.value} (already done)", "dim")
@@ -407,8 +449,13 @@ def status(ctx_obj):
 @click.option("--approve", is_flag=True, help="Approve the current daily blocking audit snapshot")
 @click.option("--post-publish", is_flag=True, help="Run post-publish output verification (JSONL trail)")
 @click.option("--verbose", is_flag=True, help="Include info-level findings in JSONL output")
+@click.option(
+    "--block-extractive-summaries",
+    is_flag=True,
+    help="Treat locally extracted (no-LLM) summaries as blocking instead of warnings",
+)
 @click.pass_context
-def audit(ctx_obj, interactive, llm, json_output, approve, post_publish, verbose):
+def audit(ctx_obj, interactive, llm, json_output, approve, post_publish, verbose, block_extractive_summaries):
     """Quality checks on database content."""
     from hn2md.stages.audit import run_audit
 
@@ -445,7 +492,9 @@ def audit(ctx_obj, interactive, llm, json_output, approve, post_publish, verbose
         return
     if json_output:
         setup_logging(log_dir=rt.output_dir / "logs", console=False)
-    result = run_audit(rt, interactive=interactive, llm_type=llm)
+    result = run_audit(
+        rt, interactive=interactive, llm_type=llm, block_extractive_summaries=block_extractive_summaries
+    )
     machine.record_audit_report(result)
     if json_output:
         print(json_mod.dumps(result, ensure_ascii=False, indent=2))
@@ -487,6 +536,56 @@ def backup(ctx_obj, dest, max_backups, check):
 import os  # noqa: E402 — needed for backup command
 
 
+@main.command("llm-stats")
+@click.option("--days", default=1.0, type=float, help="Look back this many days")
+@click.option("--run-id", default=None, help="Only calls made by this run")
+@click.option("--json", "json_output", is_flag=True, help="Output as JSON")
+@click.pass_context
+def llm_stats(ctx_obj, days, run_id, json_output):
+    """LLM latency, tokens and cost from the llm_calls table."""
+    import time
+
+    from src.llm.accounting import call_stats
+    from src.llm.config import load_llm_config
+
+    rt = ctx_obj.obj["ctx"]
+    try:
+        prices = load_llm_config().get("prices")
+    except Exception:
+        prices = None
+    stats = call_stats(
+        since=time.time() - days * 86400 if days > 0 else None,
+        run_id=run_id,
+        db_path=str(rt.db_path),
+        prices=prices,
+    )
+    if json_output:
+        print(json_mod.dumps(stats, ensure_ascii=False, indent=2))
+        return
+    if not stats["total"]["calls"] and not stats["total"]["cache_hits"]:
+        _print("No LLM calls recorded.", "yellow")
+        return
+
+    def _fmt(value, spec=""):
+        return "-" if value is None else format(value, spec)
+
+    for title, key in (("Model", "models"), ("Stage", "stages"), ("Run", "runs")):
+        _print(
+            f"\n{title:<40} {'calls':>6} {'ok':>5} {'cached':>6} {'p50 s':>7} {'p95 s':>7} "
+            f"{'tok/story':>9} {'cost $':>8}",
+            "bold",
+        )
+        for name, row in [*stats[key].items(), ("total", stats["total"])]:
+            _print(
+                f"{name:<40} {row['calls']:>6} {row['ok']:>5} {row['cache_hits']:>6} "
+                f"{_fmt(row['p50_latency_seconds'], '.2f'):>7} {_fmt(row['p95_latency_seconds'], '.2f'):>7} "
+                f"{_fmt(row['tokens_per_story']):>9} {row['cost_usd']:>8.4f}",
+                "dim" if name == "total" else None,
+            )
+    if stats["total"]["unpriced_calls"]:
+        _print(f"\n{stats['total']['unpriced_calls']} call(s) without a price (LLM_PRICES_PER_MILLION)", "yellow")
+
+
 @main.command()
 @click.pass_context
 def graph(ctx_obj):
@@ -1,6 +1,8 @@
 """Apply stage: write plan JSON to database."""
 
 import json
+import logging
+import sqlite3
 from pathlib import Path
 from typing import Any
 
@@ -8,8 +10,15 @@ from hn2md.constants import Stage
 from hn2md.context import RuntimeContext
 from hn2md.state import JobStateMachine
 from hn2md.stages.base import BaseStage
+from src.core.tag_index import TagIndex
 from src.db.connection import get_db
 
+logger = logging.getLogger(__name__)
+
+
+# Summary provenance columns written when the news table has them
+PROVENANCE_COLUMNS = ("discuss_summary_source_type", "discuss_summary_source_url", "content_summary_source_type")
+
 
 def _available_columns(conn, table: str) -> set[str]:
     return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
@@ -52,30 +61,25 @@ class ApplyStage(BaseStage):
             if unknown_ids:
                 raise ValueError(f"unknown news ids: {unknown_ids}")
 
+            provenance = [column for column in PROVENANCE_COLUMNS if column in columns]
+            assignments = "".join(f", {column}=?" for column in provenance)
             updated = 0
             for item in items:
-                if {"discuss_summary_source_type", "discuss_summary_source_url"} <= columns:
-                    cursor = conn.execute(
-                        "UPDATE news SET title_chs=?, content_summary=?, discuss_summary=?, "
-                        "discuss_summary_source_type=?, discuss_summary_source_url=? WHERE id=?",
-                        (
-                            item.get("title_chs"),
-                            item.get("content_summary"),
-                            item.get("discuss_summary"),
-                            item.get("discuss_summary_source_type"),
-                            item.get("discuss_summary_source_url"),
-                            item["id"],
-                        ),
-                    )
-                else:
-                    cursor = conn.execute(
-                        "UPDATE news SET title_chs=?, content_summary=?, discuss_summary=? WHERE id=?",
-                        (
-                            item.get("title_chs"),
-                            item.get("content_summary"),
-                            item.get("discuss_summary"),
-                            item["id"],
-                        ),
-                    )
+                cursor = conn.execute(
+                    f"UPDATE news SET title_chs=?, content_summary=?, discuss_summary=?{assignments} WHERE id=?",
+                    (
+                        item.get("title_chs"),
+                        item.get("content_summary"),
+                        item.get("discuss_summary"),
+                        *(item.get(column) for column in provenance),
+                        item["id"],
+                    ),
+                )
                 updated += cursor.rowcount
+
+        # Keep the plan stage's tag index current without rescanning every plan
+        try:
+            TagIndex(str(ctx.db_path)).add_plan(plan_path)
+        except sqlite3.Error as e:
+            logger.warning(f"[APPLY] could not add plan tags to the tag index: {e}")
         return {"updated": updated, "plan_file": str(plan_path)}
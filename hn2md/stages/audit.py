@@ -12,6 +12,7 @@ from hn2md.context import RuntimeContext
 from hn2md.state import JobStateMachine
 from src.core.content_quality import is_paywall_or_shell_content
 from src.db.connection import get_db
+from src.llm.compression import EXTRACTIVE_SOURCE_TYPE
 from src.security.content_sanitizer import contains_hallucination_markers
 
 logger = logging.getLogger(__name__)
@@ -111,8 +112,13 @@ def run_audit(
     interactive: bool = False,
     llm_type: str | None = None,
     include_summaries: bool = True,
+    block_extractive_summaries: bool = False,
 ) -> dict[str, Any]:
-    """Return a structured quality report for today's news."""
+    """Return a structured quality report for today's news.
+
+    Summaries the plan stage extracted locally because no LLM answered are
+    warnings, or blocking issues with *block_extractive_summaries*.
+    """
     if interactive:
         from src.core.audit_news import run_audit_one
 
@@ -134,6 +140,7 @@ def run_audit(
             "discuss_summary",
             "discuss_summary_source_type",
             "discuss_summary_source_url",
+            "content_summary_source_type",
             "content_source_type",
             "content_source_url",
         ]
@@ -164,6 +171,7 @@ def run_audit(
         discussion_summary_source_type = (row["discuss_summary_source_type"] or "").strip()
         discussion_summary_source_url = (row["discuss_summary_source_url"] or "").strip()
         source_type = (row["content_source_type"] or "").strip()
+        summary_source_type = (row["content_summary_source_type"] or "").strip()
         item = {
             "id": row["id"],
             "title": row["title"],
@@ -174,6 +182,7 @@ def run_audit(
             "discussion_summary_length": len(discussion_summary),
             "discuss_summary_source_type": discussion_summary_source_type or None,
             "discuss_summary_source_url": discussion_summary_source_url or None,
+            "content_summary_source_type": summary_source_type or None,
             "content_source_type": source_type or None,
             "content_source_url": row["content_source_url"],
         }
@@ -206,6 +215,15 @@ def run_audit(
             issues.append(_issue(row, "discussion_summary_source_invalid", "讨论摘要来源类型无效"))
         elif not discussion_for_gate and discussion_summary_source_type != "hn_discussion" and not discussion_summary_source_url:
             issues.append(_issue(row, "discussion_summary_source_url_missing", "外部或人工讨论摘要缺少来源 URL"))
+        extracted = [
+            label
+            for label, marker in (("正文", summary_source_type), ("讨论", discussion_summary_source_type))
+            if marker == EXTRACTIVE_SOURCE_TYPE
+        ]
+        if include_summaries and extracted:
+            flag = _issue if block_extractive_summaries else _warning_issue
+            message = f"{'、'.join(extracted)}摘要为本地抽取（LLM 不可用），需人工润色"
+            issues.append(flag(row, "extractive_summary", message))
         if include_summaries and (contains_hallucination_markers(summary) or contains_hallucination_markers(discussion_summary)):
             issues.append(_issue(row, "hallucination_marker", "摘要包含模型拒答或幻觉标记"))
         lowered = article.lower()
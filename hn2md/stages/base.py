@@ -3,7 +3,6 @@
 from __future__ import annotations
 
 import logging
-import random
 import time
 from abc import ABC, abstractmethod
 from datetime import datetime
@@ -12,6 +11,8 @@ from typing import Any
 from hn2md.constants import Stage
 from hn2md.context import RuntimeContext
 from hn2md.state import JobStateMachine, StageReceipt
+from src.llm.accounting import call_log, llm_call_context
+from src.llm.retry import RetryPolicy
 
 logger = logging.getLogger(__name__)
 
@@ -47,7 +48,9 @@ class BaseStage(ABC):
         """Wrapper with retry, transition, timing, receipt, and error recording.
 
         Retries transient failures up to self.max_retries times with
-        exponential backoff + jitter.
+        exponential backoff + jitter, never waiting past the run deadline
+        (``src.llm.retry.run_deadline``).  LLM calls made by the stage are
+        tagged with its name and run id in ``llm_calls``.
         """
         if not force_retry and not machine.can_retry(self.stage_name):
             raise RuntimeError(f"Retry budget exhausted for {self.stage_name.value}")
@@ -64,31 +67,34 @@ class BaseStage(ABC):
         )
 
         last_error = None
-        for attempt in range(self.max_retries + 1):
-            try:
-                output = self.execute(ctx, machine, **kwargs)
-                receipt.success = True
-                receipt.output_summary = output
-                last_error = None
-                break
-            except NonRetryableStageError as exc:
-                last_error = exc
-                logger.error(f"[{self.stage_name.value}] Non-retryable failure: {redact_err(str(exc))}")
-                break
-            except Exception as exc:
-                last_error = exc
-                if attempt < self.max_retries:
-                    delay = min(
-                        _DEFAULT_BACKOFF_MAX,
-                        _DEFAULT_BACKOFF_BASE * (2**attempt) + random.uniform(0, 1),
-                    )
-                    logger.warning(
-                        f"[{self.stage_name.value}] Attempt {attempt + 1}/{self.max_retries + 1} "
-                        f"failed: {redact_err(str(exc))}. Retrying in {delay:.1f}s..."
-                    )
-                    time.sleep(delay)
-                else:
-                    logger.error(f"[{self.stage_name.value}] All {self.max_retries + 1} attempts failed.")
+        policy = RetryPolicy(self.max_retries, _DEFAULT_BACKOFF_BASE, _DEFAULT_BACKOFF_MAX)
+        with llm_call_context(stage=self.stage_name.value, run_id=machine.job.run_id or None):
+            for attempt in range(self.max_retries + 1):
+                try:
+                    output = self.execute(ctx, machine, **kwargs)
+                    receipt.success = True
+                    receipt.output_summary = output
+                    last_error = None
+                    break
+                except NonRetryableStageError as exc:
+                    last_error = exc
+                    logger.error(f"[{self.stage_name.value}] Non-retryable failure: {redact_err(str(exc))}")
+                    break
+                except Exception as exc:
+                    last_error = exc
+                    delay = policy.next_delay(attempt, exc)
+                    if delay is not None:
+                        logger.warning(
+                            f"[{self.stage_name.value}] Attempt {attempt + 1}/{self.max_retries + 1} "
+                            f"failed: {redact_err(str(exc))}. Retrying in {delay:.1f}s..."
+                        )
+                        time.sleep(delay)
+                    elif attempt < self.max_retries:
+                        logger.error(f"[{self.stage_name.value}] Not retrying after attempt {attempt + 1}.")
+                        break
+                    else:
+                        logger.error(f"[{self.stage_name.value}] All {self.max_retries + 1} attempts failed.")
+        call_log.flush()
 
         if last_error is not None:
             receipt.error = str(last_error)
@@ -5,14 +5,16 @@ from __future__ import annotations
 import asyncio
 import json
 import sqlite3
+from contextlib import nullcontext
 from datetime import datetime
+from pathlib import Path
 from typing import Any
 from urllib.parse import urlparse
 
 from hn2md.constants import Stage
 from hn2md.context import RuntimeContext
+from hn2md.stages.base import BaseStage, NonRetryableStageError
 from hn2md.state import JobStateMachine
-from hn2md.stages.base import BaseStage
 from src.db.connection import get_db
 
 MIN_ARTICLE_CONTENT_CHARS = 100
@@ -29,44 +31,80 @@ async def _fetch_discussion_with_retries(
     attempts: int = 2,
     delay_seconds: float = 5.0,
 ) -> tuple[str, dict[str, Any] | None]:
-    """Fetch HN discussion content with one lightweight retry on empty result."""
+    """Fetch HN discussion content with one lightweight retry on empty result.
+
+    Retries share the HN host's retry budget and stop at the run deadline.
+    """
     from src.core.handlers.discussion_handler import get_discussion_content_async
+    from src.llm.retry import RetryPolicy, aretry_call
+
+    made = 0
+
+    async def _attempt() -> str:
+        nonlocal made
+        made += 1
+        return await get_discussion_content_async(discuss_url)
 
-    attempts = max(1, attempts)
-    for attempt in range(1, attempts + 1):
-        discussion = await get_discussion_content_async(discuss_url)
-        if discussion and discussion.strip():
-            return discussion.strip(), None
-        if attempt < attempts and delay_seconds > 0:
-            await asyncio.sleep(delay_seconds)
+    policy = RetryPolicy(max(1, attempts) - 1, backoff_base=delay_seconds, backoff_max=delay_seconds, jitter=0.0)
+    discussion = await aretry_call(
+        _attempt,
+        policy=policy,
+        host=urlparse(discuss_url).netloc.lower() or None,
+        retry_on=(),
+        retry_result=lambda text: not (text and text.strip()),
+    )
+    if discussion and discussion.strip():
+        return discussion.strip(), None
     return "", {
         "url": discuss_url,
         "reason": "discussion_missing_after_retry",
-        "attempts": attempts,
+        "attempts": made,
     }
 
 
-async def _crawl_article_with_scrapling(url: str) -> tuple[str, list[str]]:
-    """Use the generic crawler as the fallback for a failed specialist handler."""
+async def _crawl_article_with_scrapling(url: str) -> tuple[str, list[str], str | None]:
+    """Use the generic crawler as the fallback for a failed specialist handler.
+
+    Returns ``(content, image_urls, page_canonical_url)``.
+    """
     from src.core.crawlers.scrapling_crawler import ScraplingCrawler
 
     crawler = ScraplingCrawler()
     try:
-        return await crawler.crawl_article(url)
+        content, image_urls = await crawler.crawl_article(url)
+        page_canonical = getattr(crawler, "canonical_url", None)
+        return content, image_urls, page_canonical if isinstance(page_canonical, str) else None
     finally:
         await crawler.close()
 
 
+def _page_canonical_key(page_canonical: str | None) -> str | None:
+    """Dedup key for a page's ``<link rel="canonical">``, kept apart from the submitted URL's key.
+
+    Canonical tags pointing at the site root are ignored: they would make
+    every story from that site collide.
+    """
+    from src.utils.url_canonical import canonicalize_url
+
+    key = canonicalize_url(page_canonical) if page_canonical else None
+    if not key or urlparse(key).path in ("", "/"):
+        return None
+    return key
+
+
 async def _collect_item(row: sqlite3.Row, semaphore: asyncio.Semaphore, db_path: str | None = None) -> dict[str, Any]:
     """Collect missing context for one news row."""
     from src.core.content_quality import is_paywall_or_shell_content
     from src.core.handlers.article_handler_registry import resolve_article_handler
+    from src.core.handlers.content_probe import probe_content_type_async
     from src.core.handlers.fediverse_handler import get_fediverse_content, is_fediverse_url
     from src.core.handlers.image_handler import is_low_signal_article_image_url, save_article_image
     from src.core.handlers.pdf_handler import get_pdf_content, is_pdf_url
     from src.core.handlers.stackexchange_handler import build_public_summary_fallback, is_stackexchange_url
     from src.core.handlers.youtube_handler import get_youtube_content
+    from src.core.response_archive import replay_archive
     from src.utils.scraper_failures import extract_domain, record_scraper_failure
+    from src.utils.url_canonical import canonicalize_url
 
     async with semaphore:
         article_content = (row["article_content"] or "").strip()
@@ -82,11 +120,18 @@ async def _collect_item(row: sqlite3.Row, semaphore: asyncio.Semaphore, db_path:
         collected = False
 
         news_url = row["news_url"] or ""
+        stored_canonical = row["canonical_url"] if "canonical_url" in row.keys() else None
+        canonical_url = stored_canonical or canonicalize_url(news_url) or None
+        page_canonical: str | None = None
+        page_canonical_url: str | None = None
+        # Replays re-extract text only through archive-aware fetchers (Scrapling,
+        # PDF, discussion): no site-specific handlers, images or failure counters
+        replaying = replay_archive() is not None
         if news_url and len(article_content) < MIN_ARTICLE_CONTENT_CHARS:
             collected_source_type = "full_text"
             official_handler = ""
             official_handler_reason: str | None = None
-            if _is_youtube_url(news_url):
+            if _is_youtube_url(news_url) and not replaying:
                 content, saved_images, _ = await get_youtube_content(news_url, row["title"] or "")
                 image_urls = []
                 if saved_images:
@@ -94,25 +139,32 @@ async def _collect_item(row: sqlite3.Row, semaphore: asyncio.Semaphore, db_path:
             elif is_pdf_url(news_url):
                 content = await get_pdf_content(news_url)
                 image_urls = []
-            elif is_fediverse_url(news_url):
+            elif is_fediverse_url(news_url) and not replaying:
                 content, fediverse_source_type = await get_fediverse_content(news_url)
                 collected_source_type = fediverse_source_type or "full_text"
                 image_urls = []
-            elif article_handler := resolve_article_handler(news_url):
+            elif not replaying and (article_handler := resolve_article_handler(news_url)):
                 extraction = await article_handler.extract(news_url)
                 content = extraction.content
                 image_urls = list(extraction.image_urls)
                 official_handler = article_handler.name
                 official_handler_reason = extraction.reason
             else:
-                content, image_urls = await _crawl_article_with_scrapling(news_url)
+                probe = await probe_content_type_async(news_url)
+                if probe is not None and probe.is_pdf:
+                    content = await get_pdf_content(probe.final_url, probe=probe)
+                    image_urls = []
+                else:
+                    if probe is not None:
+                        probe.close()
+                    content, image_urls, page_canonical = await _crawl_article_with_scrapling(news_url)
 
             if official_handler and (
                 not content
                 or len(content.strip()) < MIN_ARTICLE_CONTENT_CHARS
                 or is_paywall_or_shell_content(content)
             ):
-                content, image_urls = await _crawl_article_with_scrapling(news_url)
+                content, image_urls, page_canonical = await _crawl_article_with_scrapling(news_url)
             unusable_content = bool(content and is_paywall_or_shell_content(content))
             if content and len(content.strip()) >= MIN_ARTICLE_CONTENT_CHARS and not unusable_content:
                 article_content = content.strip()
@@ -120,6 +172,7 @@ async def _collect_item(row: sqlite3.Row, semaphore: asyncio.Semaphore, db_path:
                 content_source_url = news_url
                 content_source_doi = None
                 collected = True
+                page_canonical_url = _page_canonical_key(page_canonical)
             elif is_stackexchange_url(news_url):
                 article_content = build_public_summary_fallback(row["title"] or "", news_url)
                 content_source_type = "public_page_summary"
@@ -127,7 +180,7 @@ async def _collect_item(row: sqlite3.Row, semaphore: asyncio.Semaphore, db_path:
                 content_source_doi = None
                 collected = True
                 domain = extract_domain(news_url)
-                failure_count = record_scraper_failure(domain, news_url, db_path)
+                failure_count = None if replaying else record_scraper_failure(domain, news_url, db_path)
                 content_warnings.append(
                     {
                         "id": row["id"],
@@ -141,7 +194,7 @@ async def _collect_item(row: sqlite3.Row, semaphore: asyncio.Semaphore, db_path:
                 )
             elif news_url:
                 domain = extract_domain(news_url)
-                failure_count = record_scraper_failure(domain, news_url, db_path)
+                failure_count = None if replaying else record_scraper_failure(domain, news_url, db_path)
                 warning = {
                     "id": row["id"],
                     "title": row["title"] or "",
@@ -156,7 +209,7 @@ async def _collect_item(row: sqlite3.Row, semaphore: asyncio.Semaphore, db_path:
                     warning["official_handler_reason"] = official_handler_reason or "content_unusable"
                     warning["fallback"] = "scrapling"
                 content_warnings.append(warning)
-            if image_urls:
+            if image_urls and not replaying:
                 saved_images = []
                 candidate_image_urls = [
                     image_url
@@ -225,6 +278,8 @@ async def _collect_item(row: sqlite3.Row, semaphore: asyncio.Semaphore, db_path:
             "content_source_type": content_source_type,
             "content_source_url": content_source_url,
             "content_source_doi": content_source_doi,
+            "canonical_url": canonical_url,
+            "page_canonical_url": page_canonical_url,
             "image_warnings": image_warnings,
             "content_warnings": content_warnings,
             "discussion_warnings": discussion_warnings,
@@ -237,19 +292,48 @@ async def _collect_rows(rows: list[sqlite3.Row], concurrency: int, db_path: str
     return await asyncio.gather(*(_collect_item(row, semaphore, db_path) for row in rows))
 
 
+def _response_archive_root(ctx: RuntimeContext) -> Path:
+    return ctx.output_dir / "responses"
+
+
 class CollectStage(BaseStage):
     stage_name = Stage.COLLECTING
 
     def execute(
         self,
         ctx: RuntimeContext,
-        machine: JobStateMachine,
+        machine: JobStateMachine | None,
         concurrency: int = 3,
+        record_responses: bool = False,
+        replay_day: str | None = None,
     ) -> dict[str, Any]:
+        """Collect today's rows.
+
+        ``record_responses`` appends every raw response to today's archive
+        under ``output/responses``.  ``replay_day`` (``YYYYMMDD``) instead
+        re-extracts that day's stories offline from its archive; replay runs
+        write only a context snapshot and never touch the database rows.
+        The CLI runs replays outside the job state machine (*machine* is None).
+        """
+        from src.core.response_archive import RECORD, REPLAY, ResponseArchive, use_archive
+
         concurrency = max(1, concurrency)
+        today = datetime.now().strftime("%Y%m%d")
+        archive: ResponseArchive | None = None
+        archive_mode: str | None = None
+        if replay_day:
+            archive = ResponseArchive.for_day(_response_archive_root(ctx), replay_day)
+            if not archive.index_path.exists():
+                raise NonRetryableStageError(f"No response archive for {replay_day}: {archive.directory}")
+            archive_mode = REPLAY
+        elif record_responses:
+            archive = ResponseArchive.for_day(_response_archive_root(ctx), today)
+            archive_mode = RECORD
+
+        table = "news_history" if replay_day and replay_day != today else "news"
         with get_db(str(ctx.db_path)) as conn:
             conn.row_factory = sqlite3.Row
-            columns = {row[1] for row in conn.execute("PRAGMA table_info(news)").fetchall()}
+            columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
             source_columns = [
                 column
                 for column in ("content_source_type", "content_source_url", "content_source_doi")
@@ -267,13 +351,32 @@ class CollectStage(BaseStage):
                 "image_2",
                 "image_3",
                 *source_columns,
+                *(["canonical_url"] if "canonical_url" in columns else []),
             ]
-            rows = conn.execute(
-                f"SELECT {', '.join(select_columns)} "
-                "FROM news WHERE date(created_at)=date('now','localtime') ORDER BY id"
-            ).fetchall()
+            if replay_day:
+                rows = conn.execute(
+                    f"SELECT {', '.join(select_columns)} "
+                    f"FROM {table} WHERE strftime('%Y%m%d', created_at)=? ORDER BY id",
+                    (replay_day,),
+                ).fetchall()
+                # Replay re-extracts everything from the archive, ignoring stored content
+                rows = [{**dict(row), "article_content": None, "discussion_content": None} for row in rows]
+            else:
+                rows = conn.execute(
+                    f"SELECT {', '.join(select_columns)} "
+                    "FROM news WHERE date(created_at)=date('now','localtime') ORDER BY id"
+                ).fetchall()
+
+        with use_archive(archive, archive_mode) if archive is not None else nullcontext():
+            items = asyncio.run(_collect_rows(rows, concurrency, str(ctx.db_path)))
 
-        items = asyncio.run(_collect_rows(rows, concurrency, str(ctx.db_path)))
+        archive_summary = (
+            {"mode": archive_mode, "path": str(archive.directory), "records": len(archive)}
+            if archive is not None
+            else None
+        )
+        if replay_day:
+            return self._write_snapshot(ctx, items, concurrency, f"hacknews_replay_{replay_day}", archive_summary)
 
         with get_db(str(ctx.db_path)) as conn:
             columns = {row[1] for row in conn.execute("PRAGMA table_info(news)").fetchall()}
@@ -315,10 +418,26 @@ class CollectStage(BaseStage):
                             item["id"],
                         ),
                     )
+                if "canonical_url" in columns and item["canonical_url"]:
+                    conn.execute("UPDATE news SET canonical_url=? WHERE id=?", (item["canonical_url"], item["id"]))
+                if "page_canonical_url" in columns and item["page_canonical_url"]:
+                    conn.execute(
+                        "UPDATE news SET page_canonical_url=? WHERE id=?", (item["page_canonical_url"], item["id"])
+                    )
+
+        return self._write_snapshot(ctx, items, concurrency, "hacknews_context", archive_summary)
 
+    @staticmethod
+    def _write_snapshot(
+        ctx: RuntimeContext,
+        items: list[dict[str, Any]],
+        concurrency: int,
+        prefix: str,
+        archive_summary: dict[str, Any] | None,
+    ) -> dict[str, Any]:
         ctx.codex_dir.mkdir(parents=True, exist_ok=True)
         stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        context_path = ctx.codex_dir / f"hacknews_context_{stamp}.json"
+        context_path = ctx.codex_dir / f"{prefix}_{stamp}.json"
         payload_items = [{key: value for key, value in item.items() if key != "collected"} for item in items]
         image_warnings = [
             warning
@@ -348,7 +467,7 @@ class CollectStage(BaseStage):
             encoding="utf-8",
         )
 
-        return {
+        summary = {
             "collected": sum(1 for item in items if item["collected"]),
             "total": len(items),
             "concurrency": concurrency,
@@ -357,3 +476,6 @@ class CollectStage(BaseStage):
             "content_warnings": content_warnings,
             "discussion_warnings": discussion_warnings,
         }
+        if archive_summary:
+            summary["response_archive"] = archive_summary
+        return summary
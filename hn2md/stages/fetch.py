@@ -5,6 +5,7 @@ import time
 
 from hn2md.constants import Stage
 from hn2md.stages.base import BaseStage
+from src.llm.retry import deadline_allows
 
 
 def _story_metadata(item: Any) -> dict[str, Any]:
@@ -52,6 +53,9 @@ class FetchStage(BaseStage):
                     break
                 last_error = f"fetch saved no stories from {len(items)} fetched item(s)"
             if attempt < len(self.retry_delays):
+                if not deadline_allows(self.retry_delays[attempt]):
+                    last_error += " (no time left for another fetch before the run deadline)"
+                    break
                 time.sleep(self.retry_delays[attempt])
 
         if not items:
@@ -1,9 +1,13 @@
 """Plan stage: generate summaries via LLM, output plan JSON."""
 
+import asyncio
 import json
 import logging
 import os
 import sqlite3
+import time
+from collections.abc import Awaitable, Callable
+from contextlib import nullcontext
 from datetime import datetime
 from pathlib import Path
 from typing import Any
@@ -12,7 +16,23 @@ from hn2md.constants import Stage
 from hn2md.context import RuntimeContext
 from hn2md.state import JobStateMachine
 from hn2md.stages.base import BaseStage
+from src.core.archive_news import HN_METRIC_COLUMNS
+from src.core.story_ranker import RankingModel, learn_ranking_model, rank_stories, reorder_blocks, tied_blocks
+from src.core.tag_index import TagIndex
 from src.db.connection import get_db
+from src.llm.accounting import llm_call_context
+from src.llm.circuit_breaker import circuit_breakers
+from src.llm.compression import (
+    EXTRACTIVE_SOURCE_TYPE,
+    FALLBACK_LEAD_SENTENCES,
+    compression_stats,
+    extractive_summary,
+)
+from src.llm.hedging import hedge_budget
+from src.llm.request_slots import request_slots, to_thread_in_slot
+from src.llm.response_cache import bypass_llm_cache
+from src.llm.router import model_router
+from src.llm.single_flight import single_flight
 from src.security.content_sanitizer import (
     contains_hallucination_markers,
     validate_summary_length,
@@ -20,6 +40,12 @@ from src.security.content_sanitizer import (
 
 logger = logging.getLogger(__name__)
 
+# Optional summary provenance fields a plan item may carry
+PROVENANCE_FIELDS = ("discuss_summary_source_type", "discuss_summary_source_url", "content_summary_source_type")
+
+# LLM requests the plan graph keeps in flight at once
+PLAN_LLM_CONCURRENCY = 4
+
 
 def _validate_manual_plan(plan: object) -> dict[str, Any]:
     """Validate and normalize a Codex-authored publishing plan."""
@@ -61,7 +87,7 @@ def _validate_manual_plan(plan: object) -> dict[str, Any]:
                 raise ValueError(f"hallucination marker in items[{index}].{field}")
             normalized[field] = value
 
-        for optional_field in ("discuss_summary_source_type", "discuss_summary_source_url"):
+        for optional_field in PROVENANCE_FIELDS:
             value = raw_item.get(optional_field)
             if value is not None:
                 if not isinstance(value, str) or not value.strip():
@@ -106,6 +132,296 @@ def _import_manual_plan(source: Path, destination_dir: Path) -> tuple[Path, dict
     return destination, normalized
 
 
+class _TaskGraph:
+    """Dependency-ordered asyncio tasks.
+
+    Each node starts once its dependencies are done; its own duration is
+    recorded so the critical path can be reported.  The in-flight limit is
+    applied per provider request (:mod:`src.llm.request_slots`), not per node.
+    """
+
+    def __init__(self):
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._deps: dict[str, tuple[str, ...]] = {}
+        self._durations: dict[str, float] = {}
+        self._started = time.perf_counter()
+        self.wall_seconds = 0.0
+        self.peak_requests = 0
+
+    def add(self, name: str, func: Callable[..., Awaitable[Any]], deps: tuple[str, ...] = ()) -> asyncio.Task:
+        """Schedule ``func(*dependency_results)`` once every dependency is done."""
+
+        async def _run() -> Any:
+            inputs = [await self._tasks[dep] for dep in deps]
+            started = time.perf_counter()
+            try:
+                return await func(*inputs)
+            finally:
+                self._durations[name] = time.perf_counter() - started
+
+        self._deps[name] = deps
+        self._tasks[name] = asyncio.create_task(_run(), name=name)
+        return self._tasks[name]
+
+    def result(self, name: str) -> Any:
+        return self._tasks[name].result()
+
+    def count(self, prefix: str) -> int:
+        return sum(1 for name in self._tasks if name.startswith(prefix))
+
+    async def join(self) -> None:
+        await asyncio.gather(*self._tasks.values())
+        self.wall_seconds = time.perf_counter() - self._started
+
+    def critical_path(self) -> tuple[float, list[str]]:
+        """Longest chain of node durations through the dependency edges."""
+        best: dict[str, tuple[float, list[str]]] = {}
+        for name, deps in self._deps.items():  # insertion order is topological
+            before = max((best[dep] for dep in deps), key=lambda entry: entry[0], default=(0.0, []))
+            best[name] = (before[0] + self._durations.get(name, 0.0), [*before[1], name])
+        return max(best.values(), key=lambda entry: entry[0], default=(0.0, []))
+
+
+def _validate_item(row, summary: str, title_chs: str) -> list[str]:
+    item_warnings = []
+    if contains_hallucination_markers(summary):
+        item_warnings.append(f"ID {row['id']}: summary contains hallucination markers")
+    if contains_hallucination_markers(title_chs):
+        item_warnings.append(f"ID {row['id']}: title_chs contains hallucination markers")
+    item_warnings.extend(validate_summary_length(summary, min_length=20, field_name=f"ID {row['id']} summary"))
+    if item_warnings:
+        logger.warning(f"[PLAN] Validation warnings for ID {row['id']}: {item_warnings}")
+    return item_warnings
+
+
+def _needs_llm(row) -> bool:
+    return bool(
+        (row["article_content"] and not (row["content_summary"] and row["title_chs"]))
+        or (row["discussion_content"] and not row["discuss_summary"])
+    )
+
+
+async def _plan_rows(
+    rows,
+    llm: str | None,
+    concurrency: int,
+    batch_size: int = 0,
+    ranking_model: RankingModel | None = None,
+    tag_index: TagIndex | None = None,
+) -> tuple[list[dict[str, Any]], list[str], _TaskGraph, dict[str, Any], dict[str, Any]]:
+    """Run :func:`_plan_graph` with at most *concurrency* provider requests in flight.
+
+    The cap counts requests, so a map-reduce summary or a batch that fans
+    out into several requests takes several of them.
+    """
+    with request_slots(concurrency) as slots:
+        planned = await _plan_graph(rows, llm, batch_size, ranking_model, tag_index)
+    planned[2].peak_requests = slots.peak
+    return planned
+
+
+async def _plan_graph(
+    rows,
+    llm: str | None,
+    batch_size: int = 0,
+    ranking_model: RankingModel | None = None,
+    tag_index: TagIndex | None = None,
+) -> tuple[list[dict[str, Any]], list[str], _TaskGraph, dict[str, Any], dict[str, Any]]:
+    """Build and run the plan task graph for *rows*.
+
+    Per story: ``article:<id>`` and ``discussion:<id>`` summaries start at
+    once; ``title:<id>`` waits only on its own article summary.  ``rank``
+    waits on every article summary and title, ``tags`` on the ranked order.
+    Discussion summaries keep running while ranking and tagging happen.
+    Ranking is local (:mod:`src.core.story_ranker`); the LLM only orders
+    stories tied near the top.  The returned ranking record lists every
+    story's score and features.  ``tags`` takes the *tag_index* proposal
+    when it is confident and asks the LLM otherwise; the returned tagging
+    record says which.
+
+    When no provider answers a summary request, the node falls back to
+    :func:`src.llm.compression.extractive_summary` and the item's
+    ``content_summary_source_type`` / ``discuss_summary_source_type`` is set
+    to ``EXTRACTIVE_SOURCE_TYPE`` so the audit gate can flag it.
+
+    With *batch_size* > 0, ``batch:<n>`` nodes first ask for up to that many
+    stories' summaries and titles in one request; the per-story nodes then
+    wait on their batch and only call the LLM for fields the batch left empty.
+    """
+    from src.llm.async_client import aclose_llm_clients
+    from src.llm.llm_business import (
+        generate_story_batch_async,
+        generate_summary_async,
+        plan_story_batches,
+        translate_title_async,
+    )
+    from src.llm.llm_evaluator import evaluate_news_attraction
+    from src.llm.llm_tag_extractor import extract_tags_with_llm
+
+    graph = _TaskGraph()
+    ranking: dict[str, Any] = {}
+    tagging: dict[str, Any] = {"source": "llm", "confidence": 0.0, "proposed": []}
+    extracted: set[tuple[int, str]] = set()
+
+    def _batch(stories: list[dict[str, Any]]):
+        async def _node() -> dict[int, dict[str, str]]:
+            return await generate_story_batch_async(stories, llm_type=llm)
+
+        return _node
+
+    def _summarise(news_id: int, text: str | None, stored: str | None, prompt_type: str, field: str):
+        async def _node(*batched: dict[int, dict[str, str]]) -> str:
+            if stored or not text:
+                return stored or ""
+            if batched and batched[0].get(news_id, {}).get(field):
+                return batched[0][news_id][field]
+            with llm_call_context(news_id=news_id):
+                summary = await generate_summary_async(text, prompt_type=prompt_type, llm_type=llm)
+            if summary:
+                return summary
+            # Every provider failed: keep the run moving with a local extract the audit gate can flag
+            logger.warning(f"[PLAN] no LLM summary for {news_id} ({field}), using a local extract")
+            extracted.add((news_id, field))
+            return extractive_summary(text, lead=0 if prompt_type == "discussion" else FALLBACK_LEAD_SENTENCES)
+
+        return _node
+
+    def _translate(row):
+        async def _node(summary: str, *batched: dict[int, dict[str, str]]) -> str:
+            if row["title_chs"] or not summary:
+                return row["title_chs"] or ""
+            if batched and batched[0].get(row["id"], {}).get("title_chs"):
+                return batched[0][row["id"]]["title_chs"]
+            with llm_call_context(news_id=row["id"]):
+                return await translate_title_async(row["title"], summary, llm_type=llm) or ""
+
+        return _node
+
+    batch_of: dict[int, tuple[str, ...]] = {}
+    if batch_size > 0:
+        pending = [dict(row) for row in rows if _needs_llm(row)]
+        for index, stories in enumerate(plan_story_batches(pending, max_stories=batch_size, llm_type=llm)):
+            graph.add(f"batch:{index}", _batch(stories))
+            batch_of.update({story["id"]: (f"batch:{index}",) for story in stories})
+
+    for row in rows:
+        news_id = row["id"]
+        batch = batch_of.get(news_id, ())
+        graph.add(
+            f"article:{news_id}",
+            _summarise(news_id, row["article_content"], row["content_summary"], "article", "content_summary"),
+            deps=batch,
+        )
+        graph.add(
+            f"discussion:{news_id}",
+            _summarise(news_id, row["discussion_content"], row["discuss_summary"], "discussion", "discuss_summary"),
+            deps=batch,
+        )
+        graph.add(f"title:{news_id}", _translate(row), deps=(f"article:{news_id}", *batch))
+
+    async def _rank(*inputs: str) -> list[dict[str, Any]]:
+        items = []
+        for row, summary, title_chs in zip(rows, inputs[0::2], inputs[1::2], strict=True):
+            if (row["id"], "content_summary") in extracted:
+                row_marker = {"content_summary_source_type": EXTRACTIVE_SOURCE_TYPE}
+            else:
+                row_marker = {}
+            items.append(
+                {
+                    "id": row["id"],
+                    "title": row["title"],
+                    "title_chs": title_chs,
+                    "news_url": row["news_url"],
+                    "discuss_url": row["discuss_url"],
+                    "content_summary": summary,
+                    "discuss_summary": "",
+                    "validation_warnings": _validate_item(row, summary, title_chs),
+                    **row_marker,
+                }
+            )
+        if not items:
+            return items
+        available = set(rows[0].keys())
+        metric_columns = [column for column in HN_METRIC_COLUMNS if column in available]
+        ranked = rank_stories(
+            [{**it, **{column: row[column] for column in metric_columns}} for it, row in zip(items, rows, strict=True)],
+            ranking_model,
+        )
+        blocks = tied_blocks(ranked)
+        tied = [ranked[index].item for block in blocks for index in block]
+        tiebreak_ids = []
+        if tied:
+            news_tuples = [
+                (
+                    it["id"],
+                    it["title_chs"] or it["title"],
+                    it["news_url"],
+                    it["discuss_url"],
+                    it["content_summary"],
+                    it["discuss_summary"],
+                    None,
+                    None,
+                    None,
+                    None,
+                )
+                for it in tied
+            ]
+            try:
+                ratings, _ = await to_thread_in_slot(evaluate_news_attraction, news_tuples, llm)
+            except Exception as e:
+                logger.warning(f"[PLAN] LLM tie-break failed, keeping local order: {e}")
+                ratings = []
+            if ratings:
+                # NEWS_ATTRACTION_PROMPT numbers the stories from 1 in the order sent
+                score_at = dict(ratings)
+                ranked = reorder_blocks(ranked, blocks, [score_at.get(pos, 0) for pos in range(1, len(tied) + 1)])
+                tiebreak_ids = [it["id"] for it in tied]
+        ranking["llm_tiebreak_ids"] = tiebreak_ids
+        ranking["stories"] = [
+            {
+                "id": story.item["id"],
+                "score": round(story.score, 4),
+                "features": {name: round(value, 4) for name, value in story.features.items()},
+            }
+            for story in ranked
+        ]
+        by_id = {it["id"]: it for it in items}
+        return [by_id[story.item["id"]] for story in ranked]
+
+    async def _tags(items: list[dict[str, Any]]) -> list[str]:
+        news_titles = [(it["title_chs"] or it["title"], it["title"]) for it in items[:4]]
+        proposal = None
+        if tag_index is not None and news_titles:
+            try:
+                proposal = tag_index.propose(news_titles)
+            except sqlite3.Error as e:
+                logger.warning(f"[PLAN] tag index unavailable, asking the LLM: {e}")
+        if proposal is not None:
+            tagging.update(confidence=proposal.confidence, proposed=proposal.tags)
+            if proposal.confident:
+                tagging["source"] = "index"
+                return proposal.tags
+        try:
+            return await to_thread_in_slot(extract_tags_with_llm, news_titles) or []
+        except Exception:
+            return []
+
+    rank_deps = tuple(dep for row in rows for dep in (f"article:{row['id']}", f"title:{row['id']}"))
+    rank_task = graph.add("rank", _rank, deps=rank_deps)
+    tags_task = graph.add("tags", _tags, deps=("rank",))
+    try:
+        await graph.join()
+    finally:
+        await aclose_llm_clients()
+
+    items = rank_task.result()
+    for it in items:
+        it["discuss_summary"] = graph.result(f"discussion:{it['id']}")
+        if (it["id"], "discuss_summary") in extracted:
+            it["discuss_summary_source_type"] = EXTRACTIVE_SOURCE_TYPE
+    return items, tags_task.result(), graph, ranking, tagging
+
+
 class PlanStage(BaseStage):
     stage_name = Stage.PLANNING
 
@@ -115,7 +431,24 @@ class PlanStage(BaseStage):
         machine: JobStateMachine,
         llm: str | None = None,
         manual_plan_file: str | None = None,
+        concurrency: int = PLAN_LLM_CONCURRENCY,
+        llm_cache: bool = True,
+        batch_size: int = 0,
     ) -> dict[str, Any]:
+        """Summarise, translate, rank and tag today's rows.
+
+        The LLM work runs as a per-story task graph (see :func:`_plan_graph`)
+        with at most *concurrency* provider requests in flight; the receipt
+        records the graph's critical path next to its wall-clock time and
+        the peak number of requests in flight (``llm_peak_in_flight``).  ``llm_cache=False``
+        skips the LLM response cache for this run; ``batch_size`` > 0 sends up
+        to that many stories per summary/title request.  ``article_compression``
+        reports how many article tokens local pre-compression removed;
+        ``ranking`` the ranker's learned weights and how many stories needed
+        an LLM tie-break; ``tagging`` whether the tags came from the
+        historical tag index or the LLM; ``summary_fallbacks`` how many
+        summaries were extracted locally because no provider answered.
+        """
         if manual_plan_file:
             plan_path, plan = _import_manual_plan(Path(manual_plan_file), ctx.codex_dir)
             return {
@@ -128,59 +461,46 @@ class PlanStage(BaseStage):
                 "manual": True,
             }
 
-        from src.llm.llm_business import generate_summary, translate_title
-        from src.llm.llm_evaluator import evaluate_news_attraction
-        from src.llm.llm_tag_extractor import extract_tags_with_llm
         with get_db(str(ctx.db_path)) as conn:
             conn.row_factory = sqlite3.Row
             cur = conn.cursor()
+            available = {column[1] for column in cur.execute("PRAGMA table_info(news)")}
+            metrics = "".join(f", {column}" for column in HN_METRIC_COLUMNS if column in available)
             cur.execute(
                 "SELECT id, title, title_chs, news_url, discuss_url, "
-                "article_content, discussion_content, content_summary, discuss_summary "
+                f"article_content, discussion_content, content_summary, discuss_summary{metrics} "
                 "FROM news WHERE date(created_at)=date('now','localtime') ORDER BY id"
             )
             rows = cur.fetchall()
 
-        items = []
-        validation_warnings = []
-        for row in rows:
-            summary = row["content_summary"] or ""
-            if not summary and row["article_content"]:
-                summary = generate_summary(row["article_content"], prompt_type="article") or ""
-
-            d_summary = row["discuss_summary"] or ""
-            if not d_summary and row["discussion_content"]:
-                d_summary = generate_summary(row["discussion_content"], prompt_type="discussion") or ""
-
-            title_chs = row["title_chs"] or ""
-            if not title_chs and summary:
-                title_chs = translate_title(row["title"], summary) or ""
-
-            # LLM output validation
-            item_warnings = []
-            if contains_hallucination_markers(summary):
-                item_warnings.append(f"ID {row['id']}: summary contains hallucination markers")
-            if contains_hallucination_markers(title_chs):
-                item_warnings.append(f"ID {row['id']}: title_chs contains hallucination markers")
-            length_errors = validate_summary_length(summary, min_length=20, field_name=f"ID {row['id']} summary")
-            item_warnings.extend(length_errors)
-
-            if item_warnings:
-                validation_warnings.extend(item_warnings)
-                logger.warning(f"[PLAN] Validation warnings for ID {row['id']}: {item_warnings}")
+        try:
+            ranking_model = learn_ranking_model(ctx.codex_dir, str(ctx.db_path))
+        except Exception as e:
+            logger.warning(f"[PLAN] could not learn ranking weights, using defaults: {e}")
+            ranking_model = RankingModel()
 
-            items.append(
-                {
-                    "id": row["id"],
-                    "title": row["title"],
-                    "title_chs": title_chs,
-                    "news_url": row["news_url"],
-                    "discuss_url": row["discuss_url"],
-                    "content_summary": summary,
-                    "discuss_summary": d_summary,
-                    "validation_warnings": item_warnings,
-                }
+        from src.utils.deployment import load_deployment_settings
+
+        tag_index = TagIndex(str(ctx.db_path))
+        index_stats: dict[str, Any] = {}
+        try:
+            astro_blog_dir = load_deployment_settings(project_root=ctx.project_root).astro_blog_dir
+            tag_index.refresh(ctx.codex_dir, astro_blog_dir)
+            index_stats = tag_index.stats()
+        except Exception as e:
+            logger.warning(f"[PLAN] could not refresh the tag index: {e}")
+
+        concurrency = max(1, concurrency)
+        compression_stats.reset()
+        hedge_budget.reset()
+        single_flight.reset()
+        with nullcontext() if llm_cache else bypass_llm_cache():
+            items, tags, graph, ranking, tagging = asyncio.run(
+                _plan_rows(rows, llm, concurrency, batch_size, ranking_model, tag_index)
             )
+        critical_seconds, critical_path = graph.critical_path()
+
+        validation_warnings = [warning for it in items for warning in it["validation_warnings"]]
 
         # Compute aggregate flags
         hallucination_detected = any(
@@ -193,43 +513,12 @@ class PlanStage(BaseStage):
             for it in items
         )
 
-        # Ranking
-        if items:
-            news_tuples = [
-                (
-                    it["id"],
-                    it["title_chs"] or it["title"],
-                    it["news_url"],
-                    it["discuss_url"],
-                    it["content_summary"],
-                    it["discuss_summary"],
-                    None,
-                    None,
-                    None,
-                    None,
-                )
-                for it in items
-            ]
-            try:
-                ratings, _ = evaluate_news_attraction(news_tuples)
-                if ratings:
-                    score_map = {s: sc for s, sc in ratings}
-                    items.sort(key=lambda x: score_map.get(x["id"], 0), reverse=True)
-            except Exception:
-                pass
-
-        # Tags
-        news_titles = [(it["title_chs"] or it["title"], it["title"]) for it in items[:4]]
-        tags = []
-        try:
-            tags = extract_tags_with_llm(news_titles) or []
-        except Exception:
-            pass
-
         plan = {
             "tags": tags,
             "ordered_ids": [it["id"] for it in items],
             "items": items,
+            "ranking": {"model": ranking_model.summary(), **ranking},
+            "tagging": tagging,
         }
 
         stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -247,4 +536,22 @@ class PlanStage(BaseStage):
             "validation_warnings": len(validation_warnings),
             "hallucination_detected": hallucination_detected,
             "short_content": short_content,
+            "llm_concurrency": concurrency,
+            "llm_peak_in_flight": graph.peak_requests,
+            "llm_batches": graph.count("batch:"),
+            "ranking": {**ranking_model.summary(), "llm_tiebreak_stories": len(ranking.get("llm_tiebreak_ids", []))},
+            "summary_fallbacks": sum(
+                it.get(field) == EXTRACTIVE_SOURCE_TYPE
+                for it in items
+                for field in ("content_summary_source_type", "discuss_summary_source_type")
+            ),
+            "tagging": {"source": tagging["source"], "confidence": tagging["confidence"], **index_stats},
+            "llm_routing": model_router.snapshot(),
+            "article_compression": compression_stats.snapshot(),
+            "llm_hedging": hedge_budget.snapshot(),
+            "llm_circuits": circuit_breakers.snapshot(),
+            "llm_single_flight": single_flight.snapshot(),
+            "llm_wall_seconds": round(graph.wall_seconds, 3),
+            "critical_path_seconds": round(critical_seconds, 3),
+            "critical_path": critical_path,
         }
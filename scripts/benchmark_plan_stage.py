@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Benchmark the LLM-bound paths against the local mock provider server.
+
+Starts src.llm.mock_server.MockLLMServer, then for each story count builds a
+throwaway workspace (config.json pointing every provider at the mock, a
+seeded news table, a rendered markdown post) and runs, in a fresh
+interpreter so no process-wide state carries over between sizes:
+
+- plan:  PlanStage.execute over all of today's stories
+- audit: audit_news gen-summary for every story, one after another
+- cover: generate_cover_ai through a stand-in gpt-image-2-skill wrapper that
+         sends one OpenAI images request to the mock (or --image-wrapper)
+
+Each case reports wall time, requests seen by the server, injected 429/503
+faults, retries (llm_calls.retries), quota consumed and tokens served.
+Gemini runs are paced by the client-side rate limiter, as in production.
+Workspaces are left in the temp directory for inspection (benchmark.log,
+the llm_calls table); their paths are in the --json report.
+
+Usage:
+    python scripts/benchmark_plan_stage.py --stories 10 100 500 --latency lognormal:0.3,0.5 \
+        --error-429 0.03 --error-503 0.01 --json output/benchmarks/plan.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.llm.mock_server import LatencyModel, MockLLMServer, MockSettings  # noqa: E402
+
+CASES = ("plan", "audit", "cover")
+GEMINI_MODEL = "gemini-3-flash-preview"
+SETTINGS_FILE = "benchmark_settings.json"
+RESULT_FILE = "benchmark_result.json"
+
+# Stand-in for gpt-image-2-skill's Node wrapper: one images request to $OPENAI_BASE_URL
+STAND_IN_WRAPPER = """\
+const fs = require("fs");
+const args = process.argv.slice(2);
+const opt = (name) => { const i = args.indexOf(name); return i >= 0 ? args[i + 1] : undefined; };
+const base = (process.env.OPENAI_BASE_URL || "").replace(/\\/$/, "");
+fetch(`${base}/images/generations`, {
+  method: "POST",
+  headers: { "Content-Type": "application/json", Authorization: `Bearer ${process.env.OPENAI_API_KEY}` },
+  body: JSON.stringify({ model: "gpt-image-2", prompt: opt("--prompt"), size: opt("--size"), quality: opt("--quality") }),
+})
+  .then(async (r) => { if (!r.ok) throw new Error(`HTTP ${r.status}: ${await r.text()}`); return r.json(); })
+  .then((j) => { fs.writeFileSync(opt("--out"), Buffer.from(j.data[0].b64_json, "base64")); console.log("{}"); })
+  .catch((e) => { console.error(String(e)); process.exit(1); });
+"""
+
+WORDS = ["kernel", "latency", "compiler", "database", "scheduler", "inference", "browser", "protocol", "cache"]
+
+
+# -- Workspace (parent process) ----------------------------------------------
+
+
+def _article(rng: random.Random, words: int) -> str:
+    sentences = []
+    while sum(len(s.split()) for s in sentences) < words:
+        sentences.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 16))).capitalize() + ".")
+    return " ".join(sentences)
+
+
+def prepare_workspace(workspace: Path, server: MockLLMServer, stories: int, args: argparse.Namespace) -> dict:
+    from src.utils.db_utils import init_database
+
+    (workspace / "config").mkdir(parents=True)
+    config = {
+        "GROK_API_KEY": "mock-key",
+        "GROK_API_URL": server.openai_url,
+        "GEMINI_API_KEY": "mock-key",
+        "GEMINI_API_URL": server.gemini_url(GEMINI_MODEL),
+        "GEMINI_MODEL": GEMINI_MODEL,
+        "MOONSHOT_API_KEY": "mock-key",
+        "MOONSHOT_API_URL": server.openai_url,
+        "DEFAULT_LLM": args.llm,
+    }
+    (workspace / "config" / "config.json").write_text(json.dumps(config, indent=2), encoding="utf-8")
+
+    db_path = workspace / "data" / "hacknews.db"
+    init_database(str(db_path))
+    rng = random.Random(args.seed + stories)
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            "INSERT INTO news (id, title, news_url, discuss_url, article_content, discussion_content, "
+            "hn_points, hn_comments, hn_rank, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now', 'localtime'))",
+            [
+                (
+                    news_id,
+                    f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)} story {news_id}",
+                    f"https://site{news_id % 37}.example/{news_id}",
+                    f"https://news.ycombinator.com/item?id={news_id}",
+                    _article(rng, rng.randint(300, 1200)),
+                    _article(rng, rng.randint(100, 400)),
+                    rng.randint(5, 900),
+                    rng.randint(0, 400),
+                    news_id if news_id <= 30 else None,
+                )
+                for news_id in range(1, stories + 1)
+            ],
+        )
+
+    markdown = workspace / "output" / "markdown" / f"hacknews_summary_{time.strftime('%Y%m%d')}_0800.md"
+    markdown.parent.mkdir(parents=True)
+    markdown.write_text(
+        f'---\ntitle: "Hacker News 摘要"\npubDatetime: {time.strftime("%Y-%m-%d")} 08:00:00\n---\n\n'
+        "## 1. 编译器提速十倍 (A compiler that is ten times faster)\n\n摘要\n",
+        encoding="utf-8",
+    )
+    wrapper = Path(args.image_wrapper) if args.image_wrapper else workspace / "skill" / "scripts" / "wrapper.cjs"
+    if not args.image_wrapper:
+        wrapper.parent.mkdir(parents=True)
+        wrapper.write_text(STAND_IN_WRAPPER, encoding="utf-8")
+
+    settings = {
+        "server": server.url,
+        "stories": stories,
+        "llm": args.llm,
+        "concurrency": args.concurrency,
+        "batch_size": args.batch_size,
+        "cases": args.cases,
+        "markdown": str(markdown),
+        "image_wrapper": str(wrapper),
+    }
+    (workspace / SETTINGS_FILE).write_text(json.dumps(settings, indent=2), encoding="utf-8")
+    return settings
+
+
+def run_size(server: MockLLMServer, stories: int, args: argparse.Namespace) -> dict:
+    workspace = Path(tempfile.mkdtemp(prefix=f"hn2md-bench-{stories}-"))
+    settings = prepare_workspace(workspace, server, stories, args)
+    no_proxy = ",".join(filter(None, [os.environ.get("NO_PROXY", ""), "127.0.0.1", "localhost"]))
+    env = {
+        **os.environ,
+        "GOOGLE_GEMINI_BASE_URL": server.url,
+        "OPENAI_BASE_URL": f"{server.url}/v1",
+        "OPENAI_API_KEY": "mock-key",
+        "HACKNEWS_IMAGE_WRAPPER": settings["image_wrapper"],
+        # Every case makes its own requests: no response cache, no cross-process reuse of results
+        "HN2MD_NO_LLM_CACHE": "1",
+        "HN2MD_NO_LLM_SINGLE_FLIGHT": "1",
+        "NO_PROXY": no_proxy,
+        "no_proxy": no_proxy,
+    }
+    server.reset()
+    proc = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--worker", str(workspace)], cwd=workspace, env=env
+    )
+    result_path = workspace / RESULT_FILE
+    if proc.returncode != 0 or not result_path.exists():
+        return {"stories": stories, "workspace": str(workspace), "error": f"worker exited with {proc.returncode}"}
+    result = json.loads(result_path.read_text(encoding="utf-8"))
+    result["workspace"] = str(workspace)
+    return result
+
+
+# -- Cases (worker process) --------------------------------------------------
+
+
+def _server_stats(url: str) -> dict:
+    import httpx
+
+    return httpx.get(f"{url}/stats", timeout=10, trust_env=False).json()
+
+
+def _llm_calls(run_id: str) -> tuple[int, int]:
+    from src.db.connection import get_db
+    from src.llm.accounting import call_log
+
+    call_log.flush()
+    try:
+        with get_db() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(retries), 0) FROM llm_calls WHERE run_id = ?", (run_id,)
+            ).fetchone()
+    except sqlite3.Error:
+        return 0, 0
+    return row[0], row[1]
+
+
+def measure(name: str, settings: dict, func) -> dict:
+    from src.llm.accounting import llm_call_context
+
+    run_id = f"bench-{settings['stories']}-{name}"
+    before = _server_stats(settings["server"])
+    started = time.perf_counter()
+    error = None
+    detail = None
+    try:
+        with llm_call_context(stage=name, run_id=run_id):
+            detail = func()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    wall = time.perf_counter() - started
+    after = _server_stats(settings["server"])
+    calls, retries = _llm_calls(run_id)
+    quota_before = before["quota_used"]
+    return {
+        "wall_seconds": round(wall, 3),
+        "requests": after["requests"] - before["requests"],
+        "streams": after["streams"] - before["streams"],
+        "injected_429": after["injected_429"] - before["injected_429"],
+        "injected_503": after["injected_503"] - before["injected_503"],
+        "quota_rejections": after["quota_rejections"] - before["quota_rejections"],
+        "quota_used": {
+            model: used - quota_before.get(model, 0)
+            for model, used in after["quota_used"].items()
+            if used > quota_before.get(model, 0)
+        },
+        "input_tokens": after["input_tokens"] - before["input_tokens"],
+        "output_tokens": after["output_tokens"] - before["output_tokens"],
+        "llm_calls": calls,
+        "retries": retries,
+        "detail": detail,
+        "error": error,
+    }
+
+
+def run_plan(settings: dict, workspace: Path) -> dict:
+    from hn2md.context import RuntimeContext
+    from hn2md.stages.plan import PlanStage
+
+    receipt = PlanStage().execute(
+        RuntimeContext.create(workspace),
+        None,
+        llm=settings["llm"],
+        concurrency=settings["concurrency"],
+        llm_cache=False,
+        batch_size=settings["batch_size"],
+    )
+    keys = ("story_count", "validation_warnings", "llm_batches", "llm_circuits", "critical_path_seconds")
+    return {key: receipt.get(key) for key in keys}
+
+
+def run_audit(settings: dict, workspace: Path) -> dict:
+    from src.core.audit_news import cmd_gen_summary
+
+    failed = 0
+    # gen-summary prints one JSON line per story; keep it out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        for news_id in range(1, settings["stories"] + 1):
+            failed += not cmd_gen_summary(news_id, llm_type=settings["llm"])
+    return {"stories": settings["stories"], "failed": failed}
+
+
+def run_cover(settings: dict, workspace: Path) -> dict:
+    from scripts.generate_wechat_cover_ai import generate_cover_ai
+
+    cover = generate_cover_ai(settings["markdown"], output=str(workspace / "output" / "images" / "cover_ai.png"))
+    return {"cover": cover}
+
+
+def run_worker(workspace: Path) -> None:
+    logging.basicConfig(
+        level=logging.WARNING,
+        filename=workspace / "benchmark.log",
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    settings = json.loads((workspace / SETTINGS_FILE).read_text(encoding="utf-8"))
+    runners = {"plan": run_plan, "audit": run_audit, "cover": run_cover}
+    cases = {
+        name: measure(name, settings, lambda run=runners[name]: run(settings, workspace))
+        for name in CASES
+        if name in settings["cases"]
+    }
+    result = {"stories": settings["stories"], "cases": cases}
+    (workspace / RESULT_FILE).write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+# -- Report --------------------------------------------------------------------
+
+
+def print_report(results: list[dict]) -> None:
+    print(
+        f"{'stories':>8} {'case':<6}{'wall s':>9}{'requests':>10}{'429':>6}{'503':>6}"
+        f"{'retries':>9}{'quota':>7}{'tokens':>10}  status"
+    )
+    for result in results:
+        if "error" in result:
+            print(f"{result['stories']:>8} {'-':<6}  {result['error']} (see {result['workspace']}/benchmark.log)")
+            continue
+        for name, case in result["cases"].items():
+            tokens = case["input_tokens"] + case["output_tokens"]
+            print(
+                f"{result['stories']:>8} {name:<6}{case['wall_seconds']:>9.2f}{case['requests']:>10}"
+                f"{case['injected_429']:>6}{case['injected_503']:>6}{case['retries']:>9}"
+                f"{sum(case['quota_used'].values()):>7}{tokens:>10}  {case['error'] or 'ok'}"
+            )
+
+
+def main() -> int:
+    if len(sys.argv) == 3 and sys.argv[1] == "--worker":
+        run_worker(Path(sys.argv[2]))
+        return 0
+
+    parser = argparse.ArgumentParser(description="Benchmark plan, audit gen-summary and AI cover against a mock LLM")
+    parser.add_argument("--stories", type=int, nargs="+", default=[10, 100, 500], help="Story counts to run")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--llm", default="grok", help="Provider the pipeline is pointed at (grok/gemini/moonshot)")
+    parser.add_argument("--concurrency", type=int, default=4, help="PlanStage LLM concurrency")
+    parser.add_argument("--batch-size", type=int, default=0, help="PlanStage stories per batch request (0: off)")
+    parser.add_argument("--latency", default="lognormal:0.3,0.5", help="Mock latency distribution (see mock_server)")
+    parser.add_argument("--error-429", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--error-503", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with faults")
+    parser.add_argument("--quota", type=int, default=None, help="Requests per model before quota exhaustion")
+    parser.add_argument("--stream-interval", type=float, default=0.0, help="Seconds between streamed chunks")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--image-wrapper", help="Real gpt-image-2-skill wrapper to run instead of the stand-in")
+    parser.add_argument("--json", help="Write the full results to this file")
+    args = parser.parse_args()
+
+    settings = MockSettings(
+        latency=LatencyModel.parse(args.latency),
+        error_429=args.error_429,
+        error_503=args.error_503,
+        retry_after=args.retry_after,
+        quota=args.quota,
+        stream_interval=args.stream_interval,
+        seed=args.seed,
+    )
+    print(
+        f"mock: latency={settings.latency} 429={settings.error_429:g} 503={settings.error_503:g} "
+        f"quota={settings.quota or 'unlimited'}; llm={args.llm} concurrency={args.concurrency}"
+    )
+    with MockLLMServer(settings) as server:
+        results = [run_size(server, stories, args) for stories in args.stories]
+
+    print_report(results)
+    if args.json:
+        path = Path(args.json)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        report = {"settings": {**vars(args), "latency": str(settings.latency)}, "results": results}
+        path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    return 0 if all("error" not in result for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
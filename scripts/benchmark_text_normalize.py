@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark src.utils.text_normalize against the inline cleanups it replaced.
+
+Builds synthetic multi-megabyte fixtures shaped like a long PDF extraction
+(mostly ASCII, ragged whitespace, stray control bytes) and a CJK-heavy
+article page, then times the legacy per-character generators against the
+shared module.
+
+Usage:
+    python scripts/benchmark_text_normalize.py --megabytes 8 --repeat 3
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.utils.text_normalize import _unprintable_re, normalize_crawled_text, normalize_pdf_text  # noqa: E402
+
+ASCII_WORDS = ["transformer", "latency", "throughput", "kernel", "scheduler", "allocation", "benchmark", "cache"]
+CJK_WORDS = ["模型", "推理", "延迟", "吞吐量", "内核", "调度器", "缓存", "基准测试"]
+SEPARATORS = [" ", " ", " ", "  ", "\n", "\n\n", "\t", " \n "]
+NOISE = ["\x00", "\x0c", "\x1b", "​", "﻿"]
+
+
+def build_fixture(words: list[str], megabytes: float, seed: int) -> str:
+    rng = random.Random(seed)
+    target = int(megabytes * 1024 * 1024)
+    parts: list[str] = []
+    size = 0
+    while size < target:
+        token = rng.choice(words) + rng.choice(SEPARATORS)
+        if rng.random() < 0.01:
+            token += rng.choice(NOISE)
+        parts.append(token)
+        size += len(token)
+    return "".join(parts)
+
+
+def legacy_pdf(text: str) -> str:
+    text = re.sub(r"\s+", " ", text).strip()
+    return "".join(ch for ch in text if ch.isprintable() or ch.isspace())
+
+
+def legacy_crawled(text: str) -> str:
+    text = re.sub(r"\s{2,}", " ", text)
+    text = re.sub(r"(\n\s*){2,}", "\n\n", text)
+    return "".join(ch for ch in text if ch.isprintable() or ch.isspace()).strip()
+
+
+def best_of(func, text: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark shared text normalisation")
+    parser.add_argument("--megabytes", type=float, default=8.0, help="Fixture size in MiB of characters")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the best is reported")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    _unprintable_re()
+    print(f"one-off character class build: {time.perf_counter() - start:.3f}s")
+
+    cases = [
+        ("pdf (ascii)", build_fixture(ASCII_WORDS, args.megabytes, 1), legacy_pdf, normalize_pdf_text),
+        ("article (ascii)", build_fixture(ASCII_WORDS, args.megabytes, 2), legacy_crawled, normalize_crawled_text),
+        ("article (cjk)", build_fixture(CJK_WORDS, args.megabytes, 3), legacy_crawled, normalize_crawled_text),
+    ]
+    print(f"{'case':<18}{'chars':>12}{'legacy':>10}{'shared':>10}{'speedup':>9}")
+    for name, text, legacy, shared in cases:
+        old = best_of(legacy, text, args.repeat)
+        new = best_of(shared, text, args.repeat)
+        print(f"{name:<18}{len(text):>12,}{old:>9.3f}s{new:>9.3f}s{old / new:>8.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -26,9 +26,23 @@ NEWS_ARCHIVE_COLUMNS = [
     "content_source_type",
     "content_source_url",
     "content_source_doi",
+    "canonical_url",
+    "page_canonical_url",
+    "hn_points",
+    "hn_comments",
+    "hn_rank",
+    "hn_posted_at",
     "created_at",
 ]
 
+# Front-page metrics captured by fetch_news (column -> SQLite type)
+HN_METRIC_COLUMNS = {
+    "hn_points": "INTEGER",
+    "hn_comments": "INTEGER",
+    "hn_rank": "INTEGER",
+    "hn_posted_at": "TEXT",
+}
+
 
 def _sanitize_identifier(name):
     """验证 SQL 标识符仅包含合法字符"""
@@ -73,6 +87,7 @@ def create_history_table(db_path: str | None = None):
             content_source_type TEXT,
             content_source_url TEXT,
             content_source_doi TEXT,
+            canonical_url TEXT,
             created_at TIMESTAMP,
             archived_at TIMESTAMP
         )
@@ -80,9 +95,21 @@ def create_history_table(db_path: str | None = None):
         for column in NEWS_ARCHIVE_COLUMNS:
             if column == "id":
                 continue
-            _ensure_column(cursor, "news_history", column)
-        for column in ("content_source_type", "content_source_url", "content_source_doi"):
+            _ensure_column(cursor, "news_history", column, HN_METRIC_COLUMNS.get(column, "TEXT"))
+        for column in (
+            "content_source_type",
+            "content_source_url",
+            "content_source_doi",
+            "canonical_url",
+            "page_canonical_url",
+        ):
             _ensure_column(cursor, "news", column)
+        for column, column_type in HN_METRIC_COLUMNS.items():
+            _ensure_column(cursor, "news", column, column_type)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_news_history_canonical_url ON news_history(canonical_url)")
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_news_history_page_canonical_url ON news_history(page_canonical_url)"
+        )
 
     logger.info("历史表创建成功")
 
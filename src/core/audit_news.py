@@ -17,6 +17,10 @@
    python src/core/audit_news.py set-title <id> <text>         # 手动设置中文标题
    python src/core/audit_news.py delete <id>                   # 删除新闻
 
+全局选项:
+  --llm <type>      指定 LLM (grok/gemini/moonshot)
+  --no-llm-cache    跳过 LLM 响应缓存，强制重新请求 (见 src/llm/response_cache.py)
+
 退出码:
   0 - 成功
   1 - 失败 或 仍有未处理的问题新闻
@@ -210,7 +214,10 @@ def cmd_gen_summary(news_id, llm_type=None):
     if not article_content or not article_content.strip():
         print(json.dumps({"error": "英文正文为空，无法生成摘要"}, ensure_ascii=False))
         return False
-    summary = generate_summary(article_content, llm_type=llm_type)
+    from src.llm.accounting import llm_call_context
+
+    with llm_call_context(stage="audit", news_id=news_id):
+        summary = generate_summary(article_content, llm_type=llm_type)
     if not summary:
         print(json.dumps({"error": "摘要生成失败"}, ensure_ascii=False))
         return False
@@ -236,7 +243,10 @@ def cmd_gen_title(news_id, llm_type=None):
     if not content_summary or not content_summary.strip():
         print(json.dumps({"error": "中文摘要为空，无法生成标题"}, ensure_ascii=False))
         return False
-    title_chs = generate_title(row["title"] or "", content_summary, llm_type=llm_type)
+    from src.llm.accounting import llm_call_context
+
+    with llm_call_context(stage="audit", news_id=news_id):
+        title_chs = generate_title(row["title"] or "", content_summary, llm_type=llm_type)
     if not title_chs:
         print(json.dumps({"error": "标题生成失败"}, ensure_ascii=False))
         return False
@@ -471,6 +481,13 @@ def main():
         else:
             args = args[:idx]
 
+    # 解析 --no-llm-cache 全局选项 (对本进程内所有 LLM 调用生效)
+    if "--no-llm-cache" in args:
+        from src.llm.response_cache import BYPASS_ENV
+
+        os.environ[BYPASS_ENV] = "1"
+        args = [arg for arg in args if arg != "--no-llm-cache"]
+
     # 无参数 → 终端交互模式
     if not args:
         success = run_audit_one(llm_type=llm_type)
@@ -517,6 +534,7 @@ def main():
                         "python audit_news.py gen-title <id> [--llm grok]  # 自动生成标题",
                         "python audit_news.py set-title <id> <text>        # 手动设置标题",
                         "python audit_news.py delete <id>                  # 删除新闻",
+                        "全局选项: --llm <type>  --no-llm-cache",
                     ],
                 },
                 ensure_ascii=False,
@@ -1,9 +1,9 @@
 """Content crawler backed by Crawl4AI's AsyncWebCrawler."""
 
 import logging
-import re
 
 from src.security.url_validator import SecurityError, validate_url
+from src.utils.text_normalize import normalize_crawled_text
 
 logger = logging.getLogger(__name__)
 
@@ -66,9 +66,7 @@ class Crawl4AICrawler:
             content = self._extract_main_content(soup)
 
         # --- clean up text ---------------------------------------------------
-        content = re.sub(r"\s{2,}", " ", content)
-        content = re.sub(r"(\n\s*){2,}", "\n\n", content)
-        content = "".join(ch for ch in content if ch.isprintable() or ch.isspace())
+        content = normalize_crawled_text(content)
 
         logger.info(
             "[CRAWL4AI] Done | chars=%d | images=%d",
@@ -1,10 +1,11 @@
 """Content crawler backed by Scrapling's Fetcher."""
 
 import logging
-import re
 from urllib.parse import urljoin
 
+from src.core.response_archive import record_response, recording_archive, replay_archive, replay_lookup
 from src.security.url_validator import SecurityError, validate_url
+from src.utils.text_normalize import normalize_crawled_text
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +14,7 @@ FETCH_TIMEOUT_SECONDS = 30
 
 try:
     from scrapling.fetchers import Fetcher
+    from scrapling.parser import Selector
 
     SCRAPLING_AVAILABLE = True
 except ImportError:
@@ -30,13 +32,17 @@ class ScraplingCrawler:
         if not SCRAPLING_AVAILABLE:
             raise ImportError("Scrapling is not installed. Run: pip install scrapling")
         self._max_images = max_images
+        self.canonical_url: str | None = None
 
     async def crawl_article(self, url: str) -> tuple[str, list[str]]:
         """Fetch *url* and return (text_content, image_urls).
 
         Uses Scrapling's ``Fetcher`` with ``stealthy_headers=True`` to
-        bypass basic anti-bot protections.
+        bypass basic anti-bot protections.  The page's
+        ``<link rel="canonical">`` target, if any, is left on
+        ``self.canonical_url``.
         """
+        self.canonical_url = None
         logger.info("[SCRAPLING] Crawling: %s", url[:80])
 
         # SSRF protection
@@ -47,12 +53,7 @@ class ScraplingCrawler:
             return "", []
 
         try:
-            page = Fetcher.get(
-                url,
-                stealthy_headers=True,
-                timeout=FETCH_TIMEOUT_SECONDS,
-                retries=0,
-            )
+            page = self._fetch_page(url)
         except TimeoutError:
             logger.warning("[SCRAPLING] Fetch timed out for %s", url[:60])
             return "", []
@@ -63,6 +64,9 @@ class ScraplingCrawler:
         # --- text content ---------------------------------------------------
         content: str = page.get_all_text()
 
+        # --- canonical link --------------------------------------------------
+        self.canonical_url = self._extract_canonical_url(page, url)
+
         # --- image URLs ------------------------------------------------------
         images: list[str] = []
         try:
@@ -77,9 +81,7 @@ class ScraplingCrawler:
             logger.warning("[SCRAPLING] Image extraction failed: %s", exc)
 
         # --- clean up text ---------------------------------------------------
-        content = re.sub(r"\s{2,}", " ", content)
-        content = re.sub(r"(\n\s*){2,}", "\n\n", content)
-        content = "".join(ch for ch in content if ch.isprintable() or ch.isspace())
+        content = normalize_crawled_text(content)
 
         logger.info(
             "[SCRAPLING] Done | chars=%d | images=%d",
@@ -92,6 +94,43 @@ class ScraplingCrawler:
         """No persistent resources to release."""
 
     # ------------------------------------------------------------------
+    @staticmethod
+    def _fetch_page(url: str):
+        """Fetch *url* live, or from the active response archive when replaying."""
+        if replay_archive() is not None:
+            record = replay_lookup(url)
+            return Selector(content=record.body, url=record.final_url or url)
+
+        page = Fetcher.get(
+            url,
+            stealthy_headers=True,
+            timeout=FETCH_TIMEOUT_SECONDS,
+            retries=0,
+        )
+        if recording_archive() is not None:
+            record_response(
+                url,
+                page.status,
+                page.body,
+                dict(getattr(page, "headers", None) or {}),
+                str(getattr(page, "url", "") or url),
+            )
+        return page
+
+    @classmethod
+    def _extract_canonical_url(cls, page, url: str) -> str | None:
+        """Return the absolute ``<link rel="canonical">`` href, if present."""
+        try:
+            for link in page.css("link[rel]"):
+                rels = str(link.attrib.get("rel") or "").lower().split()
+                href = (link.attrib.get("href") or "").strip()
+                if "canonical" in rels and href:
+                    resolved = cls._resolve_url(url, href)
+                    return resolved if resolved.startswith("http") else None
+        except Exception as exc:
+            logger.warning("[SCRAPLING] Canonical link extraction failed: %s", exc)
+        return None
+
     @staticmethod
     def _resolve_url(base: str, src: str) -> str:
         """Resolve *src* relative to *base*, handling ``//`` and ``/`` prefixes."""
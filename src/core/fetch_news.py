@@ -5,6 +5,7 @@ import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
 import logging
+import re
 import sqlite3
 import time
 import urllib.parse
@@ -14,10 +15,11 @@ import requests
 from bs4 import BeautifulSoup
 
 # 导入项目模块
-from src.core.archive_news import archive_old_news
+from src.core.archive_news import HN_METRIC_COLUMNS, archive_old_news
 from src.db.connection import get_db
 from src.security.url_validator import SecurityError, validate_url
 from src.utils import db_utils
+from src.utils.url_canonical import canonicalize_url
 
 # 配置常量
 HACKERNEWS_URL = "https://news.ycombinator.com/front"
@@ -68,9 +70,62 @@ def is_domain_filtered(domain: str, cursor: sqlite3.Cursor) -> bool:
     return cursor.fetchone() is not None
 
 
+def _has_canonical_column(cursor: sqlite3.Cursor, table_name: str, column_name: str = "canonical_url") -> bool:
+    """老库可能尚未迁移 canonical_url / page_canonical_url 列"""
+    cursor.execute(f"PRAGMA table_info({table_name})")
+    return any(column[1] == column_name for column in cursor.fetchall())
+
+
+def _canonical_match(cursor: sqlite3.Cursor, table_name: str) -> str:
+    """匹配规范化URL的 WHERE 片段：提交URL的规范化形式，以及页面 <link rel=canonical>（若有该列）"""
+    if _has_canonical_column(cursor, table_name, "page_canonical_url"):
+        return "canonical_url = ? OR page_canonical_url = ?"
+    return "canonical_url = ?"
+
+
+def _news_columns(cursor: sqlite3.Cursor) -> set[str]:
+    cursor.execute("PRAGMA table_info(news)")
+    return {column[1] for column in cursor.fetchall()}
+
+
+def _leading_int(text: str | None) -> int | None:
+    match = re.match(r"\s*(\d+)", text or "")
+    return int(match.group(1)) if match else None
+
+
+def parse_hn_metrics(title, sub) -> dict:
+    """首页排名、分数、评论数与发帖时间（解析失败的字段为 None）"""
+    row = title.find_parent("tr")
+    rank = row.find("span", class_="rank") if row else None
+    score = sub.find("span", class_="score")
+    age = sub.find("span", class_="age")
+    comments = None
+    for link in sub.find_all("a"):
+        text = link.get_text().replace("\xa0", " ").strip().lower()
+        if text == "discuss":
+            comments = 0
+        elif text.endswith(("comment", "comments")):
+            comments = _leading_int(text)
+    posted_at = (age.get("title") or "").split(" ")[0] if age else ""
+    return {
+        "hn_points": _leading_int(score.get_text()) if score else None,
+        "hn_comments": comments,
+        "hn_rank": _leading_int(rank.get_text()) if rank else None,
+        "hn_posted_at": posted_at or None,
+    }
+
+
 def is_url_in_history(news_url: str, cursor: sqlite3.Cursor) -> bool:
-    """检查URL是否存在于news_history表中"""
-    cursor.execute("SELECT id FROM news_history WHERE news_url = ?", (news_url,))
+    """检查URL（或其规范化变体）是否存在于news_history表中"""
+    canonical_url = canonicalize_url(news_url)
+    if canonical_url and _has_canonical_column(cursor, "news_history"):
+        match = _canonical_match(cursor, "news_history")
+        cursor.execute(
+            f"SELECT id FROM news_history WHERE {match} OR news_url = ? LIMIT 1",
+            (*[canonical_url] * match.count("?"), news_url),
+        )
+    else:
+        cursor.execute("SELECT id FROM news_history WHERE news_url = ?", (news_url,))
     return cursor.fetchone() is not None
 
 
@@ -143,7 +198,9 @@ def fetch_news() -> list[dict[str, str]]:
                 except (IndexError, KeyError) as e:
                     logger.warning(f"解析讨论链接失败: {e}")
 
-            news_items.append({"title": news_title, "news_url": news_url, "discuss_url": discuss_url})
+            news_items.append(
+                {"title": news_title, "news_url": news_url, "discuss_url": discuss_url, **parse_hn_metrics(title, sub)}
+            )
 
     logger.info(f"成功获取 {len(news_items)} 条新闻")
     return news_items
@@ -159,6 +216,9 @@ def save_to_database(news_items: list[dict[str, str]]) -> int:
 
     with get_db() as conn:
         cursor = conn.cursor()
+        store_canonical = _has_canonical_column(cursor, "news")
+        canonical_match = _canonical_match(cursor, "news") if store_canonical else ""
+        metric_columns = [column for column in HN_METRIC_COLUMNS if column in _news_columns(cursor)]
 
         for item in news_items:
             # 跳过"Ask HN:"开头的新闻
@@ -180,16 +240,26 @@ def save_to_database(news_items: list[dict[str, str]]) -> int:
                     logger.warning(f"讨论URL验证失败，清空: {item['title']}, 错误: {e}")
                     item["discuss_url"] = ""
 
-            # 检查是否已存在相同标题的新闻
-            cursor.execute("SELECT id FROM news WHERE title = ?", (item["title"],))
+            # 检查是否已存在相同标题或相同规范化URL的新闻
+            canonical_url = canonicalize_url(item["news_url"])
+            if store_canonical and canonical_url:
+                cursor.execute(
+                    f"SELECT id FROM news WHERE title = ? OR {canonical_match} LIMIT 1",
+                    (item["title"], *[canonical_url] * canonical_match.count("?")),
+                )
+            else:
+                cursor.execute("SELECT id FROM news WHERE title = ?", (item["title"],))
             if cursor.fetchone() is None:
+                # 列名只来自固定列表,值全部参数化
+                values = {"title": item["title"], "news_url": item["news_url"], "discuss_url": item["discuss_url"]}
+                if store_canonical:
+                    values["canonical_url"] = canonical_url
+                values.update({column: item.get(column) for column in metric_columns})
+                values["created_at"] = datetime.now()
                 try:
                     cursor.execute(
-                        """
-                    INSERT INTO news (title, news_url, discuss_url, created_at)
-                    VALUES (?, ?, ?, ?)
-                    """,
-                        (item["title"], item["news_url"], item["discuss_url"], datetime.now()),
+                        f"INSERT INTO news ({', '.join(values)}) VALUES ({', '.join('?' * len(values))})",
+                        tuple(values.values()),
                     )
                     saved_count += 1
                     logger.info(f"保存新闻: {item['title']}")
@@ -8,6 +8,7 @@ Each handler focuses on a single content type:
   - image_handler    : Image downloading and conversion
   - screenshot_handler : Page screenshot capture and LLM summarisation
   - discussion_handler : HN discussion page parsing
+  - content_probe  : MIME type / redirect probe used to route article URLs
 """
 
 from .discussion_handler import _fetch_discussion_via_selenium, get_discussion_content_async
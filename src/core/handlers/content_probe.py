@@ -0,0 +1,198 @@
+"""
+Content-type probe used to route article URLs by what they actually serve.
+
+URL shape alone misses PDFs behind extension-less links (``/download?id=1``,
+DOI resolvers, shortlinks).  ``probe_content_type`` issues a cheap ``HEAD``
+and falls back to a streamed ``GET`` when the server refuses ``HEAD`` or
+answers with a generic type.  The ``GET`` goes through the response archive,
+so probes record and replay like every other collect request.  The MIME type
+and final redirect URL of successful probes are cached per URL (least recently
+used first out past ``PROBE_CACHE_ENTRIES``); error answers such as a transient
+503 are not cached, so the next probe asks the server again.  When
+the ``GET`` path was taken, the still-open response is kept on the probe so
+the chosen handler can consume the body instead of downloading it twice.
+"""
+
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Iterator
+from dataclasses import dataclass, field, replace
+
+import certifi
+import requests
+
+from src.core.response_archive import archived_get, replay_archive
+from src.security.url_validator import SecurityError, validate_url
+from src.utils.http_constants import BROWSER_HEADERS
+
+logger = logging.getLogger(__name__)
+
+PROBE_TIMEOUT_SECONDS = 10
+SNIFF_BYTES = 1024
+PROBE_CACHE_ENTRIES = 1024
+
+# Content types that say nothing about the payload and need byte sniffing
+GENERIC_MIME_TYPES = frozenset({"", "application/octet-stream", "binary/octet-stream", "application/download"})
+
+_PROBE_CACHE: OrderedDict[str, "ContentProbe"] = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+
+@dataclass
+class ContentProbe:
+    """Routing facts for one URL: MIME type and final URL after redirects."""
+
+    url: str
+    final_url: str
+    mime_type: str
+    status_code: int | None = None
+    _prefix: bytes = field(default=b"", repr=False, compare=False)
+    _response: requests.Response | None = field(default=None, repr=False, compare=False)
+
+    @property
+    def is_pdf(self) -> bool:
+        return self.mime_type == "application/pdf"
+
+    @property
+    def is_html(self) -> bool:
+        return self.mime_type in ("text/html", "application/xhtml+xml")
+
+    @property
+    def has_body(self) -> bool:
+        """Whether an unread response body is still attached to this probe."""
+        return self._response is not None
+
+    def iter_body(self, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """Yield the attached response body once, including sniffed bytes."""
+        response, self._response = self._response, None
+        prefix, self._prefix = self._prefix, b""
+        if response is None:
+            return
+        try:
+            if prefix:
+                yield prefix
+            yield from response.iter_content(chunk_size=chunk_size)
+        finally:
+            response.close()
+
+    def close(self) -> None:
+        """Release the attached response without reading it."""
+        if self._response is not None:
+            self._response.close()
+        self._response = None
+        self._prefix = b""
+
+
+def _parse_mime_type(content_type: str | None) -> str:
+    return (content_type or "").split(";", 1)[0].strip().lower()
+
+
+def sniff_mime_type(data: bytes) -> str:
+    """Infer a MIME type from the leading bytes of a response body."""
+    head = data.lstrip()[:64].lower()
+    if head.startswith(b"%pdf-"):
+        return "application/pdf"
+    if head.startswith((b"<!doctype html", b"<html")):
+        return "text/html"
+    if head.startswith(b"<?xml"):
+        return "application/xml"
+    return ""
+
+
+def _probe_with_head(url: str, timeout: float) -> ContentProbe | None:
+    try:
+        response = requests.head(
+            url,
+            headers={**BROWSER_HEADERS, "Accept": "*/*"},
+            allow_redirects=True,
+            timeout=timeout,
+            verify=certifi.where(),
+        )
+    except requests.RequestException as exc:
+        logger.debug("[PROBE] HEAD failed | %s | url=%s", exc, url[:80])
+        return None
+    mime_type = _parse_mime_type(response.headers.get("Content-Type"))
+    if response.status_code >= 400 or mime_type in GENERIC_MIME_TYPES:
+        return None
+    return ContentProbe(url, response.url or url, mime_type, response.status_code)
+
+
+def _probe_with_get(url: str, timeout: float) -> ContentProbe | None:
+    try:
+        response = archived_get(
+            url,
+            headers={**BROWSER_HEADERS, "Accept": "*/*"},
+            allow_redirects=True,
+            timeout=timeout,
+            verify=certifi.where(),
+            stream=True,
+        )
+    except requests.RequestException as exc:
+        logger.info("[PROBE] GET failed | %s | url=%s", exc, url[:80])
+        return None
+
+    final_url = response.url or url
+    if response.status_code >= 400:
+        response.close()
+        return ContentProbe(url, final_url, "", response.status_code)
+
+    prefix = b""
+    mime_type = _parse_mime_type(response.headers.get("Content-Type"))
+    if mime_type in GENERIC_MIME_TYPES and response.raw is None:
+        # Body already buffered by the response archive
+        mime_type = sniff_mime_type(response.content[:SNIFF_BYTES]) or mime_type
+    elif mime_type in GENERIC_MIME_TYPES:
+        try:
+            prefix = response.raw.read(SNIFF_BYTES, decode_content=True) or b""
+        except Exception as exc:
+            logger.debug("[PROBE] sniff failed | %s | url=%s", exc, url[:80])
+        mime_type = sniff_mime_type(prefix) or mime_type
+
+    return ContentProbe(url, final_url, mime_type, response.status_code, _prefix=prefix, _response=response)
+
+
+def probe_content_type(url: str, timeout: float = PROBE_TIMEOUT_SECONDS) -> ContentProbe | None:
+    """Return the content probe for *url*, or None when the URL is unreachable.
+
+    Cached probes are returned without an attached body; failed probes
+    (status >= 400) are returned but not cached.
+    """
+    with _CACHE_LOCK:
+        cached = _PROBE_CACHE.get(url)
+        if cached is not None:
+            _PROBE_CACHE.move_to_end(url)
+    if cached is not None:
+        return replace(cached, _prefix=b"", _response=None)
+
+    try:
+        validate_url(url)
+    except (SecurityError, ValueError) as e:
+        logger.warning(f"[PROBE] URL validation failed | {e} | url={url[:80]}")
+        return None
+
+    # Replay has no HEAD records; the archived GET carries the same headers
+    head_probe = None if replay_archive() is not None else _probe_with_head(url, timeout)
+    probe = head_probe or _probe_with_get(url, timeout)
+    if probe is None:
+        return None
+
+    logger.info(f"[PROBE] {probe.mime_type or 'unknown'} | status:{probe.status_code} | url={url[:80]}")
+    if probe.status_code is None or probe.status_code < 400:
+        with _CACHE_LOCK:
+            _PROBE_CACHE[url] = replace(probe, _prefix=b"", _response=None)
+            while len(_PROBE_CACHE) > PROBE_CACHE_ENTRIES:
+                _PROBE_CACHE.popitem(last=False)
+    return probe
+
+
+async def probe_content_type_async(url: str, timeout: float = PROBE_TIMEOUT_SECONDS) -> ContentProbe | None:
+    """Async wrapper around :func:`probe_content_type`."""
+    return await asyncio.to_thread(probe_content_type, url, timeout)
+
+
+def clear_probe_cache() -> None:
+    """Forget every cached probe (used by tests and long-running processes)."""
+    with _CACHE_LOCK:
+        _PROBE_CACHE.clear()
@@ -19,6 +19,7 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
+from src.core.response_archive import ArchiveMiss, record_response, replay_archive, replay_lookup
 from src.security.url_validator import SecurityError, validate_url
 
 logger = logging.getLogger(__name__)
@@ -69,11 +70,41 @@ def _fetch_discussion_via_selenium(url: str) -> str:
 # ---------------------------------------------------------------------------
 
 
+async def _fetch_discussion_html(url: str, headers: dict[str, str]) -> str | None:
+    """Fetch discussion HTML with aiohttp, falling back to Selenium."""
+    import aiohttp
+
+    # --- Try aiohttp first -----------------------------------------------
+    html = None
+    async with aiohttp.ClientSession() as session:
+        try:
+            async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=30)) as response:
+                if response.status == 200:
+                    html = await response.text()
+                    logger.info(f"[DISCUSSION] aiohttp OK | len:{len(html)}")
+                else:
+                    logger.warning(f"[DISCUSSION] aiohttp status:{response.status}")
+        except Exception as e:
+            logger.warning(f"[DISCUSSION] aiohttp failed:{e}")
+
+    # --- Selenium fallback if content is too short ------------------------
+    if not html or len(html) < 1000:
+        logger.info("[DISCUSSION] aiohttp insufficient, trying Selenium...")
+        try:
+            html = await asyncio.to_thread(_fetch_discussion_via_selenium, url)
+            if html:
+                logger.info(f"[DISCUSSION] Selenium OK | len:{len(html)}")
+        except Exception as e:
+            logger.error(f"[DISCUSSION] Selenium failed:{e}")
+    return html
+
+
 async def get_discussion_content_async(url: str) -> str:
     """Fetch and parse a Hacker News discussion page.
 
     Tries aiohttp first, falls back to Selenium if the response is
-    too short or the request fails.
+    too short or the request fails.  An active response archive records
+    the fetched HTML or, in replay mode, serves it without any network.
 
     Returns:
         Concatenated text of the main post and top-level comments,
@@ -92,7 +123,6 @@ async def get_discussion_content_async(url: str) -> str:
     logger.info(f"[DISCUSSION] starting | URL: {url[:80]}...")
 
     try:
-        import aiohttp
         from bs4 import BeautifulSoup
 
         headers = {
@@ -109,28 +139,18 @@ async def get_discussion_content_async(url: str) -> str:
             "Upgrade-Insecure-Requests": "1",
         }
 
-        # --- Try aiohttp first -------------------------------------------
         html = None
-        async with aiohttp.ClientSession() as session:
+        if replay_archive() is not None:
+            # --- Offline replay: never touch the network ------------------
             try:
-                async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=30)) as response:
-                    if response.status == 200:
-                        html = await response.text()
-                        logger.info(f"[DISCUSSION] aiohttp OK | len:{len(html)}")
-                    else:
-                        logger.warning(f"[DISCUSSION] aiohttp status:{response.status}")
-            except Exception as e:
-                logger.warning(f"[DISCUSSION] aiohttp failed:{e}")
-
-        # --- Selenium fallback if content is too short --------------------
-        if not html or len(html) < 1000:
-            logger.info("[DISCUSSION] aiohttp insufficient, trying Selenium...")
-            try:
-                html = await asyncio.to_thread(_fetch_discussion_via_selenium, url)
-                if html:
-                    logger.info(f"[DISCUSSION] Selenium OK | len:{len(html)}")
-            except Exception as e:
-                logger.error(f"[DISCUSSION] Selenium failed:{e}")
+                html = replay_lookup(url).text
+            except ArchiveMiss as e:
+                logger.warning(f"[DISCUSSION] {e}")
+                return ""
+        else:
+            html = await _fetch_discussion_html(url, headers)
+            if html:
+                record_response(url, 200, html)
 
         if not html:
             logger.error("[DISCUSSION] all methods failed")
@@ -15,6 +15,7 @@ from typing import Any
 from urllib.parse import urljoin, urlparse
 
 from src.security.url_validator import SecurityError, validate_url
+from src.utils.text_normalize import html_fragment_to_text
 
 logger = logging.getLogger(__name__)
 
@@ -42,12 +43,7 @@ def is_fediverse_url(url: str) -> bool:
 
 
 def _strip_html(value: str) -> str:
-    text = re.sub(r"(?i)<br\s*/?>", "\n", value)
-    text = re.sub(r"(?i)</p\s*>", "\n\n", text)
-    text = re.sub(r"<[^>]+>", "", text)
-    text = html.unescape(text)
-    lines = [line.strip() for line in text.splitlines()]
-    return "\n".join(line for line in lines if line).strip()
+    return html_fragment_to_text(value)
 
 
 def extract_activitypub_note(data: dict[str, Any], source_url: str) -> str:
@@ -1,20 +1,36 @@
 """
 PDF content handler -- extracted from summarize_news5.py.
 
-Downloads a PDF from a URL and extracts text using PyPDF2.
+Streams a PDF from a URL to a temporary file (with a byte cap) and extracts
+text with PyPDF2 in a process pool, a few pages per task.  Extraction stops
+at a page budget, or earlier once enough text for summarisation is collected,
+so a 300-page paper no longer stalls the collect batch.
 """
 
 import asyncio
-import io
+import atexit
 import logging
-import re
+import multiprocessing
+import os
+import tempfile
 import traceback
+from collections.abc import Iterable
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import TYPE_CHECKING
 from urllib.parse import urlparse
 
 import certifi
 import requests
 
+from src.core.response_archive import archived_get
+from src.llm.retry import RetryPolicy, aretry_call
 from src.security.url_validator import SecurityError, validate_url
+from src.utils.text_normalize import normalize_pdf_text
+
+if TYPE_CHECKING:
+    from src.core.handlers.content_probe import ContentProbe
 
 try:
     import PyPDF2
@@ -25,6 +41,27 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Download limits
+PDF_MAX_BYTES = 40 * 1024 * 1024
+DOWNLOAD_CHUNK_BYTES = 256 * 1024
+# Three attempts, 2 s apart
+PDF_DOWNLOAD_RETRY = RetryPolicy(max_retries=2, backoff_base=2.0, backoff_max=2.0, jitter=0.0)
+
+# Extraction budget: stop after PDF_MAX_PAGES pages or PDF_TARGET_CHARS characters,
+# whichever comes first.  Summaries only ever read the opening of the paper.
+PDF_MAX_PAGES = 60
+PDF_TARGET_CHARS = 40_000
+PDF_PAGES_PER_TASK = 4
+PDF_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+# The PDF header must appear within the first KiB (PDF 1.7, Annex H)
+_PDF_MAGIC = b"%PDF-"
+_PDF_MAGIC_WINDOW = 1024
+
+
+class PdfTooLargeError(ValueError):
+    """Raised when a PDF download exceeds ``PDF_MAX_BYTES``."""
+
 
 def normalize_pdf_url(url: str) -> str:
     """Return a direct PDF URL when a hosting page wraps the PDF.
@@ -51,94 +88,252 @@ def is_pdf_url(url: str) -> bool:
     return normalize_pdf_url(url) != url
 
 
-async def get_pdf_content(url: str) -> str:
+async def get_pdf_content(url: str, probe: "ContentProbe | None" = None) -> str:
     """Extract text from a PDF at *url*.
 
-    Returns the full text of all pages joined by double newlines,
-    or an empty string on failure.
+    When *probe* carries an already-open PDF response (see
+    ``content_probe.probe_content_type``), its body is consumed instead of
+    downloading the file again.
+
+    Returns the text of the pages read (joined by double newlines, then
+    whitespace-normalised), or an empty string on failure.
     """
     url = normalize_pdf_url(url)
-
-    # SSRF protection: validate URL before fetching
+    pdf_path: Path | None = None
     try:
-        validate_url(url)
-    except (SecurityError, ValueError) as e:
-        logger.warning(f"[PDF] URL validation failed | {e} | url={url[:80]}")
-        return ""
+        # SSRF protection: validate URL before fetching
+        try:
+            validate_url(url)
+        except (SecurityError, ValueError) as e:
+            logger.warning(f"[PDF] URL validation failed | {e} | url={url[:80]}")
+            return ""
 
-    if PDF_LIBRARY is None:
-        logger.warning("[PDF] PyPDF2 not installed")
-        return ""
+        if PDF_LIBRARY is None:
+            logger.warning("[PDF] PyPDF2 not installed")
+            return ""
 
-    logger.info(f"[PDF] starting extraction | URL: {url[:80]}...")
+        logger.info(f"[PDF] starting extraction | URL: {url[:80]}...")
 
-    try:
-        headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                "(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-            ),
-            "Accept": "application/pdf,*/*",
-        }
-
-        # Download with retries
-        max_retries = 3
-        response = None
-        for attempt in range(max_retries):
+        if probe is not None and probe.is_pdf and probe.has_body:
             try:
-                loop = asyncio.get_event_loop()
-                response = await loop.run_in_executor(
-                    None,
-                    lambda: requests.get(url, headers=headers, verify=certifi.where(), timeout=30, stream=True),
-                )
-
-                if response.status_code == 200:
-                    logger.info(f"[PDF] download OK | attempt:{attempt + 1}/{max_retries}")
-                    break
-                else:
-                    logger.warning(
-                        f"[PDF] download failed | status:{response.status_code} | attempt:{attempt + 1}/{max_retries}"
-                    )
-            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
-                logger.warning(f"[PDF] download error | attempt:{attempt + 1}/{max_retries} | err:{e}")
-
-            if attempt < max_retries - 1:
-                await asyncio.sleep(2)
-        else:
-            status = response.status_code if response else "N/A"
-            logger.error(f"[PDF] all retries exhausted | status:{status}")
-            return ""
+                pdf_path = await asyncio.to_thread(_spool_to_tempfile, probe.iter_body(DOWNLOAD_CHUNK_BYTES))
+                logger.info("[PDF] reused probe response")
+            except PdfTooLargeError as e:
+                logger.warning(f"[PDF] {e}")
+                return ""
+            except Exception as e:
+                logger.warning(f"[PDF] probe response unusable, downloading again: {e}")
 
-        # Verify content type
-        content_type = response.headers.get("Content-Type", "").lower()
-        if "pdf" not in content_type:
-            logger.warning(f"[PDF] not a PDF | Content-Type:{content_type}")
+        if pdf_path is None:
+            pdf_path = await _download_pdf(url)
+        if pdf_path is None:
             return ""
+        return await extract_pdf_file(pdf_path)
 
-        # Extract text with PyPDF2
-        pdf_file = io.BytesIO(response.content)
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
+    except Exception as e:
+        logger.error(f"[PDF] extraction error: {e}")
+        traceback.print_exc()
+        return ""
+    finally:
+        # Release a probe response that was not consumed (early return, non-PDF probe, spool failure)
+        if probe is not None:
+            probe.close()
+        if pdf_path is not None:
+            pdf_path.unlink(missing_ok=True)
 
-        text_content: list[str] = []
-        total_pages = len(pdf_reader.pages)
-        logger.info(f"[PDF] {total_pages} pages")
 
-        for page_num in range(total_pages):
-            page = pdf_reader.pages[page_num]
-            text = page.extract_text()
-            if text:
-                text_content.append(text)
+async def _download_pdf(url: str) -> Path | None:
+    """Stream *url* to a temporary file, returning None when it is not a usable PDF."""
+    headers = {
+        "User-Agent": (
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+            "(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+        ),
+        "Accept": "application/pdf,*/*",
+    }
 
-        full_text = "\n\n".join(text_content)
+    # Download with retries (Retry-After honoured, host retry budget, run deadline)
+    async def _get():
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None,
+            lambda: archived_get(url, headers=headers, verify=certifi.where(), timeout=30, stream=True),
+        )
 
-        # Clean
-        full_text = re.sub(r"\s+", " ", full_text).strip()
-        full_text = "".join(ch for ch in full_text if ch.isprintable() or ch.isspace())
+    def _failed(response) -> bool:
+        if response.status_code == 200:
+            return False
+        logger.warning(f"[PDF] download failed | status:{response.status_code}")
+        response.close()
+        return True
 
-        logger.info(f"[PDF] extraction OK | len:{len(full_text)}")
-        return full_text
+    try:
+        response = await aretry_call(
+            _get,
+            policy=PDF_DOWNLOAD_RETRY,
+            host=urlparse(url).netloc.lower() or None,
+            retry_on=(requests.exceptions.ConnectionError, requests.exceptions.Timeout),
+            retry_result=_failed,
+        )
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+        logger.error(f"[PDF] all retries exhausted | err:{e}")
+        return None
+    if response.status_code != 200:
+        logger.error(f"[PDF] all retries exhausted | status:{response.status_code}")
+        return None
+    logger.info("[PDF] download OK")
 
-    except Exception as e:
-        logger.error(f"[PDF] extraction error: {e}")
-        traceback.print_exc()
-        return ""
+    # Verify content type (servers often label PDFs application/octet-stream;
+    # the magic-byte check in _spool_to_tempfile settles those)
+    content_type = response.headers.get("Content-Type", "").lower()
+    if "html" in content_type:
+        logger.warning(f"[PDF] not a PDF | Content-Type:{content_type}")
+        response.close()
+        return None
+
+    content_length = response.headers.get("Content-Length", "")
+    if content_length.isdigit() and int(content_length) > PDF_MAX_BYTES:
+        logger.warning(f"[PDF] too large | Content-Length:{content_length} > cap:{PDF_MAX_BYTES}")
+        response.close()
+        return None
+
+    try:
+        return await asyncio.to_thread(_spool_to_tempfile, response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES))
+    except (PdfTooLargeError, ValueError) as e:
+        logger.warning(f"[PDF] {e} | Content-Type:{content_type}")
+        return None
+    finally:
+        response.close()
+
+
+def _spool_to_tempfile(chunks: Iterable[bytes], max_bytes: int | None = None) -> Path:
+    """Write *chunks* to a temporary ``.pdf`` file, enforcing the byte cap.
+
+    Raises ``PdfTooLargeError`` past the cap and ``ValueError`` when the
+    payload does not start with a PDF header.  The file is removed on error.
+    """
+    max_bytes = PDF_MAX_BYTES if max_bytes is None else max_bytes
+    fd, name = tempfile.mkstemp(prefix="hn2md_", suffix=".pdf")
+    path = Path(name)
+    written = 0
+    head = b""
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                if len(head) < _PDF_MAGIC_WINDOW:
+                    head += chunk[: _PDF_MAGIC_WINDOW - len(head)]
+                written += len(chunk)
+                if written > max_bytes:
+                    raise PdfTooLargeError(f"download exceeds cap of {max_bytes} bytes")
+                fh.write(chunk)
+        if _PDF_MAGIC not in head:
+            raise ValueError("not a PDF (missing %PDF- header)")
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    logger.info(f"[PDF] spooled | bytes:{written}")
+    return path
+
+
+# ---------------------------------------------------------------------------
+# Page extraction (runs in worker processes)
+# ---------------------------------------------------------------------------
+
+_pdf_executor: ProcessPoolExecutor | None = None
+
+
+def _get_pdf_executor() -> Executor | None:
+    """Return the shared page-extraction pool, or None to use threads."""
+    global _pdf_executor
+    if PDF_WORKERS <= 1:
+        return None
+    if _pdf_executor is None:
+        # spawn matches Windows behaviour and is safe alongside asyncio threads
+        _pdf_executor = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pdf_executor
+
+
+@atexit.register
+def _shutdown_pdf_executor() -> None:
+    global _pdf_executor
+    if _pdf_executor is not None:
+        _pdf_executor.shutdown(wait=False, cancel_futures=True)
+        _pdf_executor = None
+
+
+def _count_pdf_pages(path: str) -> int:
+    return len(PyPDF2.PdfReader(path).pages)
+
+
+def _extract_page_range(path: str, start: int, stop: int) -> list[str]:
+    """Extract text of pages ``[start, stop)``; unreadable pages yield ``""``."""
+    reader = PyPDF2.PdfReader(path)
+    texts: list[str] = []
+    for page_num in range(start, min(stop, len(reader.pages))):
+        try:
+            texts.append(reader.pages[page_num].extract_text() or "")
+        except Exception as exc:
+            logger.debug(f"[PDF] page {page_num} failed: {exc}")
+            texts.append("")
+    return texts
+
+
+async def extract_pdf_file(
+    path: Path | str,
+    max_pages: int | None = None,
+    target_chars: int | None = None,
+) -> str:
+    """Extract text from the PDF at *path* within the page/character budget.
+
+    Page ranges are extracted in parallel, one wave of ``PDF_WORKERS`` tasks
+    at a time, in document order; the loop stops after the first wave that
+    reaches *target_chars*.
+    """
+    global _pdf_executor
+    max_pages = PDF_MAX_PAGES if max_pages is None else max_pages
+    target_chars = PDF_TARGET_CHARS if target_chars is None else target_chars
+    path = str(path)
+
+    total_pages = await asyncio.to_thread(_count_pdf_pages, path)
+    budget = min(total_pages, max_pages)
+    logger.info(f"[PDF] {total_pages} pages | budget:{budget}")
+
+    ranges = [(start, min(start + PDF_PAGES_PER_TASK, budget)) for start in range(0, budget, PDF_PAGES_PER_TASK)]
+    wave_size = max(1, PDF_WORKERS)
+    loop = asyncio.get_running_loop()
+    text_content: list[str] = []
+    chars = 0
+    pages_read = 0
+
+    for wave_start in range(0, len(ranges), wave_size):
+        wave = ranges[wave_start : wave_start + wave_size]
+        executor = _get_pdf_executor()
+        try:
+            results = await asyncio.gather(
+                *(loop.run_in_executor(executor, _extract_page_range, path, start, stop) for start, stop in wave)
+            )
+        except (BrokenProcessPool, OSError) as exc:
+            logger.warning(f"[PDF] process pool unavailable, extracting in threads: {exc}")
+            _pdf_executor = None
+            results = await asyncio.gather(
+                *(loop.run_in_executor(None, _extract_page_range, path, start, stop) for start, stop in wave)
+            )
+        for page_texts in results:
+            pages_read += len(page_texts)
+            for text in page_texts:
+                if text:
+                    text_content.append(text)
+                    chars += len(text)
+        if chars >= target_chars:
+            logger.info(f"[PDF] early stop | pages:{pages_read}/{total_pages} | chars:{chars}")
+            break
+
+    full_text = _clean_pdf_text("\n\n".join(text_content))
+    logger.info(f"[PDF] extraction OK | pages:{pages_read} | len:{len(full_text)}")
+    return full_text
+
+
+def _clean_pdf_text(text: str) -> str:
+    return normalize_pdf_text(text)
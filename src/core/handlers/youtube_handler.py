@@ -6,11 +6,11 @@ Fetches subtitles via youtube_transcript_api and downloads the thumbnail.
 """
 
 import logging
-import re
 from urllib.parse import parse_qs, urlparse
 
 from src.core.handlers.image_handler import save_article_image
 from src.security.url_validator import SecurityError, validate_url
+from src.utils.text_normalize import join_text_segments
 
 logger = logging.getLogger(__name__)
 
@@ -19,15 +19,7 @@ YOUTUBE_TRANSCRIPT_LANGUAGES = ["zh-Hans", "zh-Hant", "zh", "zh-CN", "zh-TW", "e
 
 def _normalize_transcript_text(items) -> str:
     """Join transcript segments and normalize whitespace for downstream summaries."""
-    texts = []
-    for item in items:
-        text = getattr(item, "text", "")
-        if not text:
-            continue
-        normalized = re.sub(r"\s+", " ", text).strip()
-        if normalized:
-            texts.append(normalized)
-    return " ".join(texts)
+    return join_text_segments(getattr(item, "text", "") for item in items)
 
 
 async def get_youtube_content(url: str, title: str) -> tuple[str, list[str], list[str]]:
@@ -0,0 +1,372 @@
+"""
+Per-day raw HTTP response archive with record and replay modes.
+
+Layout (one directory per day, ``output/responses/YYYYMMDD/``)::
+
+    responses.warc.gz    concatenated gzip members, one record each
+    responses.idx.jsonl  one JSON line per record: url, method, offset, length, ...
+
+Each gzip member holds a JSON header line followed by the raw body, so any
+record can be decompressed on its own from its ``(offset, length)`` pair, the
+same trick ``.warc.gz`` files use.
+
+While an archive is activated with :func:`use_archive` the crawlers and
+handlers route their HTTP through it: in ``record`` mode every response is
+fetched live and appended; in ``replay`` mode nothing touches the network and
+a URL missing from the archive behaves like a connection failure.
+
+Usage:
+    archive = ResponseArchive.for_day(ctx.output_dir / "responses", "20260601")
+    with use_archive(archive, REPLAY):
+        text, images = await ScraplingCrawler().crawl_article(url)
+"""
+
+import gzip
+import json
+import logging
+import threading
+import zlib
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+import certifi
+import requests
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FILENAME = "responses.warc.gz"
+INDEX_FILENAME = "responses.idx.jsonl"
+
+RECORD = "record"
+REPLAY = "replay"
+
+# Larger streamed bodies are passed through to the caller but not recorded
+ARCHIVE_MAX_BODY_BYTES = 40 * 1024 * 1024
+STREAM_CHUNK_BYTES = 64 * 1024
+
+# Headers that describe the transfer rather than the payload we store
+_HOP_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding", "connection"})
+
+
+class ArchiveMiss(requests.exceptions.ConnectionError):
+    """Raised in replay mode when a URL was never recorded."""
+
+
+@dataclass(frozen=True)
+class ArchivedResponse:
+    """One recorded response: decoded body plus the headers that describe it."""
+
+    url: str
+    status: int
+    body: bytes
+    headers: Mapping[str, str] = field(default_factory=dict)
+    final_url: str = ""
+    method: str = "GET"
+    recorded_at: str = ""
+
+    @property
+    def text(self) -> str:
+        content_type = self.headers.get("Content-Type") or self.headers.get("content-type") or ""
+        charset = "utf-8"
+        for part in content_type.split(";")[1:]:
+            key, _, value = part.strip().partition("=")
+            if key.lower() == "charset" and value:
+                charset = value.strip("\"'")
+        try:
+            return self.body.decode(charset, errors="replace")
+        except LookupError:
+            return self.body.decode("utf-8", errors="replace")
+
+    def to_requests_response(self) -> requests.Response:
+        """Rebuild a fully-buffered ``requests.Response`` (``raw`` is None)."""
+        response = requests.Response()
+        response.status_code = self.status
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.url = self.final_url or self.url
+        response._content = self.body
+        response._content_consumed = True
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        return response
+
+
+class ResponseArchive:
+    """Append-only response store for one day, indexed by ``(method, url)``."""
+
+    def __init__(self, directory: Path | str):
+        self.directory = Path(directory)
+        self.archive_path = self.directory / ARCHIVE_FILENAME
+        self.index_path = self.directory / INDEX_FILENAME
+        self._lock = threading.Lock()
+        self._index: dict[tuple[str, str], dict] | None = None
+
+    @classmethod
+    def for_day(cls, root: Path | str, day: str) -> "ResponseArchive":
+        """Return the archive for *day* (``YYYYMMDD``) under *root*."""
+        return cls(Path(root) / day)
+
+    def _load_index(self) -> dict[tuple[str, str], dict]:
+        if self._index is None:
+            index: dict[tuple[str, str], dict] = {}
+            if self.index_path.exists():
+                with self.index_path.open(encoding="utf-8") as fh:
+                    for line in fh:
+                        if not line.strip():
+                            continue
+                        try:
+                            entry = json.loads(line)
+                        except json.JSONDecodeError:
+                            logger.warning(f"[ARCHIVE] skipping corrupt index line in {self.index_path}")
+                            continue
+                        # Later records win: a re-recorded URL replaces the older one
+                        index[(entry["method"], entry["url"])] = entry
+            self._index = index
+        return self._index
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._load_index())
+
+    def __contains__(self, url: str) -> bool:
+        with self._lock:
+            return ("GET", url) in self._load_index()
+
+    def urls(self) -> list[str]:
+        with self._lock:
+            return [url for _, url in self._load_index()]
+
+    @staticmethod
+    def _header(response: ArchivedResponse) -> dict:
+        return {
+            "url": response.url,
+            "final_url": response.final_url or response.url,
+            "method": response.method,
+            "status": response.status,
+            "headers": {k: v for k, v in response.headers.items() if k.lower() not in _HOP_HEADERS},
+            "recorded_at": response.recorded_at or datetime.now().isoformat(timespec="seconds"),
+        }
+
+    def record(self, response: ArchivedResponse) -> None:
+        """Append *response* as a new gzip member and index it."""
+        header = self._header(response)
+        payload = json.dumps(header, ensure_ascii=False).encode("utf-8") + b"\n" + response.body
+        self._append(gzip.compress(payload), header)
+        logger.debug(f"[ARCHIVE] recorded {response.method} {response.url[:80]} | bytes:{len(response.body)}")
+
+    def _append(self, member: bytes, header: dict) -> None:
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with self.archive_path.open("ab") as fh:
+                offset = fh.tell()
+                fh.write(member)
+            entry = {
+                "url": header["url"],
+                "method": header["method"],
+                "status": header["status"],
+                "offset": offset,
+                "length": len(member),
+                "recorded_at": header["recorded_at"],
+            }
+            with self.index_path.open("a", encoding="utf-8") as fh:
+                fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._load_index()[(header["method"], header["url"])] = entry
+
+    def lookup(self, url: str, method: str = "GET") -> ArchivedResponse | None:
+        """Return the latest record for *url*, or None when it was never recorded."""
+        with self._lock:
+            entry = self._load_index().get((method, url))
+            if entry is None:
+                return None
+            with self.archive_path.open("rb") as fh:
+                fh.seek(entry["offset"])
+                member = fh.read(entry["length"])
+        header_line, _, body = gzip.decompress(member).partition(b"\n")
+        header = json.loads(header_line)
+        return ArchivedResponse(
+            url=header["url"],
+            status=header["status"],
+            body=body,
+            headers=header.get("headers") or {},
+            final_url=header.get("final_url") or header["url"],
+            method=header.get("method", method),
+            recorded_at=header.get("recorded_at", ""),
+        )
+
+    def __iter__(self) -> Iterator[ArchivedResponse]:
+        for url in self.urls():
+            record = self.lookup(url)
+            if record is not None:
+                yield record
+
+
+# ---------------------------------------------------------------------------
+# Active archive (process-wide so executor threads see it too)
+# ---------------------------------------------------------------------------
+
+_active_lock = threading.Lock()
+_active: tuple[str, ResponseArchive] | None = None
+
+
+@contextmanager
+def use_archive(archive: ResponseArchive, mode: str):
+    """Route archive-aware HTTP through *archive* in ``record`` or ``replay`` mode."""
+    global _active
+    if mode not in (RECORD, REPLAY):
+        raise ValueError(f"Unknown archive mode: {mode}")
+    with _active_lock:
+        previous, _active = _active, (mode, archive)
+    try:
+        yield archive
+    finally:
+        with _active_lock:
+            _active = previous
+
+
+def recording_archive() -> ResponseArchive | None:
+    """Return the archive to append to, when recording."""
+    active = _active
+    return active[1] if active and active[0] == RECORD else None
+
+
+def replay_archive() -> ResponseArchive | None:
+    """Return the archive to read from, when replaying."""
+    active = _active
+    return active[1] if active and active[0] == REPLAY else None
+
+
+def replay_lookup(url: str) -> ArchivedResponse:
+    """Return the replayed response for *url* or raise :class:`ArchiveMiss`."""
+    archive = replay_archive()
+    record = archive.lookup(url) if archive is not None else None
+    if record is None:
+        raise ArchiveMiss(f"URL not in response archive: {url[:120]}")
+    return record
+
+
+def record_response(
+    url: str,
+    status: int,
+    body: bytes | str,
+    headers: Mapping[str, str] | None = None,
+    final_url: str = "",
+) -> None:
+    """Append a response to the recording archive, if one is active."""
+    archive = recording_archive()
+    if archive is None:
+        return
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+        headers = {"Content-Type": "text/html; charset=utf-8", **(headers or {})}
+    try:
+        archive.record(ArchivedResponse(url, status, body, dict(headers or {}), final_url))
+    except OSError as exc:
+        logger.warning(f"[ARCHIVE] failed to record {url[:80]}: {exc}")
+
+
+class _RecordingStream:
+    """Live ``response.raw`` whose decoded bytes are compressed into one archive record as they are read.
+
+    The record is appended when the body has been read to the end, or on
+    ``close()`` after draining what the caller left unread.  Bodies over
+    ``max_bytes`` are passed through but not recorded.
+    """
+
+    def __init__(self, raw, archive: ResponseArchive, header: dict, max_bytes: int | None = None):
+        self._raw = raw
+        self._archive = archive
+        self._header = header
+        self._max_bytes = ARCHIVE_MAX_BODY_BYTES if max_bytes is None else max_bytes
+        self._compressor = zlib.compressobj(wbits=31)  # gzip container
+        self._parts = [self._compressor.compress(json.dumps(header, ensure_ascii=False).encode("utf-8") + b"\n")]
+        self._size = 0
+        self._done = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def _tee(self, chunk: bytes) -> None:
+        if self._done or not chunk:
+            return
+        self._size += len(chunk)
+        if self._size > self._max_bytes:
+            logger.warning(f"[ARCHIVE] not recording {self._header['url'][:80]}: body exceeds {self._max_bytes} bytes")
+            self._done = True
+            self._parts = []
+            return
+        self._parts.append(self._compressor.compress(chunk))
+
+    def _finish(self) -> None:
+        if self._done:
+            return
+        self._done = True
+        member = b"".join(self._parts) + self._compressor.flush()
+        self._parts = []
+        try:
+            self._archive._append(member, self._header)
+        except OSError as exc:
+            logger.warning(f"[ARCHIVE] failed to record {self._header['url'][:80]}: {exc}")
+            return
+        logger.debug(f"[ARCHIVE] recorded {self._header['url'][:80]} | bytes:{self._size}")
+
+    def stream(self, amt: int = STREAM_CHUNK_BYTES, decode_content: bool | None = None):
+        for chunk in self._raw.stream(amt, decode_content=decode_content):
+            self._tee(chunk)
+            yield chunk
+        self._finish()
+
+    def read(self, amt: int | None = None, decode_content: bool | None = None, **kwargs) -> bytes:
+        data = self._raw.read(amt, decode_content=decode_content, **kwargs)
+        self._tee(data)
+        if amt is None or not data:
+            self._finish()
+        return data
+
+    def close(self) -> None:
+        if not self._done:
+            try:
+                for chunk in self._raw.stream(STREAM_CHUNK_BYTES, decode_content=True):
+                    self._tee(chunk)
+                    if self._done:
+                        break
+                self._finish()
+            except Exception as exc:
+                logger.warning(f"[ARCHIVE] not recording {self._header['url'][:80]}: {exc}")
+                self._done = True
+        self._raw.close()
+
+
+def archived_get(url: str, **kwargs) -> requests.Response:
+    """``requests.get`` that honours the active archive.
+
+    Replay returns the recorded, fully-buffered response (``raw`` is None),
+    raising :class:`ArchiveMiss` when absent.  Record fetches live and
+    stores the body; with ``stream=True`` the caller keeps the live stream
+    and the body is recorded as it is read, up to ``ARCHIVE_MAX_BODY_BYTES``.
+    """
+    if replay_archive() is not None:
+        return replay_lookup(url).to_requests_response()
+
+    kwargs.setdefault("verify", certifi.where())
+    response = requests.get(url, **kwargs)
+    archive = recording_archive()
+    if archive is None:
+        return response
+    if kwargs.get("stream") and response.raw is not None:
+        length = response.headers.get("Content-Length", "")
+        if length.isdigit() and int(length) > ARCHIVE_MAX_BODY_BYTES:
+            logger.warning(f"[ARCHIVE] not recording {url[:80]}: Content-Length {length} exceeds the cap")
+            return response
+        header = archive._header(
+            ArchivedResponse(url, response.status_code, b"", dict(response.headers), response.url or url)
+        )
+        response.raw = _RecordingStream(response.raw, archive, header)
+        return response
+
+    body = response.content
+    record_response(url, response.status_code, body, dict(response.headers), response.url or url)
+    buffered = ArchivedResponse(url, response.status_code, body, dict(response.headers), response.url or url)
+    response.close()
+    return buffered.to_requests_response()
@@ -0,0 +1,264 @@
+"""Local story ranking for the plan stage.
+
+The plan stage used to send every story to ``evaluate_news_attraction`` (an
+LLM request) only to get an ordering, and kept DB order when that failed.
+:func:`rank_stories` scores stories locally instead, from six features:
+
+- ``points`` / ``comments``: HN score and comment count (log-scaled), as
+  captured by ``fetch_news``.
+- ``velocity``: points per hour since submission at ranking time.
+- ``front_rank``: inverse front-page position.
+- ``domain``: how high the domain's stories were placed in past plans
+  (smoothed towards 0.5 for unseen domains).
+- ``summary``: summary length, capped at ``SUMMARY_FULL_CHARS``.
+
+Each feature is min-max scaled over the day's candidates, and the score is
+their weighted sum.  :func:`learn_ranking_model` fits the weights with
+pairwise logistic regression on the orderings of past plans in
+``output/codex`` (LLM-ranked history and Codex-authored plans; plans written
+by this ranker are skipped so it does not learn from itself), falling back
+to ``DEFAULT_WEIGHTS`` until ``LEARN_MIN_PAIRS`` pairs are available.
+
+Only stories whose scores stay within ``TIE_MARGIN`` of each other among the
+top ``TIE_TOP_N`` are sent to the LLM, which then orders just those.
+"""
+
+import json
+import logging
+import math
+import sqlite3
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from src.core.archive_news import HN_METRIC_COLUMNS
+from src.db.connection import get_db
+from src.utils.scraper_failures import extract_domain
+
+logger = logging.getLogger(__name__)
+
+FEATURES = ("points", "comments", "velocity", "front_rank", "domain", "summary")
+DEFAULT_WEIGHTS = (1.0, 0.6, 0.8, 0.7, 0.5, 0.3)
+SUMMARY_FULL_CHARS = 300
+# Pseudo-placements at 0.5 behind every domain's history
+DOMAIN_PRIOR_WEIGHT = 3.0
+
+MAX_PLANS = 90
+LEARN_MIN_PAIRS = 30
+LEARN_EPOCHS = 40
+LEARNING_RATE = 0.1
+L2_PENALTY = 0.01
+
+# Normalised score gap below which neighbouring stories count as tied
+TIE_MARGIN = 0.03
+TIE_TOP_N = 5
+
+
+@dataclass
+class RankingModel:
+    weights: tuple[float, ...] = DEFAULT_WEIGHTS
+    domain_scores: dict[str, float] = field(default_factory=dict)
+    plans: int = 0
+    pairs: int = 0
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "weights": {name: round(weight, 4) for name, weight in zip(FEATURES, self.weights, strict=True)},
+            "learned_from_plans": self.plans,
+            "pairs": self.pairs,
+        }
+
+
+@dataclass(frozen=True)
+class RankedStory:
+    item: dict[str, Any]
+    score: float
+    features: dict[str, float]
+
+
+def _posted_timestamp(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        posted = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    # HN's age tooltip is UTC without an offset
+    return (posted if posted.tzinfo else posted.replace(tzinfo=UTC)).timestamp()
+
+
+def raw_features(story: dict[str, Any], domain_scores: dict[str, float], now: float) -> dict[str, float]:
+    """Unscaled feature values of one story (missing metrics count as 0)."""
+    points = story.get("hn_points") or 0
+    posted = _posted_timestamp(story.get("hn_posted_at"))
+    hours = max(0.5, (now - posted) / 3600) if posted is not None else None
+    rank = story.get("hn_rank")
+    return {
+        "points": math.log1p(points),
+        "comments": math.log1p(story.get("hn_comments") or 0),
+        "velocity": math.log1p(points / hours) if hours else 0.0,
+        "front_rank": 1 / rank if rank else 0.0,
+        "domain": domain_scores.get(extract_domain(story.get("news_url") or ""), 0.5),
+        "summary": min(len(story.get("content_summary") or ""), SUMMARY_FULL_CHARS) / SUMMARY_FULL_CHARS,
+    }
+
+
+def _scaled(rows: list[dict[str, float]]) -> list[list[float]]:
+    """Feature matrix with every column min-max scaled over *rows*."""
+    columns = []
+    for name in FEATURES:
+        values = [row[name] for row in rows]
+        low, high = min(values, default=0.0), max(values, default=0.0)
+        span = high - low
+        columns.append([(value - low) / span if span else 0.0 for value in values])
+    return [list(vector) for vector in zip(*columns, strict=True)] if rows else []
+
+
+def _scores(matrix: list[list[float]], weights: tuple[float, ...]) -> list[float]:
+    total = sum(abs(weight) for weight in weights) or 1.0
+    return [sum(w * x for w, x in zip(weights, vector, strict=True)) / total for vector in matrix]
+
+
+def rank_stories(
+    items: list[dict[str, Any]], model: RankingModel | None = None, now: float | None = None
+) -> list[RankedStory]:
+    """Stories ordered by local score, best first (ties keep input order)."""
+    model = model or RankingModel()
+    now = time.time() if now is None else now
+    rows = [raw_features(item, model.domain_scores, now) for item in items]
+    scores = _scores(_scaled(rows), model.weights)
+    ranked = [RankedStory(item, score, row) for item, score, row in zip(items, scores, rows, strict=True)]
+    return sorted(ranked, key=lambda story: story.score, reverse=True)
+
+
+def tied_blocks(ranked: list[RankedStory], top_n: int = TIE_TOP_N, margin: float = TIE_MARGIN) -> list[list[int]]:
+    """Runs of at least two neighbouring positions within the top *top_n* whose scores are within *margin*."""
+    blocks: list[list[int]] = []
+    current = [0] if ranked else []
+    for index in range(1, min(top_n, len(ranked))):
+        if ranked[index - 1].score - ranked[index].score < margin:
+            current.append(index)
+            continue
+        if len(current) > 1:
+            blocks.append(current)
+        current = [index]
+    if len(current) > 1:
+        blocks.append(current)
+    return blocks
+
+
+def reorder_blocks(ranked: list[RankedStory], blocks: list[list[int]], llm_scores: list[float]) -> list[RankedStory]:
+    """Order each tied block by *llm_scores* (one per story in ``blocks``, in block order)."""
+    result = list(ranked)
+    scores = iter(llm_scores)
+    for block in blocks:
+        members = [(next(scores), ranked[index]) for index in block]
+        members.sort(key=lambda member: member[0], reverse=True)
+        for index, (_, story) in zip(block, members, strict=True):
+            result[index] = story
+    return result
+
+
+# -- Learning from past plans --------------------------------------------------
+
+
+def _table_columns(conn: sqlite3.Connection, table: str) -> set[str]:
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _stored_metrics(ids: list[int], db_path: str | None) -> dict[int, dict[str, Any]]:
+    """HN metrics and URLs of *ids* from ``news`` and ``news_history``."""
+    found: dict[int, dict[str, Any]] = {}
+    if not ids:
+        return found
+    with get_db(db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        for table in ("news_history", "news"):
+            available = _table_columns(conn, table)
+            if "id" not in available:
+                continue
+            columns = ["id", "news_url", *(column for column in HN_METRIC_COLUMNS if column in available)]
+            placeholders = ", ".join("?" * len(ids))
+            for row in conn.execute(f"SELECT {', '.join(columns)} FROM {table} WHERE id IN ({placeholders})", ids):
+                found[row["id"]] = dict(row)
+    return found
+
+
+def _plan_files(codex_dir: Path) -> list[Path]:
+    # Drafts (hacknews_plan_draft_*) are not final orderings
+    paths = sorted(codex_dir.glob("hacknews_plan_[0-9]*.json"), key=lambda path: path.stat().st_mtime)
+    return paths[-MAX_PLANS:]
+
+
+def _placement(position: int, count: int) -> float:
+    return 1 - position / (count - 1) if count > 1 else 1.0
+
+
+def learn_ranking_model(codex_dir: Path, db_path: str | None = None) -> RankingModel:
+    """Domain history and feature weights from the orderings of past plans."""
+    plans = []
+    for path in _plan_files(codex_dir):
+        try:
+            plan = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            continue
+        if not isinstance(plan, dict) or "ranking" in plan:
+            continue
+        by_id = {item.get("id"): item for item in plan.get("items") or [] if isinstance(item, dict)}
+        ordered = [news_id for news_id in plan.get("ordered_ids") or [] if news_id in by_id]
+        if len(ordered) > 1:
+            plans.append((path.stat().st_mtime, [by_id[news_id] for news_id in ordered]))
+
+    try:
+        stored = _stored_metrics(sorted({item["id"] for _, items in plans for item in items}), db_path)
+    except sqlite3.Error as e:
+        logger.warning(f"[RANK] could not read story metrics, learning from domains only: {e}")
+        stored = {}
+
+    # Chronological pass: each plan's domain feature only sees earlier plans
+    placements: dict[str, list[float]] = defaultdict(list)
+    pairs: list[list[float]] = []
+    used_plans = 0
+
+    def _domain_scores() -> dict[str, float]:
+        return {
+            domain: (sum(values) + 0.5 * DOMAIN_PRIOR_WEIGHT) / (len(values) + DOMAIN_PRIOR_WEIGHT)
+            for domain, values in placements.items()
+        }
+
+    for planned_at, items in plans:
+        stories = [{**item, **stored.get(item["id"], {})} for item in items]
+        domains = _domain_scores()
+        matrix = _scaled([raw_features(story, domains, planned_at) for story in stories])
+        before = len(pairs)
+        for i, better in enumerate(matrix):
+            for worse in matrix[i + 1 :]:
+                diff = [a - b for a, b in zip(better, worse, strict=True)]
+                if any(diff):
+                    pairs.append(diff)
+        used_plans += len(pairs) > before
+        for position, story in enumerate(stories):
+            domain = extract_domain(story.get("news_url") or "")
+            placements[domain].append(_placement(position, len(stories)))
+
+    model = RankingModel(domain_scores=_domain_scores(), plans=used_plans, pairs=len(pairs))
+    if len(pairs) < LEARN_MIN_PAIRS:
+        return model
+
+    weights = list(DEFAULT_WEIGHTS)
+    for _ in range(LEARN_EPOCHS):
+        gradient = [0.0] * len(weights)
+        for diff in pairs:
+            margin = sum(w * x for w, x in zip(weights, diff, strict=True))
+            # d/dw log(1 + e^-margin)
+            factor = -1 / (1 + math.exp(min(margin, 50)))
+            for k, x in enumerate(diff):
+                gradient[k] += factor * x
+        weights = [
+            w - LEARNING_RATE * (g / len(pairs) + L2_PENALTY * w) for w, g in zip(weights, gradient, strict=True)
+        ]
+    model.weights = tuple(weights)
+    return model
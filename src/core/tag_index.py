@@ -0,0 +1,284 @@
+"""Historical tag index for the plan stage.
+
+``extract_tags_with_llm`` asks the LLM for four tags every run, although
+most days reuse tags that earlier posts already carried.  :class:`TagIndex`
+keeps what past posts were tagged with in SQLite:
+
+- ``tag_index_sources``: one row per indexed plan or Astro post.  A post
+  rendered from an indexed plan carries the same tags and lead story, so
+  sources with the same tags and lead title count once.
+- ``tag_index_tags`` / ``tag_index_tokens``: how many sources used each tag,
+  and how many sources' top titles contained each title token (lower-cased
+  words; CJK character bigrams).
+- ``tag_index_postings``: the inverted list, token → tags of the sources
+  whose top titles contained it.
+
+:meth:`TagIndex.propose` scores known tags against each of today's top
+titles: 1.0 when all of a tag's own tokens appear in the title, otherwise
+the noisy-or of P(tag | token) over the title's tokens.  Each title gets
+its best unused tag, and the proposal's confidence is the weakest pick's
+score; below ``MIN_CONFIDENCE`` the plan stage asks the LLM instead.
+
+The plan stage picks up new plans and Astro posts with :meth:`refresh`;
+the apply stage adds each applied plan with :meth:`add_plan`.
+"""
+
+import json
+import logging
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from src.db.connection import get_db
+
+logger = logging.getLogger(__name__)
+
+TAG_COUNT = 4
+# Only the titles the LLM sees when tagging (the top of the plan)
+TITLES_PER_SOURCE = 4
+MIN_CONFIDENCE = 0.6
+# A token predicts tags once this many sources' titles contained it
+MIN_TOKEN_SOURCES = 2
+# A tag named in a title is trusted once this many sources used it
+MIN_TAG_USES = 2
+# Pseudo-sources without the tag behind every P(tag | token) estimate
+TOKEN_PRIOR = 1
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:[.\-][a-z0-9+#]+)*")
+_CJK_RE = re.compile(r"[一-鿿]+")
+# Title words too common to say anything about a story's topic
+_STOPWORD_TEXT = (
+    "a an and are as at be by can for from has have how i in into is it its new not of on or our show ask "
+    "that the their this to was we what when why will with without you your"
+)
+_STOPWORDS = frozenset(_STOPWORD_TEXT.split())
+_HEADING_RE = re.compile(r"^## \d+\. (.+)$")
+_TAG_LINE_RE = re.compile(r"^\s+- (.+)$")
+_table_ready: set[str] = set()
+
+
+def title_tokens(text: str | None) -> set[str]:
+    """Index tokens of *text*: lower-cased words and CJK character bigrams."""
+    text = (text or "").lower()
+    tokens = {word for word in _WORD_RE.findall(text) if len(word) > 1 and word not in _STOPWORDS}
+    for run in _CJK_RE.findall(text):
+        tokens.update(run[i : i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def tag_tokens(tag: str) -> set[str]:
+    # Multi-word tags are joined with underscores (see the tags prompt)
+    return title_tokens(tag.replace("_", " "))
+
+
+def _signature(tags: list[str], titles: list[str]) -> str:
+    # Tags plus the lead title's tokens: a post and its plan match, two days with the same tags do not
+    lead = sorted(title_tokens(titles[0])) if titles else []
+    return "|".join(sorted({tag.lower() for tag in tags})) + "#" + " ".join(lead)
+
+
+@dataclass(frozen=True)
+class TagProposal:
+    tags: list[str]
+    confidence: float
+    scores: dict[str, float]
+
+    @property
+    def confident(self) -> bool:
+        return len(self.tags) == TAG_COUNT and self.confidence >= MIN_CONFIDENCE
+
+
+class TagIndex:
+    """Tag frequency and token → tag inverted lists of past posts."""
+
+    def __init__(self, db_path: str | None = None):
+        self.db_path = db_path
+
+    def _ensure_table(self) -> None:
+        marker = self.db_path or ""
+        if marker in _table_ready:
+            return
+        with get_db(self.db_path) as conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS tag_index_sources (
+                source TEXT PRIMARY KEY,
+                signature TEXT NOT NULL,
+                indexed_at REAL NOT NULL
+            )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tag_index_sources_signature ON tag_index_sources(signature)")
+            conn.execute("CREATE TABLE IF NOT EXISTS tag_index_tags (tag TEXT PRIMARY KEY, sources INTEGER NOT NULL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tag_index_tokens (token TEXT PRIMARY KEY, sources INTEGER NOT NULL)"
+            )
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS tag_index_postings (
+                token TEXT NOT NULL,
+                tag TEXT NOT NULL,
+                sources INTEGER NOT NULL,
+                PRIMARY KEY (token, tag)
+            )
+            """)
+        _table_ready.add(marker)
+
+    def add(self, source: str, tags: list[str], titles: list[str]) -> bool:
+        """Index one post's *tags* against its top *titles*; False when already indexed."""
+        tags = list(dict.fromkeys(tag.strip() for tag in tags if tag and tag.strip()))
+        tokens = set().union(*(title_tokens(title) for title in titles[:TITLES_PER_SOURCE]))
+        if not tags or not tokens:
+            return False
+        signature = _signature(tags, titles)
+        self._ensure_table()
+        with get_db(self.db_path) as conn:
+            if conn.execute("SELECT 1 FROM tag_index_sources WHERE source = ?", (source,)).fetchone():
+                return False
+            duplicate = conn.execute("SELECT 1 FROM tag_index_sources WHERE signature = ? LIMIT 1", (signature,))
+            counted = duplicate.fetchone() is None
+            # Duplicates are recorded too, so refresh() does not read them again
+            conn.execute(
+                "INSERT INTO tag_index_sources (source, signature, indexed_at) VALUES (?, ?, ?)",
+                (source, signature, time.time()),
+            )
+            if not counted:
+                return False
+            conn.executemany(
+                "INSERT INTO tag_index_tags (tag, sources) VALUES (?, 1) "
+                "ON CONFLICT(tag) DO UPDATE SET sources = sources + 1",
+                [(tag,) for tag in tags],
+            )
+            conn.executemany(
+                "INSERT INTO tag_index_tokens (token, sources) VALUES (?, 1) "
+                "ON CONFLICT(token) DO UPDATE SET sources = sources + 1",
+                [(token,) for token in sorted(tokens)],
+            )
+            conn.executemany(
+                "INSERT INTO tag_index_postings (token, tag, sources) VALUES (?, ?, 1) "
+                "ON CONFLICT(token, tag) DO UPDATE SET sources = sources + 1",
+                [(token, tag) for token in sorted(tokens) for tag in tags],
+            )
+        return True
+
+    def add_plan(self, path: Path) -> bool:
+        """Index a plan JSON file (its tags against its first ordered items)."""
+        try:
+            plan = json.loads(Path(path).read_text(encoding="utf-8-sig"))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"[TAGS] could not read plan {path}: {e}")
+            return False
+        if not isinstance(plan, dict) or not isinstance(plan.get("tags"), list):
+            return False
+        items = [item for item in plan.get("items") or [] if isinstance(item, dict)]
+        by_id = {item.get("id"): item for item in items}
+        ordered = [by_id[news_id] for news_id in plan.get("ordered_ids") or [] if news_id in by_id] or items
+        titles = [f"{item.get('title_chs') or ''} {item.get('title') or ''}" for item in ordered]
+        return self.add(str(Path(path).resolve()), [str(tag) for tag in plan["tags"]], titles)
+
+    def add_astro_post(self, path: Path) -> bool:
+        """Index a rendered Astro post (frontmatter tags against its ``## N.`` headings)."""
+        try:
+            lines = Path(path).read_text(encoding="utf-8").splitlines()
+        except OSError as e:
+            logger.warning(f"[TAGS] could not read post {path}: {e}")
+            return False
+        tags, titles = [], []
+        in_tags = False
+        for line in lines[1:]:
+            if line.startswith("tags:"):
+                in_tags = True
+                continue
+            tag_line = _TAG_LINE_RE.match(line) if in_tags else None
+            if tag_line:
+                value = tag_line.group(1).strip()
+                try:
+                    tags.append(json.loads(value) if value.startswith('"') else value)
+                except json.JSONDecodeError:
+                    tags.append(value.strip('"'))
+                continue
+            in_tags = False
+            heading = _HEADING_RE.match(line)
+            if heading:
+                titles.append(heading.group(1))
+        return self.add(str(Path(path).resolve()), tags, titles)
+
+    def refresh(self, codex_dir: Path, astro_blog_dir: Path | None = None) -> int:
+        """Index plans in *codex_dir* and posts in *astro_blog_dir* not seen before; returns how many."""
+        self._ensure_table()
+        with get_db(self.db_path) as conn:
+            seen = {row[0] for row in conn.execute("SELECT source FROM tag_index_sources")}
+        # Drafts (hacknews_plan_draft_*) were never published
+        candidates = [(self.add_plan, path) for path in sorted(Path(codex_dir).glob("hacknews_plan_[0-9]*.json"))]
+        if astro_blog_dir and Path(astro_blog_dir).is_dir():
+            candidates += [
+                (self.add_astro_post, path) for path in sorted(Path(astro_blog_dir).glob("hacknews_summary_*.md"))
+            ]
+        added = 0
+        for add, path in candidates:
+            if str(path.resolve()) not in seen:
+                added += add(path)
+        return added
+
+    def propose(self, news_titles: list[tuple[str | None, str | None]]) -> TagProposal:
+        """Four known tags for the top ``(title_chs, title)`` pairs, scored as described above."""
+        per_title = [title_tokens(f"{chs or ''} {title or ''}") for chs, title in news_titles[:TITLES_PER_SOURCE]]
+        tokens = sorted(set().union(*per_title))
+        if not tokens:
+            return TagProposal([], 0.0, {})
+        self._ensure_table()
+        placeholders = ", ".join("?" * len(tokens))
+        with get_db(self.db_path) as conn:
+            token_sources = dict(
+                conn.execute(
+                    f"SELECT token, sources FROM tag_index_tokens WHERE token IN ({placeholders}) AND sources >= ?",
+                    (*tokens, MIN_TOKEN_SOURCES),
+                ).fetchall()
+            )
+            postings: dict[str, list[tuple[str, int]]] = defaultdict(list)
+            for token, tag, sources in conn.execute(
+                f"SELECT token, tag, sources FROM tag_index_postings WHERE token IN ({placeholders}) ORDER BY tag",
+                tokens,
+            ):
+                postings[token].append((tag, sources))
+            uses = dict(conn.execute("SELECT tag, sources FROM tag_index_tags").fetchall())
+
+        named = {tag: tag_tokens(tag) for tag, count in uses.items() if count >= MIN_TAG_USES}
+        title_scores: list[dict[str, float]] = []
+        for title in per_title:
+            missing: dict[str, float] = defaultdict(lambda: 1.0)
+            for token in title & token_sources.keys():
+                for tag, sources in postings[token]:
+                    missing[tag] *= 1 - sources / (token_sources[token] + TOKEN_PRIOR)
+            scores = {tag: 1 - remaining for tag, remaining in missing.items()}
+            scores.update({tag: 1.0 for tag, words in named.items() if words and words <= title})
+            title_scores.append(scores)
+
+        chosen: dict[str, float] = {}
+        for scores in title_scores:
+            # Equal scores go to the more frequently used tag
+            best = max(
+                (tag for tag in scores if tag not in chosen),
+                key=lambda tag: (scores[tag], uses.get(tag, 0)),
+                default=None,
+            )
+            if best is not None and len(chosen) < TAG_COUNT:
+                chosen[best] = scores[best]
+        # Fewer titles than tags: fill with the strongest remaining candidates
+        overall: dict[str, float] = {}
+        for scores in title_scores:
+            for tag, score in scores.items():
+                overall[tag] = max(score, overall.get(tag, 0.0))
+        for tag in sorted(overall, key=lambda tag: (overall[tag], uses.get(tag, 0)), reverse=True):
+            if len(chosen) >= TAG_COUNT:
+                break
+            chosen.setdefault(tag, overall[tag])
+        return TagProposal(list(chosen), round(min(chosen.values(), default=0.0), 4), chosen)
+
+    def stats(self) -> dict[str, Any]:
+        self._ensure_table()
+        with get_db(self.db_path) as conn:
+            sources = conn.execute("SELECT COUNT(*) FROM tag_index_sources").fetchone()[0]
+            tags = conn.execute("SELECT COUNT(*) FROM tag_index_tags").fetchone()[0]
+            tokens = conn.execute("SELECT COUNT(*) FROM tag_index_tokens").fetchone()[0]
+        return {"sources": sources, "tags": tags, "tokens": tokens}
@@ -0,0 +1,375 @@
+"""Per-call LLM accounting: tokens, latency, retries and outcome.
+
+Every provider attempt made by ``call_llm``/``call_llm_async`` (and every
+response-cache hit or circuit-breaker rejection) becomes one row of the
+``llm_calls`` table:
+
+- **Context**: ``stage`` and ``run_id`` are set by ``BaseStage.run``,
+  ``news_id`` by the code handling one story (plan nodes, audit commands),
+  all through :func:`llm_call_context` (a ``ContextVar``, so asyncio tasks
+  and ``asyncio.to_thread`` workers inherit it).
+- **Tokens**: providers pass the API's usage fields to :func:`report_usage`
+  (OpenAI-style ``usage``, Gemini ``usageMetadata``/``usage_metadata``);
+  without them the row falls back to :func:`~src.llm.router.estimate_tokens`
+  and ``usage_reported`` stays 0.
+- **Retries**: ``with_retry``/``with_async_retry`` and the Gemini retry loops
+  call :func:`note_retry`.
+
+Rows are buffered and written in batches (``FLUSH_ROWS``, at the end of each
+stage and at exit).  ``hn2md llm-stats`` reads them back through
+:func:`call_stats`.  ``HN2MD_NO_LLM_ACCOUNTING=1`` keeps rows in memory only.
+"""
+
+import asyncio
+import atexit
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import astuple, dataclass
+
+from src.db.connection import get_db
+from src.llm.router import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DISABLE_ENV = "HN2MD_NO_LLM_ACCOUNTING"
+FLUSH_ROWS = 50
+# Rows kept in memory when the table cannot be written
+MAX_BUFFERED_ROWS = 5_000
+
+# Approximate list prices, USD per million (input, output) tokens;
+# config.json "LLM_PRICES_PER_MILLION": {"model": [input, output]} overrides them
+PRICES_PER_MILLION = {
+    "grok-3-beta": (3.0, 15.0),
+    "grok-3-mini": (0.3, 0.5),
+    "gemini-3-flash-preview": (0.5, 3.0),
+    "gemini-3.1-flash-lite-preview": (0.25, 1.5),
+    "kimi-k2-0905-preview": (0.6, 2.5),
+}
+
+_context: contextvars.ContextVar[dict | None] = contextvars.ContextVar("llm_call_context", default=None)
+_usage: contextvars.ContextVar["CallUsage | None"] = contextvars.ContextVar("llm_call_usage", default=None)
+_table_ready: set[str] = set()
+
+
+@contextmanager
+def llm_call_context(**fields):
+    """Attach ``stage``/``run_id``/``news_id`` to LLM calls made inside the block."""
+    merged = {**(_context.get() or {}), **{k: v for k, v in fields.items() if v is not None}}
+    token = _context.set(merged)
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+class CallUsage:
+    """Mutable usage holder for one provider attempt (shared with worker threads)."""
+
+    def __init__(self):
+        self.input_tokens: int | None = None
+        self.output_tokens: int | None = None
+        self.retries = 0
+        self.outcome: str | None = None
+        self.text = ""
+
+    def finish(self, result: str | None, outcome: str | None = None) -> None:
+        self.text = result or ""
+        self.outcome = outcome or ("ok" if result else "empty")
+
+
+def _usage_fields(payload) -> tuple[int | None, int | None]:
+    if isinstance(payload, dict):
+        usage = payload.get("usage")
+        if isinstance(usage, dict):
+            return usage.get("prompt_tokens"), usage.get("completion_tokens")
+        meta = payload.get("usageMetadata")
+        if isinstance(meta, dict):
+            return meta.get("promptTokenCount"), meta.get("candidatesTokenCount")
+        return None, None
+    meta = getattr(payload, "usage_metadata", None)
+    if meta is not None:
+        return getattr(meta, "prompt_token_count", None), getattr(meta, "candidates_token_count", None)
+    return None, None
+
+
+def report_usage(payload) -> None:
+    """Record the usage fields of an API response (JSON dict or SDK object), if any."""
+    usage = _usage.get()
+    if usage is None:
+        return
+    input_tokens, output_tokens = _usage_fields(payload)
+    if isinstance(input_tokens, int):
+        usage.input_tokens = input_tokens
+    if isinstance(output_tokens, int):
+        usage.output_tokens = output_tokens
+
+
+def note_retry() -> None:
+    """Count one retry of the current provider attempt."""
+    usage = _usage.get()
+    if usage is not None:
+        usage.retries += 1
+
+
+def _disabled() -> bool:
+    return os.environ.get(DISABLE_ENV, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class CallRecord:
+    created_at: float
+    run_id: str | None
+    stage: str | None
+    news_id: int | None
+    provider: str
+    model: str | None
+    prompt_type: str | None
+    input_tokens: int
+    output_tokens: int
+    usage_reported: bool
+    latency_seconds: float
+    retries: int
+    cache_hit: bool
+    outcome: str
+
+
+class CallLog:
+    """Write-behind buffer for ``llm_calls`` rows."""
+
+    def __init__(self, db_path: str | None = None):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._rows: list[CallRecord] = []
+        # Rows recorded while accounting was disabled; never written
+        self._unsaved: list[CallRecord] = []
+        self._atexit = False
+
+    def _connect(self):
+        return get_db(self.db_path) if self.db_path else get_db()
+
+    def _ensure_table(self) -> None:
+        marker = self.db_path or ""
+        if marker in _table_ready:
+            return
+        with self._connect() as conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_calls (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at REAL NOT NULL,
+                run_id TEXT,
+                stage TEXT,
+                news_id INTEGER,
+                provider TEXT NOT NULL,
+                model TEXT,
+                prompt_type TEXT,
+                input_tokens INTEGER NOT NULL,
+                output_tokens INTEGER NOT NULL,
+                usage_reported INTEGER NOT NULL,
+                latency_seconds REAL NOT NULL,
+                retries INTEGER NOT NULL,
+                cache_hit INTEGER NOT NULL,
+                outcome TEXT NOT NULL
+            )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_calls_created_at ON llm_calls(created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_calls_run_id ON llm_calls(run_id)")
+        _table_ready.add(marker)
+
+    def record(self, row: CallRecord) -> None:
+        """Buffer *row*; with accounting disabled it stays in memory and is never flushed."""
+        if _disabled():
+            with self._lock:
+                self._unsaved.append(row)
+                del self._unsaved[:-MAX_BUFFERED_ROWS]
+            return
+        with self._lock:
+            self._rows.append(row)
+            if len(self._rows) > MAX_BUFFERED_ROWS:
+                del self._rows[: len(self._rows) - MAX_BUFFERED_ROWS]
+            full = len(self._rows) >= FLUSH_ROWS
+            if not self._atexit:
+                atexit.register(self.flush)
+                self._atexit = True
+        if full:
+            self.flush()
+
+    def pending(self) -> list[CallRecord]:
+        with self._lock:
+            return self._unsaved + self._rows
+
+    def flush(self) -> int:
+        """Write buffered rows; returns how many were written."""
+        if _disabled():
+            return 0
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows:
+            return 0
+        try:
+            self._ensure_table()
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT INTO llm_calls (created_at, run_id, stage, news_id, provider, model, prompt_type, "
+                    "input_tokens, output_tokens, usage_reported, latency_seconds, retries, cache_hit, outcome) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [astuple(row) for row in rows],
+                )
+        except Exception as e:
+            logger.warning(f"[LLM-CALLS] could not write {len(rows)} rows, keeping them: {e}")
+            with self._lock:
+                self._rows[:0] = rows
+            return 0
+        return len(rows)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._rows = []
+            self._unsaved = []
+
+
+# 全局调用记录
+call_log = CallLog()
+
+
+def record_call(
+    provider: str,
+    model: str | None,
+    prompt_type: str | None,
+    outcome: str,
+    input_tokens: int = 0,
+    output_tokens: int = 0,
+    latency_seconds: float = 0.0,
+    retries: int = 0,
+    cache_hit: bool = False,
+    usage_reported: bool = False,
+) -> None:
+    """Add one row, tagged with the current :func:`llm_call_context`."""
+    context = _context.get() or {}
+    call_log.record(
+        CallRecord(
+            created_at=time.time(),
+            run_id=context.get("run_id"),
+            stage=context.get("stage"),
+            news_id=context.get("news_id"),
+            provider=provider,
+            model=model,
+            prompt_type=prompt_type,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            usage_reported=usage_reported,
+            latency_seconds=round(latency_seconds, 4),
+            retries=retries,
+            cache_hit=cache_hit,
+            outcome=outcome,
+        )
+    )
+
+
+@contextmanager
+def track_call(provider: str, model: str | None, prompt_type: str | None, estimated_input_tokens: int):
+    """Time one provider attempt and record it; the block calls ``usage.finish(result)``."""
+    usage = CallUsage()
+    token = _usage.set(usage)
+    started = time.perf_counter()
+    try:
+        yield usage
+    except BaseException as e:
+        if usage.outcome is None:
+            usage.outcome = "cancelled" if isinstance(e, asyncio.CancelledError) else "error"
+        raise
+    finally:
+        _usage.reset(token)
+        reported = usage.input_tokens is not None or usage.output_tokens is not None
+        record_call(
+            provider,
+            model,
+            prompt_type,
+            usage.outcome or "error",
+            input_tokens=usage.input_tokens if usage.input_tokens is not None else estimated_input_tokens,
+            output_tokens=usage.output_tokens if usage.output_tokens is not None else estimate_tokens(usage.text),
+            latency_seconds=time.perf_counter() - started,
+            retries=usage.retries,
+            usage_reported=reported,
+        )
+
+
+# -- Reporting ---------------------------------------------------------------
+
+
+def _percentile(values: list[float], quantile: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(quantile * len(ordered)))], 3)
+
+
+def _price(model: str | None, prices: dict) -> tuple[float, float] | None:
+    price = prices.get(model or "")
+    return tuple(price) if price else None
+
+
+def call_stats(
+    since: float | None = None, run_id: str | None = None, db_path: str | None = None, prices: dict | None = None
+) -> dict:
+    """Latency percentiles, tokens and cost from ``llm_calls``, by model, stage and run."""
+    log = CallLog(db_path) if db_path else call_log
+    log.flush()
+    log._ensure_table()
+    prices = {**PRICES_PER_MILLION, **(prices or {})}
+    clauses, params = [], []
+    if since is not None:
+        clauses.append("created_at >= ?")
+        params.append(since)
+    if run_id:
+        clauses.append("run_id = ?")
+        params.append(run_id)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    with log._connect() as conn:
+        rows = conn.execute(
+            "SELECT provider, model, stage, run_id, news_id, input_tokens, output_tokens, "
+            f"latency_seconds, cache_hit, outcome FROM llm_calls {where} ORDER BY created_at",
+            params,
+        ).fetchall()
+
+    groups = {"models": defaultdict(list), "stages": defaultdict(list), "runs": defaultdict(list)}
+    for row in rows:
+        provider, model, stage, run = row[0], row[1], row[2], row[3]
+        groups["models"][f"{provider}/{model or ''}"].append(row)
+        groups["stages"][stage or "adhoc"].append(row)
+        groups["runs"][run or "adhoc"].append(row)
+
+    def _summary(group_rows) -> dict:
+        calls = [r for r in group_rows if not r[8] and r[9] != "circuit_open"]
+        latencies = [r[7] for r in calls if r[9] == "ok"]
+        input_tokens = sum(r[5] for r in calls)
+        output_tokens = sum(r[6] for r in calls)
+        cost, unpriced = 0.0, 0
+        for r in calls:
+            price = _price(r[1], prices)
+            if price is None:
+                unpriced += 1
+            else:
+                cost += (r[5] * price[0] + r[6] * price[1]) / 1_000_000
+        stories = {r[4] for r in calls if r[4] is not None}
+        return {
+            "calls": len(calls),
+            "ok": sum(r[9] == "ok" for r in calls),
+            "cache_hits": sum(bool(r[8]) for r in group_rows),
+            "p50_latency_seconds": _percentile(latencies, 0.5),
+            "p95_latency_seconds": _percentile(latencies, 0.95),
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "stories": len(stories),
+            "tokens_per_story": round((input_tokens + output_tokens) / len(stories)) if stories else None,
+            "cost_usd": round(cost, 4),
+            "unpriced_calls": unpriced,
+        }
+
+    result = {name: {key: _summary(rs) for key, rs in sorted(group.items())} for name, group in groups.items()}
+    result["total"] = _summary(rows)
+    return result
@@ -0,0 +1,356 @@
+"""Pooled provider clients and the async LLM entry point.
+
+Every provider call used to open its own connection: ``call_grok_api``
+built a fresh ``httpx.Client`` per attempt and ``call_gemini_api`` a fresh
+``genai.Client``.  This module keeps long-lived clients instead:
+
+- ``get_sync_http_client()``: one process-wide ``httpx.Client``.
+- ``get_async_http_client()``: one ``httpx.AsyncClient`` per event loop
+  (an ``AsyncClient`` cannot outlive the loop that opened its connections).
+- ``get_genai_client(api_key)``: one ``google.genai.Client`` per API key.
+
+``call_llm_async`` mirrors ``call_llm`` (same provider fallback order, or the
+router's order for ``llm_type="auto"``) on top of ``LLMProvider.acall``, so a
+stage can ``asyncio.gather`` many requests without per-call connection setup.
+Free-text request classes (``STREAM_PROMPT_TYPES``) are streamed through a
+:class:`~src.llm.streaming.StreamValidator`: a refusal aborts the stream and
+the next model in the route is tried straight away.
+
+Usage:
+    from src.llm.async_client import call_llm_async
+
+    summaries = await asyncio.gather(*(call_llm_async(p) for p in prompts))
+"""
+
+import asyncio
+import logging
+import ssl
+import threading
+import time
+import weakref
+
+import certifi
+import httpx
+
+from src.llm.providers.base import LLMProvider
+from src.security.content_sanitizer import redact_secrets
+
+logger = logging.getLogger(__name__)
+
+HTTP_TIMEOUT_SECONDS = 120.0
+HTTP_MAX_CONNECTIONS = 20
+HTTP_MAX_KEEPALIVE = 10
+
+# Provider order tried by call_llm / call_llm_async for each primary provider
+FALLBACK_CHAINS = {
+    "grok": ("grok", "gemini", "moonshot"),
+    "gemini": ("gemini", "grok", "moonshot"),
+    "moonshot": ("moonshot", "gemini", "grok"),
+}
+# Same, restricted to providers that accept image input
+IMAGE_FALLBACK_CHAINS = {
+    "grok": ("grok", "gemini"),
+    "gemini": ("gemini",),
+    "moonshot": ("gemini",),
+}
+
+_lock = threading.Lock()
+_sync_client: httpx.Client | None = None
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_genai_clients: dict[str, object] = {}
+_providers: dict[str, LLMProvider] = {}
+
+
+def _ssl_context() -> ssl.SSLContext:
+    return ssl.create_default_context(cafile=certifi.where())
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE)
+
+
+def get_sync_http_client() -> httpx.Client:
+    """Return the shared blocking HTTP client used by provider ``call()``."""
+    global _sync_client
+    with _lock:
+        if _sync_client is None or _sync_client.is_closed:
+            _sync_client = httpx.Client(
+                verify=_ssl_context(),
+                timeout=HTTP_TIMEOUT_SECONDS,
+                follow_redirects=True,
+                limits=_limits(),
+            )
+        return _sync_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Return the pooled async HTTP client bound to the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                verify=_ssl_context(),
+                timeout=HTTP_TIMEOUT_SECONDS,
+                follow_redirects=True,
+                limits=_limits(),
+            )
+            _async_clients[loop] = client
+        return client
+
+
+def get_genai_client(api_key: str):
+    """Return a cached ``google.genai.Client`` for *api_key*.
+
+    Raises ImportError when google-genai is not installed, like constructing
+    the client directly would.
+    """
+    with _lock:
+        client = _genai_clients.get(api_key)
+        if client is None:
+            from google import genai
+
+            client = genai.Client(api_key=api_key)
+            _genai_clients[api_key] = client
+        return client
+
+
+def get_provider(name: str) -> LLMProvider:
+    """Return the shared provider instance for *name* (``grok``/``gemini``/``moonshot``)."""
+    name = name.lower()
+    with _lock:
+        provider = _providers.get(name)
+        if provider is None:
+            from src.llm.providers import GeminiProvider, GrokProvider, MoonshotProvider
+
+            classes = {"grok": GrokProvider, "gemini": GeminiProvider, "moonshot": MoonshotProvider}
+            if name not in classes:
+                raise ValueError(f"不支持的llm_type: {name}")
+            provider = _providers[name] = classes[name]()
+        return provider
+
+
+async def aclose_llm_clients() -> None:
+    """Close the async client of the running loop (call before the loop ends)."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+
+
+def close_llm_clients() -> None:
+    """Close the shared blocking client and drop cached SDK clients."""
+    global _sync_client
+    with _lock:
+        client, _sync_client = _sync_client, None
+        _genai_clients.clear()
+    if client is not None:
+        client.close()
+
+
+async def call_llm_async(
+    prompt,
+    llm_type=None,
+    system_content=None,
+    model=None,
+    temperature=None,
+    max_tokens=None,
+    response_format=None,
+    image_data=None,
+    prompt_type=None,
+    use_cache=True,
+    stream=None,
+    validate=None,
+):
+    """Async counterpart of ``call_llm`` with the same fallback order and cache.
+
+    *model* only applies to the primary provider; fallbacks use their
+    configured default model.  Returns ``""`` when every provider fails.
+    *stream* defaults to on for free-text ``STREAM_PROMPT_TYPES`` requests.
+    *validate* is an optional ``callable(result) -> bool``; rejected results are
+    returned but not cached (see ``response_cache.acceptable``).
+    Identical requests already in flight are joined (``single_flight``).
+    """
+    from src.llm import response_cache
+    from src.llm.accounting import record_call
+    from src.llm.config import load_llm_config
+    from src.llm.router import AUTO, estimate_tokens, model_router
+    from src.llm.single_flight import flight_key, single_flight
+    from src.llm.streaming import STREAM_PROMPT_TYPES
+
+    config = load_llm_config()
+    if llm_type is None:
+        llm_type = config["default"]
+    primary = llm_type.lower()
+    if primary != AUTO and primary not in FALLBACK_CHAINS:
+        raise ValueError(f"不支持的llm_type: {llm_type}")
+
+    key = None
+    if use_cache:
+        key = response_cache.request_cache_key(
+            config, llm_type, model, prompt, system_content, temperature, max_tokens, response_format, image_data
+        )
+        cached = await asyncio.to_thread(response_cache.lookup, key, validate)
+        if cached is not None:
+            logger.info("[LLM-CACHE] hit (%s, %s)", primary, prompt_type or "default")
+            record_call(primary, model, prompt_type, "cache_hit", output_tokens=estimate_tokens(cached), cache_hit=True)
+            return cached
+
+    if stream is None:
+        stream = prompt_type in STREAM_PROMPT_TYPES and response_format is None
+
+    async def _request():
+        if primary == AUTO:
+            routes = model_router.route(config, prompt_type, prompt, system_content, max_tokens, bool(image_data))
+            route = [(r.provider, r.model) for r in routes]
+        else:
+            chain = IMAGE_FALLBACK_CHAINS[primary] if image_data else FALLBACK_CHAINS[primary]
+            route = [(name, model if name == primary else None) for name in chain]
+
+        result = await _call_route_async(
+            config,
+            route,
+            prompt,
+            system_content,
+            temperature,
+            max_tokens,
+            response_format,
+            image_data,
+            prompt_type,
+            stream,
+        )
+        if key is not None and result:
+            await asyncio.to_thread(response_cache.store, key, result, primary, model, prompt_type, validate)
+        return result
+
+    flight = flight_key(
+        config, llm_type, model, prompt, system_content, temperature, max_tokens, response_format, image_data
+    )
+    return await single_flight.ado(flight, _request, validate)
+
+
+async def _call_route_async(
+    config,
+    route,
+    prompt,
+    system_content,
+    temperature,
+    max_tokens,
+    response_format,
+    image_data,
+    prompt_type,
+    stream=False,
+):
+    """Try each ``(provider, model)`` in *route*; every attempt feeds the router's statistics.
+
+    With a hedge budget configured, a provider slower than its p90 latency is
+    raced against the next one in the route (see :mod:`src.llm.hedging`).
+    """
+    from src.llm.hedging import hedge_budget, hedge_delay
+    from src.llm.router import estimate_tokens, model_router
+
+    kwargs = {
+        "system_content": system_content,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "response_format": response_format,
+        "image_data": image_data,
+    }
+    input_tokens = estimate_tokens(prompt) + estimate_tokens(system_content)
+    budget = config.get("hedge_budget") or 0.0
+
+    def attempt(name, model):
+        return asyncio.create_task(
+            _attempt_async(config, name, model, prompt, kwargs, prompt_type, input_tokens, stream)
+        )
+
+    index = 0
+    while index < len(route):
+        name, model = route[index]
+        index += 1
+        hedge_budget.record_request()
+        tasks = [attempt(name, model)]
+        if budget > 0 and index < len(route):
+            delay = hedge_delay(model_router, name, model or (config.get(name) or {}).get("model"), prompt_type)
+            try:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+            except asyncio.CancelledError:
+                tasks[0].cancel()
+                raise
+            if not done and hedge_budget.try_spend(budget):
+                logger.info("[LLM] %s still running after p90 %.1fs, hedging with %s", name, delay, route[index][0])
+                tasks.append(attempt(*route[index]))
+                index += 1
+
+        result, winner = await _first_result(tasks)
+        if result:
+            if winner is not tasks[0]:
+                hedge_budget.record_win()
+            return result
+        logger.info("[LLM] %s returned no result, trying next provider", name)
+
+    logger.error("[LLM] all providers failed: %s", " -> ".join(name for name, _ in route))
+    return ""
+
+
+async def _first_result(tasks):
+    """``(result, task)`` of the first non-empty result among *tasks*; the others are cancelled."""
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for finished in done:
+                if finished.result():
+                    return finished.result(), finished
+        return "", None
+    finally:
+        for unfinished in pending:
+            unfinished.cancel()
+
+
+async def _attempt_async(config, name, model, prompt, kwargs, prompt_type, input_tokens, stream):
+    """One provider call; returns ``""`` on failure and records it with the router and circuit breaker."""
+    from src.llm.accounting import record_call, track_call
+    from src.llm.circuit_breaker import circuit_breakers
+    from src.llm.request_slots import request_slot
+    from src.llm.router import model_router
+    from src.llm.streaming import StreamRejected, StreamValidator
+
+    resolved = model or (config.get(name) or {}).get("model")
+    result = ""
+    # Take the slot before the breaker: a half-open probe must not be held
+    # by a task that can still be cancelled while queueing for a slot
+    async with request_slot():
+        admission = circuit_breakers.allow(name, resolved)
+        if not admission:
+            logger.info("[CIRCUIT] %s/%s open, skipping", name, resolved)
+            record_call(name, resolved, prompt_type, "circuit_open")
+            return ""
+        started = time.perf_counter()
+        with track_call(name, resolved, prompt_type, input_tokens) as call:
+            try:
+                provider = get_provider(name)
+                if stream:
+                    result = await provider.astream(prompt, model=model, validator=StreamValidator(), **kwargs)
+                else:
+                    result = await provider.acall(prompt, model=model, **kwargs)
+            except asyncio.CancelledError:
+                # Lost a hedge race: says nothing about the model's latency or reliability
+                logger.info("[LLM] %s cancelled by a faster hedge", name)
+                circuit_breakers.release(name, resolved, admission)
+                raise
+            except StreamRejected as e:
+                logger.warning("[LLM] %s stream rejected (%s), trying next model", name, e)
+                # The provider answered; only the content was unusable
+                circuit_breakers.release(name, resolved, admission)
+                call.finish(e.partial, "rejected")
+            except Exception as e:
+                logger.warning("[LLM] %s async call failed: %s", name, redact_secrets(str(e))[:200])
+                circuit_breakers.record(name, resolved, False, admission)
+                call.finish("", "error")
+            else:
+                circuit_breakers.record(name, resolved, bool(result), admission)
+                call.finish(result)
+    model_router.record(name, resolved, prompt_type, time.perf_counter() - started, bool(result), input_tokens)
+    return result
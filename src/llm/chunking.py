@@ -0,0 +1,96 @@
+"""Token-aware text chunking for long LLM inputs.
+
+PDFs, long articles and video transcripts do not fit a single summary
+request.  ``chunk_text`` splits them into pieces of at most *max_tokens*
+(estimated with :func:`src.llm.router.estimate_tokens`, so CJK text is
+counted per character rather than per whitespace-separated "word"),
+preferring paragraph breaks, then sentence ends, and only cutting inside a
+sentence when a single sentence is itself too long.
+"""
+
+import re
+
+from src.llm.router import estimate_tokens
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+# After Western sentence punctuation followed by whitespace, or right after CJK punctuation
+_SENTENCE_END = re.compile(r"(?<=[.!?;])\s+|(?<=[。！？；])")
+
+
+def split_sentences(text: str) -> list[str]:
+    """Sentences of *text* (Western and CJK end punctuation), whitespace-trimmed."""
+    return [sentence.strip() for sentence in _SENTENCE_END.split(text) if sentence.strip()]
+
+
+def _hard_split(text: str, max_tokens: int) -> list[str]:
+    """Cut *text* into pieces of at most *max_tokens*, at whitespace where possible."""
+    pieces = []
+    while estimate_tokens(text) > max_tokens:
+        # Largest prefix that fits (token count grows monotonically with length)
+        low, high = 1, len(text)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if estimate_tokens(text[:mid]) <= max_tokens:
+                low = mid
+            else:
+                high = mid - 1
+        cut = text.rfind(" ", 0, low)
+        cut = cut if cut > low // 2 else low
+        pieces.append(text[:cut].strip())
+        text = text[cut:].strip()
+    if text:
+        pieces.append(text)
+    return pieces
+
+
+def _joiner(piece: str) -> str:
+    """Western text is rejoined with a space, CJK text without one."""
+    return " " if piece[-1].isascii() else ""
+
+
+def _units(text: str, max_tokens: int) -> list[tuple[str, str]]:
+    """Split into (piece, separator) units that each fit in *max_tokens*."""
+    units = []
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            units.append((paragraph, "\n\n"))
+            continue
+        sentences = split_sentences(paragraph)
+        for index, sentence in enumerate(sentences):
+            pieces = _hard_split(sentence, max_tokens)
+            for piece in pieces[:-1]:
+                units.append((piece, _joiner(piece)))
+            # The paragraph's last sentence closes the paragraph
+            units.append((pieces[-1], "\n\n" if index == len(sentences) - 1 else _joiner(pieces[-1])))
+    return units
+
+
+def chunk_text(text: str | None, max_tokens: int) -> list[str]:
+    """Split *text* into chunks of at most *max_tokens* estimated tokens.
+
+    Paragraphs and sentences are kept whole whenever they fit; chunks keep
+    the source order and together contain all of the text.
+    """
+    if not text or not text.strip():
+        return []
+    max_tokens = max(1, max_tokens)
+    chunks, current = [], ""
+    for piece, separator in _units(text, max_tokens):
+        if current and estimate_tokens(current + piece) > max_tokens:
+            chunks.append(current.strip())
+            current = ""
+        current += piece + separator
+    if current.strip():
+        chunks.append(current.strip())
+    return chunks
+
+
+def truncate_tokens(text: str | None, max_tokens: int) -> str:
+    """First chunk's worth of *text*: at most *max_tokens*, cut at a paragraph or sentence end."""
+    if not text or estimate_tokens(text) <= max_tokens:
+        return text or ""
+    chunks = chunk_text(text, max_tokens)
+    return chunks[0] if chunks else ""
@@ -0,0 +1,183 @@
+"""Per-(provider, model) circuit breakers for LLM calls.
+
+Quota exhaustion already disables a Gemini model for the day
+(``disable_model_for_today``), but a transient 5xx storm on Grok or Moonshot
+used to cost every call its full retry ladder.  ``call_llm`` and
+``call_llm_async`` now ask :data:`circuit_breakers` before each provider
+call and report the outcome afterwards:
+
+- **closed**: calls pass; outcomes go into a sliding window of the last
+  ``WINDOW_CALLS`` calls within ``WINDOW_SECONDS``.  When at least
+  ``MIN_CALLS`` of them are recorded and the failure share reaches
+  ``FAILURE_RATE``, the circuit opens.
+- **open**: calls are rejected at once (the route moves to the next model)
+  until ``OPEN_SECONDS`` have passed.
+- **half-open**: one probe call is let through.  Success closes the circuit;
+  failure opens it again with the open period doubled (up to
+  ``MAX_OPEN_SECONDS``).  Only the probe's outcome counts: ``allow`` returns
+  an :class:`Admission` that callers hand back to ``record``/``release``, and
+  late outcomes of calls admitted earlier are ignored.
+
+Outcomes that say nothing about the provider's health (a cancelled hedge, a
+stream rejected for its content) release the probe slot via
+:meth:`CircuitBreakers.release` instead of being recorded.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+WINDOW_CALLS = 10
+WINDOW_SECONDS = 120.0
+MIN_CALLS = 3
+FAILURE_RATE = 0.5
+OPEN_SECONDS = 30.0
+MAX_OPEN_SECONDS = 300.0
+
+
+@dataclass(frozen=True)
+class Admission:
+    """An allowed call; *probe* numbers the half-open probe, None for calls admitted while closed."""
+
+    probe: int | None = None
+
+
+class CircuitBreaker:
+    """State machine for one (provider, model); not thread-safe on its own."""
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self.state = CLOSED
+        self.open_seconds = OPEN_SECONDS
+        self.opened_at = 0.0
+        self.probe_started = None
+        self.probe = 0
+        self.rejected = 0
+        self._outcomes: deque[tuple[float, bool]] = deque(maxlen=WINDOW_CALLS)
+
+    def _failure_rate(self, now: float) -> float | None:
+        while self._outcomes and now - self._outcomes[0][0] > WINDOW_SECONDS:
+            self._outcomes.popleft()
+        if len(self._outcomes) < MIN_CALLS:
+            return None
+        return sum(not ok for _, ok in self._outcomes) / len(self._outcomes)
+
+    def _open(self, now: float) -> None:
+        self.state = OPEN
+        self.opened_at = now
+        self.probe_started = None
+
+    def _is_probe(self, admission: Admission | None) -> bool:
+        return admission is not None and admission.probe == self.probe and self.probe_started is not None
+
+    def allow(self) -> Admission | None:
+        now = self._clock()
+        if self.state == CLOSED:
+            return Admission()
+        # A probe that never reported back (crashed worker) is replaced after one open period
+        probe_stale = self.probe_started is not None and now - self.probe_started >= self.open_seconds
+        if (self.state == OPEN and now - self.opened_at >= self.open_seconds) or probe_stale:
+            self.state = HALF_OPEN
+            self.probe_started = now
+            self.probe += 1
+            return Admission(self.probe)
+        self.rejected += 1
+        return None
+
+    def record(self, ok: bool, admission: Admission | None = None) -> None:
+        now = self._clock()
+        if self.state == HALF_OPEN:
+            if not self._is_probe(admission):
+                # A call admitted before the probe; only the probe decides
+                return
+            if ok:
+                self.state = CLOSED
+                self.open_seconds = OPEN_SECONDS
+                self.probe_started = None
+                self._outcomes.clear()
+            else:
+                self.open_seconds = min(MAX_OPEN_SECONDS, self.open_seconds * 2)
+                self._open(now)
+            return
+        if self.state == OPEN:
+            # A call admitted before the circuit opened; it cannot change the state
+            return
+        self._outcomes.append((now, ok))
+        rate = self._failure_rate(now)
+        if rate is not None and rate >= FAILURE_RATE:
+            self._open(now)
+
+    def release(self, admission: Admission | None = None) -> None:
+        if self.state == HALF_OPEN and self._is_probe(admission):
+            # Let the next call probe straight away
+            self.state = OPEN
+            self.opened_at = self._clock() - self.open_seconds
+            self.probe_started = None
+
+
+class CircuitBreakers:
+    """Thread-safe registry of :class:`CircuitBreaker` by (provider, model)."""
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._breakers: dict[tuple[str, str], CircuitBreaker] = {}
+
+    def _get(self, provider: str, model: str | None) -> CircuitBreaker:
+        key = (provider, model or "")
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers[key] = CircuitBreaker(self._clock)
+        return breaker
+
+    def allow(self, provider: str, model: str | None) -> Admission | None:
+        """An :class:`Admission` when a call to *provider*/*model* may go out now, else None."""
+        with self._lock:
+            breaker = self._get(provider, model)
+            before = breaker.state
+            allowed = breaker.allow()
+        if allowed and before == OPEN:
+            logger.info(f"[CIRCUIT] {provider}/{model} half-open, sending probe")
+        return allowed
+
+    def record(self, provider: str, model: str | None, ok: bool, admission: Admission | None = None) -> None:
+        """Report the outcome of the call *admission* let through."""
+        with self._lock:
+            breaker = self._get(provider, model)
+            before = breaker.state
+            breaker.record(ok, admission)
+            after = breaker.state
+        if after != before:
+            if after == OPEN:
+                logger.warning(f"[CIRCUIT] {provider}/{model} open for {breaker.open_seconds:.0f}s")
+            else:
+                logger.info(f"[CIRCUIT] {provider}/{model} {after}")
+
+    def release(self, provider: str, model: str | None, admission: Admission | None = None) -> None:
+        """End an allowed call without an outcome (cancelled, or rejected for its content)."""
+        with self._lock:
+            self._get(provider, model).release(admission)
+
+    def snapshot(self) -> dict:
+        """State and fast-rejection count per model, for logs and receipts."""
+        with self._lock:
+            return {
+                f"{provider}/{model}": {"state": breaker.state, "rejected": breaker.rejected}
+                for (provider, model), breaker in sorted(self._breakers.items())
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._breakers.clear()
+
+
+# 全局熔断器
+circuit_breakers = CircuitBreakers()
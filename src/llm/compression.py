@@ -0,0 +1,285 @@
+"""Local extractive pre-compression of scraped article text.
+
+``ScraplingCrawler.get_all_text()`` returns everything on the page:
+navigation, cookie banners, share buttons and footers come along with the
+article and cost input tokens on every summary request.  ``compress_text``
+runs before the LLM sees the text, using only the standard library:
+
+1. **Boilerplate lines** — short lines matching navigation/consent/footer
+   phrases, and very short lines without sentence punctuation (menu items).
+2. **Repeated blocks** — short lines that occur more than once (headers and
+   footers repeated on the page) are dropped; longer repeats keep their
+   first occurrence.
+3. **TextRank** — when what remains still exceeds *max_tokens*, sentences
+   are scored with PageRank over a word/bigram-overlap similarity graph
+   (CJK text is compared on character bigrams) and the highest-scoring
+   sentences that fit the budget are kept, in their original order.
+
+``compression_stats`` totals input/output tokens so stage receipts can
+report the reduction ratio.
+
+``extractive_summary`` reuses the same pieces as a zero-network fallback
+when every provider fails: the lede plus the sentences richest in the
+text's recurring keywords, bounded to ``FALLBACK_SUMMARY_CHARS``.  Callers
+mark such summaries with ``EXTRACTIVE_SOURCE_TYPE``.
+"""
+
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+
+from src.llm.chunking import split_sentences
+from src.llm.router import estimate_tokens
+
+# Lines at most this long (estimated tokens) are candidates for boilerplate/repeat removal
+BOILERPLATE_MAX_TOKENS = 24
+# Lines shorter than this without sentence punctuation are treated as menu/link text
+MENU_MAX_TOKENS = 6
+TEXTRANK_DAMPING = 0.85
+TEXTRANK_ITERATIONS = 30
+TEXTRANK_TOLERANCE = 1e-4
+# Sentences beyond this are not scored (keeps the O(n²) similarity graph small)
+TEXTRANK_MAX_SENTENCES = 400
+# Score bonus for the first few sentences, where news articles put the lede
+LEAD_SENTENCES = 3
+LEAD_BONUS = 0.5
+
+# Fallback summaries: at most this many characters, opening with this many lead sentences
+FALLBACK_SUMMARY_CHARS = 400
+FALLBACK_LEAD_SENTENCES = 2
+# Shorter sentences are captions, bylines or fragments
+FALLBACK_MIN_SENTENCE_CHARS = 40
+EXTRACTIVE_SOURCE_TYPE = "extractive_fallback"
+
+_BOILERPLATE = re.compile(
+    r"cookie|consent|accept all|privacy policy|terms of (service|use)|all rights reserved|©|copyright"
+    r"|subscribe|newsletter|sign (in|up)|log ?in|create (an )?account|skip to (main )?content"
+    r"|share (this|on)|follow us|advertisement|related (articles|posts|stories)|read more|back to top"
+    r"|you may also like|recommended for you|enable javascript|"
+    r"隐私政策|用户协议|版权所有|订阅|登录|注册|分享到|相关阅读|返回顶部|广告",
+    re.IGNORECASE,
+)
+_SENTENCE_PUNCTUATION = re.compile(r"[.!?。！？；;:：]")
+_WORD = re.compile(r"[a-z0-9]{3,}")
+_CJK = re.compile(r"[㐀-鿿]+")
+_DIGITS = re.compile(r"\d+")
+_STOPWORD_TEXT = (
+    "the and for are but not you all any can had her was one our out has him his how its "
+    "may new now own see two way who did get let say she too use that with have this will your "
+    "from they been more when what which their there would about into than them then these some could other"
+)
+_STOPWORDS = frozenset(_STOPWORD_TEXT.split())
+
+
+@dataclass(frozen=True)
+class Compression:
+    text: str
+    input_tokens: int
+    output_tokens: int
+
+    @property
+    def ratio(self) -> float:
+        """Share of input tokens removed (0.0 = nothing removed)."""
+        return 1 - self.output_tokens / self.input_tokens if self.input_tokens else 0.0
+
+
+def _line_key(line: str, tokens: int) -> str:
+    """Comparison key; short lines ignore numbers ("Page 2 of 9", dates, counters)."""
+    key = " ".join(line.lower().split())
+    return _DIGITS.sub("#", key) if tokens <= BOILERPLATE_MAX_TOKENS else key
+
+
+def _is_boilerplate(line: str, tokens: int) -> bool:
+    if tokens > BOILERPLATE_MAX_TOKENS:
+        return False
+    if _BOILERPLATE.search(line):
+        return True
+    return tokens <= MENU_MAX_TOKENS and not _SENTENCE_PUNCTUATION.search(line)
+
+
+def strip_boilerplate(text: str) -> list[str]:
+    """Content lines of *text*: boilerplate and repeated short blocks removed."""
+    lines = [(line.strip(), estimate_tokens(line)) for line in text.splitlines() if line.strip()]
+    counts: dict[str, int] = {}
+    for line, tokens in lines:
+        key = _line_key(line, tokens)
+        counts[key] = counts.get(key, 0) + 1
+
+    kept, seen = [], set()
+    for line, tokens in lines:
+        key = _line_key(line, tokens)
+        if _is_boilerplate(line, tokens):
+            continue
+        if counts[key] > 1 and (tokens <= BOILERPLATE_MAX_TOKENS or key in seen):
+            continue
+        seen.add(key)
+        kept.append(line)
+    return kept
+
+
+def _terms(sentence: str) -> set[str]:
+    lowered = sentence.lower()
+    terms = {word for word in _WORD.findall(lowered) if word not in _STOPWORDS}
+    for run in _CJK.findall(lowered):
+        terms.update(run[i : i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+def textrank_scores(sentences: list[str]) -> list[float]:
+    """PageRank scores over the TextRank sentence-similarity graph."""
+    terms = [_terms(sentence) for sentence in sentences]
+    count = len(sentences)
+    neighbours: list[list[tuple[int, float]]] = [[] for _ in range(count)]
+    for i in range(count):
+        if len(terms[i]) < 2:
+            continue
+        for j in range(i + 1, count):
+            if len(terms[j]) < 2:
+                continue
+            overlap = len(terms[i] & terms[j])
+            if overlap:
+                weight = overlap / (math.log(len(terms[i])) + math.log(len(terms[j])))
+                neighbours[i].append((j, weight))
+                neighbours[j].append((i, weight))
+
+    totals = [sum(weight for _, weight in edges) for edges in neighbours]
+    scores = [1.0] * count
+    for _ in range(TEXTRANK_ITERATIONS):
+        shares = [score / total if total else 0.0 for score, total in zip(scores, totals, strict=True)]
+        updated = [
+            (1 - TEXTRANK_DAMPING) + TEXTRANK_DAMPING * sum(weight * shares[j] for j, weight in neighbours[i])
+            for i in range(count)
+        ]
+        converged = max((abs(a - b) for a, b in zip(updated, scores, strict=True)), default=0.0) < TEXTRANK_TOLERANCE
+        scores = updated
+        if converged:
+            break
+    return scores
+
+
+def _select(lines: list[str], max_tokens: int) -> str:
+    """Highest-scoring sentences of *lines* within *max_tokens*, in source order."""
+    sentences = [(index, sentence) for index, line in enumerate(lines) for sentence in split_sentences(line)]
+    scored = sentences[:TEXTRANK_MAX_SENTENCES]
+    scores = textrank_scores([sentence for _, sentence in scored])
+    ranked = sorted(
+        range(len(scored)),
+        key=lambda i: scores[i] * (1 + LEAD_BONUS if i < LEAD_SENTENCES else 1),
+        reverse=True,
+    )
+
+    chosen, used = set(), 0
+    for i in ranked:
+        cost = estimate_tokens(scored[i][1])
+        if used + cost <= max_tokens:
+            chosen.add(i)
+            used += cost
+
+    out: list[str] = []
+    previous_line = None
+    for i in sorted(chosen):
+        line_index, sentence = scored[i]
+        if out and line_index == previous_line:
+            out[-1] += (" " if sentence[0].isascii() else "") + sentence
+        else:
+            out.append(sentence)
+        previous_line = line_index
+    return "\n".join(out)
+
+
+def compress_text(text: str | None, max_tokens: int | None = None) -> Compression:
+    """Drop boilerplate and, above *max_tokens*, keep the most informative sentences."""
+    text = text or ""
+    input_tokens = estimate_tokens(text)
+    lines = strip_boilerplate(text)
+    compressed = "\n".join(lines)
+    if max_tokens is not None and estimate_tokens(compressed) > max_tokens:
+        compressed = _select(lines, max_tokens)
+    if not compressed.strip():
+        # Nothing recognisable as content: let the LLM see the original
+        compressed = text
+    return Compression(compressed, input_tokens, estimate_tokens(compressed))
+
+
+def _clip(sentence: str, max_chars: int) -> str:
+    if len(sentence) <= max_chars:
+        return sentence
+    cut = sentence.rfind(" ", 0, max_chars)
+    return sentence[: cut if cut > max_chars // 2 else max_chars - 1].rstrip() + "…"
+
+
+def extractive_summary(
+    text: str | None, max_chars: int = FALLBACK_SUMMARY_CHARS, lead: int = FALLBACK_LEAD_SENTENCES
+) -> str:
+    """Summary of *text* made of its own sentences, for when no LLM answers.
+
+    The first *lead* sentences come first; the rest of *max_chars* goes to
+    the sentences whose terms recur most across the text (a term scores the
+    number of sentences containing it).  Chosen sentences keep source order.
+    """
+    text = text or ""
+    # Like compress_text, a text that is all "boilerplate" is used as it is
+    lines = strip_boilerplate(text) or [line.strip() for line in text.splitlines() if line.strip()]
+    sentences = [sentence for line in lines for sentence in split_sentences(line)]
+    sentences = sentences[:TEXTRANK_MAX_SENTENCES]
+    candidates = [sentence for sentence in sentences if len(sentence) >= FALLBACK_MIN_SENTENCE_CHARS] or sentences
+    if not candidates:
+        return ""
+
+    terms = [_terms(sentence) for sentence in candidates]
+    frequency = Counter(term for sentence_terms in terms for term in sentence_terms)
+
+    def _keyword_score(i: int) -> float:
+        recurring = sum(frequency[term] for term in terms[i] if frequency[term] > 1)
+        return recurring / math.sqrt(len(terms[i]) or 1)
+
+    lead = min(max(0, lead), len(candidates))
+    order = list(range(lead)) + sorted(range(lead, len(candidates)), key=_keyword_score, reverse=True)
+    chosen, used = [], 0
+    for i in order:
+        cost = len(candidates[i]) + bool(chosen)
+        if used + cost <= max_chars:
+            chosen.append(i)
+            used += cost
+    if not chosen:
+        return _clip(candidates[order[0]], max_chars)
+
+    summary = ""
+    for i in sorted(chosen):
+        sentence = candidates[i]
+        summary += (" " if summary and sentence[0].isascii() else "") + sentence
+    return summary
+
+
+class CompressionStats:
+    """Running input/output token totals of ``compress_text`` calls."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def record(self, result: Compression) -> None:
+        with self._lock:
+            self._texts += 1
+            self._input_tokens += result.input_tokens
+            self._output_tokens += result.output_tokens
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            removed = 1 - self._output_tokens / self._input_tokens if self._input_tokens else 0.0
+            return {
+                "texts": self._texts,
+                "input_tokens": self._input_tokens,
+                "output_tokens": self._output_tokens,
+                "reduction_ratio": round(removed, 3),
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._texts = self._input_tokens = self._output_tokens = 0
+
+
+# 全局压缩统计
+compression_stats = CompressionStats()
@@ -61,6 +61,9 @@ def load_llm_config():
                 "max_tokens": config.get("MOONSHOT_MAX_TOKENS", 800),
             },
             "default": config.get("DEFAULT_LLM", "grok"),
+            # Extra requests allowed for hedging, as a share of all requests (0 disables)
+            "hedge_budget": float(config.get("LLM_HEDGE_BUDGET", 0.0)),
+            "prices": config.get("LLM_PRICES_PER_MILLION", {}),
         }
 
     _llm_config_cache = result
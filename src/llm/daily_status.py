@@ -1,6 +1,14 @@
-"""LLM daily model status and request-count tracking (SQLite-backed)."""
+"""LLM daily model status and request-count tracking (SQLite-backed).
 
+State is served from the in-process :data:`quota_ledger`; SQLite is read once
+per day (and again only after another process writes) and written behind.
+"""
+
+import atexit
 import logging
+import threading
+import time
+from collections import Counter
 from datetime import datetime
 
 from src.db.connection import get_db
@@ -11,6 +19,9 @@ logger = logging.getLogger(__name__)
 GEMINI_FALLBACK_MODEL = "gemini-3.1-flash-lite-preview"
 GEMINI_STRICT_LIMIT_PER_MINUTE = 5
 GEMINI_STRICT_LIMIT_PER_DAY = 20
+# 账本落库合并间隔与跨进程版本检查间隔（秒）
+FLUSH_INTERVAL_SECONDS = 0.5
+VERSION_CHECK_SECONDS = 1.0
 
 
 def _today_str():
@@ -44,80 +55,254 @@ def _ensure_llm_status_table():
             PRIMARY KEY (provider, model, usage_date)
         )
         """)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS llm_quota_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+        """)
 
 
-def _reserve_daily_request_slot(provider, model, daily_limit):
-    """预占当天请求配额；达到上限返回False。"""
-    _ensure_llm_status_table()
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT request_count
-            FROM llm_model_daily_usage
-            WHERE provider = ? AND model = ? AND usage_date = ?
-            """,
-            (provider, model, _today_str()),
-        )
+class QuotaLedger:
+    """当天模型禁用状态与请求计数的进程内账本（write-behind 持久化）。
+
+    - 当天状态只在首次使用（或跨日、或其他进程写入后）从 SQLite 读一次；
+    - ``reserve``/``disable``/``is_disabled`` 只读写内存，写入排队后由后台线程
+      用 ``UPSERT ... RETURNING`` 批量落库，返回值校正为库中的权威计数
+      （含其他进程的预占）；
+    - 跨进程失效：每次落库同时递增 ``llm_quota_version``，热路径最多每
+      ``VERSION_CHECK_SECONDS`` 秒读一次该单行版本号，与自己最后一次写入
+      得到的版本不同即重新加载。
+    """
+
+    def __init__(self, flush_interval=None, version_check_seconds=None):
+        self.flush_interval = FLUSH_INTERVAL_SECONDS if flush_interval is None else flush_interval
+        self.version_check_seconds = VERSION_CHECK_SECONDS if version_check_seconds is None else version_check_seconds
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flusher = None
+        self._atexit_registered = False
+        self._reset_state()
+
+    def _reset_state(self):
+        self._day = None
+        self._version = None
+        self._checked_at = 0.0
+        self._disabled = set()
+        self._usage = {}
+        # 待落库：{(provider, model, day): 增量} 与 {(provider, model, day): (reason, error)}
+        self._pending_usage = Counter()
+        self._pending_disable = {}
+
+    def reset(self):
+        """丢弃内存状态与未落库写入（测试或切换数据库时使用）。"""
+        with self._lock:
+            self._reset_state()
+
+    # -- 加载与失效 ---------------------------------------------------------
+
+    @staticmethod
+    def _read_version(cursor):
+        cursor.execute("SELECT version FROM llm_quota_version WHERE id = 1")
         row = cursor.fetchone()
-        current = int(row[0]) if row else 0
-        if current >= daily_limit:
-            return False
-
-        cursor.execute(
-            """
-            INSERT INTO llm_model_daily_usage
-                (provider, model, usage_date, request_count, updated_at)
-            VALUES
-                (?, ?, ?, 1, datetime('now', 'localtime'))
-            ON CONFLICT(provider, model, usage_date)
-            DO UPDATE SET
-                request_count = request_count + 1,
-                updated_at = datetime('now', 'localtime')
-            """,
-            (provider, model, _today_str()),
-        )
+        return int(row[0]) if row else 0
+
+    def _load(self, today):
+        _ensure_llm_status_table()
+        with get_db() as conn:
+            cursor = conn.cursor()
+            version = self._read_version(cursor)
+            cursor.execute(
+                "SELECT provider, model FROM llm_model_daily_status WHERE status_date = ? AND is_disabled = 1",
+                (today,),
+            )
+            disabled = {(provider, model) for provider, model in cursor.fetchall()}
+            cursor.execute(
+                "SELECT provider, model, request_count FROM llm_model_daily_usage WHERE usage_date = ?",
+                (today,),
+            )
+            usage = {(provider, model): int(count) for provider, model, count in cursor.fetchall()}
+        with self._lock:
+            # 尚未落库的本进程写入叠加在库中状态之上
+            for (provider, model, day), count in self._pending_usage.items():
+                if day == today:
+                    usage[(provider, model)] = usage.get((provider, model), 0) + count
+            disabled.update((p, m) for p, m, day in self._pending_disable if day == today)
+            self._day, self._version = today, version
+            self._disabled, self._usage = disabled, usage
+            self._checked_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        today = _today_str()
+        if self._day != today:
+            self._load(today)
+            return
+        now = time.monotonic()
+        if now - self._checked_at < self.version_check_seconds:
+            return
+        self._checked_at = now
+        with get_db() as conn:
+            version = self._read_version(conn.cursor())
+        if version != self._version:
+            logger.debug(f"llm_quota_version {self._version} -> {version}，重新加载当天模型状态")
+            self._load(today)
+
+    # -- 热路径 ----------------------------------------------------------------
+
+    def reserve(self, provider, model, daily_limit):
+        """在内存中预占当天请求配额；达到上限返回False。"""
+        self._ensure_fresh()
+        key = (provider, model)
+        with self._lock:
+            used = self._usage.get(key, 0)
+            if used >= daily_limit:
+                return False
+            self._usage[key] = used + 1
+            self._pending_usage[(provider, model, self._day)] += 1
+        self._schedule_flush()
         return True
 
+    def is_disabled(self, provider, model):
+        self._ensure_fresh()
+        return (provider, model) in self._disabled
+
+    def disable(self, provider, model, reason, error_msg):
+        self._ensure_fresh()
+        with self._lock:
+            self._disabled.add((provider, model))
+            self._pending_disable[(provider, model, self._day)] = (reason, (error_msg or "")[:1000])
+        self._schedule_flush()
+
+    def status(self):
+        """(禁用的 {(provider, model)}, {(provider, model): request_count}) 快照。"""
+        self._ensure_fresh()
+        with self._lock:
+            return set(self._disabled), dict(self._usage)
+
+    # -- write-behind ----------------------------------------------------------
+
+    def _schedule_flush(self):
+        if self._flusher is None or not self._flusher.is_alive():
+            with self._lock:
+                if self._flusher is None or not self._flusher.is_alive():
+                    self._flusher = threading.Thread(target=self._flush_loop, name="quota-ledger", daemon=True)
+                    self._flusher.start()
+                    if not self._atexit_registered:
+                        atexit.register(self.flush)
+                        self._atexit_registered = True
+        self._wake.set()
+
+    def _flush_loop(self):
+        pause = threading.Event()
+        while True:
+            self._wake.wait()
+            # 合并一个间隔内的写入（Event.wait 而非 time.sleep，不受对 sleep 的打桩影响）
+            pause.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """把排队的预占与禁用写入 SQLite；失败时重新排队。"""
+        with self._flush_lock:
+            with self._lock:
+                usage, self._pending_usage = self._pending_usage, Counter()
+                disables, self._pending_disable = self._pending_disable, {}
+            if not usage and not disables:
+                return
+            counts = {}
+            try:
+                _ensure_llm_status_table()
+                with get_db() as conn:
+                    cursor = conn.cursor()
+                    for (provider, model, day), count in usage.items():
+                        cursor.execute(
+                            """
+                            INSERT INTO llm_model_daily_usage
+                                (provider, model, usage_date, request_count, updated_at)
+                            VALUES
+                                (?, ?, ?, ?, datetime('now', 'localtime'))
+                            ON CONFLICT(provider, model, usage_date)
+                            DO UPDATE SET
+                                request_count = request_count + excluded.request_count,
+                                updated_at = excluded.updated_at
+                            RETURNING request_count
+                            """,
+                            (provider, model, day, count),
+                        )
+                        counts[(provider, model, day)] = int(cursor.fetchone()[0])
+                    for (provider, model, day), (reason, error_msg) in disables.items():
+                        cursor.execute(
+                            """
+                            INSERT INTO llm_model_daily_status
+                                (provider, model, status_date, is_disabled, reason, last_error, disabled_at, updated_at)
+                            VALUES
+                                (?, ?, ?, 1, ?, ?, datetime('now', 'localtime'), datetime('now', 'localtime'))
+                            ON CONFLICT(provider, model, status_date)
+                            DO UPDATE SET
+                                is_disabled = 1,
+                                reason = excluded.reason,
+                                last_error = excluded.last_error,
+                                disabled_at = excluded.disabled_at,
+                                updated_at = excluded.updated_at
+                            """,
+                            (provider, model, day, reason, error_msg),
+                        )
+                    cursor.execute(
+                        """
+                        INSERT INTO llm_quota_version (id, version) VALUES (1, 1)
+                        ON CONFLICT(id) DO UPDATE SET version = version + 1
+                        RETURNING version
+                        """
+                    )
+                    version = int(cursor.fetchone()[0])
+            except Exception as e:
+                logger.warning(f"模型当日状态落库失败，稍后重试: {e}")
+                with self._lock:
+                    self._pending_usage.update(usage)
+                    for key, value in disables.items():
+                        self._pending_disable.setdefault(key, value)
+                return
+
+            with self._lock:
+                for (provider, model, day), count in counts.items():
+                    if day == self._day:
+                        # 权威计数（含其他进程的预占）+ 落库期间新增的本地预占
+                        self._usage[(provider, model)] = count + self._pending_usage.get((provider, model, day), 0)
+                if self._version is not None and version == self._version + 1:
+                    self._version = version
+                else:
+                    # 期间有其他进程写入：下次访问时重新加载
+                    self._version = None
+                    self._checked_at = 0.0
+
+
+# 全局账本实例
+quota_ledger = QuotaLedger()
+
+
+def _reserve_daily_request_slot(provider, model, daily_limit):
+    """预占当天请求配额；达到上限返回False。"""
+    return quota_ledger.reserve(provider, model, daily_limit)
+
 
 def is_model_disabled_today(provider, model):
     """检查模型今天是否已被禁用。"""
-    _ensure_llm_status_table()
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT is_disabled
-            FROM llm_model_daily_status
-            WHERE provider = ? AND model = ? AND status_date = ?
-            """,
-            (provider, model, _today_str()),
-        )
-        row = cursor.fetchone()
-        return bool(row and row[0] == 1)
+    return quota_ledger.is_disabled(provider, model)
 
 
 def disable_model_for_today(provider, model, reason, error_msg):
     """将模型标记为当天禁用，次日自动恢复。"""
-    _ensure_llm_status_table()
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            INSERT INTO llm_model_daily_status
-                (provider, model, status_date, is_disabled, reason, last_error, disabled_at, updated_at)
-            VALUES
-                (?, ?, ?, 1, ?, ?, datetime('now', 'localtime'), datetime('now', 'localtime'))
-            ON CONFLICT(provider, model, status_date)
-            DO UPDATE SET
-                is_disabled = 1,
-                reason = excluded.reason,
-                last_error = excluded.last_error,
-                disabled_at = excluded.disabled_at,
-                updated_at = excluded.updated_at
-            """,
-            (provider, model, _today_str(), reason, (error_msg or "")[:1000]),
-        )
+    quota_ledger.disable(provider, model, reason, error_msg)
+
+
+def get_daily_model_status():
+    """当天所有模型的禁用状态与请求计数（来自进程内账本）。
+
+    Returns:
+        (禁用的 {(provider, model)}, {(provider, model): request_count})
+    """
+    return quota_ledger.status()
 
 
 def _is_forbidden_gemini_model(model):
@@ -0,0 +1,76 @@
+"""Hedged LLM requests: a second provider when the first is slow.
+
+A plain route only moves to the next provider after the current one has
+fully failed, which for Grok can mean three 120 s attempts plus backoff.
+With ``"LLM_HEDGE_BUDGET"`` set in config.json, ``call_llm_async`` waits
+for the current provider only up to its learned p90 latency for the request
+class (:meth:`ModelRouter.latency_quantile`).  When it is still running, the
+next provider in the route gets the same request; the first non-empty answer
+wins and the other task is cancelled.
+
+Hedges cost extra requests, so :data:`hedge_budget` allows at most
+``budget × requests`` hedged requests (0.1 = up to 10 % extra spend).
+Providers that run in a worker thread (Gemini) cannot be interrupted: a
+cancelled Gemini call finishes in the background, but its answer is dropped.
+"""
+
+import threading
+
+from src.llm.router import PRIOR_LATENCY_SECONDS
+
+HEDGE_QUANTILE = 0.9
+# Threshold before enough latencies are recorded: the prior latency times this
+HEDGE_PRIOR_FACTOR = 2.0
+# Never hedge sooner than this, however fast a model has been
+HEDGE_MIN_SECONDS = 2.0
+
+
+def hedge_delay(router, provider: str, model: str | None, request_class: str | None) -> float:
+    """Seconds to wait for *provider*/*model* before hedging."""
+    learned = router.latency_quantile(provider, model, request_class, HEDGE_QUANTILE)
+    if learned is None:
+        learned = PRIOR_LATENCY_SECONDS.get(provider, 15.0) * HEDGE_PRIOR_FACTOR
+    return max(HEDGE_MIN_SECONDS, learned)
+
+
+class HedgeBudget:
+    """Caps hedged requests at a share of all provider requests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def record_request(self) -> None:
+        with self._lock:
+            self._requests += 1
+
+    def try_spend(self, budget: float) -> bool:
+        """Reserve one hedge if it keeps hedges within ``budget × requests``."""
+        with self._lock:
+            if budget <= 0 or self._hedges + 1 > budget * self._requests:
+                self._denied += budget > 0
+                return False
+            self._hedges += 1
+            self._requests += 1
+            return True
+
+    def record_win(self) -> None:
+        with self._lock:
+            self._wins += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "hedges": self._hedges,
+                "hedge_wins": self._wins,
+                "hedges_denied": self._denied,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._requests = self._hedges = self._wins = self._denied = 0
+
+
+# 全局对冲预算
+hedge_budget = HedgeBudget()
@@ -0,0 +1,168 @@
+"""Smaller image payloads for vision requests.
+
+``generate_summary_from_image`` used to send the screenshot exactly as
+``save_page_screenshot`` wrote it: a lossless full-resolution PNG, base64
+encoded inline in the request.  The models downscale large images anyway
+(Gemini tiles them at 768 px), so most of those bytes only cost upload time.
+:func:`prepare_image` runs before the request:
+
+1. **Above the fold** — an image taller than ``FOLD_MAX_RATIO`` × its width
+   (a full-page capture) is cropped to its top region, where the headline
+   and lede are.
+2. **Downsample** — the longest edge is scaled to at most ``MAX_EDGE_PX``.
+3. **Re-encode** — JPEG at ``JPEG_QUALITY`` (Grok's vision endpoint accepts
+   JPEG and PNG only, so WebP is not used); the original is kept when it is
+   already smaller.
+
+Prepared payloads are cached by the SHA-256 of the original bytes, and
+``image_payload_stats`` totals the bytes saved.  Images Pillow cannot decode
+are sent unchanged.
+"""
+
+import base64
+import binascii
+import hashlib
+import io
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# Keep at most this height/width ratio from the top of the image
+FOLD_MAX_RATIO = 1.25
+MAX_EDGE_PX = 1536
+JPEG_QUALITY = 80
+CACHE_ENTRIES = 32
+
+# Leading base64 characters of each format's magic bytes
+_MIME_PREFIXES = (
+    ("/9j/", "image/jpeg"),
+    ("iVBORw0KGgo", "image/png"),
+    ("R0lGOD", "image/gif"),
+    ("UklGR", "image/webp"),
+)
+
+
+def image_mime_type(image_data: str | None) -> str:
+    """MIME type of base64 *image_data* from its magic bytes (PNG when unknown)."""
+    for prefix, mime_type in _MIME_PREFIXES:
+        if image_data and image_data.startswith(prefix):
+            return mime_type
+    return "image/png"
+
+
+@dataclass(frozen=True)
+class ImagePayload:
+    data: str
+    mime_type: str
+    original_bytes: int
+    payload_bytes: int
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.original_bytes - self.payload_bytes
+
+
+def _encode(raw: bytes) -> bytes:
+    from PIL import Image
+
+    with Image.open(io.BytesIO(raw)) as image:
+        image.load()
+        width, height = image.size
+        if height > width * FOLD_MAX_RATIO:
+            image = image.crop((0, 0, width, round(width * FOLD_MAX_RATIO)))
+        scale = MAX_EDGE_PX / max(image.size)
+        if scale < 1:
+            image = image.resize(
+                (max(1, round(image.width * scale)), max(1, round(image.height * scale))), Image.Resampling.LANCZOS
+            )
+        if image.mode != "RGB":
+            # JPEG has no alpha: flatten transparent pixels onto white like a browser page
+            rgba = image.convert("RGBA")
+            image = Image.new("RGB", rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel("A"))
+        out = io.BytesIO()
+        image.save(out, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+        return out.getvalue()
+
+
+class ImagePayloadStats:
+    """Running byte totals of prepared image payloads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def record(self, payload: ImagePayload, cache_hit: bool = False) -> None:
+        with self._lock:
+            self._images += 1
+            self._cache_hits += cache_hit
+            self._original_bytes += payload.original_bytes
+            self._payload_bytes += payload.payload_bytes
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            saved = self._original_bytes - self._payload_bytes
+            return {
+                "images": self._images,
+                "cache_hits": self._cache_hits,
+                "original_bytes": self._original_bytes,
+                "payload_bytes": self._payload_bytes,
+                "saved_bytes": saved,
+                "reduction_ratio": round(saved / self._original_bytes, 3) if self._original_bytes else 0.0,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._images = self._cache_hits = self._original_bytes = self._payload_bytes = 0
+
+
+# 全局图片负载统计
+image_payload_stats = ImagePayloadStats()
+
+_cache: OrderedDict[str, ImagePayload] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def prepare_image(raw: bytes) -> ImagePayload:
+    """Cropped, downsampled JPEG payload of image bytes *raw* (cached by content hash)."""
+    key = hashlib.sha256(raw).hexdigest()
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+    if cached is not None:
+        image_payload_stats.record(cached, cache_hit=True)
+        return cached
+
+    original = base64.b64encode(raw).decode("ascii")
+    payload = ImagePayload(original, image_mime_type(original), len(raw), len(raw))
+    try:
+        encoded = _encode(raw)
+    except Exception as e:
+        logger.warning(f"[IMAGE] could not re-encode image, sending it unchanged: {e}")
+    else:
+        if len(encoded) < len(raw):
+            payload = ImagePayload(base64.b64encode(encoded).decode("ascii"), "image/jpeg", len(raw), len(encoded))
+    logger.info(
+        f"[IMAGE] payload {payload.original_bytes // 1024} KB -> {payload.payload_bytes // 1024} KB "
+        f"({payload.mime_type})"
+    )
+
+    with _cache_lock:
+        _cache[key] = payload
+        while len(_cache) > CACHE_ENTRIES:
+            _cache.popitem(last=False)
+    image_payload_stats.record(payload)
+    return payload
+
+
+def prepare_image_b64(image_data: str) -> ImagePayload | None:
+    """:func:`prepare_image` for base64 input; None when *image_data* is not valid base64."""
+    try:
+        raw = base64.b64decode(image_data, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    return prepare_image(raw) if raw else None
@@ -1,22 +1,59 @@
+import asyncio
+import contextvars
+import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
-from .llm_utils import call_llm
+from src.security.content_sanitizer import contains_hallucination_markers, validate_summary_length
+
+from .async_client import call_llm_async
+from .chunking import chunk_text, truncate_tokens
+from .compression import compress_text, compression_stats
+from .image_payload import prepare_image_b64
+from .llm_utils import call_llm, load_llm_config
 from .prompts import (
+    ARTICLE_REDUCE_PROMPT,
     ARTICLE_SUMMARY_PROMPT,
     ARTICLE_SUMMARY_SYSTEM,
+    BATCH_STORY_PROMPT,
+    BATCH_STORY_SYSTEM,
+    CHUNK_SUMMARY_PROMPT,
+    CHUNK_SUMMARY_SYSTEM,
+    DISCUSSION_REDUCE_PROMPT,
     DISCUSSION_SUMMARY_PROMPT,
     DISCUSSION_SUMMARY_SYSTEM,
     TITLE_TRANSLATE_PROMPT,
     TITLE_TRANSLATE_SYSTEM,
 )
+from .router import estimate_tokens, model_router
 
 logger = logging.getLogger(__name__)
 
+# 不足此 token 数的输入直接单次摘要；批量模式每条新闻的正文/讨论也截取到此长度（约700个英文词）
+SUMMARY_INPUT_TOKENS = 1_000
+
+# 长文分段摘要（map-reduce）：每段 token 上限（再受模型上下文窗口约束）、输出预留、最多段数、并发数
+SUMMARY_CHUNK_TOKENS = 6_000
+SUMMARY_OUTPUT_TOKENS = 1_000
+MAP_REDUCE_MAX_CHUNKS = 6
+MAP_REDUCE_CONCURRENCY = 3
+
+# 批量模式：一次请求处理多条新闻，降低每日请求数（Gemini 20次/天、5次/分钟）
+BATCH_MAX_STORIES = 5
+# 每条新闻预留的输出 token（约400字摘要 + 250字讨论 + 标题 + JSON开销）
+BATCH_OUTPUT_TOKENS_PER_STORY = 1_200
+# 校验失败的新闻最多再批量重试的轮数
+BATCH_RETRY_ROUNDS = 1
+BATCH_FIELDS = ("content_summary", "discuss_summary", "title_chs")
+
 
 # 生成文本摘要（文章/讨论）
 def generate_summary(text, prompt_type="article", llm_type=None, model=None):
     """
     生成摘要，支持不同的LLM模型
+
+    超过单段上限的长文（PDF、长文章、视频字幕）按 token 分段：各段并发提炼要点（map），
+    再合并为最终摘要（reduce），见 summary_chunk_tokens()。
     Args:
         text: 需要总结的文本
         prompt_type: 'article'或'discussion'
@@ -27,50 +64,224 @@ def generate_summary(text, prompt_type="article", llm_type=None, model=None):
     """
     if not text:
         return ""
-    # 控制输入文本大小，超过700词只取前700词（降低以避免超长内容）
-    words = text.split()
-    if len(words) > 700:
-        text = " ".join(words[:700])
-        logger.info(f"[截取] 文章内容从 {len(words)} 词截取到 700 词")
+    try:
+        chunks = _summary_chunks(text, prompt_type, llm_type)
+        if len(chunks) > 1:
+            return _map_reduce_summary(chunks, prompt_type, llm_type, model)
+        prompt, system_content = _summary_request(chunks[0], prompt_type)
+        summary = call_llm(
+            prompt,
+            llm_type=llm_type,
+            system_content=system_content,
+            model=model,
+            prompt_type=prompt_type,
+            validate=_summary_validator(prompt_type),
+        )
+        return _finalize_summary(summary, prompt_type)
+    except Exception as e:
+        logger.error(f"生成摘要时出错: {e}")
+        return ""
+
+
+async def generate_summary_async(text, prompt_type="article", llm_type=None, model=None):
+    """generate_summary 的异步版本，走 call_llm_async 的连接池"""
+    if not text:
+        return ""
+    try:
+        # 压缩与切分是纯 CPU 计算，放到线程里不阻塞事件循环
+        chunks = await asyncio.to_thread(_summary_chunks, text, prompt_type, llm_type)
+        if len(chunks) > 1:
+            return await _map_reduce_summary_async(chunks, prompt_type, llm_type, model)
+        prompt, system_content = _summary_request(chunks[0], prompt_type)
+        summary = await call_llm_async(
+            prompt,
+            llm_type=llm_type,
+            system_content=system_content,
+            model=model,
+            prompt_type=prompt_type,
+            validate=_summary_validator(prompt_type),
+        )
+        return _finalize_summary(summary, prompt_type)
+    except Exception as e:
+        logger.error(f"生成摘要时出错: {e}")
+        return ""
+
+
+def _truncate_input(text, limit=SUMMARY_INPUT_TOKENS):
+    """控制输入文本大小，超过 limit 个 token 只取前面完整的段落/句子（避免超长内容）"""
+    truncated = truncate_tokens(text, limit)
+    if truncated != text:
+        logger.info(f"[截取] 内容从约 {estimate_tokens(text)} token 截取到 {estimate_tokens(truncated)} token")
+    return truncated
+
+
+def summary_chunk_tokens(llm_type=None):
+    """单段摘要输入的 token 上限：上下文窗口扣除提示词与输出预留，且不超过 SUMMARY_CHUNK_TOKENS"""
+    prompt = max(estimate_tokens(CHUNK_SUMMARY_PROMPT), estimate_tokens(ARTICLE_SUMMARY_PROMPT))
+    overhead = prompt + estimate_tokens(ARTICLE_SUMMARY_SYSTEM) + SUMMARY_OUTPUT_TOKENS
+    return max(SUMMARY_INPUT_TOKENS, min(SUMMARY_CHUNK_TOKENS, batch_context_tokens(llm_type) - overhead))
+
+
+def _compress_article(text, max_tokens=None):
+    """本地抽取式压缩抓取的正文（去导航、页脚、重复块；超过 max_tokens 时按 TextRank 取句），计入压缩统计"""
+    result = compress_text(text, max_tokens)
+    compression_stats.record(result)
+    if result.output_tokens < result.input_tokens:
+        logger.info(f"[压缩] 正文约 {result.input_tokens} -> {result.output_tokens} token（减少 {result.ratio:.0%}）")
+    return result.text
+
+
+def _summary_chunks(text, prompt_type, llm_type):
+    """准备摘要输入：文章先做本地压缩，再按模型上下文切分
+
+    短文本不切分；文章压缩后的上限是 MAP_REDUCE_MAX_CHUNKS 段，其余输入超过该段数时只保留前面的段。
+    """
+    chunk_tokens = summary_chunk_tokens(llm_type) if estimate_tokens(text) > SUMMARY_INPUT_TOKENS else None
+    if prompt_type == "article":
+        text = _compress_article(text, chunk_tokens * MAP_REDUCE_MAX_CHUNKS if chunk_tokens else None)
+    if estimate_tokens(text) <= SUMMARY_INPUT_TOKENS:
+        return [text]
+    chunks = chunk_text(text, chunk_tokens or summary_chunk_tokens(llm_type))
+    if len(chunks) > MAP_REDUCE_MAX_CHUNKS:
+        logger.info(f"[分段] 内容共 {len(chunks)} 段，只摘要前 {MAP_REDUCE_MAX_CHUNKS} 段")
+        chunks = chunks[:MAP_REDUCE_MAX_CHUNKS]
+    return chunks or [text]
+
+
+def _map_requests(chunks, prompt_type):
+    """每段一个提炼要点的请求 (prompt, system_content)"""
+    kind = "文章" if prompt_type == "article" else "社区讨论"
+    requests = []
+    for index, chunk in enumerate(chunks, 1):
+        prompt = CHUNK_SUMMARY_PROMPT.format(kind=kind, index=index, total=len(chunks), text=chunk)
+        logger.info(f"[分段] {prompt_type} 第 {index}/{len(chunks)} 段，输入约 {estimate_tokens(prompt)} token")
+        requests.append((prompt, CHUNK_SUMMARY_SYSTEM))
+    return requests
+
+
+def _reduce_request(partials, prompt_type):
+    """把各段要点合并为最终摘要的请求；没有可用要点时返回 None"""
+    partials = [p.strip() for p in partials if p and p.strip().lower() != "null"]
+    if not partials:
+        logger.error(f"[分段] {prompt_type} 所有分段摘要均失败")
+        return None
+    text = "\n\n".join(f"【{index}】{partial}" for index, partial in enumerate(partials, 1))
     if prompt_type == "article":
-        prompt = ARTICLE_SUMMARY_PROMPT.format(text=text)
-        system_content = ARTICLE_SUMMARY_SYSTEM
+        prompt, system_content = ARTICLE_REDUCE_PROMPT.format(text=text), ARTICLE_SUMMARY_SYSTEM
     else:
-        prompt = DISCUSSION_SUMMARY_PROMPT.format(text=text)
-        system_content = DISCUSSION_SUMMARY_SYSTEM
-    try:
-        summary = call_llm(prompt, llm_type=llm_type, system_content=system_content, model=model)
-        if summary.lower() == "null":
-            return ""
+        prompt, system_content = DISCUSSION_REDUCE_PROMPT.format(text=text), DISCUSSION_SUMMARY_SYSTEM
+    logger.info(f"[分段] {prompt_type} 合并 {len(partials)} 段要点，输入约 {estimate_tokens(prompt)} token")
+    return prompt, system_content
+
+
+def _map_reduce_summary(chunks, prompt_type, llm_type, model):
+    """分段并发提炼要点，再合并为最终摘要（各请求的限流由 call_llm 内的限流器负责）
+
+    线程池线程不继承 ContextVar：每段在提交时的上下文副本中运行，run_deadline 与 llm_call_context 随之生效。
+    """
+
+    def _map(request):
+        prompt, system_content = request
+        return call_llm(prompt, llm_type=llm_type, system_content=system_content, model=model, prompt_type=prompt_type)
+
+    with ThreadPoolExecutor(max_workers=min(MAP_REDUCE_CONCURRENCY, len(chunks))) as pool:
+        futures = [
+            pool.submit(contextvars.copy_context().run, _map, request) for request in _map_requests(chunks, prompt_type)
+        ]
+        partials = [future.result() for future in futures]
+    reduce = _reduce_request(partials, prompt_type)
+    if reduce is None:
+        return ""
+    prompt, system_content = reduce
+    summary = call_llm(
+        prompt,
+        llm_type=llm_type,
+        system_content=system_content,
+        model=model,
+        prompt_type=prompt_type,
+        validate=_summary_validator(prompt_type),
+    )
+    return _finalize_summary(summary, prompt_type)
+
+
+async def _map_reduce_summary_async(chunks, prompt_type, llm_type, model):
+    """_map_reduce_summary 的异步版本：分段请求以 MAP_REDUCE_CONCURRENCY 并发"""
+    semaphore = asyncio.Semaphore(MAP_REDUCE_CONCURRENCY)
+
+    async def _map(request):
+        prompt, system_content = request
+        async with semaphore:
+            return await call_llm_async(
+                prompt, llm_type=llm_type, system_content=system_content, model=model, prompt_type=prompt_type
+            )
 
-        # 字数限制：文章摘要300-400字，讨论摘要保持原逻辑
+    partials = await asyncio.gather(*(_map(request) for request in _map_requests(chunks, prompt_type)))
+    reduce = _reduce_request(partials, prompt_type)
+    if reduce is None:
+        return ""
+    prompt, system_content = reduce
+    summary = await call_llm_async(
+        prompt,
+        llm_type=llm_type,
+        system_content=system_content,
+        model=model,
+        prompt_type=prompt_type,
+        validate=_summary_validator(prompt_type),
+    )
+    return _finalize_summary(summary, prompt_type)
+
+
+def _summary_request(text, prompt_type):
+    """构造单次摘要请求，返回 (prompt, system_content)"""
+    if prompt_type == "article":
+        return ARTICLE_SUMMARY_PROMPT.format(text=text), ARTICLE_SUMMARY_SYSTEM
+    return DISCUSSION_SUMMARY_PROMPT.format(text=text), DISCUSSION_SUMMARY_SYSTEM
+
+
+def _summary_validator(prompt_type):
+    """返回写缓存前的校验函数：文章摘要须满足 validate_summary_length，讨论摘要不能为空；"null" 是有效回答"""
+
+    def _valid(summary):
+        if summary.strip().lower() == "null":
+            return True
+        finalized = _finalize_summary(summary, prompt_type)
         if prompt_type == "article":
-            # 如果超过400字，按句子截断
-            if len(summary) > 400:
-                sentences = summary.split("。")
-                result = ""
-                for sent in sentences:
-                    if len(result + sent) <= 400:
-                        result += sent + "。"
-                    else:
-                        break
-                summary = result if result.endswith("。") else result + "。"
-                logger.info(f"[截断] 文章摘要截取到 {len(summary)} 字")
-            else:
-                # 句号分割，去掉最后一句
-                sentences = summary.split("。")
-                if len(sentences) > 1:
-                    summary = "。".join(sentences[:-1]) + "。"
+            return not validate_summary_length(finalized)
+        return bool(finalized.strip())
+
+    return _valid
+
+
+def _finalize_summary(summary, prompt_type):
+    """处理LLM返回的摘要：null 置空，按句号截断"""
+    if summary.lower() == "null":
+        return ""
+
+    # 字数限制：文章摘要300-400字，讨论摘要保持原逻辑
+    if prompt_type == "article":
+        # 如果超过400字，按句子截断
+        if len(summary) > 400:
+            sentences = summary.split("。")
+            result = ""
+            for sent in sentences:
+                if len(result + sent) <= 400:
+                    result += sent + "。"
+                else:
+                    break
+            summary = result if result.endswith("。") else result + "。"
+            logger.info(f"[截断] 文章摘要截取到 {len(summary)} 字")
         else:
-            # 讨论摘要保持原逻辑
+            # 句号分割，去掉最后一句
             sentences = summary.split("。")
             if len(sentences) > 1:
                 summary = "。".join(sentences[:-1]) + "。"
+    else:
+        # 讨论摘要保持原逻辑
+        sentences = summary.split("。")
+        if len(sentences) > 1:
+            summary = "。".join(sentences[:-1]) + "。"
 
-        return summary
-    except Exception as e:
-        logger.error(f"生成摘要时出错: {e}")
-        return ""
+    return summary
 
 
 # 生成图片摘要
@@ -86,6 +297,11 @@ def generate_summary_from_image(base64_image_data, prompt, llm_type):
         logger.error("base64_image_data 为空 (Error: base64_image_data is empty)")
         return ""
 
+    # 裁剪到首屏、缩小并转为 JPEG 后再上传（见 src/llm/image_payload.py）
+    payload = prepare_image_b64(base64_image_data)
+    if payload is not None:
+        base64_image_data = payload.data
+
     # Moonshot不支持图片，自动切换到配置的默认LLM或Gemini
     if llm_type and llm_type.lower() == "moonshot":
         logger.warning("Moonshot不支持图片输入，自动切换到Gemini")
@@ -101,7 +317,7 @@ def generate_summary_from_image(base64_image_data, prompt, llm_type):
 
     # 调用LLM进行图片摘要 - 传递图片数据
     try:
-        summary = call_llm(prompt, llm_type=llm_type, image_data=base64_image_data)
+        summary = call_llm(prompt, llm_type=llm_type, image_data=base64_image_data, prompt_type="image")
         if summary.lower() == "null":
             return ""
         return summary
@@ -127,10 +343,236 @@ def translate_title(title, content_summary, llm_type=None, model=None):
     prompt = TITLE_TRANSLATE_PROMPT.format(title=title, content_summary=content_summary)
     system_content = TITLE_TRANSLATE_SYSTEM
     try:
-        translated_title = call_llm(prompt, llm_type=llm_type, system_content=system_content, model=model)
+        translated_title = call_llm(
+            prompt, llm_type=llm_type, system_content=system_content, model=model, prompt_type="title"
+        )
+        if translated_title.lower() == "null":
+            return ""
+        return translated_title
+    except Exception as e:
+        logger.error(f"翻译标题时出错: {e}")
+        return ""
+
+
+async def translate_title_async(title, content_summary, llm_type=None, model=None):
+    """translate_title 的异步版本，走 call_llm_async 的连接池"""
+    if not title or not content_summary:
+        return ""
+    prompt = TITLE_TRANSLATE_PROMPT.format(title=title, content_summary=content_summary)
+    try:
+        translated_title = await call_llm_async(
+            prompt, llm_type=llm_type, system_content=TITLE_TRANSLATE_SYSTEM, model=model, prompt_type="title"
+        )
         if translated_title.lower() == "null":
             return ""
         return translated_title
     except Exception as e:
         logger.error(f"翻译标题时出错: {e}")
         return ""
+
+
+# 批量生成多条新闻的文章摘要、讨论摘要和中文标题
+def batch_context_tokens(llm_type=None):
+    """返回 llm_type 的上下文窗口大小（config.json 中的 context_tokens 优先，auto 取候选模型最大值）"""
+    return model_router.context_tokens_for(load_llm_config(), llm_type)
+
+
+def _batch_story_payload(story, record=False):
+    article = story.get("article_content") or ""
+    if record:
+        article = _compress_article(article, SUMMARY_INPUT_TOKENS)
+    else:
+        article = compress_text(article, SUMMARY_INPUT_TOKENS).text
+    return {
+        "id": story["id"],
+        "title": story.get("title") or "",
+        "article": article,
+        "discussion": _truncate_input(story.get("discussion_content") or ""),
+    }
+
+
+def plan_story_batches(stories, max_stories=BATCH_MAX_STORIES, context_tokens=None, llm_type=None):
+    """把新闻按顺序装入批次：每批不超过 max_stories 条，输入加预留输出不超过上下文窗口
+
+    Args:
+        stories: 含 id、title、article_content、discussion_content 的字典列表
+        max_stories: 每批最多新闻数（批量系数）
+        context_tokens: 上下文窗口大小，None 时按 llm_type 取 batch_context_tokens()
+    Returns:
+        批次列表，每个批次是 stories 的子列表；单条超限的新闻独占一批
+    """
+    max_stories = max(1, max_stories)
+    if context_tokens is None:
+        context_tokens = batch_context_tokens(llm_type)
+    budget = context_tokens - estimate_tokens(BATCH_STORY_PROMPT) - estimate_tokens(BATCH_STORY_SYSTEM)
+
+    batches, current, used = [], [], 0
+    for story in stories:
+        cost = (
+            estimate_tokens(json.dumps(_batch_story_payload(story), ensure_ascii=False)) + BATCH_OUTPUT_TOKENS_PER_STORY
+        )
+        if current and (len(current) >= max_stories or used + cost > budget):
+            batches.append(current)
+            current, used = [], 0
+        current.append(story)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _batch_request(stories):
+    """构造批量请求，返回 (prompt, system_content, max_tokens)"""
+    payload = json.dumps([_batch_story_payload(story, record=True) for story in stories], ensure_ascii=False, indent=1)
+    return (
+        BATCH_STORY_PROMPT.format(stories=payload),
+        BATCH_STORY_SYSTEM,
+        BATCH_OUTPUT_TOKENS_PER_STORY * len(stories),
+    )
+
+
+def _parse_batch_response(text):
+    """解析批量返回的JSON，返回 {id: item}；无法解析时返回空字典"""
+    text = (text or "").strip()
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end <= start:
+        return {}
+    try:
+        items = json.loads(text[start : end + 1]).get("items", [])
+    except (json.JSONDecodeError, AttributeError):
+        logger.error(f"[批量] 无法解析LLM返回的JSON: {text[:100]}...")
+        return {}
+    parsed = {}
+    for item in items if isinstance(items, list) else []:
+        if isinstance(item, dict) and isinstance(item.get("id"), int):
+            parsed[item["id"]] = item
+    return parsed
+
+
+def _batch_field(item, field):
+    value = item.get(field) if item else None
+    if not isinstance(value, str) or value.strip().lower() in ("", "null"):
+        return ""
+    return value.strip()
+
+
+def _validate_batch_item(story, item):
+    """校验单条批量结果，返回 (通过校验的字段, 是否需要重新请求)"""
+    result = dict.fromkeys(BATCH_FIELDS, "")
+    failed = False
+
+    if story.get("article_content"):
+        summary = _finalize_summary(_batch_field(item, "content_summary"), "article")
+        if summary and not contains_hallucination_markers(summary) and not validate_summary_length(summary):
+            result["content_summary"] = summary
+        else:
+            failed = True
+
+    if story.get("discussion_content"):
+        discussion = _finalize_summary(_batch_field(item, "discuss_summary"), "discussion")
+        if discussion and not contains_hallucination_markers(discussion):
+            result["discuss_summary"] = discussion
+        else:
+            failed = True
+
+    if result["content_summary"]:
+        title_chs = _batch_field(item, "title_chs")
+        if title_chs and not contains_hallucination_markers(title_chs):
+            result["title_chs"] = title_chs
+        else:
+            failed = True
+
+    return result, failed
+
+
+def _merge_batch_results(stories, text, results):
+    """把一次批量返回并入 results，返回需要重新请求的新闻"""
+    parsed = _parse_batch_response(text)
+    retry = []
+    for story in stories:
+        validated, failed = _validate_batch_item(story, parsed.get(story["id"]))
+        merged = results.setdefault(story["id"], dict.fromkeys(BATCH_FIELDS, ""))
+        merged.update({field: value for field, value in validated.items() if value})
+        if failed:
+            retry.append(story)
+    return retry
+
+
+def _batch_validator(stories):
+    """返回写缓存前的校验函数：批次内每条新闻都通过 _validate_batch_item 才缓存"""
+
+    def _valid(text):
+        parsed = _parse_batch_response(text)
+        return all(not _validate_batch_item(story, parsed.get(story["id"]))[1] for story in stories)
+
+    return _valid
+
+
+def generate_story_batch(stories, llm_type=None, model=None):
+    """一次请求生成多条新闻的 content_summary、discuss_summary 和 title_chs
+
+    每条结果单独校验（非空、无幻觉标记、摘要长度），只把未通过校验的新闻
+    重新批量请求，最多 BATCH_RETRY_ROUNDS 轮。重试轮不读写缓存，
+    只有整批都通过校验的返回才会写入缓存。
+    Args:
+        stories: plan_story_batches() 产生的一个批次
+    Returns:
+        {id: {"content_summary", "discuss_summary", "title_chs"}}，仍未通过校验的字段为空字符串，
+        调用方可对这些字段回退到 generate_summary / translate_title
+    """
+    results = {}
+    pending = list(stories)
+    for round_index in range(1 + BATCH_RETRY_ROUNDS):
+        if not pending:
+            break
+        prompt, system_content, max_tokens = _batch_request(pending)
+        try:
+            text = call_llm(
+                prompt,
+                llm_type=llm_type,
+                system_content=system_content,
+                model=model,
+                max_tokens=max_tokens,
+                response_format={"type": "json_object"},
+                prompt_type="batch",
+                use_cache=round_index == 0,
+                validate=_batch_validator(pending),
+            )
+        except Exception as e:
+            logger.error(f"[批量] 生成摘要时出错: {e}")
+            text = ""
+        pending = _merge_batch_results(pending, text, results)
+        if pending:
+            logger.warning(f"[批量] {len(pending)} 条新闻未通过校验: {[story['id'] for story in pending]}")
+    return results
+
+
+async def generate_story_batch_async(stories, llm_type=None, model=None):
+    """generate_story_batch 的异步版本，走 call_llm_async 的连接池"""
+    results = {}
+    pending = list(stories)
+    for round_index in range(1 + BATCH_RETRY_ROUNDS):
+        if not pending:
+            break
+        prompt, system_content, max_tokens = _batch_request(pending)
+        try:
+            text = await call_llm_async(
+                prompt,
+                llm_type=llm_type,
+                system_content=system_content,
+                model=model,
+                max_tokens=max_tokens,
+                response_format={"type": "json_object"},
+                prompt_type="batch",
+                use_cache=round_index == 0,
+                validate=_batch_validator(pending),
+            )
+        except Exception as e:
+            logger.error(f"[批量] 生成摘要时出错: {e}")
+            text = ""
+        pending = _merge_batch_results(pending, text, results)
+        if pending:
+            logger.warning(f"[批量] {len(pending)} 条新闻未通过校验: {[story['id'] for story in pending]}")
+    return results
@@ -26,6 +26,7 @@ def evaluate_news_attraction(news_items, llm_type=None, model=None):
         model=model,
         temperature=None,
         max_tokens=8192,
+        prompt_type="ranking",
     )
     # 清理可能的markdown代码块标记
     result_text = result_text.strip()
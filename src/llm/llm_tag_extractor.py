@@ -22,11 +22,14 @@ def extract_tags_with_llm(news_titles):
 
     llm_config = load_llm_config()
     default_llm = (llm_config.get("default") or "gemini").lower()
-    call_order = ["gemini", "grok"] if default_llm == "gemini" else ["grok", "gemini"]
+    if default_llm == "auto":
+        call_order = ["auto"]
+    else:
+        call_order = ["gemini", "grok"] if default_llm == "gemini" else ["grok", "gemini"]
 
     for llm_name in call_order:
         try:
-            text = call_llm(prompt, llm_type=llm_name, max_tokens=8196)
+            text = call_llm(prompt, llm_type=llm_name, max_tokens=8196, prompt_type="tags")
             if text:
                 tags = parse_tags_from_text(text)
                 if tags:
@@ -4,7 +4,11 @@ import time
 
 import requests
 
+from src.llm import response_cache
+from src.llm.accounting import note_retry, record_call, report_usage, track_call
+from src.llm.async_client import FALLBACK_CHAINS, IMAGE_FALLBACK_CHAINS, call_llm_async  # noqa: F401
 from src.llm.balancer import GeminiModelBalancer, gemini_balancer  # noqa: F401
+from src.llm.circuit_breaker import circuit_breakers
 from src.llm.config import invalidate_llm_config_cache, load_llm_config  # noqa: F401
 from src.llm.daily_status import (  # noqa: F401
     GEMINI_FALLBACK_MODEL,
@@ -19,11 +23,18 @@ from src.llm.daily_status import (  # noqa: F401
     is_gemini_quota_exceeded_error,
     is_model_disabled_today,
 )
-from src.llm.rate_limit import RateLimiter, rate_limiter  # noqa: F401
+from src.llm.image_payload import image_mime_type
+from src.llm.rate_limit import RateLimiter, TokenBucketLimiter, rate_limiter, retry_delay_hint  # noqa: F401
+from src.llm.retry import deadline_allows, retry_after_seconds, retry_budget
+from src.llm.router import AUTO, estimate_tokens, model_router
+from src.llm.single_flight import flight_key, single_flight
 from src.security.content_sanitizer import redact_secrets
 
 logger = logging.getLogger(__name__)
 
+# 共享重试预算按主机计
+GEMINI_HOST = "generativelanguage.googleapis.com"
+
 # Shared HTTP session with connection pooling — reuse across all LLM calls
 _http_session = requests.Session()
 _http_session.headers.update(
@@ -85,7 +96,7 @@ def call_grok_api(
             "role": "user",
             "content": [
                 {"type": "text", "text": prompt},
-                {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{image_data}"}},
+                {"type": "image_url", "image_url": {"url": f"data:{image_mime_type(image_data)};base64,{image_data}"}},
             ],
         }
     else:
@@ -110,22 +121,21 @@ def call_grok_api(
         response = None
         try:
             if attempt > 0:
+                note_retry()
                 wait_time = 2**attempt + random.uniform(0.5, 1.5)  # 指数退避 + 随机抖动
                 logger.info(f"[Grok] 第 {attempt + 1}/{max_retries + 1} 次尝试，等待 {wait_time:.1f} 秒...")
                 time.sleep(wait_time)
 
             # 优先使用 httpx（Windows 上 SSL 兼容性更好）
             try:
-                import httpx
-
-                logger.info("[Grok] 使用 httpx 发送请求...")
-                import certifi
+                from src.llm.async_client import get_sync_http_client
 
-                with httpx.Client(verify=certifi.where(), timeout=120.0, follow_redirects=True) as client:
-                    response = client.post(api_url, headers=headers, json=data)
-                    response.raise_for_status()
+                logger.info("[Grok] 使用共享 httpx 连接池发送请求...")
+                response = get_sync_http_client().post(api_url, headers=headers, json=data)
+                response.raise_for_status()
             except ImportError:
                 # 回退到 curl-cffi
+                import certifi
                 from curl_cffi import requests as curl_requests
 
                 logger.warning("[Grok] httpx 不可用，使用 curl-cffi...")
@@ -133,6 +143,7 @@ def call_grok_api(
                 response.raise_for_status()
 
             response_json = response.json()
+            report_usage(response_json)
             if "choices" in response_json:
                 result = response_json["choices"][0]["message"]["content"].strip()
                 if attempt > 0:
@@ -206,6 +217,7 @@ def call_moonshot_api(prompt, system_content=None, model=None, temperature=None,
         response = _http_session.post(api_url, headers=headers, json=data, timeout=60, verify=True)
         response.raise_for_status()
         response_json = response.json()
+        report_usage(response_json)
         if "choices" in response_json:
             return response_json["choices"][0]["message"]["content"].strip()
         return ""
@@ -268,7 +280,7 @@ def call_gemini_api(
 
     # 使用模型名作为限流key，使得不同模型分别计数
     rate_limiter_key = f"gemini-{model}"
-    rate_limiter.wait_if_needed(
+    rate_limiter.acquire(
         rate_limiter_key,
         max_requests=max_requests,
         window_seconds=window_seconds if "window_seconds" in locals() else 60,
@@ -305,14 +317,17 @@ def call_gemini_api(
     for attempt in range(max_retries):
         # 使用新版 google-genai SDK
         try:
-            from google import genai
+            from src.llm.async_client import get_genai_client
 
-            client = genai.Client(api_key=api_key)
+            client = get_genai_client(api_key)
 
             # 构建内容参数
             if image_data:
                 # 如果有图片，构建多模态输入
-                contents = [{"text": prompt}, {"inline_data": {"mime_type": "image/png", "data": image_data}}]
+                contents = [
+                    {"text": prompt},
+                    {"inline_data": {"mime_type": image_mime_type(image_data), "data": image_data}},
+                ]
             else:
                 # 纯文本输入
                 contents = prompt
@@ -325,6 +340,7 @@ def call_gemini_api(
                     "max_output_tokens": max_tokens,
                 },
             )
+            report_usage(response)
             if hasattr(response, "text") and response.text:
                 logger.warning("Gemini API调用成功")
                 gemini_balancer.report_success(model)
@@ -382,29 +398,17 @@ def call_gemini_api(
                         or "rate limit" in error_msg.lower()
                         or "resource_exhausted" in error_msg.lower()
                     ):
-                        import re
-
-                        # 尝试提取 retryDelay（格式：'43s' 或 'retryDelay': '43s'）
-                        retry_match = re.search(r'["\']retryDelay["\']\s*:\s*["\'](\d+)s["\']', error_msg)
-                        if retry_match:
-                            delay = int(retry_match.group(1)) + random.uniform(1.0, 3.0)
-                            logger.info(f"使用API返回的retryDelay，等待 {delay:.1f} 秒后重试...")
+                        # Retry-After 响应头或错误信息中的 retryDelay / retry in XXs / retry_delay { seconds: XX }
+                        hinted = retry_after_seconds(e)
+                        if hinted is not None:
+                            delay = hinted + random.uniform(1.0, 3.0)
+                            logger.info(f"使用API返回的重试时间，等待 {delay:.1f} 秒后重试...")
                         else:
-                            # 尝试提取 "Please retry in XXs" 格式
-                            retry_match = re.search(r"retry in ([\d.]+)s", error_msg)
-                            if retry_match:
-                                delay = float(retry_match.group(1)) + random.uniform(1.0, 3.0)
-                                logger.info(f"从错误信息提取重试时间，等待 {delay:.1f} 秒后重试...")
-                            else:
-                                # 尝试提取 retry_delay { seconds: XX }
-                                retry_match = re.search(r"retry_delay\s*\{\s*seconds:\s*(\d+)", error_msg)
-                                if retry_match:
-                                    delay = int(retry_match.group(1)) + random.uniform(1.0, 3.0)
-                                    logger.info(f"使用API返回的retry_delay，等待 {delay:.1f} 秒后重试...")
-                                else:
-                                    # 默认等待到下一个窗口
-                                    delay = 65 + random.uniform(1.0, 3.0)
-                                    logger.warning(f"遇到限流错误 (429)，等待 {delay:.1f} 秒到下一个时间窗口...")
+                            # 默认等待到下一个窗口
+                            delay = 65 + random.uniform(1.0, 3.0)
+                            logger.warning(f"遇到限流错误 (429)，等待 {delay:.1f} 秒到下一个时间窗口...")
+                        # 让其他进程/线程也遵守服务端给出的等待时间
+                        rate_limiter.defer(rate_limiter_key, retry_delay_hint(error_msg))
                     # 对503等服务不可用错误使用指数退避
                     elif "503" in error_msg or "unavailable" in error_msg.lower():
                         delay = min(60, (3**attempt) + random.uniform(2, 5))  # 5秒、11秒、29秒、60秒
@@ -413,6 +417,14 @@ def call_gemini_api(
                         # 默认使用较长的退避时间
                         delay = min(90, (10 * (2**attempt))) + random.uniform(1.0, 3.0)
                         logger.info(f"等待 {delay:.1f} 秒后重试...")
+                    # 不在本次运行截止时间之后等待，也不超出 Gemini 主机的共享重试预算
+                    if not deadline_allows(delay):
+                        logger.warning(f"等待 {delay:.1f} 秒会超过本次运行的截止时间，停止重试")
+                        break
+                    if not retry_budget.spend(GEMINI_HOST):
+                        logger.warning(f"{GEMINI_HOST} 的重试预算已用完，停止重试")
+                        break
+                    note_retry()
                     time.sleep(delay)
                     continue
 
@@ -426,7 +438,12 @@ def call_gemini_api(
                 # 如果有图片，构建多模态输入
                 data = {
                     "contents": [
-                        {"parts": [{"text": prompt}, {"inline_data": {"mime_type": "image/png", "data": image_data}}]}
+                        {
+                            "parts": [
+                                {"text": prompt},
+                                {"inline_data": {"mime_type": image_mime_type(image_data), "data": image_data}},
+                            ]
+                        }
                     ],
                     "generationConfig": {"temperature": temperature, "maxOutputTokens": max_tokens},
                 }
@@ -440,6 +457,7 @@ def call_gemini_api(
             response = _http_session.post(api_url, headers=headers, params=params, json=data, timeout=60)
             response.raise_for_status()
             response_json = response.json()
+            report_usage(response_json)
             if "candidates" in response_json and len(response_json["candidates"]) > 0:
                 gemini_balancer.report_success(model)
                 return response_json["candidates"][0]["content"]["parts"][0]["text"].strip()
@@ -492,29 +510,17 @@ def call_gemini_api(
                         or "rate limit" in error_msg.lower()
                         or "resource_exhausted" in error_msg.lower()
                     ):
-                        import re
-
-                        # 尝试提取 retryDelay（格式：'43s' 或 'retryDelay': '43s'）
-                        retry_match = re.search(r'["\']retryDelay["\']\s*:\s*["\'](\d+)s["\']', error_msg)
-                        if retry_match:
-                            delay = int(retry_match.group(1)) + random.uniform(1.0, 3.0)
-                            logger.info(f"使用API返回的retryDelay，等待 {delay:.1f} 秒后重试...")
+                        # Retry-After 响应头或错误信息中的 retryDelay / retry in XXs / retry_delay { seconds: XX }
+                        hinted = retry_after_seconds(e)
+                        if hinted is not None:
+                            delay = hinted + random.uniform(1.0, 3.0)
+                            logger.info(f"使用API返回的重试时间，等待 {delay:.1f} 秒后重试...")
                         else:
-                            # 尝试提取 "Please retry in XXs" 格式
-                            retry_match = re.search(r"retry in ([\d.]+)s", error_msg)
-                            if retry_match:
-                                delay = float(retry_match.group(1)) + random.uniform(1.0, 3.0)
-                                logger.info(f"从错误信息提取重试时间，等待 {delay:.1f} 秒后重试...")
-                            else:
-                                # 尝试提取 retry_delay { seconds: XX }
-                                retry_match = re.search(r"retry_delay\s*\{\s*seconds:\s*(\d+)", error_msg)
-                                if retry_match:
-                                    delay = int(retry_match.group(1)) + random.uniform(1.0, 3.0)
-                                    logger.info(f"使用API返回的retry_delay，等待 {delay:.1f} 秒后重试...")
-                                else:
-                                    # 默认等待到下一个窗口
-                                    delay = 65 + random.uniform(1.0, 3.0)
-                                    logger.warning(f"遇到限流错误 (429)，等待 {delay:.1f} 秒到下一个时间窗口...")
+                            # 默认等待到下一个窗口
+                            delay = 65 + random.uniform(1.0, 3.0)
+                            logger.warning(f"遇到限流错误 (429)，等待 {delay:.1f} 秒到下一个时间窗口...")
+                        # 让其他进程/线程也遵守服务端给出的等待时间
+                        rate_limiter.defer(rate_limiter_key, retry_delay_hint(error_msg))
                     # 对503等服务不可用错误使用指数退避
                     elif "503" in error_msg or "unavailable" in error_msg.lower():
                         delay = min(60, (3**attempt) + random.uniform(2, 5))  # 5秒、11秒、29秒、60秒
@@ -523,6 +529,14 @@ def call_gemini_api(
                         # 默认使用较长的退避时间
                         delay = min(90, (10 * (2**attempt))) + random.uniform(1.0, 3.0)
                         logger.info(f"等待 {delay:.1f} 秒后重试...")
+                    # 不在本次运行截止时间之后等待，也不超出 Gemini 主机的共享重试预算
+                    if not deadline_allows(delay):
+                        logger.warning(f"等待 {delay:.1f} 秒会超过本次运行的截止时间，停止重试")
+                        break
+                    if not retry_budget.spend(GEMINI_HOST):
+                        logger.warning(f"{GEMINI_HOST} 的重试预算已用完，停止重试")
+                        break
+                    note_retry()
                     time.sleep(delay)
                     continue
             else:
@@ -542,88 +556,121 @@ def call_llm(
     max_tokens=None,
     response_format=None,
     image_data=None,
+    prompt_type=None,
+    use_cache=True,
+    validate=None,
 ):
     """
     统一LLM调用入口,根据llm_type自动选择Grok、Gemini或Moonshot。
     Args:
         prompt: 文本提示
-        llm_type: 'grok'、'gemini'、'moonshot',不传则用配置默认
+        llm_type: 'grok'、'gemini'、'moonshot' 或 'auto'(由 src/llm/router.py 按预期耗时选择),不传则用配置默认
         system_content: 系统提示(Grok和Moonshot支持)
         model: 指定具体模型
         temperature: 温度参数
         max_tokens: 最大token数
         response_format: 响应格式
         image_data: Base64编码的图片数据(仅Gemini支持)
+        prompt_type: 提示类型（article/discussion/title/image/ranking/tags），决定缓存有效期
+        use_cache: 是否读写LLM响应缓存（见 src/llm/response_cache.py）
+        validate: 可选的 callable(结果) -> bool；不通过的结果（以及含幻觉/拒答标记的结果）照常返回，但不写入缓存
 
     支持自动降级:优先使用指定LLM,失败时按优先级切换。
+    同时进行中的相同请求只发一次（见 src/llm/single_flight.py）。
     """
     config = load_llm_config()
     if llm_type is None:
         llm_type = config["default"]
+    primary = llm_type.lower()
+    if primary != AUTO and primary not in FALLBACK_CHAINS:
+        raise ValueError(f"不支持的llm_type: {llm_type}")
 
-    # 尝试主要LLM
-    if llm_type.lower() == "grok":
+    key = None
+    if use_cache:
+        key = response_cache.request_cache_key(
+            config, llm_type, model, prompt, system_content, temperature, max_tokens, response_format, image_data
+        )
+        cached = response_cache.lookup(key, validate)
+        if cached is not None:
+            logger.info(f"[LLM-CACHE] 命中缓存 ({llm_type}, {prompt_type or 'default'})")
+            record_call(primary, model, prompt_type, "cache_hit", output_tokens=estimate_tokens(cached), cache_hit=True)
+            return cached
+
+    def _request():
+        if primary == AUTO:
+            route = [
+                (r.provider, r.model)
+                for r in model_router.route(config, prompt_type, prompt, system_content, max_tokens, bool(image_data))
+            ]
+        else:
+            # 指定LLM时按固定降级顺序,model 对每一级都生效
+            chain = IMAGE_FALLBACK_CHAINS[primary] if image_data else FALLBACK_CHAINS[primary]
+            route = [(name, model) for name in chain]
+
+        result = _call_route(
+            config, route, prompt, system_content, temperature, max_tokens, response_format, image_data, prompt_type
+        )
+        if key is not None:
+            response_cache.store(key, result, primary, model, prompt_type, validate)
+        return result
+
+    flight = flight_key(
+        config, llm_type, model, prompt, system_content, temperature, max_tokens, response_format, image_data
+    )
+    return single_flight.do(flight, _request, validate)
+
+
+def _call_provider(provider, prompt, system_content, model, temperature, max_tokens, response_format, image_data):
+    """调用单个LLM（不降级）"""
+    if provider == "grok":
         # Grok 4.1+ 支持图片识别
-        result = call_grok_api(
+        return call_grok_api(
             prompt, system_content, model, temperature, max_tokens, response_format, image_data=image_data
         )
-        if result:  # 成功则直接返回
-            return result
-        # Grok失败,尝试切换到Gemini
-        logger.info("Grok API调用失败,尝试切换到Gemini...")
-        result = call_gemini_api(prompt, model, temperature, max_tokens, response_format, image_data=image_data)
-        if result:
-            return result
-        # Gemini也失败,尝试Moonshot(不支持图片)
-        if image_data:
-            logger.error("Grok和Gemini均失败,Moonshot不支持图片,图片识别无法继续")
-            return ""
-        logger.warning("Gemini API也失败,尝试切换到Moonshot...")
-        return call_moonshot_api(prompt, system_content, model, temperature, max_tokens, response_format)
+    if provider == "gemini":
+        return call_gemini_api(prompt, model, temperature, max_tokens, response_format, image_data=image_data)
+    # Moonshot不支持图片
+    return call_moonshot_api(prompt, system_content, model, temperature, max_tokens, response_format)
 
-    elif llm_type.lower() == "gemini":
-        result = call_gemini_api(prompt, model, temperature, max_tokens, response_format, image_data=image_data)
-        if result:  # 成功则直接返回
-            return result
-        # Gemini失败,如果有图片数据则无法降级（Grok和Moonshot都不支持图片）
-        if image_data:
-            logger.error("Gemini处理图片失败,且Grok/Moonshot不支持图片,图片识别无法继续")
-            return ""
-        # 纯文本时可以降级到Grok
-        logger.warning("Gemini API调用失败,尝试切换到Grok...")
-        result = call_grok_api(prompt, system_content, model, temperature, max_tokens, response_format)
-        if result:
-            return result
-        # Grok也失败,尝试Moonshot
-        logger.info("Grok API也失败,尝试切换到Moonshot...")
-        return call_moonshot_api(prompt, system_content, model, temperature, max_tokens, response_format)
-
-    elif llm_type.lower() == "moonshot":
-        # Moonshot不支持图片,如果有图片数据则直接切换到Gemini
-        if image_data:
-            logger.warning("警告: Moonshot不支持图片输入,自动切换到Gemini处理图片")
-            result = call_gemini_api(prompt, model, temperature, max_tokens, response_format, image_data=image_data)
-            if result:
-                return result
-            # Gemini失败,尝试Grok（但Grok也不支持图片）
-            logger.error("Gemini处理图片失败,图片识别无法继续")
-            return ""
 
-        # 纯文本调用Moonshot
-        result = call_moonshot_api(prompt, system_content, model, temperature, max_tokens, response_format)
-        if result:  # 成功则直接返回
-            return result
-        # Moonshot失败,尝试切换到Gemini
-        logger.info("Moonshot API调用失败,尝试切换到Gemini...")
-        result = call_gemini_api(prompt, model, temperature, max_tokens, response_format)
+def _call_route(
+    config, route, prompt, system_content, temperature, max_tokens, response_format, image_data, prompt_type
+):
+    """按 route [(provider, model), ...] 依次调用直到得到非空结果（不经过缓存）
+
+    每次调用的耗时、成败与估算输入 token 计入 model_router 的统计，并写入 llm_calls；
+    熔断器（src/llm/circuit_breaker.py）处于打开状态的模型直接跳过。
+    """
+    input_tokens = estimate_tokens(prompt) + estimate_tokens(system_content)
+    for index, (provider, model) in enumerate(route):
+        if index:
+            logger.warning(f"{route[index - 1][0]} 调用失败,尝试切换到 {provider}...")
+        resolved = model or (config.get(provider) or {}).get("model")
+        admission = circuit_breakers.allow(provider, resolved)
+        if not admission:
+            logger.info(f"[CIRCUIT] {provider}/{resolved} 熔断中,跳过")
+            record_call(provider, resolved, prompt_type, "circuit_open")
+            continue
+        started = time.perf_counter()
+        result = ""
+        try:
+            with track_call(provider, resolved, prompt_type, input_tokens) as call:
+                result = _call_provider(
+                    provider, prompt, system_content, model, temperature, max_tokens, response_format, image_data
+                )
+                call.finish(result)
+        finally:
+            model_router.record(
+                provider, resolved, prompt_type, time.perf_counter() - started, bool(result), input_tokens
+            )
+            circuit_breakers.record(provider, resolved, bool(result), admission)
         if result:
             return result
-        # Gemini也失败,尝试Grok
-        logger.warning("Gemini API也失败,尝试切换到Grok...")
-        return call_grok_api(prompt, system_content, model, temperature, max_tokens, response_format)
-
+    if image_data:
+        logger.error(f"支持图片的LLM均失败,图片识别无法继续: {' -> '.join(p for p, _ in route)}")
     else:
-        raise ValueError(f"不支持的llm_type: {llm_type}")
+        logger.error(f"所有LLM均调用失败: {' -> '.join(p for p, _ in route)}")
+    return ""
 
 
 def main():
@@ -0,0 +1,597 @@
+"""Local stand-in for the LLM providers, for benchmarks and offline runs.
+
+:class:`MockLLMServer` answers the three wire formats the pipeline speaks:
+
+- ``POST /v1/chat/completions``: OpenAI-compatible (Grok, Moonshot), with
+  ``"stream": true`` served as server-sent events.
+- ``POST /v1beta/models/<model>:generateContent`` and
+  ``:streamGenerateContent?alt=sse``: Gemini, for both the google-genai SDK
+  (``GOOGLE_GEMINI_BASE_URL``) and the plain-HTTP fallback.
+- ``POST /v1/images/generations``: OpenAI images, for the AI cover wrapper.
+
+Replies come from :func:`canned_reply`, which recognises the pipeline's own
+prompts (story batches, attraction ratings, tags, titles) and answers
+everything else with a Chinese summary, so the callers' parsers and
+validators accept them.  :class:`MockSettings` controls the behaviour:
+
+- **Latency**: a :class:`LatencyModel` (``fixed``, ``uniform``, ``normal`` or
+  ``lognormal``) sampled per request before the first byte.
+- **Faults**: ``error_429`` / ``error_503`` are per-request probabilities of
+  a rate-limit or overload error, with ``Retry-After`` (and a ``retry in Ns``
+  hint in the body) when ``retry_after`` is set.
+- **Quota**: ``quota`` requests per model; after that the model answers 429
+  with the provider's quota-exhausted error.
+- **Streaming**: replies are split into ``stream_chunks`` events spaced by
+  ``stream_interval`` seconds.
+
+``GET /stats`` returns the counters (requests per route and status, injected
+faults, quota used per model, tokens served); ``POST /reset`` clears them
+together with the quota.
+
+Usage:
+    with MockLLMServer(MockSettings(latency=LatencyModel.parse("lognormal:0.3,0.5"))) as server:
+        config["GROK_API_URL"] = server.openai_url
+        os.environ["GOOGLE_GEMINI_BASE_URL"] = server.url
+
+    python -m src.llm.mock_server --port 8900 --latency uniform:0.1,0.4 --error-429 0.05
+"""
+
+import argparse
+import base64
+import io
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from src.llm.prompts import BATCH_STORY_PROMPT, NEWS_ATTRACTION_PROMPT, TITLE_TRANSLATE_PROMPT
+from src.llm.router import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+_GEMINI_PATH = re.compile(r"/models/([^/:]+):(generateContent|streamGenerateContent)$")
+
+_SUMMARY_SENTENCES = (
+    "这篇文章介绍了一个开源项目的最新版本，重点说明了它在性能和易用性上的改进。",
+    "作者通过一系列基准测试对比了新旧实现，新版本在典型负载下的延迟明显降低。",
+    "文章还讨论了设计上的取舍，包括内存占用、兼容性以及维护成本之间的平衡。",
+    "项目团队计划在后续版本中继续完善文档，并开放更多扩展接口供社区使用。",
+    "社区成员对这一方向普遍持积极态度，同时也提出了关于长期稳定性的疑问。",
+    "文中给出的示例代码展示了迁移过程，大多数现有用户只需少量修改即可升级。",
+)
+_TAGS = ("AI", "Open_Source", "Rust", "Linux", "数据库", "网络安全")
+
+
+@dataclass(frozen=True)
+class LatencyModel:
+    """Per-request delay in seconds, drawn from a named distribution."""
+
+    kind: str = "fixed"
+    params: tuple[float, ...] = (0.0,)
+
+    KINDS = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        """``fixed:S``, ``uniform:LOW,HIGH``, ``normal:MEAN,SD`` or ``lognormal:MEDIAN,SIGMA``."""
+        kind, _, raw = spec.partition(":")
+        kind = kind.strip().lower()
+        if kind not in cls.KINDS:
+            raise ValueError(f"unknown latency distribution: {kind!r} (expected one of {', '.join(cls.KINDS)})")
+        try:
+            params = tuple(float(value) for value in raw.split(",") if value.strip())
+        except ValueError as e:
+            raise ValueError(f"bad latency parameters in {spec!r}") from e
+        if len(params) != cls.KINDS[kind]:
+            raise ValueError(f"{kind} latency takes {cls.KINDS[kind]} parameter(s), got {spec!r}")
+        return cls(kind, params)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            value = rng.uniform(*self.params)
+        elif self.kind == "normal":
+            value = rng.gauss(*self.params)
+        elif self.kind == "lognormal":
+            median, sigma = self.params
+            value = rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+        else:
+            value = self.params[0]
+        return max(0.0, value)
+
+    def __str__(self) -> str:
+        return f"{self.kind}:{','.join(f'{value:g}' for value in self.params)}"
+
+
+@dataclass
+class MockSettings:
+    latency: LatencyModel = field(default_factory=LatencyModel)
+    error_429: float = 0.0
+    error_503: float = 0.0
+    # Seconds sent as Retry-After with injected faults (None sends no hint)
+    retry_after: float | None = 1.0
+    # Requests each model serves before answering with quota exhaustion (None: unlimited)
+    quota: int | None = None
+    stream_chunks: int = 8
+    stream_interval: float = 0.0
+    seed: int | None = None
+
+
+def _template_prefix(template: str) -> str:
+    return template.split("{", 1)[0].strip()[:40]
+
+
+def _pick(text: str, options: tuple[str, ...]) -> str:
+    return options[zlib.crc32(text.encode("utf-8")) % len(options)]
+
+
+def _summary_for(text: str) -> str:
+    start = zlib.crc32(text.encode("utf-8")) % len(_SUMMARY_SENTENCES)
+    return "".join(_SUMMARY_SENTENCES[(start + offset) % len(_SUMMARY_SENTENCES)] for offset in range(4))
+
+
+def _title_for(text: str) -> str:
+    return f"{_pick(text, ('开源', '性能', '安全', '工具'))}新进展：{_pick(text[::-1], ('深度解析', '实测对比', '社区热议'))}"
+
+
+def canned_reply(prompt: str) -> str:
+    """A reply to *prompt* in the shape its caller parses."""
+    head = prompt.lstrip()
+    if head.startswith(_template_prefix(BATCH_STORY_PROMPT)):
+        payload = prompt.split("新闻列表：", 1)[-1]
+        start, end = payload.find("["), payload.rfind("]")
+        try:
+            stories = json.loads(payload[start : end + 1]) if start >= 0 else []
+        except json.JSONDecodeError:
+            stories = []
+        items = [
+            {
+                "id": story.get("id"),
+                "content_summary": _summary_for(story.get("article") or "") if story.get("article") else "",
+                "discuss_summary": _summary_for(story.get("discussion") or "") if story.get("discussion") else "",
+                "title_chs": _title_for(story.get("title") or "") if story.get("article") else "",
+            }
+            for story in stories
+            if isinstance(story, dict)
+        ]
+        return json.dumps({"items": items}, ensure_ascii=False)
+    if head.startswith(_template_prefix(NEWS_ATTRACTION_PROMPT)):
+        listing = prompt.split("新闻列表:", 1)[-1]
+        ids = [int(number) for number in re.findall(r"^(\d+)\. ", listing, re.M)]
+        ratings = [{"id": news_id, "score": 1 + zlib.crc32(str(news_id).encode()) % 90 / 10} for news_id in ids]
+        return json.dumps({"ratings": ratings, "top_headline": ids[0] if ids else None, "headline_reason": "模拟评分"})
+    if "- TAG" in prompt:
+        start = zlib.crc32(prompt.encode("utf-8")) % len(_TAGS)
+        return "\n".join(f"- {_TAGS[(start + offset) % len(_TAGS)]}" for offset in range(4))
+    if head.startswith(_template_prefix(TITLE_TRANSLATE_PROMPT)):
+        return _title_for(prompt)
+    return _summary_for(prompt)
+
+
+def _chunks(text: str, count: int) -> list[str]:
+    size = max(1, math.ceil(len(text) / max(1, count)))
+    return [text[i : i + size] for i in range(0, len(text), size)] or [""]
+
+
+def _openai_prompt(body: dict) -> str:
+    for message in reversed(body.get("messages") or []):
+        if message.get("role") != "user":
+            continue
+        content = message.get("content")
+        if isinstance(content, list):
+            return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+        return content or ""
+    return ""
+
+
+def _gemini_prompt(body: dict) -> str:
+    contents = body.get("contents") or []
+    if isinstance(contents, dict):
+        contents = [contents]
+    return "".join(
+        part.get("text", "")
+        for content in contents
+        if isinstance(content, dict)
+        for part in content.get("parts") or []
+        if isinstance(part, dict)
+    )
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def log_message(self, format, *args):  # noqa: A002 - BaseHTTPRequestHandler signature
+        logger.debug("[MOCK-LLM] " + format, *args)
+
+    def _send_json(self, status: int, payload: dict, headers: dict[str, str] | None = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.mock._count_status(status)
+
+    def _send_events(self, events: list[dict], done_marker: bool) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        self.server.mock._count_status(200)
+        interval = self.server.mock.settings.stream_interval
+        try:
+            for index, event in enumerate(events):
+                if index and interval:
+                    time.sleep(interval)
+                self.wfile.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode())
+                self.wfile.flush()
+            if done_marker:
+                self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client aborted the stream (e.g. a StreamValidator rejection)
+            pass
+
+    def do_GET(self):
+        if urlsplit(self.path).path == "/stats":
+            self._send_json(200, self.server.mock.stats())
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "invalid JSON body"}})
+            return
+        mock = self.server.mock
+        if path == "/reset":
+            mock.reset()
+            self._send_json(200, {"ok": True})
+            return
+        gemini = _GEMINI_PATH.search(path)
+        if path.endswith("/chat/completions"):
+            mock._serve_openai(self, body)
+        elif gemini:
+            mock._serve_gemini(self, body, gemini.group(1), gemini.group(2) == "streamGenerateContent")
+        elif path.endswith("/images/generations"):
+            mock._serve_image(self, body)
+        else:
+            self._send_json(404, {"error": {"message": f"unknown endpoint {path}"}})
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, address, mock: "MockLLMServer"):
+        self.mock = mock
+        super().__init__(address, _Handler)
+
+
+class MockLLMServer:
+    """OpenAI-, Gemini- and images-compatible HTTP server on a background thread."""
+
+    def __init__(
+        self, settings: MockSettings | None = None, host: str = "127.0.0.1", port: int = 0, reply=canned_reply
+    ):
+        self.settings = settings or MockSettings()
+        self.reply = reply
+        self._host = host
+        self._port = port
+        self._rng = random.Random(self.settings.seed)
+        self._lock = threading.Lock()
+        self._server: _Server | None = None
+        self._thread: threading.Thread | None = None
+        self._png_cache: dict[str, str] = {}
+        self.reset()
+
+    # -- Lifecycle -------------------------------------------------------
+
+    def start(self) -> "MockLLMServer":
+        self._server = _Server((self._host, self._port), self)
+        self._port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-llm-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self._host}:{self._port}"
+
+    @property
+    def openai_url(self) -> str:
+        return f"{self.url}/v1/chat/completions"
+
+    def gemini_url(self, model: str) -> str:
+        return f"{self.url}/v1beta/models/{model}:generateContent"
+
+    # -- Counters --------------------------------------------------------
+
+    def reset(self) -> None:
+        with self._lock:
+            self._requests: dict[str, int] = defaultdict(int)
+            self._statuses: dict[int, int] = defaultdict(int)
+            self._faults: dict[str, int] = defaultdict(int)
+            self._quota_used: dict[str, int] = defaultdict(int)
+            self._streams = 0
+            self._tokens = [0, 0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": sum(self._requests.values()),
+                "routes": dict(self._requests),
+                "statuses": {str(status): count for status, count in sorted(self._statuses.items())},
+                "streams": self._streams,
+                "injected_429": self._faults["429"],
+                "injected_503": self._faults["503"],
+                "quota_rejections": self._faults["quota"],
+                "quota_used": dict(self._quota_used),
+                "input_tokens": self._tokens[0],
+                "output_tokens": self._tokens[1],
+            }
+
+    def _count_status(self, status: int) -> None:
+        with self._lock:
+            self._statuses[status] += 1
+
+    # -- Request handling ------------------------------------------------
+
+    def _admit(self, route: str, model: str, stream: bool) -> str | None:
+        """Count the request and decide its fate: None to serve it, else ``429``/``503``/``quota``."""
+        settings = self.settings
+        with self._lock:
+            self._requests[route] += 1
+            self._streams += stream
+            draw = self._rng.random()
+            if draw < settings.error_429:
+                fault = "429"
+            elif draw < settings.error_429 + settings.error_503:
+                fault = "503"
+            elif settings.quota is not None and self._quota_used[model] >= settings.quota:
+                fault = "quota"
+            else:
+                self._quota_used[model] += 1
+                fault = None
+            if fault:
+                self._faults[fault] += 1
+            delay = settings.latency.sample(self._rng)
+        if fault is None and delay:
+            time.sleep(delay)
+        return fault
+
+    def _fault_headers(self, fault: str) -> dict[str, str]:
+        if fault == "quota" or self.settings.retry_after is None:
+            return {}
+        return {"Retry-After": f"{math.ceil(self.settings.retry_after)}"}
+
+    def _retry_hint(self, fault: str) -> str:
+        if fault == "quota" or self.settings.retry_after is None:
+            return ""
+        return f", please retry in {self.settings.retry_after:g}s"
+
+    def _record_tokens(self, prompt: str, text: str) -> tuple[int, int]:
+        usage = (estimate_tokens(prompt), estimate_tokens(text))
+        with self._lock:
+            self._tokens[0] += usage[0]
+            self._tokens[1] += usage[1]
+        return usage
+
+    def _serve_openai(self, handler: _Handler, body: dict) -> None:
+        model = body.get("model") or "mock"
+        stream = bool(body.get("stream"))
+        fault = self._admit("openai", model, stream)
+        if fault == "quota":
+            handler._send_json(
+                429,
+                {
+                    "error": {
+                        "message": "You exceeded your current quota, please check your plan and billing details.",
+                        "type": "insufficient_quota",
+                        "code": "insufficient_quota",
+                    }
+                },
+            )
+            return
+        if fault:
+            error = (
+                {"message": f"Rate limit reached for {model}{self._retry_hint(fault)}", "type": "rate_limit_error"}
+                if fault == "429"
+                else {"message": f"The server is overloaded{self._retry_hint(fault)}", "type": "server_error"}
+            )
+            handler._send_json(int(fault), {"error": error}, self._fault_headers(fault))
+            return
+
+        prompt = _openai_prompt(body)
+        text = self.reply(prompt)
+        prompt_tokens, completion_tokens = self._record_tokens(prompt, text)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        created = int(time.time())
+        if not stream:
+            handler._send_json(
+                200,
+                {
+                    "id": f"mock-{created}",
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [
+                        {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+                    ],
+                    "usage": usage,
+                },
+            )
+            return
+        events = [
+            {
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}],
+            }
+            for chunk in _chunks(text, self.settings.stream_chunks)
+        ]
+        events.append(
+            {
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+        )
+        handler._send_events(events, done_marker=True)
+
+    def _serve_gemini(self, handler: _Handler, body: dict, model: str, stream: bool) -> None:
+        fault = self._admit("gemini", model, stream)
+        if fault == "quota":
+            message = (
+                "You exceeded your current quota, please check your plan and billing details. "
+                f"Quota exceeded for metric: generate_content_free_tier_requests, limit: {self.settings.quota}, "
+                f"model: {model}"
+            )
+            handler._send_json(429, {"error": {"code": 429, "message": message, "status": "RESOURCE_EXHAUSTED"}})
+            return
+        if fault:
+            error = (
+                {"code": 429, "message": f"Rate limit exceeded{self._retry_hint(fault)}.", "status": "RATE_LIMITED"}
+                if fault == "429"
+                else {
+                    "code": 503,
+                    "message": f"The model is overloaded{self._retry_hint(fault)}.",
+                    "status": "UNAVAILABLE",
+                }
+            )
+            handler._send_json(int(fault), {"error": error}, self._fault_headers(fault))
+            return
+
+        prompt = _gemini_prompt(body)
+        text = self.reply(prompt)
+        prompt_tokens, completion_tokens = self._record_tokens(prompt, text)
+        usage = {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": completion_tokens,
+            "totalTokenCount": prompt_tokens + completion_tokens,
+        }
+        if not stream:
+            handler._send_json(
+                200,
+                {
+                    "candidates": [
+                        {"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP", "index": 0}
+                    ],
+                    "usageMetadata": usage,
+                    "modelVersion": model,
+                },
+            )
+            return
+        chunks = _chunks(text, self.settings.stream_chunks)
+        events = []
+        for index, chunk in enumerate(chunks):
+            candidate = {"content": {"parts": [{"text": chunk}], "role": "model"}, "index": 0}
+            event = {"candidates": [candidate], "modelVersion": model}
+            if index == len(chunks) - 1:
+                candidate["finishReason"] = "STOP"
+                event["usageMetadata"] = usage
+            events.append(event)
+        handler._send_events(events, done_marker=False)
+
+    def _png(self, size: str) -> str:
+        if size not in self._png_cache:
+            from PIL import Image
+
+            width, _, height = size.partition("x")
+            image = Image.new("RGB", (int(width or 1024), int(height or 1024)), (32, 96, 160))
+            buffer = io.BytesIO()
+            image.save(buffer, "PNG")
+            self._png_cache[size] = base64.b64encode(buffer.getvalue()).decode("ascii")
+        return self._png_cache[size]
+
+    def _serve_image(self, handler: _Handler, body: dict) -> None:
+        model = body.get("model") or "mock-image"
+        fault = self._admit("images", model, False)
+        if fault:
+            status = 429 if fault == "quota" else int(fault)
+            handler._send_json(
+                status, {"error": {"message": f"image request failed ({fault})"}}, self._fault_headers(fault)
+            )
+            return
+        size = str(body.get("size") or "1024x1024")
+        if not re.fullmatch(r"\d{1,4}x\d{1,4}", size):
+            handler._send_json(400, {"error": {"message": f"bad size {size!r}"}})
+            return
+        self._record_tokens(str(body.get("prompt") or ""), "")
+        handler._send_json(200, {"created": int(time.time()), "data": [{"b64_json": self._png(size)}]})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the LLM provider APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument(
+        "--latency", default="fixed:0", help="fixed:S | uniform:LOW,HIGH | normal:MEAN,SD | lognormal:MEDIAN,SIGMA"
+    )
+    parser.add_argument("--error-429", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--error-503", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with injected faults")
+    parser.add_argument("--quota", type=int, default=None, help="Requests per model before quota exhaustion")
+    parser.add_argument("--stream-chunks", type=int, default=8)
+    parser.add_argument("--stream-interval", type=float, default=0.0, help="Seconds between streamed chunks")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    settings = MockSettings(
+        latency=LatencyModel.parse(args.latency),
+        error_429=args.error_429,
+        error_503=args.error_503,
+        retry_after=args.retry_after,
+        quota=args.quota,
+        stream_chunks=args.stream_chunks,
+        stream_interval=args.stream_interval,
+        seed=args.seed,
+    )
+    server = MockLLMServer(settings, host=args.host, port=args.port).start()
+    print(f"OpenAI-compatible: {server.openai_url}")
+    print(f"Gemini base URL:   {server.url}  (GOOGLE_GEMINI_BASE_URL / GEMINI_API_URL={server.gemini_url('MODEL')})")
+    print(f"Counters:          {server.url}/stats")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
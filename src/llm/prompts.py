@@ -76,3 +76,46 @@ IMAGE_SUMMARY_PROMPT = (
 # 标题翻译 prompt
 TITLE_TRANSLATE_PROMPT = '请根据以下包含在三引号中的英文标题和文章摘要，请给出最有冲击力、最通顺的中文标题翻译,标题可以不直译,翻译的标题直接返回结果，无需添加任何额外内容，如果文章摘要为空，或者不符合，请直接返回空。英文标题："""{title}"""文章摘要："""{content_summary}"""'
 TITLE_TRANSLATE_SYSTEM = "你是一个专业的新闻编辑，需要根据文章上下文提供有冲击力的标题翻译。"
+
+# 批量新闻处理 prompt（一次请求完成多条新闻的文章摘要、讨论摘要和标题翻译）
+BATCH_STORY_PROMPT = (
+    "下方JSON数组中每个元素是一条hacknews新闻：id、英文标题title、英文正文article、社区讨论discussion。\n"
+    "请逐条处理，返回一个JSON对象，格式严格如下：\n"
+    '{{"items": [{{"id": 新闻id, "content_summary": "文章摘要", "discuss_summary": "讨论摘要", "title_chs": "中文标题"}}]}}\n\n'
+    "【content_summary】将article翻译并总结为300-400字的中文新闻段落，绝对不要超过400字；"
+    "纯文本，不分段，不用任何markdown格式；不要出现'网页标题''主要内容'等元数据；"
+    "不要用英文缩写，说'应用程序接口'而非'API'。\n"
+    "【discuss_summary】将discussion用简洁准确的中文总结为200到250字，以'社区'代替'hacknews社区'，"
+    "尽量多介绍不同讨论者的言论，不包含评论者名称。\n"
+    "【title_chs】根据title和你写的content_summary给出最有冲击力、最通顺的中文标题，可以不直译。\n\n"
+    '某个字段的原文为空或无法理解时，该字段返回空字符串""。每条新闻必须返回一个元素，id保持不变，'
+    "只返回JSON，不要任何其他文字。\n\n"
+    "新闻列表：\n{stories}"
+)
+BATCH_STORY_SYSTEM = "你是专业中文新闻编辑，擅长把英文新闻和评论翻译总结为中文，并严格按要求输出JSON。"
+
+# 长文分段摘要 prompt（map：逐段提炼要点；reduce：合并为最终摘要）
+CHUNK_SUMMARY_PROMPT = (
+    "下方三引号中是一篇英文{kind}按顺序切分后的第{index}/{total}部分。"
+    "请只依据这一部分，用中文提炼其中的关键事实、数据和观点，150-250字，纯文本，不分段，"
+    "不要推测其他部分的内容，不要出现'本部分''这一段'等说明文字。"
+    '如果这一部分没有实质内容，请只返回null。\n"""{text}"""'
+)
+CHUNK_SUMMARY_SYSTEM = "你是专业中文新闻编辑，擅长从英文长文的片段中准确提炼要点。"
+ARTICLE_REDUCE_PROMPT = (
+    "下方三引号中是同一篇英文新闻按顺序分段提炼出的中文要点。请把它们合并为一段300-400字的中文新闻段落。\n\n"
+    "【核心要求】\n"
+    "字数：300-400字（绝对不要超过400字！）\n"
+    "格式：纯文本段落，不分段，不用任何markdown格式\n"
+    "内容：突出全文的核心信息，去掉各段之间重复的内容，次要细节可省略\n\n"
+    "【禁止项】\n"
+    "- 不要出现'第一部分''要点'等元数据\n"
+    "- 不要用英文缩写，说'应用程序接口'而非'API'\n\n"
+    '分段要点：\n"""{text}"""\n\n'
+    "如果内容无法理解，返回null。"
+)
+DISCUSSION_REDUCE_PROMPT = (
+    "下方三引号中是hacknews社区同一个讨论按顺序分段提炼出的中文要点。请合并为200到250字的中文总结，"
+    "以'社区'代替'hacknews社区'，尽量多介绍不同讨论者的观点，去掉重复内容，不包含评论者名称，"
+    '只返回正文，不需要markdown格式的标题：\n"""{text}"""\n如果内容不充分或无法理解，请返回null。'
+)
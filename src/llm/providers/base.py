@@ -1,7 +1,12 @@
 """Abstract base class for LLM providers."""
 
+import asyncio
 import logging
 from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.llm.streaming import StreamValidator
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +52,82 @@ class LLMProvider(ABC):
         """
         ...
 
+    async def acall(
+        self,
+        prompt: str,
+        system_content: str | None = None,
+        model: str | None = None,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+        response_format: dict | None = None,
+        image_data: str | None = None,
+    ) -> str:
+        """Async version of :meth:`call`.
+
+        Default: run the blocking :meth:`call` in a worker thread.  Providers
+        with a native async transport override this.
+        """
+        return await asyncio.to_thread(
+            self.call,
+            prompt,
+            system_content=system_content,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            response_format=response_format,
+            image_data=image_data,
+        )
+
+    async def astream(
+        self,
+        prompt: str,
+        system_content: str | None = None,
+        model: str | None = None,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+        response_format: dict | None = None,
+        image_data: str | None = None,
+        validator: "StreamValidator | None" = None,
+    ) -> str:
+        """Like :meth:`acall`, but every delta goes through *validator*.
+
+        Raises ``StreamRejected`` as soon as the validator rejects the text.
+        Default: no native streaming, validate the full :meth:`acall` result.
+        """
+        result = await self.acall(
+            prompt,
+            system_content=system_content,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            response_format=response_format,
+            image_data=image_data,
+        )
+        if validator is not None:
+            validator.reset()
+            validator.feed(result)
+        return result
+
+    async def _astream_chat_completion(
+        self, api_url: str, headers: dict, data: dict, validator: "StreamValidator | None", **request_kwargs
+    ) -> str:
+        """Stream an OpenAI-compatible chat completion (SSE) through *validator*."""
+        from src.llm.accounting import report_usage
+        from src.llm.async_client import get_async_http_client
+        from src.llm.streaming import StreamValidator, aiter_sse_json, openai_delta
+
+        validator = validator or StreamValidator(markers=())
+        validator.reset()
+        async with get_async_http_client().stream(
+            "POST", api_url, headers=headers, json={**data, "stream": True}, **request_kwargs
+        ) as response:
+            response.raise_for_status()
+            # Leaving the block on StreamRejected closes the connection mid-stream
+            async for event in aiter_sse_json(response.aiter_lines()):
+                report_usage(event)
+                validator.feed(openai_delta(event))
+        return validator.text.strip()
+
     def health_check(self) -> bool:
         """Quick health check. Default: try a trivial call."""
         try:
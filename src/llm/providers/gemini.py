@@ -1,11 +1,21 @@
-"""Gemini API provider (Google) with load balancing and quota management."""
+"""Gemini API provider (Google) with load balancing and quota management.
 
+Model selection and the daily quota reservation are blocking (SQLite), so
+the async entry points run the call in a worker thread; only the rate-limit
+wait happens on the event loop (``acquire_async``), so a throttled request
+does not hold a worker.  The SDK client itself is pooled per API key.
+"""
+
+import asyncio
 import logging
 import random
-import re
 import time
 
+from src.llm.accounting import note_retry, report_usage
+from src.llm.image_payload import image_mime_type
 from src.llm.providers.base import LLMProvider
+from src.llm.rate_limit import retry_delay_hint
+from src.llm.streaming import StreamRejected
 from src.security.content_sanitizer import redact_secrets
 
 logger = logging.getLogger(__name__)
@@ -27,14 +37,9 @@ class GeminiProvider(LLMProvider):
     @staticmethod
     def _extract_retry_delay(error_msg: str, attempt: int) -> float:
         """Parse retry hint from error message or compute exponential backoff."""
-        for pat in (
-            r'["\']retryDelay["\']\s*:\s*["\'](\d+)s["\']',
-            r"retry in ([\d.]+)s",
-            r"retry_delay\s*\{\s*seconds:\s*(\d+)",
-        ):
-            m = re.search(pat, error_msg)
-            if m:
-                return float(m.group(1)) + random.uniform(1.0, 3.0)
+        hint = retry_delay_hint(error_msg)
+        if hint is not None:
+            return hint + random.uniform(1.0, 3.0)
         lower = error_msg.lower()
         if "503" in error_msg or "unavailable" in lower:
             return min(60, 3**attempt + random.uniform(2, 5))
@@ -54,6 +59,7 @@ class GeminiProvider(LLMProvider):
             disable_model_for_today,
             gemini_balancer,
             is_gemini_quota_exceeded_error,
+            rate_limiter,
         )
 
         error_msg = redact_secrets(str(error))
@@ -64,9 +70,11 @@ class GeminiProvider(LLMProvider):
             return "switch" if model != GEMINI_FALLBACK_MODEL else "fail"
         if self._is_retryable(error_msg) and attempt < max_retries - 1:
             delay = self._extract_retry_delay(error_msg, attempt)
+            rate_limiter.defer(f"gemini-{model}", retry_delay_hint(error_msg))
             logger.warning(
                 "Gemini error (attempt %d/%d): %.200s — retry in %.1fs", attempt + 1, max_retries, error_msg, delay
             )
+            note_retry()
             time.sleep(delay)
             return "retry"
         logger.error("Gemini unrecoverable: %.200s", error_msg)
@@ -75,42 +83,77 @@ class GeminiProvider(LLMProvider):
     # -- Single-attempt helpers ------------------------------------------
 
     @staticmethod
-    def _try_genai_sdk(api_key, model, contents, temperature, max_tokens):
-        """One attempt via google-genai SDK.  Returns text or raises."""
-        from google import genai
-
-        client = genai.Client(api_key=api_key)
-        response = client.models.generate_content(
-            model=model,
-            contents=contents,
-            config={"temperature": temperature, "max_output_tokens": max_tokens},
-        )
+    def _try_genai_sdk(api_key, model, contents, temperature, max_tokens, validator=None):
+        """One attempt via google-genai SDK.  Returns text or raises.
+
+        With a *validator* the completion is streamed and every chunk is fed
+        to it, so a rejected answer stops the stream early.
+        """
+        from src.llm.async_client import get_genai_client
+
+        models = get_genai_client(api_key).models
+        config = {"temperature": temperature, "max_output_tokens": max_tokens}
+        if validator is not None:
+            validator.reset()
+            for chunk in models.generate_content_stream(model=model, contents=contents, config=config):
+                report_usage(chunk)
+                validator.feed(getattr(chunk, "text", None))
+            return validator.text.strip()
+
+        response = models.generate_content(model=model, contents=contents, config=config)
+        report_usage(response)
         if hasattr(response, "text") and response.text:
             return response.text.strip()
         return ""
 
     @staticmethod
-    def _try_requests(api_url, api_key, prompt, image_data, temperature, max_tokens):
+    def _try_requests(api_url, api_key, prompt, image_data, temperature, max_tokens, validator=None):
         """One attempt via plain HTTP requests.  Returns text or raises."""
         from src.llm.llm_utils import _http_session
+        from src.llm.streaming import gemini_delta, iter_sse_json
 
         headers = {"Content-Type": "application/json"}
         params = {"key": api_key}
         if image_data:
-            parts = [{"text": prompt}, {"inline_data": {"mime_type": "image/png", "data": image_data}}]
+            parts = [{"text": prompt}, {"inline_data": {"mime_type": image_mime_type(image_data), "data": image_data}}]
         else:
             parts = [{"text": prompt}]
         data = {
             "contents": [{"parts": parts}],
             "generationConfig": {"temperature": temperature, "maxOutputTokens": max_tokens},
         }
+        if validator is not None:
+            validator.reset()
+            stream_url = api_url.replace(":generateContent", ":streamGenerateContent")
+            with _http_session.post(
+                stream_url, headers=headers, params={**params, "alt": "sse"}, json=data, timeout=60, stream=True
+            ) as resp:
+                resp.raise_for_status()
+                resp.encoding = "utf-8"
+                for event in iter_sse_json(resp.iter_lines(decode_unicode=True)):
+                    report_usage(event)
+                    validator.feed(gemini_delta(event))
+            return validator.text.strip()
+
         resp = _http_session.post(api_url, headers=headers, params=params, json=data, timeout=60)
         resp.raise_for_status()
         rj = resp.json()
+        report_usage(rj)
         if "candidates" in rj and rj["candidates"]:
             return rj["candidates"][0]["content"]["parts"][0]["text"].strip()
         return ""
 
+    @staticmethod
+    def _bucket(model: str) -> tuple[str, int, int]:
+        """``(limiter key, max requests, window seconds)`` for *model*."""
+        from src.llm.llm_utils import GEMINI_STRICT_LIMIT_PER_MINUTE, _is_strict_capped_gemini_model
+
+        if _is_strict_capped_gemini_model(model):
+            return f"gemini-{model}", GEMINI_STRICT_LIMIT_PER_MINUTE, 60
+        if "3.1-flash-lite-preview" in model:
+            return f"gemini-{model}", 15, 60
+        return f"gemini-{model}", 8, 60
+
     # -- Main entry point ------------------------------------------------
 
     def call(
@@ -123,11 +166,13 @@ class GeminiProvider(LLMProvider):
         response_format: dict | None = None,
         image_data: str | None = None,
         max_retries: int = 5,
+        validator=None,
+        limited_model: str | None = None,
     ) -> str:
+        """Call Gemini; *limited_model* already holds a rate-limit token (see :meth:`astream`)."""
         from src.llm.llm_utils import (
             GEMINI_FALLBACK_MODEL,
             GEMINI_STRICT_LIMIT_PER_DAY,
-            GEMINI_STRICT_LIMIT_PER_MINUTE,
             _is_forbidden_gemini_model,
             _is_strict_capped_gemini_model,
             _reserve_daily_request_slot,
@@ -157,14 +202,11 @@ class GeminiProvider(LLMProvider):
         api_url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
 
         # Rate limiting
+        key, rpm, window = self._bucket(model)
         if _is_strict_capped_gemini_model(model):
-            rpm, window = GEMINI_STRICT_LIMIT_PER_MINUTE, 60
             logger.info("%s rate-limit: %d/min, %d/day", model, rpm, GEMINI_STRICT_LIMIT_PER_DAY)
-        elif "3.1-flash-lite-preview" in (model or ""):
-            rpm, window = 15, 60
-        else:
-            rpm, window = 8, 60
-        rate_limiter.wait_if_needed(f"gemini-{model}", max_requests=rpm, window_seconds=window)
+        if model != limited_model:
+            rate_limiter.acquire(key, max_requests=rpm, window_seconds=window)
 
         # Daily quota reservation (strict-capped models)
         if _is_strict_capped_gemini_model(model):
@@ -187,6 +229,7 @@ class GeminiProvider(LLMProvider):
                         response_format,
                         max_retries=max_retries,
                         image_data=image_data,
+                        validator=validator,
                     )
                 return ""
 
@@ -195,7 +238,7 @@ class GeminiProvider(LLMProvider):
         logger.info("[Gemini] model=%s prompt=%d chars", model, len(prompt))
 
         contents = (
-            [{"text": prompt}, {"inline_data": {"mime_type": "image/png", "data": image_data}}]
+            [{"text": prompt}, {"inline_data": {"mime_type": image_mime_type(image_data), "data": image_data}}]
             if image_data
             else prompt
         )
@@ -204,7 +247,7 @@ class GeminiProvider(LLMProvider):
         for attempt in range(max_retries):
             # SDK
             try:
-                result = self._try_genai_sdk(api_key, model, contents, temperature, max_tokens)
+                result = self._try_genai_sdk(api_key, model, contents, temperature, max_tokens, validator)
                 if result:
                     gemini_balancer.report_success(model)
                     return result
@@ -213,6 +256,8 @@ class GeminiProvider(LLMProvider):
             except ImportError:
                 logger.error("google-genai not installed: pip install google-genai")
                 return ""
+            except StreamRejected:
+                raise
             except Exception as e:
                 action = self._process_error(e, model, attempt, max_retries)
                 if action == "switch":
@@ -225,18 +270,21 @@ class GeminiProvider(LLMProvider):
                         response_format,
                         max_retries=max_retries,
                         image_data=image_data,
+                        validator=validator,
                     )
                 if action == "retry":
                     continue
 
             # Requests fallback
             try:
-                result = self._try_requests(api_url, api_key, prompt, image_data, temperature, max_tokens)
+                result = self._try_requests(api_url, api_key, prompt, image_data, temperature, max_tokens, validator)
                 if result:
                     gemini_balancer.report_success(model)
                     return result
                 logger.warning("[Gemini] requests returned empty")
                 return ""
+            except StreamRejected:
+                raise
             except Exception as e:
                 action = self._process_error(e, model, attempt, max_retries)
                 if action == "switch":
@@ -249,6 +297,7 @@ class GeminiProvider(LLMProvider):
                         response_format,
                         max_retries=max_retries,
                         image_data=image_data,
+                        validator=validator,
                     )
                 if action == "retry":
                     continue
@@ -256,3 +305,50 @@ class GeminiProvider(LLMProvider):
 
         logger.warning("Gemini API failed after %d attempts", max_retries)
         return ""
+
+    async def astream(
+        self,
+        prompt: str,
+        system_content: str | None = None,
+        model: str | None = None,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+        response_format: dict | None = None,
+        image_data: str | None = None,
+        validator=None,
+    ) -> str:
+        """Streamed :meth:`call` in a worker thread, after waiting for a rate-limit token on the loop."""
+        from src.llm.llm_utils import _is_forbidden_gemini_model, gemini_balancer, rate_limiter
+
+        preferred = model if model is not None else self._load_config().get("model")
+        picked = await asyncio.to_thread(gemini_balancer.get_next_model, preferred_model=preferred)
+        limited = None
+        if picked and not _is_forbidden_gemini_model(picked):
+            key, rpm, window = self._bucket(picked)
+            await rate_limiter.acquire_async(key, max_requests=rpm, window_seconds=window)
+            model = limited = picked
+        return await asyncio.to_thread(
+            self.call,
+            prompt,
+            system_content,
+            model,
+            temperature,
+            max_tokens,
+            response_format,
+            image_data,
+            validator=validator,
+            limited_model=limited,
+        )
+
+    async def acall(
+        self,
+        prompt: str,
+        system_content: str | None = None,
+        model: str | None = None,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+        response_format: dict | None = None,
+        image_data: str | None = None,
+    ) -> str:
+        """:meth:`astream` without a validator."""
+        return await self.astream(prompt, system_content, model, temperature, max_tokens, response_format, image_data)
@@ -2,13 +2,16 @@
 
 Uses the OpenAI-compatible chat completions endpoint.
 Supports text and multimodal (image) input via Grok 4.1+.
-Prefers httpx for SSL compatibility; falls back to curl-cffi.
+Sends through the shared pooled httpx clients (sync and async); the blocking
+path falls back to curl-cffi when httpx is unavailable.
 """
 
 import logging
 
+from src.llm.accounting import report_usage
+from src.llm.image_payload import image_mime_type
 from src.llm.providers.base import LLMProvider
-from src.llm.retry import with_retry
+from src.llm.retry import with_async_retry, with_retry
 from src.security.content_sanitizer import redact_secrets
 
 logger = logging.getLogger(__name__)
@@ -29,23 +32,17 @@ class GrokProvider(LLMProvider):
 
         return load_llm_config()["grok"]
 
-    @with_retry(max_retries=2, backoff_base=2.0, backoff_max=30.0)
-    def call(
+    def _build_request(
         self,
         prompt: str,
-        system_content: str | None = None,
-        model: str | None = None,
-        temperature: float | None = None,
-        max_tokens: int | None = None,
-        response_format: dict | None = None,
-        image_data: str | None = None,
-        max_retries: int = 2,
-    ) -> str:
-        """Call Grok API for a single attempt.
-
-        Retries are handled by the ``@with_retry`` decorator.  On final
-        failure the exception propagates to the caller.
-        """
+        system_content: str | None,
+        model: str | None,
+        temperature: float | None,
+        max_tokens: int | None,
+        response_format: dict | None,
+        image_data: str | None,
+    ) -> tuple[str, dict, dict]:
+        """Return ``(api_url, headers, json_body)`` for one chat completion."""
         config = self._load_config()
         api_key = config["api_key"]
         api_url = config["api_url"]
@@ -68,7 +65,7 @@ class GrokProvider(LLMProvider):
                 {"type": "text", "text": prompt},
                 {
                     "type": "image_url",
-                    "image_url": {"url": f"data:image/png;base64,{image_data}"},
+                    "image_url": {"url": f"data:{image_mime_type(image_data)};base64,{image_data}"},
                 },
             ]
         else:
@@ -91,22 +88,51 @@ class GrokProvider(LLMProvider):
             total_len,
             total_len // 4,
         )
+        return api_url, headers, data
+
+    @staticmethod
+    def _parse_response(response_json: dict) -> str:
+        report_usage(response_json)
+        if "choices" in response_json:
+            result = response_json["choices"][0]["message"]["content"].strip()
+            logger.info("[Grok] success, %d chars", len(result))
+            return result
 
-        # -- Send request (httpx preferred, curl-cffi fallback) --
-        import certifi
+        logger.warning(
+            "[Grok] no 'choices' in response: %s",
+            redact_secrets(str(response_json)[:500]),
+        )
+        return ""
+
+    @with_retry(max_retries=2, backoff_base=2.0, backoff_max=30.0, host="api.x.ai")
+    def call(
+        self,
+        prompt: str,
+        system_content: str | None = None,
+        model: str | None = None,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+        response_format: dict | None = None,
+        image_data: str | None = None,
+        max_retries: int = 2,
+    ) -> str:
+        """Call Grok API for a single attempt.
 
+        Retries are handled by the ``@with_retry`` decorator.  On final
+        failure the exception propagates to the caller.
+        """
+        api_url, headers, data = self._build_request(
+            prompt, system_content, model, temperature, max_tokens, response_format, image_data
+        )
+
+        # -- Send request (pooled httpx preferred, curl-cffi fallback) --
         try:
-            import httpx
+            from src.llm.async_client import get_sync_http_client
 
-            logger.info("[Grok] using httpx")
-            with httpx.Client(
-                verify=certifi.where(),
-                timeout=120.0,
-                follow_redirects=True,
-            ) as client:
-                response = client.post(api_url, headers=headers, json=data)
-                response.raise_for_status()
+            response = get_sync_http_client().post(api_url, headers=headers, json=data)
+            response.raise_for_status()
         except ImportError:
+            import certifi
             from curl_cffi import requests as curl_requests
 
             logger.info("[Grok] httpx unavailable, using curl-cffi")
@@ -119,15 +145,43 @@ class GrokProvider(LLMProvider):
             )
             response.raise_for_status()
 
-        # -- Parse response --
-        response_json = response.json()
-        if "choices" in response_json:
-            result = response_json["choices"][0]["message"]["content"].strip()
-            logger.info("[Grok] success, %d chars", len(result))
-            return result
+        return self._parse_response(response.json())
 
-        logger.warning(
-            "[Grok] no 'choices' in response: %s",
-            redact_secrets(str(response_json)[:500]),
+    @with_async_retry(max_retries=2, backoff_base=2.0, backoff_max=30.0, host="api.x.ai")
+    async def acall(
+        self,
+        prompt: str,
+        system_content: str | None = None,
+        model: str | None = None,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+        response_format: dict | None = None,
+        image_data: str | None = None,
+    ) -> str:
+        """Async single attempt over the loop's pooled ``httpx.AsyncClient``."""
+        from src.llm.async_client import get_async_http_client
+
+        api_url, headers, data = self._build_request(
+            prompt, system_content, model, temperature, max_tokens, response_format, image_data
         )
-        return ""
+        response = await get_async_http_client().post(api_url, headers=headers, json=data)
+        response.raise_for_status()
+        return self._parse_response(response.json())
+
+    @with_async_retry(max_retries=2, backoff_base=2.0, backoff_max=30.0, host="api.x.ai")
+    async def astream(
+        self,
+        prompt: str,
+        system_content: str | None = None,
+        model: str | None = None,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+        response_format: dict | None = None,
+        image_data: str | None = None,
+        validator=None,
+    ) -> str:
+        """Streamed single attempt (SSE); aborts as soon as *validator* rejects the text."""
+        api_url, headers, data = self._build_request(
+            prompt, system_content, model, temperature, max_tokens, response_format, image_data
+        )
+        return await self._astream_chat_completion(api_url, headers, data, validator)
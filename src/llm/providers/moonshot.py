@@ -8,8 +8,9 @@ Models:
 
 import logging
 
+from src.llm.accounting import report_usage
 from src.llm.providers.base import LLMProvider
-from src.llm.retry import with_retry
+from src.llm.retry import with_async_retry, with_retry
 
 logger = logging.getLogger(__name__)
 
@@ -25,26 +26,16 @@ class MoonshotProvider(LLMProvider):
 
         return load_llm_config()["moonshot"]
 
-    @with_retry(max_retries=2, backoff_base=2.0, backoff_max=30.0)
-    def call(
+    def _build_request(
         self,
         prompt: str,
-        system_content: str | None = None,
-        model: str | None = None,
-        temperature: float | None = None,
-        max_tokens: int | None = None,
-        response_format: dict | None = None,
-        image_data: str | None = None,
-        max_retries: int = 2,
-    ) -> str:
-        """Call the Moonshot chat completions API.
-
-        Moonshot does not support image input.  If *image_data* is provided it
-        is silently ignored (the caller should route image requests to Gemini
-        or Grok instead).
-        """
-        from src.llm.llm_utils import _http_session
-
+        system_content: str | None,
+        model: str | None,
+        temperature: float | None,
+        max_tokens: int | None,
+        response_format: dict | None,
+    ) -> tuple[str, dict, dict]:
+        """Return ``(api_url, headers, json_body)`` for one chat completion."""
         config = self._load_config()
         api_key = config["api_key"]
         api_url = config["api_url"]
@@ -70,11 +61,77 @@ class MoonshotProvider(LLMProvider):
         }
         if response_format:
             data["response_format"] = response_format
+        return api_url, headers, data
 
-        response = _http_session.post(api_url, headers=headers, json=data, timeout=60, verify=True)
-        response.raise_for_status()
-        response_json = response.json()
-
+    @staticmethod
+    def _parse_response(response_json: dict) -> str:
+        report_usage(response_json)
         if "choices" in response_json:
             return response_json["choices"][0]["message"]["content"].strip()
         return ""
+
+    @with_retry(max_retries=2, backoff_base=2.0, backoff_max=30.0, host="api.moonshot.cn")
+    def call(
+        self,
+        prompt: str,
+        system_content: str | None = None,
+        model: str | None = None,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+        response_format: dict | None = None,
+        image_data: str | None = None,
+        max_retries: int = 2,
+    ) -> str:
+        """Call the Moonshot chat completions API.
+
+        Moonshot does not support image input.  If *image_data* is provided it
+        is silently ignored (the caller should route image requests to Gemini
+        or Grok instead).
+        """
+        from src.llm.llm_utils import _http_session
+
+        api_url, headers, data = self._build_request(
+            prompt, system_content, model, temperature, max_tokens, response_format
+        )
+        response = _http_session.post(api_url, headers=headers, json=data, timeout=60, verify=True)
+        response.raise_for_status()
+        return self._parse_response(response.json())
+
+    @with_async_retry(max_retries=2, backoff_base=2.0, backoff_max=30.0, host="api.moonshot.cn")
+    async def acall(
+        self,
+        prompt: str,
+        system_content: str | None = None,
+        model: str | None = None,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+        response_format: dict | None = None,
+        image_data: str | None = None,
+    ) -> str:
+        """Async single attempt over the loop's pooled ``httpx.AsyncClient``."""
+        from src.llm.async_client import get_async_http_client
+
+        api_url, headers, data = self._build_request(
+            prompt, system_content, model, temperature, max_tokens, response_format
+        )
+        response = await get_async_http_client().post(api_url, headers=headers, json=data, timeout=60)
+        response.raise_for_status()
+        return self._parse_response(response.json())
+
+    @with_async_retry(max_retries=2, backoff_base=2.0, backoff_max=30.0, host="api.moonshot.cn")
+    async def astream(
+        self,
+        prompt: str,
+        system_content: str | None = None,
+        model: str | None = None,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+        response_format: dict | None = None,
+        image_data: str | None = None,
+        validator=None,
+    ) -> str:
+        """Streamed single attempt (SSE); aborts as soon as *validator* rejects the text."""
+        api_url, headers, data = self._build_request(
+            prompt, system_content, model, temperature, max_tokens, response_format
+        )
+        return await self._astream_chat_completion(api_url, headers, data, validator, timeout=60)
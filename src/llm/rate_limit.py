@@ -1,55 +1,235 @@
-"""API rate limiter with sliding-window throttling."""
+"""API rate limiting.
 
+``TokenBucketLimiter`` keeps one token bucket per key (e.g.
+``gemini-gemini-3-flash-preview``) in the shared SQLite database, so
+``hn2md``, ``publisher`` and the skill scripts running side by side draw
+from the same per-minute budget instead of each assuming it owns all of it.
+
+Taking a token is one short ``BEGIN IMMEDIATE`` transaction; any waiting
+happens afterwards, outside every lock, with ``time.sleep`` (``acquire``) or
+``asyncio.sleep`` (``acquire_async``).  Each limiter remembers the bucket
+state it last wrote: while that state says the caller must wait, the wait is
+answered without touching the database (other processes can only make it
+longer), so only a grant costs a write.  ``defer`` records a provider
+``retryDelay`` hint so every process holds off for that key until it expires.
+
+Usage:
+    from src.llm.rate_limit import rate_limiter
+
+    rate_limiter.acquire("gemini-gemini-3-flash-preview", max_requests=5, window_seconds=60)
+    ...
+    rate_limiter.defer("gemini-gemini-3-flash-preview", retry_delay_hint(error_msg))
+"""
+
+import asyncio
 import logging
+import re
+import sqlite3
+import threading
 import time
 from collections import defaultdict, deque
 from threading import Lock
 
+from src.db.connection import get_db
+
 logger = logging.getLogger(__name__)
 
+_RETRY_DELAY_PATTERNS = (
+    re.compile(r'["\']retryDelay["\']\s*:\s*["\'](\d+(?:\.\d+)?)s["\']'),
+    re.compile(r"retry in ([\d.]+)s"),
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)"),
+)
+
+
+def retry_delay_hint(error_msg: str | None) -> float | None:
+    """Seconds the provider asked us to wait (``retryDelay`` and friends), if any."""
+    for pattern in _RETRY_DELAY_PATTERNS:
+        match = pattern.search(error_msg or "")
+        if match:
+            return float(match.group(1))
+    return None
+
+
+class TokenBucketLimiter:
+    """Cross-process token buckets stored in the ``llm_rate_buckets`` table.
+
+    A bucket for *max_requests* per *window_seconds* holds at most *burst*
+    tokens and refills at ``(max_requests - burst + 1) / window_seconds``
+    tokens per second, so no window of that length ever sees more than
+    *max_requests* grants.  The default ``burst=1`` spaces requests evenly.
+    """
+
+    def __init__(self, db_path: str | None = None):
+        self.db_path = db_path
+        self._table_ready = False
+        # Per-process fallback when the database cannot be used
+        self._local: dict[str, tuple[float, float, float]] = {}
+        # Bucket state last written per key; a wait it predicts is a lower bound
+        self._seen: dict[str, tuple[float, float, float]] = {}
+        self._local_lock = threading.Lock()
+
+    def _connect(self):
+        return get_db(self.db_path) if self.db_path else get_db()
+
+    def _ensure_table(self, conn) -> None:
+        if self._table_ready:
+            return
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS llm_rate_buckets (
+            bucket_key TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            blocked_until REAL NOT NULL DEFAULT 0
+        )
+        """)
+        self._table_ready = True
+
+    @staticmethod
+    def _take(state, now, rate, capacity) -> tuple[tuple[float, float, float], float]:
+        """Refill and try to take one token; returns (new_state, seconds_to_wait)."""
+        if state is None:
+            tokens, blocked_until = capacity, 0.0
+        else:
+            tokens, updated_at, blocked_until = state
+            tokens = min(capacity, tokens + max(0.0, now - updated_at) * rate)
+        if blocked_until > now:
+            return (tokens, now, blocked_until), blocked_until - now
+        if tokens >= 1.0:
+            return (tokens - 1.0, now, blocked_until), 0.0
+        return (tokens, now, blocked_until), (1.0 - tokens) / rate
+
+    def try_acquire(self, key: str, max_requests: int = 60, window_seconds: float = 60, burst: int = 1) -> float:
+        """Take a token without waiting.
+
+        Returns 0.0 when granted, otherwise the seconds until one could be.
+        """
+        capacity = float(max(1, min(burst, max_requests)))
+        rate = (max_requests - capacity + 1) / window_seconds
+        now = time.time()
+        with self._local_lock:
+            seen = self._seen.get(key)
+        if seen is not None:
+            _, wait = self._take(seen, now, rate, capacity)
+            if wait > 0:
+                return wait
+        try:
+            with self._connect() as conn:
+                self._ensure_table(conn)
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT tokens, updated_at, blocked_until FROM llm_rate_buckets WHERE bucket_key = ?",
+                    (key,),
+                ).fetchone()
+                state, wait = self._take(row, now, rate, capacity)
+                conn.execute(
+                    """
+                    INSERT INTO llm_rate_buckets (bucket_key, tokens, updated_at, blocked_until)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(bucket_key) DO UPDATE SET
+                        tokens = excluded.tokens,
+                        updated_at = excluded.updated_at,
+                        blocked_until = excluded.blocked_until
+                    """,
+                    (key, *state),
+                )
+            with self._local_lock:
+                self._seen[key] = state
+            return wait
+        except sqlite3.Error as e:
+            logger.warning(f"[RATE] shared bucket unavailable, limiting in-process only: {e}")
+            with self._local_lock:
+                self._local[key], wait = self._take(self._local.get(key), now, rate, capacity)
+                return wait
+
+    def acquire(self, key: str, max_requests: int = 60, window_seconds: float = 60, burst: int = 1) -> float:
+        """Block until a token is granted; returns the seconds spent waiting."""
+        waited = 0.0
+        while (wait := self.try_acquire(key, max_requests, window_seconds, burst)) > 0:
+            logger.info(f"{key} API限流：{max_requests}次/{window_seconds}秒，等待 {wait:.1f} 秒")
+            time.sleep(wait)
+            waited += wait
+        return waited
+
+    async def acquire_async(
+        self, key: str, max_requests: int = 60, window_seconds: float = 60, burst: int = 1
+    ) -> float:
+        """``acquire`` for coroutines: waits with ``asyncio.sleep``."""
+        waited = 0.0
+        while (wait := await asyncio.to_thread(self.try_acquire, key, max_requests, window_seconds, burst)) > 0:
+            logger.info(f"{key} API限流：{max_requests}次/{window_seconds}秒，等待 {wait:.1f} 秒")
+            await asyncio.sleep(wait)
+            waited += wait
+        return waited
+
+    def defer(self, key: str, seconds: float | None) -> None:
+        """Hold every process off *key* for *seconds* (a provider ``retryDelay``)."""
+        if not seconds or seconds <= 0:
+            return
+        until = time.time() + seconds
+        try:
+            with self._connect() as conn:
+                self._ensure_table(conn)
+                conn.execute(
+                    """
+                    INSERT INTO llm_rate_buckets (bucket_key, tokens, updated_at, blocked_until)
+                    VALUES (?, 0, ?, ?)
+                    ON CONFLICT(bucket_key) DO UPDATE SET
+                        blocked_until = MAX(blocked_until, excluded.blocked_until)
+                    """,
+                    (key, time.time(), until),
+                )
+            with self._local_lock:
+                if key in self._seen:
+                    tokens, updated_at, blocked_until = self._seen[key]
+                    self._seen[key] = (tokens, updated_at, max(blocked_until, until))
+        except sqlite3.Error as e:
+            logger.warning(f"[RATE] could not record retry delay for {key}: {e}")
+            with self._local_lock:
+                tokens, updated_at, blocked_until = self._local.get(key, (0.0, time.time(), 0.0))
+                self._local[key] = (tokens, updated_at, max(blocked_until, until))
+        logger.info(f"{key} 服务端要求等待 {seconds:.1f} 秒")
+
+    def wait_if_needed(self, api_type: str, max_requests: int = 60, window_seconds: int = 60):
+        """Compatibility wrapper for the old ``RateLimiter`` call sites."""
+        self.acquire(api_type, max_requests=max_requests, window_seconds=window_seconds)
+
 
 class RateLimiter:
+    """In-process sliding-window limiter (kept for callers that want no shared state)."""
+
     def __init__(self):
         self.request_times = defaultdict(deque)
         self.locks = defaultdict(Lock)
 
     def wait_if_needed(self, api_type: str, max_requests: int = 60, window_seconds: int = 60):
-        """API限流检查，如需要会阻塞等待
+        """API限流检查，如需要会等待（等待时不持有锁）
 
         Args:
             api_type: API类型标识（如 'gemini-gemini-3-flash-preview'）
             max_requests: 时间窗口内最大请求数
             window_seconds: 时间窗口（秒）
         """
-        with self.locks[api_type]:
-            now = time.time()
-            window_start = now - window_seconds
-
-            # 清理超出窗口的记录
-            times = self.request_times[api_type]
-            while times and times[0] < window_start:
-                times.popleft()
-
-            # 检查是否需要等待
-            if len(times) >= max_requests:
-                oldest_request = times[0]
-                # 计算需要等待到最老的请求过期（离开时间窗口）
-                wait_time = oldest_request + window_seconds - now + 1  # +1秒安全余量
-                if wait_time > 0:
-                    logger.info(
-                        f"{api_type} API限流：已达到 {max_requests}次/{window_seconds}秒 上限，等待 {wait_time:.1f} 秒"
-                    )
-                    time.sleep(wait_time)
-                    # 等待后重新清理过期记录
-                    now = time.time()
-                    window_start = now - window_seconds
-                    while times and times[0] < window_start:
-                        times.popleft()
-
-            # 记录本次请求时间
-            self.request_times[api_type].append(now)
-            logger.debug(f"{api_type} 限流状态: {len(times) + 1}/{max_requests} 请求 (最近{window_seconds}秒)")
-
-
-# 全局限流器实例
-rate_limiter = RateLimiter()
+        while True:
+            with self.locks[api_type]:
+                now = time.time()
+                window_start = now - window_seconds
+
+                # 清理超出窗口的记录
+                times = self.request_times[api_type]
+                while times and times[0] < window_start:
+                    times.popleft()
+
+                if len(times) < max_requests:
+                    # 记录本次请求时间
+                    times.append(now)
+                    logger.debug(f"{api_type} 限流状态: {len(times)}/{max_requests} 请求 (最近{window_seconds}秒)")
+                    return
+                # 需要等待到最老的请求过期（离开时间窗口）
+                wait_time = times[0] + window_seconds - now + 1  # +1秒安全余量
+
+            logger.info(f"{api_type} API限流：已达到 {max_requests}次/{window_seconds}秒 上限，等待 {wait_time:.1f} 秒")
+            time.sleep(wait_time)
+
+
+# 全局限流器实例（跨进程共享）
+rate_limiter = TokenBucketLimiter()
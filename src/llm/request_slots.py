@@ -0,0 +1,75 @@
+"""Run-scoped cap on provider requests in flight.
+
+A plan run bounds its LLM traffic with :func:`request_slots`: every provider
+attempt ``call_llm_async`` makes inside the block (``_attempt_async``) holds
+one slot while it runs.  The cap counts requests, not callers, so a
+map-reduce summary, a batch or a hedge that fans out into several requests
+takes several slots.
+
+Blocking helpers that make one request at a time (``call_llm`` through the
+tie-break and tag extraction) run through :func:`to_thread_in_slot`, which
+holds one slot for the whole thread.  Worker threads never wait on a slot
+themselves: a thread parked on the semaphore would hold an executor worker
+that a slot holder's ``asyncio.to_thread`` may need.
+
+The slots live in a ``ContextVar`` (inherited by asyncio tasks); outside a
+:func:`request_slots` block requests are not limited.
+
+Usage:
+    async def run():
+        with request_slots(4) as slots:
+            await asyncio.gather(*(call_llm_async(p) for p in prompts))
+        print(slots.peak)
+"""
+
+import asyncio
+import contextvars
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+
+_slots: contextvars.ContextVar["RequestSlots | None"] = contextvars.ContextVar("llm_request_slots", default=None)
+
+
+class RequestSlots:
+    """At most *limit* provider requests in flight on one event loop."""
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self._semaphore = asyncio.Semaphore(self.limit)
+        self.in_flight = 0
+        self.peak = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        async with self._semaphore:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+
+    def snapshot(self) -> dict[str, int]:
+        return {"limit": self.limit, "peak": self.peak}
+
+
+@contextmanager
+def request_slots(limit: int):
+    """Cap provider requests started inside the block at *limit*."""
+    slots = RequestSlots(limit)
+    token = _slots.set(slots)
+    try:
+        yield slots
+    finally:
+        _slots.reset(token)
+
+
+def request_slot():
+    """``async with`` one slot of the current run, or nothing outside :func:`request_slots`."""
+    slots = _slots.get()
+    return slots.slot() if slots is not None else nullcontext()
+
+
+async def to_thread_in_slot(func, /, *args, **kwargs):
+    """``asyncio.to_thread`` holding one slot: for blocking calls that make one request at a time."""
+    async with request_slot():
+        return await asyncio.to_thread(func, *args, **kwargs)
@@ -0,0 +1,286 @@
+"""Persistent LLM response cache (SQLite-backed).
+
+Re-running ``hn2md plan``, ``audit_news gen-summary`` or a resumed release
+sends byte-identical prompts again; with Gemini's strict daily cap that
+burns scarce quota.  ``call_llm``/``call_llm_async`` look responses up here
+before touching any provider.
+
+Key: SHA-256 over provider, model, temperature, max_tokens, response format
+and the hashes of the prompt, system prompt and image payload.  Entries
+expire per prompt type (discussions and rankings change during the day,
+article summaries and titles do not) and the table is trimmed
+least-recently-used first once it grows past ``CACHE_MAX_BYTES``.
+
+Only responses that pass ``contains_hallucination_markers`` and the caller's
+``validate`` callable are written; a cached entry that fails them is dropped
+on read, so a bad answer is retried on the next run instead of replayed.
+
+Bypass with ``HN2MD_NO_LLM_CACHE=1``, ``with bypass_llm_cache():``,
+``call_llm(..., use_cache=False)`` or the ``--no-llm-cache`` CLI flags.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from src.db.connection import get_db
+from src.security.content_sanitizer import contains_hallucination_markers
+
+logger = logging.getLogger(__name__)
+
+BYPASS_ENV = "HN2MD_NO_LLM_CACHE"
+
+DAY_SECONDS = 24 * 60 * 60
+# Time-to-live per prompt type; discussions and rankings move during the day
+CACHE_TTL_SECONDS = {
+    "article": 30 * DAY_SECONDS,
+    "title": 30 * DAY_SECONDS,
+    "image": 30 * DAY_SECONDS,
+    "tags": 7 * DAY_SECONDS,
+    "discussion": DAY_SECONDS // 2,
+    "ranking": DAY_SECONDS // 2,
+    # Multi-story requests include discussions
+    "batch": DAY_SECONDS // 2,
+}
+DEFAULT_TTL_SECONDS = 7 * DAY_SECONDS
+
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Evict down to this fraction of the budget so every insert does not evict
+_EVICT_TARGET_RATIO = 0.9
+
+_bypass_lock = threading.Lock()
+_bypass_depth = 0
+_table_ready: set[str] = set()
+
+
+def _sha256(value: str | None) -> str:
+    return hashlib.sha256((value or "").encode("utf-8")).hexdigest()
+
+
+def cache_key(
+    provider: str,
+    model: str | None,
+    prompt: str,
+    system_content: str | None = None,
+    temperature: float | None = None,
+    max_tokens: int | None = None,
+    response_format: dict | None = None,
+    image_data: str | None = None,
+) -> str:
+    """Return the cache key for one request."""
+    parts = {
+        "provider": (provider or "").lower(),
+        "model": model or "",
+        "prompt": _sha256(prompt),
+        "system": _sha256(system_content),
+        "image": _sha256(image_data) if image_data else "",
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "response_format": response_format or None,
+    }
+    return _sha256(json.dumps(parts, sort_keys=True, ensure_ascii=False))
+
+
+def request_cache_key(
+    config: dict,
+    llm_type: str,
+    model: str | None,
+    prompt: str,
+    system_content: str | None = None,
+    temperature: float | None = None,
+    max_tokens: int | None = None,
+    response_format: dict | None = None,
+    image_data: str | None = None,
+) -> str:
+    """Key a ``call_llm`` request by its primary provider and effective model.
+
+    An unset *model* resolves to the provider's configured default, so
+    changing the default model in config.json invalidates old entries.
+    """
+    resolved_model = model or (config.get(llm_type.lower()) or {}).get("model")
+    return cache_key(
+        llm_type, resolved_model, prompt, system_content, temperature, max_tokens, response_format, image_data
+    )
+
+
+def ttl_for(prompt_type: str | None) -> int:
+    return CACHE_TTL_SECONDS.get(prompt_type or "", DEFAULT_TTL_SECONDS)
+
+
+@contextmanager
+def bypass_llm_cache():
+    """Skip cache reads and writes inside the block (process-wide)."""
+    global _bypass_depth
+    with _bypass_lock:
+        _bypass_depth += 1
+    try:
+        yield
+    finally:
+        with _bypass_lock:
+            _bypass_depth -= 1
+
+
+def cache_bypassed() -> bool:
+    return _bypass_depth > 0 or os.environ.get(BYPASS_ENV, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+class LLMResponseCache:
+    """Response table with TTL expiry and LRU eviction under a byte budget."""
+
+    def __init__(self, db_path: str | None = None, max_bytes: int = CACHE_MAX_BYTES):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+
+    def _connect(self):
+        return get_db(self.db_path) if self.db_path else get_db()
+
+    def _ensure_table(self) -> None:
+        marker = self.db_path or ""
+        if marker in _table_ready:
+            return
+        with self._connect() as conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_response_cache (
+                cache_key TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                model TEXT,
+                prompt_type TEXT,
+                response TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_llm_response_cache_last_access ON llm_response_cache(last_access)"
+            )
+        _table_ready.add(marker)
+
+    def get(self, key: str) -> str | None:
+        """Return the cached response, or None when missing or expired."""
+        self._ensure_table()
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT response, expires_at FROM llm_response_cache WHERE cache_key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                conn.execute("DELETE FROM llm_response_cache WHERE cache_key = ?", (key,))
+                return None
+            conn.execute(
+                "UPDATE llm_response_cache SET last_access = ?, hits = hits + 1 WHERE cache_key = ?",
+                (now, key),
+            )
+            return row[0]
+
+    def put(self, key: str, response: str, provider: str, model: str | None, prompt_type: str | None) -> None:
+        """Store *response* and evict least-recently-used rows over budget."""
+        self._ensure_table()
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO llm_response_cache
+                    (cache_key, provider, model, prompt_type, response, size_bytes,
+                     created_at, expires_at, last_access, hits)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+                ON CONFLICT(cache_key) DO UPDATE SET
+                    response = excluded.response,
+                    size_bytes = excluded.size_bytes,
+                    created_at = excluded.created_at,
+                    expires_at = excluded.expires_at,
+                    last_access = excluded.last_access
+                """,
+                (key, provider, model, prompt_type, response, size, now, now + ttl_for(prompt_type), now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now: float) -> None:
+        conn.execute("DELETE FROM llm_response_cache WHERE expires_at <= ?", (now,))
+        total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM llm_response_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * _EVICT_TARGET_RATIO)
+        victims = []
+        for key, size in conn.execute("SELECT cache_key, size_bytes FROM llm_response_cache ORDER BY last_access"):
+            if total <= target:
+                break
+            victims.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM llm_response_cache WHERE cache_key = ?", victims)
+        logger.info("[LLM-CACHE] evicted %d entries to stay under %d bytes", len(victims), self.max_bytes)
+
+    def delete(self, key: str) -> None:
+        self._ensure_table()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM llm_response_cache WHERE cache_key = ?", (key,))
+
+    def stats(self) -> dict:
+        self._ensure_table()
+        with self._connect() as conn:
+            entries, size, hits = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0), COALESCE(SUM(hits), 0) FROM llm_response_cache"
+            ).fetchone()
+        return {"entries": entries, "bytes": size, "hits": hits, "max_bytes": self.max_bytes}
+
+    def clear(self) -> None:
+        self._ensure_table()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM llm_response_cache")
+
+
+_default_cache = LLMResponseCache()
+
+
+def acceptable(response: str | None, validate=None) -> bool:
+    """Whether *response* may be cached: non-empty, no refusal markers, accepted by *validate*."""
+    if not response or contains_hallucination_markers(response):
+        return False
+    return validate is None or bool(validate(response))
+
+
+def lookup(key: str, validate=None) -> str | None:
+    """Read from the default cache; cache failures never fail the LLM call.
+
+    An entry that is no longer ``acceptable`` is invalidated and treated as a miss.
+    """
+    if cache_bypassed():
+        return None
+    try:
+        cached = _default_cache.get(key)
+    except Exception as e:
+        logger.warning(f"[LLM-CACHE] lookup failed: {e}")
+        return None
+    if cached is not None and not acceptable(cached, validate):
+        logger.info("[LLM-CACHE] dropping cached response that fails validation")
+        invalidate(key)
+        return None
+    return cached
+
+
+def invalidate(key: str) -> None:
+    """Remove *key* from the default cache."""
+    try:
+        _default_cache.delete(key)
+    except Exception as e:
+        logger.warning(f"[LLM-CACHE] invalidate failed: {e}")
+
+
+def store(key: str, response: str, provider: str, model: str | None, prompt_type: str | None, validate=None) -> None:
+    """Write to the default cache; responses that are not ``acceptable`` are never cached."""
+    if cache_bypassed() or not acceptable(response, validate):
+        return
+    try:
+        _default_cache.put(key, response, provider, model, prompt_type)
+    except Exception as e:
+        logger.warning(f"[LLM-CACHE] store failed: {e}")
@@ -1,53 +1,302 @@
-"""Unified retry decorator for LLM provider calls."""
+"""Shared retry engine for sync and async code.
 
+:class:`RetryPolicy` decides whether, and how long, to wait before the next
+attempt (:meth:`RetryPolicy.next_delay`); :func:`retry_call` and
+:func:`aretry_call` run a callable under a policy, and :func:`with_retry` /
+:func:`with_async_retry` wrap provider methods with them.  Loops that keep
+their own structure (``BaseStage.run``, ``FetchStage``, the Gemini SDK loop)
+ask the policy or :func:`deadline_allows` before sleeping.
+
+- **Server hints**: an HTTP ``Retry-After`` header (seconds or HTTP date) or a
+  Gemini ``retryDelay`` in the error text replaces the computed backoff.
+- **Run deadline**: :func:`run_deadline` stores a monotonic deadline in a
+  ``ContextVar`` (inherited by asyncio tasks and ``asyncio.to_thread``
+  workers); no retry waits past it, however deeply it is nested.
+- **Per-host budgets**: ``retry_budget`` allows each host at most
+  ``HOST_RETRY_BUDGET`` retries per ``HOST_RETRY_WINDOW`` seconds across all
+  callers, so a struggling host is not hammered by every loop at once.
+
+Exceptions with a false ``retryable`` attribute (e.g.
+``streaming.StreamRejected``) are raised at once instead of retried.
+Each retry is counted on the current ``llm_calls`` row (``accounting.note_retry``).
+"""
+
+import asyncio
+import contextvars
 import functools
 import logging
 import random
+import threading
 import time
+from collections import defaultdict, deque
 from collections.abc import Callable
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
 from typing import Any, TypeVar
 
+from src.llm.accounting import note_retry
+from src.llm.rate_limit import retry_delay_hint
+
 logger = logging.getLogger(__name__)
 
 F = TypeVar("F", bound=Callable[..., Any])
 
+HOST_RETRY_BUDGET = 20
+HOST_RETRY_WINDOW = 60.0
+# A server asking for a longer wait than this will not be retried
+MAX_HINTED_WAIT = 120.0
+
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar("retry_deadline", default=None)
+
+
+@contextmanager
+def run_deadline(seconds: float | None):
+    """Let retries inside the block wait at most until *seconds* from now (nested blocks only shorten it)."""
+    if seconds is None:
+        yield
+        return
+    current = _deadline.get()
+    deadline = time.monotonic() + max(0.0, seconds)
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def time_left() -> float | None:
+    """Seconds until the current run deadline, or None without one."""
+    deadline = _deadline.get()
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+
+def deadline_allows(delay: float) -> bool:
+    """Whether waiting *delay* seconds still ends before the run deadline."""
+    remaining = time_left()
+    return remaining is None or delay < remaining
+
+
+def retry_after_seconds(failure: object) -> float | None:
+    """Seconds the server asked to wait before retrying *failure*, if it said.
+
+    Reads a ``retry_after`` attribute, the ``Retry-After`` header of a
+    response (or of an error's ``.response``), or a ``retryDelay`` in the
+    error text.
+    """
+    hinted = getattr(failure, "retry_after", None)
+    if isinstance(hinted, int | float):
+        return float(hinted)
+    response = failure if hasattr(failure, "status_code") else getattr(failure, "response", None)
+    headers = getattr(response, "headers", None)
+    value = headers.get("Retry-After") if headers is not None and hasattr(headers, "get") else None
+    if isinstance(value, str) and value.strip():
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(UTC)).total_seconds())
+        except (TypeError, ValueError):
+            pass
+    return retry_delay_hint(str(failure)) if isinstance(failure, BaseException) else None
+
+
+class RetryBudget:
+    """Sliding-window retry allowance per host, shared by every retry loop in the process."""
+
+    def __init__(self, limit: int = HOST_RETRY_BUDGET, window: float = HOST_RETRY_WINDOW):
+        self.limit = limit
+        self.window = window
+        self._lock = threading.Lock()
+        self._spent: dict[str, deque[float]] = defaultdict(deque)
+        self._denied: dict[str, int] = defaultdict(int)
+
+    def spend(self, host: str) -> bool:
+        """Take one retry for *host*; False when its budget for the window is used up."""
+        now = time.monotonic()
+        with self._lock:
+            spent = self._spent[host]
+            while spent and spent[0] <= now - self.window:
+                spent.popleft()
+            if len(spent) >= self.limit:
+                self._denied[host] += 1
+                return False
+            spent.append(now)
+            return True
+
+    def snapshot(self) -> dict[str, dict[str, int]]:
+        with self._lock:
+            return {
+                host: {"retries": len(self._spent[host]), "denied": self._denied[host]}
+                for host in sorted(set(self._spent) | set(self._denied))
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._spent.clear()
+            self._denied.clear()
+
+
+# 全局重试预算
+retry_budget = RetryBudget()
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Exponential backoff with jitter: ``min(backoff_max, backoff_base * 2**attempt + U(0, jitter))``."""
+
+    max_retries: int = 3
+    backoff_base: float = 2.0
+    backoff_max: float = 30.0
+    jitter: float = 1.0
 
-def with_retry(max_retries: int = 3, backoff_base: float = 2.0, backoff_max: float = 30.0) -> Callable[[F], F]:
+    def backoff(self, attempt: int) -> float:
+        return min(self.backoff_max, self.backoff_base * (2**attempt) + random.uniform(0, self.jitter))
+
+    def next_delay(self, attempt: int, failure: object = None, host: str | None = None) -> float | None:
+        """Seconds to wait after failed *attempt* (0-based), or None to stop retrying.
+
+        *failure* is the exception or response that failed; its server hint
+        wins over the backoff.  Stops when retries are used up, the failure
+        is not ``retryable``, the server asks for more than
+        ``MAX_HINTED_WAIT``, the wait would pass the run deadline, or *host*
+        has no retry budget left.
+        """
+        if attempt >= self.max_retries or not getattr(failure, "retryable", True):
+            return None
+        hinted = retry_after_seconds(failure) if failure is not None else None
+        if hinted is not None and hinted > MAX_HINTED_WAIT:
+            logger.warning(f"[RETRY] server asked for {hinted:.0f}s, not retrying")
+            return None
+        delay = hinted if hinted is not None else self.backoff(attempt)
+        if not deadline_allows(delay):
+            logger.warning(f"[RETRY] {delay:.1f}s wait would pass the run deadline ({time_left():.1f}s left)")
+            return None
+        if host and not retry_budget.spend(host):
+            logger.warning(f"[RETRY] retry budget for {host} used up, not retrying")
+            return None
+        return delay
+
+
+def _log_retry(attempt: int, policy: RetryPolicy, failure: object, delay: float) -> None:
+    logger.warning("Retry %d/%d: %s. Wait %.1fs", attempt + 1, policy.max_retries, failure, delay)
+    note_retry()
+
+
+def retry_call(
+    func: Callable[..., Any],
+    *args,
+    policy: RetryPolicy | None = None,
+    host: str | None = None,
+    retry_on: tuple[type[BaseException], ...] = (Exception,),
+    retry_result: Callable[[Any], bool] | None = None,
+    **kwargs,
+) -> Any:
+    """Call *func* until it succeeds under *policy*.
+
+    Exceptions in *retry_on* are retried (the last one is raised); results
+    for which *retry_result* is true are retried too (the last one is
+    returned).
+    """
+    policy = policy or RetryPolicy()
+    attempt = 0
+    while True:
+        try:
+            result = func(*args, **kwargs)
+        except retry_on as e:
+            delay = policy.next_delay(attempt, e, host)
+            if delay is None:
+                raise
+            failure: object = e
+        else:
+            if retry_result is None or not retry_result(result):
+                return result
+            delay = policy.next_delay(attempt, result, host)
+            if delay is None:
+                return result
+            failure = "unusable result"
+        _log_retry(attempt, policy, failure, delay)
+        time.sleep(delay)
+        attempt += 1
+
+
+async def aretry_call(
+    func: Callable[..., Any],
+    *args,
+    policy: RetryPolicy | None = None,
+    host: str | None = None,
+    retry_on: tuple[type[BaseException], ...] = (Exception,),
+    retry_result: Callable[[Any], bool] | None = None,
+    **kwargs,
+) -> Any:
+    """Async :func:`retry_call`: awaits *func* and backs off with ``asyncio.sleep``."""
+    policy = policy or RetryPolicy()
+    attempt = 0
+    while True:
+        try:
+            result = await func(*args, **kwargs)
+        except retry_on as e:
+            delay = policy.next_delay(attempt, e, host)
+            if delay is None:
+                raise
+            failure: object = e
+        else:
+            if retry_result is None or not retry_result(result):
+                return result
+            delay = policy.next_delay(attempt, result, host)
+            if delay is None:
+                return result
+            failure = "unusable result"
+        _log_retry(attempt, policy, failure, delay)
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+def with_retry(
+    max_retries: int = 3, backoff_base: float = 2.0, backoff_max: float = 30.0, host: str | None = None
+) -> Callable[[F], F]:
     """Retry decorator with exponential backoff and jitter.
 
     Args:
         max_retries: Maximum number of retries (default 3, so 4 total attempts).
         backoff_base: Base multiplier for exponential backoff (default 2.0).
         backoff_max: Maximum backoff delay in seconds (default 30.0).
+        host: Charge retries to this host's shared retry budget.
 
     Usage:
         @with_retry(max_retries=3, backoff_base=2.0, backoff_max=30.0)
         def my_function():
             ...
     """
+    policy = RetryPolicy(max_retries, backoff_base, backoff_max)
 
     def decorator(func):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            for attempt in range(max_retries + 1):
-                try:
-                    return func(*args, **kwargs)
-                except Exception as e:
-                    if attempt < max_retries:
-                        delay = min(
-                            backoff_max,
-                            backoff_base * (2**attempt) + random.uniform(0, 1),
-                        )
-                        logger.warning(
-                            "Retry %d/%d: %s. Wait %.1fs",
-                            attempt + 1,
-                            max_retries,
-                            e,
-                            delay,
-                        )
-                        time.sleep(delay)
-                    else:
-                        raise
+            return retry_call(functools.partial(func, *args, **kwargs), policy=policy, host=host)
+
+        return wrapper
+
+    return decorator
+
+
+def with_async_retry(
+    max_retries: int = 3, backoff_base: float = 2.0, backoff_max: float = 30.0, host: str | None = None
+) -> Callable[[F], F]:
+    """Async variant of :func:`with_retry`; backs off with ``asyncio.sleep``.
+
+    Usage:
+        @with_async_retry(max_retries=2)
+        async def my_coroutine():
+            ...
+    """
+    policy = RetryPolicy(max_retries, backoff_base, backoff_max)
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await aretry_call(functools.partial(func, *args, **kwargs), policy=policy, host=host)
 
         return wrapper
 
@@ -0,0 +1,271 @@
+"""Quota-, latency- and context-aware provider/model routing.
+
+With ``llm_type="auto"`` (or ``"DEFAULT_LLM": "auto"`` in config.json),
+``call_llm``/``call_llm_async`` ask :data:`model_router` for an ordered list
+of (provider, model) candidates instead of walking a fixed fallback chain.
+
+Each candidate gets an expected completion time for the request class
+(the ``prompt_type``: article, discussion, title, ranking, tags, image,
+batch)::
+
+    expected = mean_latency / (1 - error_rate) * quota_pressure
+
+- ``mean_latency``: rolling mean of the last ``ROLLING_WINDOW`` successful
+  calls for the class, else for the model, else ``PRIOR_LATENCY_SECONDS``.
+- ``error_rate``: rolling failure share, smoothed towards ``PRIOR_ERROR_RATE``
+  so one early failure does not bury a model.
+- ``quota_pressure``: ``1 + QUOTA_PRESSURE / remaining`` for models with a
+  daily cap (remaining requests from ``daily_status.quota_ledger``), so a
+  scarce quota is spent only when it buys real speed.
+
+Candidates that are disabled today, out of daily quota, cannot take images
+or whose context window cannot hold prompt plus ``max_tokens`` are skipped.
+Every decision is logged with ``[ROUTER]`` and counted; ``snapshot()``
+returns the counts and per-model statistics for stage receipts.
+"""
+
+import logging
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from dataclasses import dataclass
+
+from src.llm.daily_status import (
+    GEMINI_FALLBACK_MODEL,
+    GEMINI_STRICT_LIMIT_PER_DAY,
+    _is_forbidden_gemini_model,
+    get_daily_model_status,
+)
+
+logger = logging.getLogger(__name__)
+
+AUTO = "auto"
+
+# Context windows (tokens); config.json llm.<type>.context_tokens overrides the provider default
+PROVIDER_CONTEXT_TOKENS = {"grok": 131_072, "gemini": 1_048_576, "moonshot": 131_072}
+MODEL_CONTEXT_TOKENS = {
+    "moonshot-v1-8k": 8_192,
+    "moonshot-v1-32k": 32_768,
+    "moonshot-v1-128k": 131_072,
+}
+DEFAULT_CONTEXT_TOKENS = 32_768
+
+# Requests per day for capped models (None: no local cap)
+DAILY_LIMITS = {
+    ("gemini", "gemini-3-flash-preview"): GEMINI_STRICT_LIMIT_PER_DAY,
+    ("gemini", GEMINI_FALLBACK_MODEL): 500,
+}
+GEMINI_MODELS = ("gemini-3-flash-preview", GEMINI_FALLBACK_MODEL)
+VISION_PROVIDERS = ("grok", "gemini")
+
+ROLLING_WINDOW = 20
+PRIOR_LATENCY_SECONDS = {"grok": 12.0, "gemini": 10.0, "moonshot": 15.0}
+PRIOR_ERROR_RATE = 0.1
+PRIOR_WEIGHT = 3
+MAX_ERROR_RATE = 0.95
+QUOTA_PRESSURE = 2.0
+# Daily usage and disabled flags are re-read from the quota ledger at most this often
+QUOTA_REFRESH_SECONDS = 30.0
+
+
+def estimate_tokens(text: str | None) -> int:
+    """Rough token count: ~4 ASCII characters per token, one per CJK/other character."""
+    if not text:
+        return 0
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return ascii_chars // 4 + (len(text) - ascii_chars)
+
+
+def context_tokens(provider: str, model: str | None = None, config: dict | None = None) -> int:
+    """Context window of *provider*/*model*."""
+    configured = ((config or {}).get(provider) or {}).get("context_tokens")
+    if configured:
+        return int(configured)
+    if model in MODEL_CONTEXT_TOKENS:
+        return MODEL_CONTEXT_TOKENS[model]
+    return PROVIDER_CONTEXT_TOKENS.get(provider, DEFAULT_CONTEXT_TOKENS)
+
+
+@dataclass(frozen=True)
+class Route:
+    provider: str
+    model: str
+    expected_seconds: float
+
+
+class ModelRouter:
+    """Rolling per-model statistics and the routing decision built on them."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples: dict[tuple[str, str, str], deque] = defaultdict(lambda: deque(maxlen=ROLLING_WINDOW))
+        self._decisions: Counter = Counter()
+        self._input_tokens: Counter = Counter()
+        self._quota: dict[tuple[str, str], tuple[bool, int]] = {}
+        self._quota_read_at = 0.0
+
+    # -- Statistics --------------------------------------------------------
+
+    def record(
+        self,
+        provider: str,
+        model: str | None,
+        request_class: str | None,
+        seconds: float,
+        ok: bool,
+        input_tokens: int = 0,
+    ) -> None:
+        """Add one finished call to the rolling window (and its estimated input tokens to the totals)."""
+        key = (provider, model or "", request_class or "default")
+        with self._lock:
+            self._samples[key].append((seconds, ok))
+            self._input_tokens[f"{provider}/{model or ''}"] += input_tokens
+            if ok and (provider, model) in DAILY_LIMITS and (provider, model) in self._quota:
+                disabled, used = self._quota[(provider, model)]
+                self._quota[(provider, model)] = (disabled, used + 1)
+
+    def _window(self, provider: str, model: str, request_class: str) -> list[tuple[float, bool]]:
+        samples = list(self._samples.get((provider, model, request_class), ()))
+        if len(samples) >= PRIOR_WEIGHT:
+            return samples
+        # Too little data for this class: borrow the model's other classes
+        return [s for (p, m, _), window in self._samples.items() if (p, m) == (provider, model) for s in window]
+
+    def _latency_and_error_rate(self, provider: str, model: str, request_class: str) -> tuple[float, float]:
+        samples = self._window(provider, model, request_class)
+        successes = [seconds for seconds, ok in samples if ok]
+        latency = sum(successes) / len(successes) if successes else PRIOR_LATENCY_SECONDS.get(provider, 15.0)
+        failures = len(samples) - len(successes)
+        error_rate = (failures + PRIOR_ERROR_RATE * PRIOR_WEIGHT) / (len(samples) + PRIOR_WEIGHT)
+        return latency, min(error_rate, MAX_ERROR_RATE)
+
+    def latency_quantile(
+        self, provider: str, model: str | None, request_class: str | None, quantile: float
+    ) -> float | None:
+        """*quantile* of recent successful latencies (None until ``PRIOR_WEIGHT`` successes)."""
+        with self._lock:
+            samples = self._window(provider, model or "", request_class or "default")
+        successes = sorted(seconds for seconds, ok in samples if ok)
+        if len(successes) < PRIOR_WEIGHT:
+            return None
+        return successes[min(len(successes) - 1, int(quantile * len(successes)))]
+
+    # -- Quota ---------------------------------------------------------------
+
+    def _refresh_quota(self, models: list[tuple[str, str]]) -> None:
+        now = time.monotonic()
+        if now - self._quota_read_at < QUOTA_REFRESH_SECONDS and all(m in self._quota for m in models):
+            return
+        disabled, usage = get_daily_model_status()
+        with self._lock:
+            self._quota = {model: (model in disabled, usage.get(model, 0)) for model in models}
+            self._quota_read_at = now
+
+    def remaining_quota(self, provider: str, model: str) -> int | None:
+        """Requests left today for a capped model (None when uncapped)."""
+        limit = DAILY_LIMITS.get((provider, model))
+        if limit is None:
+            return None
+        _, used = self._quota.get((provider, model), (False, 0))
+        return max(0, limit - used)
+
+    # -- Routing -------------------------------------------------------------
+
+    def candidates(self, config: dict) -> list[tuple[str, str]]:
+        """Configured (provider, model) pairs, in the configured default's fallback order."""
+        from src.llm.async_client import FALLBACK_CHAINS
+
+        default = (config.get("default") or "grok").lower()
+        order = FALLBACK_CHAINS.get(default, FALLBACK_CHAINS["grok"])
+        pairs = []
+        for provider in order:
+            settings = config.get(provider) or {}
+            if not settings.get("api_key"):
+                continue
+            if provider == "gemini":
+                preferred = settings.get("model")
+                models = [preferred] if preferred in GEMINI_MODELS else []
+                pairs.extend(("gemini", m) for m in [*models, *(m for m in GEMINI_MODELS if m not in models)])
+            elif settings.get("model"):
+                pairs.append((provider, settings["model"]))
+        return [(p, m) for p, m in pairs if not (p == "gemini" and _is_forbidden_gemini_model(m))]
+
+    def route(
+        self,
+        config: dict,
+        request_class: str | None = None,
+        prompt: str = "",
+        system_content: str | None = None,
+        max_tokens: int | None = None,
+        image: bool = False,
+    ) -> list[Route]:
+        """Order usable candidates by expected completion time (fastest first)."""
+        request_class = request_class or "default"
+        pairs = self.candidates(config)
+        try:
+            self._refresh_quota(pairs)
+        except Exception as e:
+            logger.warning(f"[ROUTER] daily quota unavailable, routing on latency only: {e}")
+
+        needed = estimate_tokens(prompt) + estimate_tokens(system_content) + (max_tokens or 800)
+        routes, skipped = [], []
+        with self._lock:
+            for provider, model in pairs:
+                disabled, _ = self._quota.get((provider, model), (False, 0))
+                remaining = self.remaining_quota(provider, model)
+                if image and provider not in VISION_PROVIDERS:
+                    skipped.append(f"{provider}/{model}: no image input")
+                elif disabled or remaining == 0:
+                    skipped.append(f"{provider}/{model}: no quota today")
+                elif needed > context_tokens(provider, model, config):
+                    skipped.append(f"{provider}/{model}: {needed} tokens exceed context")
+                else:
+                    latency, error_rate = self._latency_and_error_rate(provider, model, request_class)
+                    pressure = 1.0 + QUOTA_PRESSURE / remaining if remaining else 1.0
+                    routes.append(Route(provider, model, latency / (1.0 - error_rate) * pressure))
+            routes.sort(key=lambda route: route.expected_seconds)
+            if routes:
+                self._decisions[(request_class, f"{routes[0].provider}/{routes[0].model}")] += 1
+
+        ranked = ", ".join(f"{r.provider}/{r.model}={r.expected_seconds:.1f}s" for r in routes) or "none"
+        logger.info(f"[ROUTER] {request_class}: {ranked}" + (f" (skipped {'; '.join(skipped)})" if skipped else ""))
+        return routes
+
+    def context_tokens_for(self, config: dict, llm_type: str | None = None) -> int:
+        """Context window a request for *llm_type* can rely on (largest candidate for ``auto``)."""
+        llm_type = (llm_type or config.get("default") or "grok").lower()
+        if llm_type != AUTO:
+            return context_tokens(llm_type, (config.get(llm_type) or {}).get("model"), config)
+        windows = [context_tokens(p, m, config) for p, m in self.candidates(config)]
+        return max(windows, default=DEFAULT_CONTEXT_TOKENS)
+
+    def snapshot(self) -> dict:
+        """Routing decisions, rolling statistics and input token totals, for logs and receipts."""
+        with self._lock:
+            decisions: dict[str, dict[str, int]] = defaultdict(dict)
+            for (request_class, target), count in sorted(self._decisions.items()):
+                decisions[request_class][target] = count
+            models = {}
+            for provider, model in sorted({(p, m) for p, m, _ in self._samples}):
+                samples = [s for (p, m, _), w in self._samples.items() if (p, m) == (provider, model) for s in w]
+                successes = [seconds for seconds, ok in samples if ok]
+                models[f"{provider}/{model}"] = {
+                    "calls": len(samples),
+                    "error_rate": round(1 - len(successes) / len(samples), 3),
+                    "mean_latency_seconds": round(sum(successes) / len(successes), 3) if successes else None,
+                    "remaining_quota": self.remaining_quota(provider, model),
+                }
+            input_tokens = {target: count for target, count in sorted(self._input_tokens.items()) if count}
+        return {"decisions": dict(decisions), "models": models, "input_tokens": input_tokens}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._decisions.clear()
+            self._input_tokens.clear()
+            self._quota.clear()
+            self._quota_read_at = 0.0
+
+
+# 全局路由器实例
+model_router = ModelRouter()
@@ -0,0 +1,334 @@
+"""Single-flight coalescing of identical in-flight LLM requests.
+
+The audit commands, the plan stage and skill scripts can ask for the same
+summary at the same moment, and a concurrent plan stage can hit duplicate
+stories.  ``call_llm``/``call_llm_async`` run every cache miss through
+:data:`single_flight`, keyed by :func:`flight_key` (the response-cache key
+over a whitespace-normalized prompt):
+
+- **In process**: the first caller (the leader) makes the request; callers
+  arriving while it runs wait for it and share its result (threads through
+  an ``Event``, coroutines through a ``Future`` of their event loop).
+- **Across processes**: the leader holds a lease row in ``llm_inflight``.
+  Other processes poll the row until the leader writes its response there,
+  or take over once the lease expires.  Only callers that were already
+  waiting get the published response: a caller arriving after the leader
+  finished makes its own request, so ``use_cache=False``, a bypassed cache
+  and ``validate`` are never skipped by a leftover row.  A failed request,
+  or one ``response_cache.acceptable`` rejects, deletes its row, so waiters
+  make their own attempt.  A waiter stops
+  polling when the ``run_deadline`` leaves no time for another poll and
+  returns ``""``, like a request whose providers all failed.
+- A cancelled async leader hands over: its waiters retry, and one of them
+  becomes the new leader instead of being cancelled with it.
+
+Disable the cross-process lease with ``HN2MD_NO_LLM_SINGLE_FLIGHT=1``; lease
+errors never fail the LLM call, it then simply runs uncoalesced.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+
+from src.db.connection import get_db
+from src.llm import response_cache
+from src.llm.retry import deadline_allows
+
+logger = logging.getLogger(__name__)
+
+SHARED_DISABLE_ENV = "HN2MD_NO_LLM_SINGLE_FLIGHT"
+# Longer than a typical retry ladder; waiters take over a lease older than this
+LEASE_SECONDS = 180.0
+# Finished responses stay readable this long for waiters still polling the lease
+RESULT_SECONDS = 60.0
+POLL_SECONDS = 0.5
+
+LEADER = "leader"
+DONE = "done"
+WAIT = "wait"
+
+# Result of a cancelled async leader: its waiters try again themselves
+_HANDOVER = object()
+
+_table_ready: set[str] = set()
+
+
+def _normalize(text: str | None) -> str | None:
+    return " ".join(text.split()) if text else text
+
+
+def flight_key(
+    config: dict,
+    llm_type: str,
+    model: str | None,
+    prompt: str,
+    system_content: str | None = None,
+    temperature: float | None = None,
+    max_tokens: int | None = None,
+    response_format: dict | None = None,
+    image_data: str | None = None,
+) -> str:
+    """Request key with whitespace-normalized prompts (layout-only differences coalesce)."""
+    return response_cache.request_cache_key(
+        config,
+        llm_type,
+        model,
+        _normalize(prompt),
+        _normalize(system_content),
+        temperature,
+        max_tokens,
+        response_format,
+        image_data,
+    )
+
+
+class FlightLease:
+    """Cross-process lease rows in ``llm_inflight``."""
+
+    def __init__(self, db_path: str | None = None):
+        self.db_path = db_path
+
+    def _connect(self):
+        return get_db(self.db_path) if self.db_path else get_db()
+
+    def _ensure_table(self) -> None:
+        marker = self.db_path or ""
+        if marker in _table_ready:
+            return
+        with self._connect() as conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_inflight (
+                flight_key TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                response TEXT
+            )
+            """)
+        _table_ready.add(marker)
+
+    def acquire(
+        self, key: str, owner: str, lease_seconds: float = LEASE_SECONDS, joined: bool = False
+    ) -> tuple[str, str | None]:
+        """``(LEADER, None)``, ``(DONE, response)`` or ``(WAIT, None)`` for *owner*.
+
+        ``DONE`` only goes to a caller that *joined* the flight (got ``WAIT``
+        before); a newcomer finding a finished response leads a fresh request.
+        """
+        self._ensure_table()
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM llm_inflight WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "INSERT INTO llm_inflight (flight_key, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(flight_key) DO NOTHING",
+                (key, owner, now + lease_seconds),
+            )
+            holder, response = conn.execute(
+                "SELECT owner, response FROM llm_inflight WHERE flight_key = ?", (key,)
+            ).fetchone()
+            if response is not None and not joined:
+                conn.execute(
+                    "UPDATE llm_inflight SET owner = ?, expires_at = ?, response = NULL WHERE flight_key = ?",
+                    (owner, now + lease_seconds, key),
+                )
+                return LEADER, None
+        if response is not None:
+            return DONE, response
+        return (LEADER, None) if holder == owner else (WAIT, None)
+
+    def finish(self, key: str, owner: str, response: str) -> None:
+        """Publish *response* to waiters, or drop the lease when the request failed."""
+        with self._connect() as conn:
+            if response:
+                conn.execute(
+                    "UPDATE llm_inflight SET response = ?, expires_at = ? WHERE flight_key = ? AND owner = ?",
+                    (response, time.time() + RESULT_SECONDS, key, owner),
+                )
+            else:
+                conn.execute("DELETE FROM llm_inflight WHERE flight_key = ? AND owner = ?", (key, owner))
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = ""
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one request."""
+
+    def __init__(self, lease: FlightLease | None = None, poll_seconds: float = POLL_SECONDS):
+        self.lease = lease or FlightLease()
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+        self._futures: dict[tuple[asyncio.AbstractEventLoop, str], asyncio.Future] = {}
+        self.reset()
+
+    @staticmethod
+    def _shared() -> bool:
+        return os.environ.get(SHARED_DISABLE_ENV, "").strip().lower() not in ("1", "true", "yes", "on")
+
+    def _count(self, field: str) -> None:
+        with self._lock:
+            self._stats[field] += 1
+
+    # -- Blocking callers --------------------------------------------------
+
+    def do(self, key: str, fn, validate=None):
+        """Return ``fn()``, or the result of an identical call already in flight.
+
+        Results ``response_cache.acceptable(result, validate)`` rejects are not
+        published to other processes.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats["leaders"] += 1
+            else:
+                self._stats["coalesced"] += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run_leased(key, fn, validate)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _run_leased(self, key: str, fn, validate=None):
+        if not self._shared():
+            return fn()
+        owner = f"{os.getpid()}:{uuid.uuid4().hex}"
+        joined = False
+        try:
+            while True:
+                state, response = self.lease.acquire(key, owner, joined=joined)
+                if state == DONE:
+                    self._count("shared")
+                    return response
+                if state == LEADER:
+                    break
+                joined = True
+                if not deadline_allows(self.poll_seconds):
+                    logger.warning("[SINGLE-FLIGHT] run deadline reached while waiting for another process")
+                    return ""
+                time.sleep(self.poll_seconds)
+        except Exception as e:
+            logger.warning(f"[SINGLE-FLIGHT] lease unavailable, calling directly: {e}")
+            return fn()
+
+        result = ""
+        try:
+            result = fn()
+            return result
+        finally:
+            self._finish(key, owner, result, validate)
+
+    # -- Async callers -----------------------------------------------------
+
+    async def ado(self, key: str, coro_fn, validate=None):
+        """Async :meth:`do`: await ``coro_fn()`` or an identical call in flight on this loop.
+
+        When the leader is cancelled its waiters are not: they retry, and the
+        first one leads the request again.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                future = self._futures.get((loop, key))
+                leader = future is None
+                if leader:
+                    future = self._futures[(loop, key)] = loop.create_future()
+                    # Nobody may be waiting: do not warn about an unretrieved exception
+                    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+                    self._stats["leaders"] += 1
+                else:
+                    self._stats["coalesced"] += 1
+            if leader:
+                break
+            result = await asyncio.shield(future)
+            if result is not _HANDOVER:
+                return result
+
+        try:
+            result = await self._arun_leased(key, coro_fn, validate)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.set_result(_HANDOVER)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._futures[(loop, key)]
+
+    async def _arun_leased(self, key: str, coro_fn, validate=None):
+        if not self._shared():
+            return await coro_fn()
+        owner = f"{os.getpid()}:{uuid.uuid4().hex}"
+        joined = False
+        try:
+            while True:
+                state, response = await asyncio.to_thread(self.lease.acquire, key, owner, joined=joined)
+                if state == DONE:
+                    self._count("shared")
+                    return response
+                if state == LEADER:
+                    break
+                joined = True
+                if not deadline_allows(self.poll_seconds):
+                    logger.warning("[SINGLE-FLIGHT] run deadline reached while waiting for another process")
+                    return ""
+                await asyncio.sleep(self.poll_seconds)
+        except Exception as e:
+            logger.warning(f"[SINGLE-FLIGHT] lease unavailable, calling directly: {e}")
+            return await coro_fn()
+
+        result = ""
+        try:
+            result = await coro_fn()
+            return result
+        finally:
+            await asyncio.to_thread(self._finish, key, owner, result, validate)
+
+    # -- Shared ------------------------------------------------------------
+
+    def _finish(self, key: str, owner: str, result: str, validate=None) -> None:
+        # A rejected result is dropped like a failure: waiters make their own attempt
+        if not response_cache.acceptable(result, validate):
+            result = ""
+        try:
+            self.lease.finish(key, owner, result)
+        except Exception as e:
+            # Waiters take over when the lease expires
+            logger.warning(f"[SINGLE-FLIGHT] could not release lease: {e}")
+
+    def snapshot(self) -> dict:
+        """Leading callers, callers that joined one in process, and answers shared across processes."""
+        with self._lock:
+            return dict(self._stats)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats = {"leaders": 0, "coalesced": 0, "shared": 0}
+
+
+# 全局单飞实例
+single_flight = SingleFlight()
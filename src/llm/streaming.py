@@ -0,0 +1,112 @@
+"""Streaming completions with early abort on rejected output.
+
+Without streaming a refusal such as "As an AI language model, I cannot..."
+is only noticed after the whole completion has been generated and paid
+for.  Providers' ``astream`` reads the completion incrementally (SSE for the
+OpenAI-compatible Grok/Moonshot endpoints, ``generate_content_stream`` /
+``streamGenerateContent?alt=sse`` for Gemini) and feeds every delta to a
+:class:`StreamValidator`, which raises :class:`StreamRejected` as soon as a
+rejection marker appears.  Leaving the stream closes the connection, and
+``call_llm_async`` moves straight on to the next model in the route.
+
+Usage:
+    validator = StreamValidator()
+    text = await get_provider("grok").astream(prompt, validator=validator)
+"""
+
+import json
+import logging
+from collections.abc import AsyncIterable, Iterable, Iterator
+
+from src.security.content_sanitizer import HALLUCINATION_MARKERS
+
+logger = logging.getLogger(__name__)
+
+# Request classes whose free-text answers are streamed and validated
+STREAM_PROMPT_TYPES = frozenset({"article", "discussion", "title", "image"})
+
+
+class StreamRejected(Exception):
+    """A streamed completion hit a rejection marker and was aborted."""
+
+    # Not a transport error: retrying the same model would waste another request
+    retryable = False
+
+    def __init__(self, marker: str, partial: str):
+        super().__init__(f"rejection marker {marker!r} after {len(partial)} chars")
+        self.marker = marker
+        self.partial = partial
+
+
+class StreamValidator:
+    """Incremental rejection-marker check over a streamed completion.
+
+    Only the tail that could still complete a marker is re-scanned with each
+    delta, so validation stays linear in the completion length.
+    """
+
+    def __init__(self, markers: Iterable[str] = HALLUCINATION_MARKERS):
+        self._markers = tuple(marker.lower() for marker in markers)
+        self._overlap = max((len(marker) for marker in self._markers), default=1) - 1
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the text seen so far (a new attempt starts a new completion)."""
+        self._parts: list[str] = []
+        self._tail = ""
+
+    def feed(self, delta: str | None) -> None:
+        """Add one delta; raises :class:`StreamRejected` on a marker."""
+        if not delta:
+            return
+        self._parts.append(delta)
+        window = (self._tail + delta).lower()
+        for marker in self._markers:
+            if marker in window:
+                raise StreamRejected(marker, self.text)
+        self._tail = (self._tail + delta)[-self._overlap :] if self._overlap else ""
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+
+def _sse_payload(line: str) -> str | None:
+    """JSON payload of an SSE ``data:`` line ("" for ``[DONE]``, None otherwise)."""
+    if not line.startswith("data:"):
+        return None
+    data = line[5:].strip()
+    return "" if data == "[DONE]" else data
+
+
+def iter_sse_json(lines: Iterable[str]) -> Iterator[dict]:
+    """Decoded JSON events of a server-sent-events body."""
+    for line in lines:
+        payload = _sse_payload(line)
+        if payload == "":
+            return
+        if payload:
+            yield json.loads(payload)
+
+
+async def aiter_sse_json(lines: AsyncIterable[str]):
+    """Async variant of :func:`iter_sse_json`."""
+    async for line in lines:
+        payload = _sse_payload(line)
+        if payload == "":
+            return
+        if payload:
+            yield json.loads(payload)
+
+
+def openai_delta(event: dict) -> str:
+    """Text delta of an OpenAI-compatible ``chat.completion.chunk`` event."""
+    choices = event.get("choices") or [{}]
+    return (choices[0].get("delta") or {}).get("content") or ""
+
+
+def gemini_delta(event: dict) -> str:
+    """Text delta of a Gemini ``streamGenerateContent`` event."""
+    candidates = event.get("candidates") or [{}]
+    parts = (candidates[0].get("content") or {}).get("parts") or []
+    return "".join(part.get("text", "") for part in parts)
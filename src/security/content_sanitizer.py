@@ -106,6 +106,24 @@ def sanitize_for_html(value: str | None) -> str:
     return value
 
 
+# Phrases that show text comes from the LLM itself rather than the source
+HALLUCINATION_MARKERS = (
+    "As an AI",
+    "As a language model",
+    "I cannot",
+    "I'm sorry",
+    "I apologize",
+    "I don't have access",
+    "I'm unable to",
+    "As an assistant",
+    "I'm not able to",
+    "I was unable to",
+    "Note:",
+    "Disclaimer:",
+    "Please note that",
+)
+
+
 def contains_hallucination_markers(text: str | None) -> bool:
     """Check if text contains common LLM hallucination/rejection markers.
 
@@ -115,24 +133,8 @@ def contains_hallucination_markers(text: str | None) -> bool:
     if not text:
         return False
 
-    markers = [
-        "As an AI",
-        "As a language model",
-        "I cannot",
-        "I'm sorry",
-        "I apologize",
-        "I don't have access",
-        "I'm unable to",
-        "As an assistant",
-        "I'm not able to",
-        "I was unable to",
-        "Note:",
-        "Disclaimer:",
-        "Please note that",
-    ]
-
     text_lower = text.lower()
-    return any(marker.lower() in text_lower for marker in markers)
+    return any(marker.lower() in text_lower for marker in HALLUCINATION_MARKERS)
 
 
 def validate_summary_length(
@@ -4,6 +4,7 @@ import sqlite3
 import colorama
 
 from src.db.connection import get_db
+from src.utils.url_canonical import canonicalize_url
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +34,13 @@ def init_database(db_path: str | None = None) -> None:
             content_source_doi TEXT,
             discuss_summary_source_type TEXT,
             discuss_summary_source_url TEXT,
+            content_summary_source_type TEXT,
+            canonical_url TEXT,
+            page_canonical_url TEXT,
+            hn_points INTEGER,
+            hn_comments INTEGER,
+            hn_rank INTEGER,
+            hn_posted_at TEXT,
             created_at TIMESTAMP
         )
         """)
@@ -61,6 +69,22 @@ def init_database(db_path: str | None = None) -> None:
             cursor.execute("ALTER TABLE news ADD COLUMN discuss_summary_source_type TEXT")
         if "discuss_summary_source_url" not in columns:
             cursor.execute("ALTER TABLE news ADD COLUMN discuss_summary_source_url TEXT")
+        if "content_summary_source_type" not in columns:
+            cursor.execute("ALTER TABLE news ADD COLUMN content_summary_source_type TEXT")
+        if "canonical_url" not in columns:
+            cursor.execute("ALTER TABLE news ADD COLUMN canonical_url TEXT")
+        if "page_canonical_url" not in columns:
+            cursor.execute("ALTER TABLE news ADD COLUMN page_canonical_url TEXT")
+        if "hn_points" not in columns:
+            cursor.execute("ALTER TABLE news ADD COLUMN hn_points INTEGER")
+        if "hn_comments" not in columns:
+            cursor.execute("ALTER TABLE news ADD COLUMN hn_comments INTEGER")
+        if "hn_rank" not in columns:
+            cursor.execute("ALTER TABLE news ADD COLUMN hn_rank INTEGER")
+        if "hn_posted_at" not in columns:
+            cursor.execute("ALTER TABLE news ADD COLUMN hn_posted_at TEXT")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_news_canonical_url ON news(canonical_url)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_news_page_canonical_url ON news(page_canonical_url)")
 
         # 创建过滤域名表
         cursor.execute("""
@@ -102,6 +126,13 @@ def init_database(db_path: str | None = None) -> None:
             content_source_doi TEXT,
             discuss_summary_source_type TEXT,
             discuss_summary_source_url TEXT,
+            content_summary_source_type TEXT,
+            canonical_url TEXT,
+            page_canonical_url TEXT,
+            hn_points INTEGER,
+            hn_comments INTEGER,
+            hn_rank INTEGER,
+            hn_posted_at TEXT,
             created_at TIMESTAMP,
             archived_at TIMESTAMP
         )
@@ -130,6 +161,25 @@ def init_database(db_path: str | None = None) -> None:
             cursor.execute("ALTER TABLE news_history ADD COLUMN discuss_summary_source_type TEXT")
         if "discuss_summary_source_url" not in history_columns:
             cursor.execute("ALTER TABLE news_history ADD COLUMN discuss_summary_source_url TEXT")
+        if "content_summary_source_type" not in history_columns:
+            cursor.execute("ALTER TABLE news_history ADD COLUMN content_summary_source_type TEXT")
+        if "canonical_url" not in history_columns:
+            cursor.execute("ALTER TABLE news_history ADD COLUMN canonical_url TEXT")
+        if "page_canonical_url" not in history_columns:
+            cursor.execute("ALTER TABLE news_history ADD COLUMN page_canonical_url TEXT")
+        if "hn_points" not in history_columns:
+            cursor.execute("ALTER TABLE news_history ADD COLUMN hn_points INTEGER")
+        if "hn_comments" not in history_columns:
+            cursor.execute("ALTER TABLE news_history ADD COLUMN hn_comments INTEGER")
+        if "hn_rank" not in history_columns:
+            cursor.execute("ALTER TABLE news_history ADD COLUMN hn_rank INTEGER")
+        if "hn_posted_at" not in history_columns:
+            cursor.execute("ALTER TABLE news_history ADD COLUMN hn_posted_at TEXT")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_news_history_canonical_url ON news_history(canonical_url)")
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_news_history_page_canonical_url ON news_history(page_canonical_url)"
+        )
+        backfill_canonical_urls(cursor)
 
         # 创建微信 access_tokens 表
         cursor.execute("""
@@ -178,6 +228,21 @@ def init_database(db_path: str | None = None) -> None:
     logger.info("数据库所有表结构已初始化/升级")
 
 
+def backfill_canonical_urls(cursor: sqlite3.Cursor) -> int:
+    """为缺少 canonical_url 的历史行补齐规范化 URL，返回更新行数"""
+    updated = 0
+    for table in ("news", "news_history"):
+        rows = cursor.execute(
+            f"SELECT id, news_url FROM {table} WHERE canonical_url IS NULL AND news_url IS NOT NULL"
+        ).fetchall()
+        values = [(canonicalize_url(news_url), row_id) for row_id, news_url in rows]
+        cursor.executemany(f"UPDATE {table} SET canonical_url = ? WHERE id = ?", values)
+        updated += len(values)
+    if updated:
+        logger.info(f"已补齐 {updated} 条新闻的 canonical_url")
+    return updated
+
+
 def get_illegal_keywords(db_path: str | None = None) -> list[str]:
     """获取所有违法关键字"""
     try:
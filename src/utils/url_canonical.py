@@ -0,0 +1,104 @@
+"""
+Canonical URL keys for cross-variant story deduplication.
+
+Hacker News regularly resubmits the same story under a different URL shape:
+``http`` vs ``https``, ``www.``/``m.`` hosts, trailing slashes, tracking
+parameters, arXiv ``abs``/``pdf`` pairs and GitHub ``blob``/``raw`` links.
+``canonicalize_url`` folds all of those into one comparison key that is
+stored in the ``canonical_url`` column of ``news`` and ``news_history``.
+
+The key is only used for comparison; it is never fetched.
+"""
+
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only carry attribution/tracking state
+TRACKING_PARAMS = frozenset(
+    {
+        "fbclid",
+        "gclid",
+        "dclid",
+        "msclkid",
+        "mc_cid",
+        "mc_eid",
+        "igshid",
+        "ref_src",
+        "ref_url",
+        "_hsenc",
+        "_hsmi",
+    }
+)
+
+# Host prefixes that serve the same document as the bare host
+_HOST_ALIAS_PREFIXES = ("www.", "m.", "mobile.")
+
+_ARXIV_HOSTS = frozenset({"arxiv.org", "export.arxiv.org"})
+_ARXIV_PATH_RE = re.compile(r"^/(?:abs|pdf|html)/(?P<id>.+?)(?:v\d+)?(?:\.pdf)?/?$")
+
+
+def _is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name.startswith("utm_") or name in TRACKING_PARAMS
+
+
+def _normalize_host(netloc: str, scheme: str) -> str:
+    host = netloc.rsplit("@", 1)[-1].lower().rstrip(".")
+    default_port = ":80" if scheme == "http" else ":443"
+    if host.endswith(default_port):
+        host = host[: -len(default_port)]
+    for prefix in _HOST_ALIAS_PREFIXES:
+        if host.startswith(prefix) and host.count(".") >= 2:
+            return host[len(prefix) :]
+    return host
+
+
+def _canonical_special_path(host: str, path: str) -> tuple[str, str] | None:
+    """Map known mirror URL shapes onto their landing page."""
+    if host in _ARXIV_HOSTS:
+        match = _ARXIV_PATH_RE.match(path)
+        if match:
+            return "arxiv.org", f"/abs/{match.group('id')}"
+        return None
+
+    parts = path.strip("/").split("/")
+    if host == "raw.githubusercontent.com" and len(parts) >= 4:
+        owner, repo, branch = parts[:3]
+        return "github.com", f"/{owner}/{repo}/blob/{branch}/{'/'.join(parts[3:])}"
+    if host == "github.com" and len(parts) >= 5 and parts[2] == "raw":
+        return "github.com", f"/{parts[0]}/{parts[1]}/blob/{'/'.join(parts[3:])}"
+    return None
+
+
+def canonicalize_url(url: str) -> str:
+    """Return the dedup key for *url*, or ``""`` when it is not an HTTP(S) URL.
+
+    Examples:
+        >>> canonicalize_url("http://www.example.com/post/?utm_source=hn")
+        'https://example.com/post'
+        >>> canonicalize_url("https://arxiv.org/pdf/2401.12345v2.pdf")
+        'https://arxiv.org/abs/2401.12345'
+    """
+    url = (url or "").strip()
+    if not url:
+        return ""
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return ""
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https") or not parts.netloc:
+        return ""
+
+    host = _normalize_host(parts.netloc, scheme)
+    path = re.sub(r"/{2,}", "/", parts.path or "/")
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking_param(k)]
+
+    special = _canonical_special_path(host, path)
+    if special:
+        host, path = special
+        query = []
+
+    if path.endswith("/"):
+        path = path.rstrip("/")
+    return urlunsplit(("https", host, path, urlencode(sorted(query)), ""))
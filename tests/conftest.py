@@ -10,6 +10,44 @@ from unittest.mock import Mock, patch
 import pytest
 
 
+@pytest.fixture(autouse=True)
+def _no_llm_response_cache(monkeypatch):
+    """Keep LLM tests from reading or writing the persistent response cache, flight leases and call rows."""
+    monkeypatch.setenv("HN2MD_NO_LLM_CACHE", "1")
+    monkeypatch.setenv("HN2MD_NO_LLM_SINGLE_FLIGHT", "1")
+    monkeypatch.setenv("HN2MD_NO_LLM_ACCOUNTING", "1")
+
+
+@pytest.fixture(autouse=True)
+def _fresh_quota_ledger():
+    """Start and end every test with an empty in-memory quota ledger."""
+    from src.llm.daily_status import quota_ledger
+
+    quota_ledger.reset()
+    yield
+    quota_ledger.reset()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_circuit_breakers():
+    """Keep one test's failing providers from tripping circuits in the next."""
+    from src.llm.circuit_breaker import circuit_breakers
+
+    circuit_breakers.reset()
+    yield
+    circuit_breakers.reset()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_retry_budget():
+    """Keep one test's retries from using up a host's retry budget in the next."""
+    from src.llm.retry import retry_budget
+
+    retry_budget.reset()
+    yield
+    retry_budget.reset()
+
+
 @pytest.fixture
 def temp_db(tmp_path):
     """Create a temporary SQLite database with all required tables."""
@@ -0,0 +1,135 @@
+"""Tests for content-type probing ahead of article handler dispatch."""
+
+from __future__ import annotations
+
+import io
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.core.handlers import content_probe
+
+
+class _Raw(io.BytesIO):
+    def read(self, size: int = -1, decode_content: bool = True) -> bytes:
+        return super().read(size)
+
+
+def _response(status: int, content_type: str, url: str, body: bytes = b"") -> MagicMock:
+    response = MagicMock()
+    response.status_code = status
+    response.headers = {"Content-Type": content_type} if content_type else {}
+    response.url = url
+    response.raw = _Raw(body)
+    response.iter_content = lambda chunk_size: iter([response.raw.read()])
+    return response
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(content_probe, "validate_url", lambda url: url)
+    content_probe.clear_probe_cache()
+    yield
+    content_probe.clear_probe_cache()
+
+
+def test_head_content_type_and_redirect_are_used_and_cached(monkeypatch: pytest.MonkeyPatch) -> None:
+    head = MagicMock(return_value=_response(200, "application/pdf; qs=0.9", "https://cdn.example.com/paper"))
+    get = MagicMock()
+    monkeypatch.setattr(content_probe.requests, "head", head)
+    monkeypatch.setattr(content_probe.requests, "get", get)
+
+    first = content_probe.probe_content_type("https://example.com/paper")
+    second = content_probe.probe_content_type("https://example.com/paper")
+
+    assert first.is_pdf
+    assert first.final_url == "https://cdn.example.com/paper"
+    assert second == first
+    head.assert_called_once()
+    get.assert_not_called()
+
+
+def test_generic_type_falls_back_to_streamed_get_and_sniffs_body(monkeypatch: pytest.MonkeyPatch) -> None:
+    body = b"%PDF-1.7\n" + b"x" * 2048
+    monkeypatch.setattr(
+        content_probe.requests,
+        "head",
+        MagicMock(return_value=_response(405, "", "https://example.com/download")),
+    )
+    monkeypatch.setattr(
+        content_probe.requests,
+        "get",
+        MagicMock(return_value=_response(200, "application/octet-stream", "https://example.com/download", body)),
+    )
+
+    probe = content_probe.probe_content_type("https://example.com/download")
+
+    assert probe.is_pdf
+    assert probe.has_body
+    assert b"".join(probe.iter_body()) == body
+    assert not probe.has_body
+
+
+def test_cached_probe_has_no_attached_body(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(content_probe.requests, "head", MagicMock(return_value=_response(405, "", "")))
+    monkeypatch.setattr(
+        content_probe.requests,
+        "get",
+        MagicMock(return_value=_response(200, "text/html", "https://example.com/post", b"<html></html>")),
+    )
+
+    assert content_probe.probe_content_type("https://example.com/post").has_body
+    cached = content_probe.probe_content_type("https://example.com/post")
+
+    assert cached.is_html
+    assert not cached.has_body
+
+
+def test_error_responses_are_not_cached(monkeypatch: pytest.MonkeyPatch) -> None:
+    url = "https://example.com/post"
+    monkeypatch.setattr(content_probe.requests, "head", MagicMock(return_value=_response(405, "", "")))
+    get = MagicMock(side_effect=[_response(503, "text/html", url), _response(200, "text/html", url, b"<html>")])
+    monkeypatch.setattr(content_probe.requests, "get", get)
+
+    assert content_probe.probe_content_type(url).status_code == 503
+    assert content_probe.probe_content_type(url).status_code == 200
+    assert content_probe.probe_content_type(url).status_code == 200
+    assert get.call_count == 2
+
+
+def test_cache_drops_least_recently_used(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(content_probe, "PROBE_CACHE_ENTRIES", 2)
+    head = MagicMock(side_effect=lambda url, **kwargs: _response(200, "text/html", url))
+    monkeypatch.setattr(content_probe.requests, "head", head)
+
+    for url in ("https://a.example/", "https://b.example/", "https://a.example/", "https://c.example/"):
+        content_probe.probe_content_type(url)
+    content_probe.probe_content_type("https://a.example/")
+    content_probe.probe_content_type("https://b.example/")
+
+    assert [call.args[0] for call in head.call_args_list] == [
+        "https://a.example/",
+        "https://b.example/",
+        "https://c.example/",
+        "https://b.example/",
+    ]
+
+
+def test_unreachable_url_returns_none(monkeypatch: pytest.MonkeyPatch) -> None:
+    error = content_probe.requests.ConnectionError("offline")
+    monkeypatch.setattr(content_probe.requests, "head", MagicMock(side_effect=error))
+    monkeypatch.setattr(content_probe.requests, "get", MagicMock(side_effect=error))
+
+    assert content_probe.probe_content_type("https://example.com/post") is None
+
+
+@pytest.mark.parametrize(
+    ("data", "expected"),
+    [
+        (b"%PDF-1.4", "application/pdf"),
+        (b"  <!DOCTYPE html><html>", "text/html"),
+        (b"\x89PNG", ""),
+    ],
+)
+def test_sniff_mime_type(data: bytes, expected: str) -> None:
+    assert content_probe.sniff_mime_type(data) == expected
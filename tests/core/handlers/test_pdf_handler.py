@@ -1,8 +1,42 @@
 """Tests for PDF URL normalization and extraction helpers."""
 
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
 from src.core.handlers import pdf_handler
 
 
+def _make_pdf(page_texts: list[str]) -> bytes:
+    """Build a minimal multi-page PDF with one text line per page."""
+    objects = []
+    n = len(page_texts)
+    font_id = 3 + 2 * n
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(n))
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {n} >>".encode())
+    for i, text in enumerate(page_texts):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % num + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
 def test_github_blob_pdf_url_converts_to_raw_url() -> None:
     url = "https://github.com/deepseek-ai/DeepSpec/blob/main/DSpark_paper.pdf"
 
@@ -19,3 +53,90 @@ def test_plain_pdf_url_is_unchanged() -> None:
 
 def test_detects_github_blob_pdf_as_pdf_url() -> None:
     assert pdf_handler.is_pdf_url("https://github.com/org/repo/blob/main/paper.pdf")
+
+
+def test_spool_enforces_byte_cap_and_removes_partial_file(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(pdf_handler.tempfile, "tempdir", str(tmp_path))
+
+    with pytest.raises(pdf_handler.PdfTooLargeError):
+        pdf_handler._spool_to_tempfile([b"%PDF-1.4\n", b"x" * 64], max_bytes=32)
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_spool_rejects_non_pdf_payload(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(pdf_handler.tempfile, "tempdir", str(tmp_path))
+
+    with pytest.raises(ValueError, match="not a PDF"):
+        pdf_handler._spool_to_tempfile([b"<html>", b"</html>"])
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_extract_pdf_file_respects_page_budget(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(pdf_handler, "PDF_WORKERS", 1)
+    monkeypatch.setattr(pdf_handler, "PDF_PAGES_PER_TASK", 2)
+    path = tmp_path / "paper.pdf"
+    path.write_bytes(_make_pdf([f"Page {n} text" for n in range(1, 8)]))
+
+    text = asyncio.run(pdf_handler.extract_pdf_file(path, max_pages=3, target_chars=10_000))
+
+    assert text == "Page 1 text Page 2 text Page 3 text"
+
+
+def test_extract_pdf_file_stops_early_once_enough_text(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(pdf_handler, "PDF_WORKERS", 1)
+    monkeypatch.setattr(pdf_handler, "PDF_PAGES_PER_TASK", 2)
+    path = tmp_path / "paper.pdf"
+    path.write_bytes(_make_pdf([f"Page {n} text" for n in range(1, 8)]))
+
+    text = asyncio.run(pdf_handler.extract_pdf_file(path, target_chars=20))
+
+    assert text == "Page 1 text Page 2 text"
+
+
+def test_extract_pdf_file_uses_process_pool_in_page_order(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(pdf_handler, "PDF_WORKERS", 2)
+    monkeypatch.setattr(pdf_handler, "PDF_PAGES_PER_TASK", 1)
+    path = tmp_path / "paper.pdf"
+    path.write_bytes(_make_pdf([f"Page {n}" for n in range(1, 5)]))
+
+    try:
+        text = asyncio.run(pdf_handler.extract_pdf_file(path, target_chars=10_000))
+    finally:
+        pdf_handler._shutdown_pdf_executor()
+
+    assert text == "Page 1 Page 2 Page 3 Page 4"
+
+
+def test_get_pdf_content_streams_download_and_cleans_up(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(pdf_handler, "PDF_WORKERS", 1)
+    monkeypatch.setattr(pdf_handler, "validate_url", lambda url: url)
+    monkeypatch.setattr(pdf_handler.tempfile, "tempdir", str(tmp_path))
+    pdf_bytes = _make_pdf(["Streamed body"])
+    response = MagicMock()
+    response.status_code = 200
+    response.headers = {"Content-Type": "application/octet-stream"}
+    response.iter_content = lambda chunk_size: iter([pdf_bytes[:10], pdf_bytes[10:]])
+    monkeypatch.setattr(pdf_handler, "archived_get", MagicMock(return_value=response))
+
+    text = asyncio.run(pdf_handler.get_pdf_content("https://example.com/download?id=1"))
+
+    assert text == "Streamed body"
+    response.close.assert_called()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_get_pdf_content_closes_probe_on_rejected_url(monkeypatch) -> None:
+    from src.core.handlers.content_probe import ContentProbe
+
+    def _reject(url):
+        raise ValueError("private address")
+
+    monkeypatch.setattr(pdf_handler, "validate_url", _reject)
+    response = MagicMock()
+    probe = ContentProbe("http://10.0.0.1/a.pdf", "http://10.0.0.1/a.pdf", "application/pdf", 200, _response=response)
+
+    assert asyncio.run(pdf_handler.get_pdf_content(probe.url, probe)) == ""
+    response.close.assert_called_once()
+    assert not probe.has_body
@@ -161,6 +161,95 @@ class TestIsUrlInHistory:
         assert is_url_in_history("https://newsite.com/article", cursor) is False
         conn.close()
 
+    def test_url_variant_found_by_canonical_url(self, temp_db):
+        from src.core.fetch_news import is_url_in_history
+        conn = sqlite3.connect(temp_db)
+        cursor = conn.cursor()
+        cursor.execute("ALTER TABLE news_history ADD COLUMN canonical_url TEXT")
+        cursor.execute(
+            "INSERT INTO news_history (news_url, canonical_url) VALUES (?, ?)",
+            ("https://arxiv.org/abs/2401.12345", "https://arxiv.org/abs/2401.12345"),
+        )
+        conn.commit()
+
+        assert is_url_in_history("http://arxiv.org/pdf/2401.12345v2.pdf", cursor) is True
+        assert is_url_in_history("https://www.example.com/article/?utm_source=hn", cursor) is False
+        conn.close()
+
+    def test_url_found_by_page_canonical_url(self, temp_db):
+        from src.core.fetch_news import is_url_in_history
+        conn = sqlite3.connect(temp_db)
+        cursor = conn.cursor()
+        cursor.execute("ALTER TABLE news_history ADD COLUMN canonical_url TEXT")
+        cursor.execute("ALTER TABLE news_history ADD COLUMN page_canonical_url TEXT")
+        cursor.execute(
+            "INSERT INTO news_history (news_url, canonical_url, page_canonical_url) VALUES (?, ?, ?)",
+            ("https://example.com/story?id=7", "https://example.com/story?id=7", "https://example.com/posts/story"),
+        )
+        conn.commit()
+
+        assert is_url_in_history("https://example.com/story?id=7", cursor) is True
+        assert is_url_in_history("https://www.example.com/posts/story/", cursor) is True
+        assert is_url_in_history("https://example.com/posts/other", cursor) is False
+        conn.close()
+
+
+class TestParseHnMetrics:
+    """Tests for parse_hn_metrics on front-page markup."""
+
+    HTML = """
+    <table>
+    <tr class="athing submission" id="42"><td class="title"><span class="rank">3.</span></td>
+      <td class="title"><span class="titleline"><a href="https://example.com/x">Story</a></span></td></tr>
+    <tr><td class="subtext"><span class="subline">
+      <span class="score" id="score_42">128 points</span> by <a class="hnuser">pg</a>
+      <span class="age" title="2026-10-19T06:30:00 1792391400"><a href="item?id=42">2 hours ago</a></span>
+      | <a href="hide?id=42">hide</a> | <a href="item?id=42">57&nbsp;comments</a>
+    </span></td></tr>
+    <tr class="athing submission" id="43"><td class="title"><span class="rank">4.</span></td>
+      <td class="title"><span class="titleline"><a href="https://example.com/y">New</a></span></td></tr>
+    <tr><td class="subtext"><span class="subline">
+      <span class="score" id="score_43">1 point</span>
+      <span class="age" title="2026-10-19T08:20:00"><a href="item?id=43">10 minutes ago</a></span>
+      | <a href="item?id=43">discuss</a>
+    </span></td></tr>
+    </table>
+    """
+
+    def test_parses_rank_points_comments_and_age(self):
+        from bs4 import BeautifulSoup
+
+        from src.core.fetch_news import parse_hn_metrics
+
+        soup = BeautifulSoup(self.HTML, "html.parser")
+        titles = soup.find_all("span", class_="titleline")
+        subtext = soup.find_all("td", class_="subtext")
+
+        assert parse_hn_metrics(titles[0], subtext[0]) == {
+            "hn_points": 128,
+            "hn_comments": 57,
+            "hn_rank": 3,
+            "hn_posted_at": "2026-10-19T06:30:00",
+        }
+        assert parse_hn_metrics(titles[1], subtext[1])["hn_comments"] == 0
+
+    def test_saves_metrics_when_columns_exist(self, fetch_news_db):
+        import src.core.fetch_news as mod
+
+        conn = sqlite3.connect(fetch_news_db)
+        for column in ("hn_points", "hn_comments", "hn_rank"):
+            conn.execute(f"ALTER TABLE news ADD COLUMN {column} INTEGER")
+        conn.commit()
+        conn.close()
+
+        item = {"title": "Ranked", "news_url": "https://example.com/1", "discuss_url": "", "hn_points": 12,
+                "hn_comments": 3, "hn_rank": 7, "hn_posted_at": "2026-10-19T06:30:00"}
+        assert mod.save_to_database([item]) == 1
+
+        conn = sqlite3.connect(fetch_news_db)
+        assert conn.execute("SELECT hn_points, hn_comments, hn_rank FROM news").fetchone() == (12, 3, 7)
+        conn.close()
+
 
 class TestSaveToDatabase:
     """Tests for save_to_database with database."""
@@ -198,6 +287,24 @@ class TestSaveToDatabase:
         saved = mod.save_to_database(items)
         assert saved == 1
 
+    def test_skips_duplicate_canonical_url(self, fetch_news_db):
+        import src.core.fetch_news as mod
+        conn = sqlite3.connect(fetch_news_db)
+        conn.execute("ALTER TABLE news ADD COLUMN canonical_url TEXT")
+        conn.commit()
+        conn.close()
+
+        items = [
+            {"title": "First Title", "news_url": "https://example.com/post", "discuss_url": ""},
+            {"title": "Second Title", "news_url": "http://www.example.com/post/?utm_source=hn", "discuss_url": ""},
+        ]
+        saved = mod.save_to_database(items)
+        assert saved == 1
+
+        conn = sqlite3.connect(fetch_news_db)
+        assert conn.execute("SELECT canonical_url FROM news").fetchall() == [("https://example.com/post",)]
+        conn.close()
+
     def test_empty_list(self, fetch_news_db):
         import src.core.fetch_news as mod
         saved = mod.save_to_database([])
@@ -0,0 +1,136 @@
+"""Tests for src/core/response_archive.py."""
+
+import gzip
+import io
+import json
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+from urllib3.response import HTTPResponse
+
+from src.core import response_archive
+from src.core.response_archive import (
+    RECORD,
+    REPLAY,
+    ArchivedResponse,
+    ArchiveMiss,
+    ResponseArchive,
+    archived_get,
+    use_archive,
+)
+
+
+def test_records_are_independently_gzipped_and_indexed_by_offset(tmp_path) -> None:
+    archive = ResponseArchive.for_day(tmp_path, "20260601")
+    archive.record(ArchivedResponse("https://a.example/", 200, b"first", {"Content-Type": "text/html"}))
+    archive.record(ArchivedResponse("https://b.example/", 404, b"second"))
+
+    entries = [json.loads(line) for line in archive.index_path.read_text(encoding="utf-8").splitlines()]
+    raw = archive.archive_path.read_bytes()
+    second = entries[1]
+    member = gzip.decompress(raw[second["offset"] : second["offset"] + second["length"]])
+
+    assert [entry["url"] for entry in entries] == ["https://a.example/", "https://b.example/"]
+    assert member.endswith(b"\nsecond")
+
+
+def test_lookup_survives_reopen_and_latest_record_wins(tmp_path) -> None:
+    archive = ResponseArchive.for_day(tmp_path, "20260601")
+    archive.record(ArchivedResponse("https://a.example/", 500, b"old"))
+    archive.record(
+        ArchivedResponse(
+            "https://a.example/",
+            200,
+            "新".encode("gbk"),
+            {"Content-Type": "text/html; charset=gbk", "Content-Encoding": "gzip"},
+            final_url="https://a.example/final",
+        )
+    )
+
+    reopened = ResponseArchive.for_day(tmp_path, "20260601")
+    record = reopened.lookup("https://a.example/")
+
+    assert len(reopened) == 1
+    assert record.status == 200
+    assert record.final_url == "https://a.example/final"
+    assert record.text == "新"
+    assert "Content-Encoding" not in record.headers
+    assert reopened.lookup("https://missing.example/") is None
+
+
+def test_archived_get_records_then_replays_without_network(tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+    live = MagicMock()
+    live.status_code = 200
+    live.content = b"%PDF-1.7 body"
+    live.headers = {"Content-Type": "application/pdf"}
+    live.url = "https://cdn.example/paper.pdf"
+    get = MagicMock(return_value=live)
+    monkeypatch.setattr(response_archive.requests, "get", get)
+    archive = ResponseArchive.for_day(tmp_path, "20260601")
+
+    with use_archive(archive, RECORD):
+        recorded = archived_get("https://example.com/paper", timeout=5)
+    with use_archive(archive, REPLAY):
+        replayed = archived_get("https://example.com/paper", timeout=5)
+        with pytest.raises(ArchiveMiss):
+            archived_get("https://example.com/other")
+
+    get.assert_called_once()
+    assert recorded.content == replayed.content == b"%PDF-1.7 body"
+    assert replayed.url == "https://cdn.example/paper.pdf"
+    assert replayed.headers["content-type"] == "application/pdf"
+    assert replayed.raw is None
+
+
+def test_archive_is_inactive_outside_use_archive(tmp_path) -> None:
+    archive = ResponseArchive.for_day(tmp_path, "20260601")
+    with use_archive(archive, REPLAY):
+        assert response_archive.replay_archive() is archive
+        assert response_archive.recording_archive() is None
+    assert response_archive.replay_archive() is None
+
+    with pytest.raises(ValueError), use_archive(archive, "bogus"):
+        pass
+
+
+def _streaming_get(monkeypatch: pytest.MonkeyPatch, body: bytes) -> None:
+    def _get(url, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.headers = requests.structures.CaseInsensitiveDict({"Content-Type": "application/pdf"})
+        response.raw = HTTPResponse(body=io.BytesIO(body), status=200, preload_content=False)
+        return response
+
+    monkeypatch.setattr(response_archive.requests, "get", _get)
+
+
+def test_streamed_record_keeps_the_live_response_and_records_as_read(tmp_path, monkeypatch) -> None:
+    body = b"%PDF-1.7 " + bytes(range(256)) * 1000
+    _streaming_get(monkeypatch, body)
+    archive = ResponseArchive.for_day(tmp_path, "20260601")
+
+    with use_archive(archive, RECORD):
+        read = archived_get("https://example.com/a.pdf", stream=True)
+        assert read.raw is not None
+        assert b"".join(read.iter_content(chunk_size=4096)) == body
+        sniffed = archived_get("https://example.com/b.pdf", stream=True)
+        assert sniffed.raw.read(8, decode_content=True) == b"%PDF-1.7"
+        sniffed.close()
+
+    assert archive.lookup("https://example.com/a.pdf").body == body
+    assert archive.lookup("https://example.com/b.pdf").body == body
+
+
+def test_streamed_bodies_over_the_cap_are_not_recorded(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(response_archive, "ARCHIVE_MAX_BODY_BYTES", 1024)
+    body = b"x" * 5000
+    _streaming_get(monkeypatch, body)
+    archive = ResponseArchive.for_day(tmp_path, "20260601")
+
+    with use_archive(archive, RECORD):
+        response = archived_get("https://example.com/big.pdf", stream=True)
+        assert b"".join(response.iter_content(chunk_size=512)) == body
+
+    assert archive.lookup("https://example.com/big.pdf") is None
@@ -35,3 +35,30 @@ def test_crawl_article_uses_full_response_text(monkeypatch: pytest.MonkeyPatch)
 
     assert content == "Readable article body"
     assert images == []
+
+
+class _FakeLink:
+    def __init__(self, rel: str, href: str) -> None:
+        self.attrib = {"rel": rel, "href": href}
+
+
+class _CanonicalPage(_FakePage):
+    def css(self, selector: str) -> list[object]:
+        if selector == "link[rel]":
+            return [_FakeLink("stylesheet", "/site.css"), _FakeLink("Canonical", "/posts/story")]
+        return []
+
+
+def test_crawl_article_records_page_canonical_link(monkeypatch: pytest.MonkeyPatch) -> None:
+    class _CanonicalFetcher:
+        @staticmethod
+        def get(*_args: object, **_kwargs: object) -> _CanonicalPage:
+            return _CanonicalPage()
+
+    monkeypatch.setattr(scrapling_crawler, "SCRAPLING_AVAILABLE", True)
+    monkeypatch.setattr(scrapling_crawler, "Fetcher", _CanonicalFetcher, raising=False)
+
+    crawler = scrapling_crawler.ScraplingCrawler()
+    asyncio.run(crawler.crawl_article("https://m.example.com/amp/story?utm_source=hn"))
+
+    assert crawler.canonical_url == "https://m.example.com/posts/story"
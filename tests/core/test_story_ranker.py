@@ -0,0 +1,137 @@
+"""Tests for src/core/story_ranker.py."""
+
+import json
+import math
+import os
+import sqlite3
+import time
+
+from src.core.story_ranker import (
+    DEFAULT_WEIGHTS,
+    FEATURES,
+    LEARN_MIN_PAIRS,
+    RankingModel,
+    learn_ranking_model,
+    rank_stories,
+    raw_features,
+    reorder_blocks,
+    tied_blocks,
+)
+
+NOW = 1_760_000_000.0
+
+
+def _story(news_id, points=None, comments=None, rank=None, hours=None, url=None, summary="摘要" * 50):
+    posted = None
+    if hours is not None:
+        posted = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(NOW - hours * 3600))
+    return {
+        "id": news_id,
+        "news_url": url or f"https://site{news_id}.example/post",
+        "content_summary": summary,
+        "hn_points": points,
+        "hn_comments": comments,
+        "hn_rank": rank,
+        "hn_posted_at": posted,
+    }
+
+
+def test_velocity_uses_hours_since_submission():
+    features = raw_features(_story(1, points=99, hours=2), {}, NOW)
+
+    assert round(features["velocity"], 3) == round(math.log1p(49.5), 3)
+    assert raw_features(_story(2, points=99), {}, NOW)["velocity"] == 0.0
+
+
+def test_popular_fast_rising_story_ranks_first():
+    stories = [
+        _story(1, points=40, comments=10, rank=9, hours=10),
+        _story(2, points=400, comments=250, rank=1, hours=3),
+        _story(3, points=120, comments=30, rank=4, hours=5),
+    ]
+
+    ranked = rank_stories(stories, now=NOW)
+
+    assert [story.item["id"] for story in ranked] == [2, 3, 1]
+    assert set(ranked[0].features) == set(FEATURES)
+
+
+def test_missing_metrics_tie_and_keep_input_order():
+    ranked = rank_stories([_story(1), _story(2), _story(3)], now=NOW)
+
+    assert [story.item["id"] for story in ranked] == [1, 2, 3]
+    assert tied_blocks(ranked) == [[0, 1, 2]]
+
+
+def test_tied_blocks_only_cover_the_top_candidates():
+    ranked = rank_stories(
+        [
+            _story(1, points=500, rank=1, hours=1),
+            _story(2, points=500, rank=1, hours=1),
+            _story(3, points=10, rank=30, hours=20),
+            _story(4, points=10, rank=30, hours=20),
+        ],
+        now=NOW,
+    )
+
+    assert tied_blocks(ranked, top_n=3) == [[0, 1]]
+    reordered = reorder_blocks(ranked, [[0, 1]], [2.0, 9.0])
+    assert [story.item["id"] for story in reordered] == [2, 1, 3, 4]
+
+
+def _write_plan(codex_dir, name, ordered, mtime, **extra):
+    path = codex_dir / name
+    items = [{"id": news_id, "content_summary": "摘要" * 50} for news_id in ordered]
+    path.write_text(json.dumps({"ordered_ids": ordered, "items": items, **extra}), encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+def test_learns_weights_and_domain_history_from_past_plans(tmp_path):
+    codex_dir = tmp_path / "codex"
+    codex_dir.mkdir()
+    db_path = str(tmp_path / "hacknews.db")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "CREATE TABLE news_history (id INTEGER PRIMARY KEY, news_url TEXT, hn_points INTEGER, "
+            "hn_comments INTEGER, hn_rank INTEGER, hn_posted_at TEXT)"
+        )
+        # Editors put the most-discussed story first, whatever its points
+        for day in range(8):
+            ids = [day * 10 + k for k in range(4)]
+            for k, news_id in enumerate(ids):
+                conn.execute(
+                    "INSERT INTO news_history VALUES (?, ?, ?, ?, ?, NULL)",
+                    (
+                        news_id,
+                        f"https://{'favourite.dev' if k == 0 else f'other{k}.com'}/{news_id}",
+                        10 + 50 * k,
+                        300 - 80 * k,
+                        None,
+                    ),
+                )
+            _write_plan(codex_dir, f"hacknews_plan_2026010{day}_080000.json", ids, NOW + day)
+    # Own output and drafts are not training data
+    _write_plan(codex_dir, "hacknews_plan_20260110_080000.json", [3, 2, 1, 0], NOW + 20, ranking={})
+    _write_plan(codex_dir, "hacknews_plan_draft_20260111_080000.json", [3, 2, 1, 0], NOW + 21)
+
+    model = learn_ranking_model(codex_dir, db_path)
+
+    assert model.plans == 8
+    assert model.pairs >= LEARN_MIN_PAIRS
+    weights = dict(zip(FEATURES, model.weights, strict=True))
+    assert weights["comments"] > DEFAULT_WEIGHTS[FEATURES.index("comments")]
+    assert weights["points"] < DEFAULT_WEIGHTS[FEATURES.index("points")]
+    assert model.domain_scores["favourite.dev"] > 0.5 > model.domain_scores["other3.com"]
+
+    ranked = rank_stories([_story(1, points=200, comments=5), _story(2, points=20, comments=200)], model=model, now=NOW)
+    assert [story.item["id"] for story in ranked] == [2, 1]
+
+
+def test_too_little_history_keeps_default_weights(tmp_path):
+    _write_plan(tmp_path, "hacknews_plan_20260101_080000.json", [1, 2], NOW)
+
+    model = learn_ranking_model(tmp_path, str(tmp_path / "empty.db"))
+
+    assert model.weights == DEFAULT_WEIGHTS
+    assert model.summary()["learned_from_plans"] == 0
+    assert RankingModel().summary()["weights"]["points"] == DEFAULT_WEIGHTS[0]
@@ -0,0 +1,96 @@
+"""Tests for src/core/tag_index.py."""
+
+import json
+
+from src.core.tag_index import MIN_CONFIDENCE, TagIndex, tag_tokens, title_tokens
+
+DAYS = [
+    (["Rust", "数据库", "AI", "开源"], ["Rust 编写的数据库 (A database in Rust)", "开源大模型 (Open LLM weights)"]),
+    (["Rust", "编译器", "AI", "安全"], ["Rust 编译器提速 (Faster Rust compiler)", "模型安全 (Model jailbreaks)"]),
+    (["Linux", "数据库", "开源", "安全"], ["Linux 内核 (Linux kernel news)", "数据库漏洞 (Postgres CVE)"]),
+    (["Linux", "AI", "编译器", "SQLite"], ["SQLite 内部 (SQLite internals)", "Linux 调度 (Linux scheduler)"]),
+]
+
+
+def _write_plan(codex_dir, name, tags, titles):
+    items = [{"id": i, "title_chs": chs, "title": en.rstrip(")")} for i, (chs, en) in enumerate(_split(titles))]
+    path = codex_dir / name
+    path.write_text(
+        json.dumps({"tags": tags, "ordered_ids": [item["id"] for item in items], "items": items}, ensure_ascii=False),
+        encoding="utf-8",
+    )
+    return path
+
+
+def _split(titles):
+    return [tuple(title.split(" (", 1)) for title in titles]
+
+
+def _index(tmp_path):
+    codex_dir = tmp_path / "codex"
+    codex_dir.mkdir()
+    for day, (tags, titles) in enumerate(DAYS):
+        _write_plan(codex_dir, f"hacknews_plan_2026010{day}_080000.json", tags, titles)
+    index = TagIndex(str(tmp_path / "hacknews.db"))
+    assert index.refresh(codex_dir) == len(DAYS)
+    return index, codex_dir
+
+
+def test_tokens_cover_words_and_cjk_bigrams():
+    assert title_tokens("Show HN: A database in Rust") == {"hn", "database", "rust"}
+    assert title_tokens("开源数据库") == {"开源", "源数", "数据", "据库"}
+    assert tag_tokens("Machine_Learning") == {"machine", "learning"}
+
+
+def test_recurring_tags_are_proposed_without_the_llm(tmp_path):
+    index, _ = _index(tmp_path)
+
+    proposal = index.propose(
+        [
+            ("Rust 异步运行时", "An async runtime in Rust"),
+            ("Linux 文件系统", "Linux filesystems"),
+            ("新的数据库引擎", "A new database engine"),
+            ("AI 代码编辑器", "An AI code editor"),
+        ]
+    )
+
+    assert proposal.tags == ["Rust", "Linux", "数据库", "AI"]
+    assert proposal.confident
+    assert proposal.confidence >= MIN_CONFIDENCE
+    # Other tags score by co-occurrence: each came with "linux" in 1 of its 2 sources (+1 prior)
+    scores = index.propose([(None, "Linux scheduler")]).scores
+    assert scores.pop("Linux") == 1.0
+    assert len(scores) == 3
+    assert all(abs(score - 1 / 3) < 1e-3 for score in scores.values())
+
+
+def test_unfamiliar_titles_are_not_confident(tmp_path):
+    index, _ = _index(tmp_path)
+
+    proposal = index.propose([("量子计算", "Quantum computing"), ("太空望远镜", "Space telescope")])
+
+    assert not proposal.confident
+    assert TagIndex(str(tmp_path / "empty.db")).propose([("标题", "Title")]).tags == []
+
+
+def test_sources_are_indexed_once_and_posts_dedupe_against_plans(tmp_path):
+    index, codex_dir = _index(tmp_path)
+    astro_dir = tmp_path / "blog"
+    astro_dir.mkdir()
+    # Rendered from the first plan: same tags, so it adds nothing
+    (astro_dir / "hacknews_summary_20260100_0800.md").write_text(
+        '---\ntitle: "t"\ntags:\n  - "Rust"\n  - "数据库"\n  - "AI"\n  - "开源"\n---\n\n'
+        "---\n\n## 1. Rust 编写的数据库 (A database in Rust)\n\n摘要\n",
+        encoding="utf-8",
+    )
+    (astro_dir / "hacknews_summary_20251201_0800.md").write_text(
+        '---\ntitle: "t"\ntags:\n  - "WebAssembly"\n  - "浏览器"\n  - "AI"\n  - "Rust"\n---\n\n'
+        "---\n\n## 1. 浏览器中的 WebAssembly (WebAssembly in the browser)\n\n摘要\n",
+        encoding="utf-8",
+    )
+
+    assert index.refresh(codex_dir, astro_dir) == 1
+    assert index.refresh(codex_dir, astro_dir) == 0
+    assert index.add_plan(codex_dir / "hacknews_plan_20260100_080000.json") is False
+    stats = index.stats()
+    assert (stats["sources"], stats["tags"]) == (6, 10)
@@ -117,3 +117,42 @@ def test_apply_persists_discussion_summary_source_when_columns_exist(tmp_path) -
             "SELECT discuss_summary_source_type, discuss_summary_source_url FROM news WHERE id=1"
         ).fetchone()
     assert row == ("external_hn_snippet", "https://news.ycombinator.com/item?id=1")
+
+
+def test_apply_writes_each_provenance_column_the_table_has(tmp_path) -> None:
+    ctx = _ctx(tmp_path)
+    with sqlite3.connect(ctx.db_path) as conn:
+        conn.execute("ALTER TABLE news ADD COLUMN content_summary_source_type TEXT")
+    plan = _plan(
+        tmp_path,
+        [
+            {
+                "id": 1,
+                "title_chs": "标题",
+                "content_summary": "摘要",
+                "discuss_summary": "讨论摘要",
+                "content_summary_source_type": "extractive_fallback",
+                "discuss_summary_source_type": "extractive_fallback",
+            }
+        ],
+    )
+
+    ApplyStage().execute(ctx, object(), plan_file=str(plan))
+
+    with sqlite3.connect(ctx.db_path) as conn:
+        row = conn.execute("SELECT content_summary, content_summary_source_type FROM news WHERE id=1").fetchone()
+    assert row == ("摘要", "extractive_fallback")
+
+
+def test_apply_adds_the_plan_to_the_tag_index(tmp_path) -> None:
+    from src.core.tag_index import TagIndex
+
+    ctx = _ctx(tmp_path)
+    plan = _plan(tmp_path)
+    data = json.loads(plan.read_text(encoding="utf-8"))
+    data["tags"] = ["AI", "Rust", "开源", "安全"]
+    plan.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+    ApplyStage().execute(ctx, object(), plan_file=str(plan))
+
+    assert TagIndex(str(ctx.db_path)).stats()["sources"] == 1
@@ -103,6 +103,54 @@ def test_pre_plan_audit_ignores_summaries_but_keeps_content_gates(tmp_path) -> N
     assert not {"summary_missing", "discussion_summary_missing"} & {issue["code"] for issue in report["issues"]}
 
 
+def _seed_extracted_summary(ctx: RuntimeContext) -> None:
+    init_database(str(ctx.db_path))
+    article = "Readable article body. " * 10
+    with sqlite3.connect(ctx.db_path) as conn:
+        conn.execute(
+            """
+            INSERT INTO news (
+                id, title, news_url, article_content, discussion_content, content_summary, discuss_summary,
+                content_summary_source_type, content_source_type, content_source_url, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now', 'localtime'))
+            """,
+            (
+                1,
+                "Story",
+                "https://example.com/story",
+                article,
+                "discussion",
+                article[:60],
+                "讨论摘要",
+                "extractive_fallback",
+                "full_text",
+                "https://example.com/story",
+            ),
+        )
+
+
+def test_audit_warns_about_extractive_summaries_by_default(tmp_path) -> None:
+    ctx = _ctx(tmp_path)
+    _seed_extracted_summary(ctx)
+
+    report = run_audit(ctx)
+
+    assert report["blocking_count"] == 0
+    assert [(issue["code"], issue["severity"]) for issue in report["issues"]] == [("extractive_summary", "warning")]
+    assert report["items"][0]["content_summary_source_type"] == "extractive_fallback"
+    assert not run_audit(ctx, include_summaries=False)["issues"]
+
+
+def test_audit_can_block_extractive_summaries(tmp_path) -> None:
+    ctx = _ctx(tmp_path)
+    _seed_extracted_summary(ctx)
+
+    report = run_audit(ctx, block_extractive_summaries=True)
+
+    assert report["blocking_count"] == 1
+    assert report["issues"][0]["code"] == "extractive_summary"
+
+
 def test_audit_blocks_paywall_shell_even_when_text_is_long(tmp_path) -> None:
     ctx = _ctx(tmp_path)
     init_database(str(ctx.db_path))
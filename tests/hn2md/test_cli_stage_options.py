@@ -47,6 +47,22 @@ def test_collect_forwards_concurrency(tmp_path) -> None:
     stage.run.assert_called_once_with(_runtime(tmp_path), machine, concurrency=5)
 
 
+def test_collect_forwards_response_archive_options(tmp_path) -> None:
+    result, stage, machine = _invoke(tmp_path, ["collect", "--record-responses"])
+    assert result.exit_code == 0, result.output
+    stage.run.assert_called_once_with(_runtime(tmp_path), machine, concurrency=3, record_responses=True)
+
+
+
+def test_collect_replay_runs_outside_todays_job(tmp_path) -> None:
+    result, stage, machine = _invoke(tmp_path, ["collect", "--replay-day", "20260601"])
+
+    assert result.exit_code == 0, result.output
+    stage.execute.assert_called_once_with(_runtime(tmp_path), None, concurrency=3, replay_day="20260601")
+    stage.run.assert_not_called()
+    assert not machine.method_calls
+
+
 def test_plan_forwards_manual_plan(tmp_path) -> None:
     plan = tmp_path / "plan.json"
     plan.write_text("{}", encoding="utf-8")
@@ -62,6 +78,45 @@ def test_plan_forwards_manual_plan(tmp_path) -> None:
     )
 
 
+def test_plan_forwards_concurrency(tmp_path) -> None:
+    result, stage, machine = _invoke(tmp_path, ["plan", "--concurrency", "6"])
+
+    assert result.exit_code == 0, result.output
+    stage.run.assert_called_once_with(
+        _runtime(tmp_path),
+        machine,
+        llm=None,
+        manual_plan_file=None,
+        concurrency=6,
+    )
+
+
+def test_plan_forwards_no_llm_cache(tmp_path) -> None:
+    result, stage, machine = _invoke(tmp_path, ["plan", "--no-llm-cache"])
+
+    assert result.exit_code == 0, result.output
+    stage.run.assert_called_once_with(
+        _runtime(tmp_path),
+        machine,
+        llm=None,
+        manual_plan_file=None,
+        llm_cache=False,
+    )
+
+
+def test_plan_forwards_batch_size(tmp_path) -> None:
+    result, stage, machine = _invoke(tmp_path, ["plan", "--batch-size", "4"])
+
+    assert result.exit_code == 0, result.output
+    stage.run.assert_called_once_with(
+        _runtime(tmp_path),
+        machine,
+        llm=None,
+        manual_plan_file=None,
+        batch_size=4,
+    )
+
+
 def test_apply_forwards_plan_file(tmp_path) -> None:
     plan = tmp_path / "plan.json"
 
@@ -5,8 +5,18 @@ import sqlite3
 from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import pytest
+
 from hn2md.context import RuntimeContext
 from hn2md.stages.collect import CollectStage, _fetch_discussion_with_retries
+from src.core.handlers.content_probe import ContentProbe
+
+
+@pytest.fixture(autouse=True)
+def _no_content_probe():
+    """Keep collection tests offline: URLs route by shape unless a test probes."""
+    with patch("src.core.handlers.content_probe.probe_content_type_async", new=AsyncMock(return_value=None)) as probe:
+        yield probe
 
 
 def _ctx(tmp_path: Path) -> RuntimeContext:
@@ -165,6 +175,85 @@ def test_collect_stage_filters_decorative_images_before_saving(tmp_path) -> None
     assert row == ("article.jpg", None, None)
 
 
+def test_collect_stage_records_page_canonical_url(tmp_path) -> None:
+    ctx = _ctx(tmp_path)
+    with sqlite3.connect(ctx.db_path) as conn:
+        conn.execute("ALTER TABLE news ADD COLUMN canonical_url TEXT")
+        conn.execute("ALTER TABLE news ADD COLUMN page_canonical_url TEXT")
+    crawler = MagicMock()
+    crawler.crawl_article = AsyncMock(return_value=("Readable article body " * 10, []))
+    crawler.canonical_url = "http://www.example.com/posts/story/"
+    crawler.close = AsyncMock()
+
+    with (
+        patch("src.core.crawlers.scrapling_crawler.ScraplingCrawler", return_value=crawler),
+        patch(
+            "src.core.handlers.discussion_handler.get_discussion_content_async",
+            new=AsyncMock(return_value="HN discussion"),
+        ),
+    ):
+        CollectStage().execute(ctx, object(), concurrency=1)
+
+    with sqlite3.connect(ctx.db_path) as conn:
+        row = conn.execute("SELECT news_url, canonical_url, page_canonical_url FROM news WHERE id=1").fetchone()
+    assert row == ("https://example.com/story", "https://example.com/story", "https://example.com/posts/story")
+
+
+def test_page_canonical_pointing_at_the_site_root_is_ignored() -> None:
+    from hn2md.stages.collect import _page_canonical_key
+
+    assert _page_canonical_key("https://www.example.com/") is None
+    assert _page_canonical_key(None) is None
+    assert _page_canonical_key("http://example.com/a/?utm_source=x") == "https://example.com/a"
+
+
+def test_collect_stage_replays_recorded_responses_offline(tmp_path) -> None:
+    from src.core.response_archive import record_response, recording_archive, replay_archive, replay_lookup
+
+    ctx = _ctx(tmp_path)
+
+    async def crawl(url):
+        if replay_archive() is not None:
+            return replay_lookup(url).text, []
+        record_response(url, 200, "Archived article body " * 10)
+        return "Archived article body " * 10, []
+
+    async def discussion(url):
+        if replay_archive() is not None:
+            return replay_lookup(url).text
+        assert recording_archive() is not None
+        record_response(url, 200, "Archived discussion")
+        return "Archived discussion"
+
+    crawler = MagicMock()
+    crawler.crawl_article = AsyncMock(side_effect=crawl)
+    crawler.close = AsyncMock()
+    with (
+        patch("src.core.crawlers.scrapling_crawler.ScraplingCrawler", return_value=crawler),
+        patch("src.core.handlers.discussion_handler.get_discussion_content_async", new=AsyncMock(side_effect=discussion)),
+    ):
+        recorded = CollectStage().execute(ctx, object(), concurrency=1, record_responses=True)
+        day = Path(recorded["response_archive"]["path"]).name
+        with sqlite3.connect(ctx.db_path) as conn:
+            conn.execute("UPDATE news SET article_content='edited', discussion_content='edited'")
+        replayed = CollectStage().execute(ctx, object(), concurrency=1, replay_day=day)
+
+    assert recorded["response_archive"]["records"] == 2
+    assert replayed["response_archive"]["mode"] == "replay"
+    snapshot = json.loads(Path(replayed["context_file"]).read_text(encoding="utf-8"))
+    assert snapshot["items"][0]["article_content"] == ("Archived article body " * 10).strip()
+    assert snapshot["items"][0]["discussion_content"] == "Archived discussion"
+    with sqlite3.connect(ctx.db_path) as conn:
+        assert conn.execute("SELECT article_content FROM news").fetchone() == ("edited",)
+
+
+def test_collect_stage_replay_requires_an_archive(tmp_path) -> None:
+    from hn2md.stages.base import NonRetryableStageError
+
+    with pytest.raises(NonRetryableStageError, match="No response archive"):
+        CollectStage().execute(_ctx(tmp_path), object(), replay_day="20200101")
+
+
 def test_collect_stage_routes_youtube_urls_to_youtube_handler(tmp_path) -> None:
     ctx = _ctx(tmp_path)
     _set_news_url(ctx, "https://www.youtube.com/watch?v=abc123")
@@ -221,6 +310,35 @@ def test_collect_stage_routes_github_blob_pdf_to_pdf_handler(tmp_path) -> None:
     assert row == (("PDF extracted text " * 10).strip(),)
 
 
+def test_collect_stage_routes_extensionless_pdf_by_probed_content_type(tmp_path, _no_content_probe) -> None:
+    ctx = _ctx(tmp_path)
+    _set_news_url(ctx, "https://example.com/download?id=42")
+    probe = ContentProbe(
+        "https://example.com/download?id=42",
+        "https://cdn.example.com/files/paper",
+        "application/pdf",
+        200,
+    )
+    _no_content_probe.return_value = probe
+
+    with (
+        patch(
+            "src.core.handlers.pdf_handler.get_pdf_content",
+            new=AsyncMock(return_value="PDF extracted text " * 10),
+        ) as pdf_handler,
+        patch("src.core.crawlers.scrapling_crawler.ScraplingCrawler") as crawler_cls,
+        patch(
+            "src.core.handlers.discussion_handler.get_discussion_content_async",
+            new=AsyncMock(return_value="HN discussion"),
+        ),
+    ):
+        result = CollectStage().execute(ctx, object(), concurrency=1)
+
+    pdf_handler.assert_awaited_once_with("https://cdn.example.com/files/paper", probe=probe)
+    crawler_cls.assert_not_called()
+    assert result["collected"] == 1
+
+
 def test_collect_stage_routes_fediverse_urls_to_fediverse_handler(tmp_path) -> None:
     ctx = _ctx(tmp_path)
     _set_news_url(ctx, "https://mathstodon.xyz/@iblech/1161234567890")
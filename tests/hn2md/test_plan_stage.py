@@ -1,8 +1,10 @@
 """PlanStage manual Codex-plan import tests."""
 
+import asyncio
 import json
+import sqlite3
 from pathlib import Path
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 import pytest
 
@@ -107,3 +109,274 @@ def test_manual_plan_rejects_invalid_content(tmp_path, mutate, message) -> None:
 
     with pytest.raises(ValueError, match=message):
         PlanStage().execute(_ctx(tmp_path), object(), manual_plan_file=str(source))
+
+
+def _seed_news(ctx: RuntimeContext, count: int) -> None:
+    ctx.db_path.parent.mkdir(parents=True, exist_ok=True)
+    with sqlite3.connect(ctx.db_path) as conn:
+        conn.execute(
+            """
+            CREATE TABLE news (
+                id INTEGER PRIMARY KEY,
+                title TEXT,
+                title_chs TEXT,
+                news_url TEXT,
+                discuss_url TEXT,
+                article_content TEXT,
+                discussion_content TEXT,
+                content_summary TEXT,
+                discuss_summary TEXT,
+                created_at TIMESTAMP
+            )
+            """
+        )
+        for news_id in range(1, count + 1):
+            conn.execute(
+                """
+                INSERT INTO news (id, title, news_url, discuss_url, article_content, discussion_content, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, datetime('now', 'localtime'))
+                """,
+                (
+                    news_id,
+                    f"Story {news_id}",
+                    f"https://example.com/{news_id}",
+                    f"https://news.ycombinator.com/item?id={news_id}",
+                    f"article body {news_id}",
+                    f"discussion body {news_id}",
+                ),
+            )
+
+
+class _FakeLLM:
+    """Async LLM doubles that record how many calls overlap."""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.in_flight = 0
+        self.peak = 0
+        self.events: list[str] = []
+
+    async def _work(self, label: str) -> None:
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        self.events.append(f"start:{label}")
+        await asyncio.sleep(self.delay)
+        self.events.append(f"end:{label}")
+        self.in_flight -= 1
+
+    async def summary(self, text, prompt_type="article", llm_type=None, model=None):
+        news_id = text.rsplit(" ", 1)[-1]
+        await self._work(f"{prompt_type}:{news_id}")
+        return f"这是第{news_id}篇的{prompt_type}摘要，长度足够用于验证计划阶段的并发执行。"
+
+    async def title(self, title, content_summary, llm_type=None, model=None):
+        await self._work(f"title:{title}")
+        return f"中文 {title}"
+
+
+def _run_plan(tmp_path: Path, count: int, concurrency: int, fake: _FakeLLM, ratings=None):
+    ctx = _ctx(tmp_path)
+    _seed_news(ctx, count)
+    with (
+        patch("src.llm.llm_business.generate_summary_async", side_effect=fake.summary),
+        patch("src.llm.llm_business.translate_title_async", side_effect=fake.title),
+        patch("src.llm.llm_evaluator.evaluate_news_attraction", return_value=(ratings or [], "")) as rank,
+        patch("src.llm.llm_tag_extractor.extract_tags_with_llm", return_value=["AI", "Rust", "开源", "安全"]) as tags,
+    ):
+        result = PlanStage().execute(ctx, object(), llm="grok", concurrency=concurrency)
+    return result, rank, tags
+
+
+def test_plan_graph_runs_story_llm_calls_concurrently(tmp_path) -> None:
+    fake = _FakeLLM()
+
+    result, rank, tags = _run_plan(tmp_path, count=4, concurrency=8, fake=fake)
+
+    plan = json.loads(Path(result["plan_file"]).read_text(encoding="utf-8"))
+    assert plan["ordered_ids"] == [1, 2, 3, 4]
+    assert set(plan["tags"]) == {"AI", "Rust", "开源", "安全"}
+    assert plan["items"][0]["title_chs"] == "中文 Story 1"
+    assert "discussion" in plan["items"][0]["discuss_summary"]
+    # 8 summaries start together; titles follow their own article summary
+    assert fake.peak == 8
+    assert fake.events.index("end:article:1") < fake.events.index("start:title:Story 1")
+    assert rank.call_args.args[1] == "grok"
+    assert result["llm_concurrency"] == 8
+    assert set(result["llm_routing"]) == {"decisions", "models", "input_tokens"}
+    assert result["article_compression"]["reduction_ratio"] == 0.0
+    assert result["llm_hedging"]["hedges"] == 0
+    assert all(circuit["state"] == "closed" for circuit in result["llm_circuits"].values())
+    article, title, *tail = result["critical_path"]
+    assert article.startswith("article:")
+    assert title == "title:" + article.split(":")[1]
+    assert tail == ["rank", "tags"]
+    assert result["critical_path_seconds"] >= 2 * fake.delay
+    assert result["llm_wall_seconds"] < 12 * fake.delay
+
+
+def test_plan_concurrency_caps_provider_requests_including_map_reduce(tmp_path) -> None:
+    from src.llm import async_client
+
+    ctx = _ctx(tmp_path)
+    _seed_news(ctx, 3)
+    fake = _FakeLLM(delay=0.01)
+    provider = MagicMock()
+
+    async def _acall(prompt, **kwargs):
+        await fake._work("request")
+        # Distinct answers keep single-flight from joining the reduce requests
+        return f"这是第{len(fake.events)}段足够长的中文摘要，用于验证计划阶段的请求并发上限。"
+
+    provider.acall = provider.astream = _acall
+    config = {"grok": {"model": "grok-test"}, "gemini": {"model": "gemini-test"}, "moonshot": {}, "default": "grok"}
+    with (
+        patch("src.llm.config.load_llm_config", return_value=config),
+        patch.object(async_client, "get_provider", return_value=provider),
+        # Every summary fans out into three map requests plus a reduce
+        patch("src.llm.llm_business._summary_chunks", side_effect=lambda text, *_: [f"{text} ({i})" for i in range(3)]),
+        patch("src.llm.llm_evaluator.evaluate_news_attraction", return_value=([], "")),
+        patch("src.llm.llm_tag_extractor.extract_tags_with_llm", return_value=[]),
+    ):
+        result = PlanStage().execute(ctx, object(), llm="grok", concurrency=2)
+
+    assert fake.events.count("start:request") == 6 * 4 + 3
+    assert fake.peak == result["llm_peak_in_flight"] == 2
+    assert result["story_count"] == 3
+
+
+def test_plan_graph_tags_follow_ranked_order(tmp_path) -> None:
+    fake = _FakeLLM(delay=0)
+
+    result, _, tags = _run_plan(tmp_path, count=5, concurrency=4, fake=fake, ratings=[(5, 9), (2, 8)])
+
+    plan = json.loads(Path(result["plan_file"]).read_text(encoding="utf-8"))
+    assert plan["ordered_ids"][:2] == [5, 2]
+    assert [title for _, title in tags.call_args.args[0]] == ["Story 5", "Story 2", "Story 1", "Story 3"]
+
+
+def test_plan_ranks_locally_and_records_features(tmp_path) -> None:
+    fake = _FakeLLM(delay=0)
+    ctx = _ctx(tmp_path)
+    _seed_news(ctx, 3)
+    with sqlite3.connect(ctx.db_path) as conn:
+        for column in ("hn_points", "hn_comments", "hn_rank"):
+            conn.execute(f"ALTER TABLE news ADD COLUMN {column} INTEGER")
+        for news_id, points, comments, rank in ((1, 15, 2, 25), (2, 480, 310, 1), (3, 120, 40, 6)):
+            conn.execute(
+                "UPDATE news SET hn_points=?, hn_comments=?, hn_rank=? WHERE id=?", (points, comments, rank, news_id)
+            )
+
+    with (
+        patch("src.llm.llm_business.generate_summary_async", side_effect=fake.summary),
+        patch("src.llm.llm_business.translate_title_async", side_effect=fake.title),
+        patch("src.llm.llm_evaluator.evaluate_news_attraction", return_value=([], "")) as rank,
+        patch("src.llm.llm_tag_extractor.extract_tags_with_llm", return_value=[]),
+    ):
+        result = PlanStage().execute(ctx, object())
+
+    plan = json.loads(Path(result["plan_file"]).read_text(encoding="utf-8"))
+    assert plan["ordered_ids"] == [2, 3, 1]
+    rank.assert_not_called()
+    assert plan["ranking"]["llm_tiebreak_ids"] == []
+    assert [story["id"] for story in plan["ranking"]["stories"]] == [2, 3, 1]
+    assert plan["ranking"]["stories"][0]["features"]["front_rank"] == 1.0
+    assert result["ranking"]["llm_tiebreak_stories"] == 0
+
+
+def test_plan_reuses_tags_from_the_tag_index(tmp_path) -> None:
+    codex_dir = _ctx(tmp_path).codex_dir
+    codex_dir.mkdir(parents=True)
+    for day in range(3):
+        items = [{"id": i, "title_chs": f"中文 Story {day}{i}", "title": f"Story {day}{i}"} for i in range(1, 5)]
+        (codex_dir / f"hacknews_plan_2026010{day}_080000.json").write_text(
+            json.dumps({"tags": ["AI", "Rust", "开源", "安全"], "ordered_ids": [1, 2, 3, 4], "items": items}),
+            encoding="utf-8",
+        )
+
+    result, _, tags = _run_plan(tmp_path, count=4, concurrency=4, fake=_FakeLLM(delay=0))
+
+    tags.assert_not_called()
+    plan = json.loads(Path(result["plan_file"]).read_text(encoding="utf-8"))
+    assert set(plan["tags"]) == {"AI", "Rust", "开源", "安全"}
+    assert plan["tagging"]["source"] == "index"
+    assert result["tagging"]["source"] == "index"
+    assert result["tagging"]["sources"] == 3
+
+
+def test_plan_graph_skips_llm_for_stored_summaries(tmp_path) -> None:
+    fake = _FakeLLM(delay=0)
+    ctx = _ctx(tmp_path)
+    _seed_news(ctx, 1)
+    with sqlite3.connect(ctx.db_path) as conn:
+        conn.execute(
+            "UPDATE news SET title_chs='已有标题', content_summary='已有的正文摘要内容足够长，不需要再次调用模型生成。', "
+            "discuss_summary='已有讨论摘要。'"
+        )
+
+    with (
+        patch("src.llm.llm_business.generate_summary_async", side_effect=fake.summary),
+        patch("src.llm.llm_business.translate_title_async", side_effect=fake.title),
+        patch("src.llm.llm_evaluator.evaluate_news_attraction", return_value=([], "")),
+        patch("src.llm.llm_tag_extractor.extract_tags_with_llm", return_value=[]),
+    ):
+        result = PlanStage().execute(ctx, object())
+
+    assert fake.events == []
+    assert result["story_count"] == 1
+
+
+def test_plan_batch_mode_falls_back_per_field(tmp_path) -> None:
+    fake = _FakeLLM(delay=0)
+    ctx = _ctx(tmp_path)
+    _seed_news(ctx, 5)
+    batches = []
+
+    async def _batch(stories, llm_type=None, model=None):
+        batches.append([story["id"] for story in stories])
+        results = {}
+        for story in stories:
+            results[story["id"]] = {
+                "content_summary": f"批量生成的第{story['id']}篇文章摘要，长度足够通过校验。",
+                "discuss_summary": f"批量生成的第{story['id']}篇讨论摘要。",
+                "title_chs": f"批量标题 {story['id']}",
+            }
+        # Story 2's title failed validation in the batch
+        results.get(2, {})["title_chs"] = ""
+        return results
+
+    with (
+        patch("src.llm.llm_business.generate_story_batch_async", side_effect=_batch),
+        patch("src.llm.llm_business.generate_summary_async", side_effect=fake.summary),
+        patch("src.llm.llm_business.translate_title_async", side_effect=fake.title),
+        patch("src.llm.llm_evaluator.evaluate_news_attraction", return_value=([], "")),
+        patch("src.llm.llm_tag_extractor.extract_tags_with_llm", return_value=[]),
+        patch("src.llm.llm_business.batch_context_tokens", return_value=100_000),
+    ):
+        result = PlanStage().execute(ctx, object(), batch_size=2)
+
+    plan = json.loads(Path(result["plan_file"]).read_text(encoding="utf-8"))
+    assert batches == [[1, 2], [3, 4], [5]]
+    assert result["llm_batches"] == 3
+    assert fake.events == ["start:title:Story 2", "end:title:Story 2"]
+    assert plan["items"][1]["title_chs"] == "中文 Story 2"
+    assert plan["items"][0]["title_chs"] == "批量标题 1"
+    assert plan["items"][4]["discuss_summary"] == "批量生成的第5篇讨论摘要。"
+
+
+def test_plan_falls_back_to_local_extracts_when_no_provider_answers(tmp_path) -> None:
+    fake = _FakeLLM(delay=0)
+
+    async def _no_summary(text, prompt_type="article", llm_type=None, model=None):
+        return ""
+
+    fake.summary = _no_summary
+
+    result, _, _ = _run_plan(tmp_path, count=2, concurrency=4, fake=fake)
+
+    plan = json.loads(Path(result["plan_file"]).read_text(encoding="utf-8"))
+    item = plan["items"][0]
+    assert item["content_summary"] == f"article body {item['id']}"
+    assert item["discuss_summary"] == f"discussion body {item['id']}"
+    assert item["content_summary_source_type"] == item["discuss_summary_source_type"] == "extractive_fallback"
+    assert item["title_chs"] == f"中文 Story {item['id']}"
+    assert result["summary_fallbacks"] == 4
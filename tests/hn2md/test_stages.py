@@ -162,6 +162,20 @@ class TestBaseStageRunRetries:
         # Should sleep twice (after attempt 1 and 2, not after final attempt 3)
         assert mock_sleep.call_count == 2
 
+    def test_retry_does_not_wait_past_the_run_deadline(self, tmp_path):
+        """run() gives up instead of sleeping past run_deadline."""
+        from src.llm.retry import run_deadline
+
+        ctx = _make_ctx(tmp_path)
+        machine = _make_machine(tmp_path)
+
+        stage, call_log = _make_stage(Stage.FETCHING, succeed_after=-1, max_retries=2)
+        with patch("hn2md.stages.base.time.sleep") as mock_sleep, run_deadline(1), pytest.raises(ConnectionError):
+            stage.run(ctx, machine)
+
+        assert len(call_log) == 1
+        mock_sleep.assert_not_called()
+
     def test_non_retryable_error_does_not_retry(self, tmp_path):
         """Operator-action errors should fail once without retry delays."""
         ctx = _make_ctx(tmp_path)
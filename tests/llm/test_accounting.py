@@ -0,0 +1,198 @@
+"""Tests for per-call LLM accounting (src/llm/accounting.py) and ``hn2md llm-stats``."""
+
+import asyncio
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from click.testing import CliRunner
+
+from src.llm import async_client
+from src.llm.accounting import (
+    DISABLE_ENV,
+    CallLog,
+    CallRecord,
+    call_log,
+    call_stats,
+    llm_call_context,
+    report_usage,
+    track_call,
+)
+from src.llm.retry import with_retry
+
+CONFIG = {
+    "grok": {"api_key": "k", "model": "grok-3-beta"},
+    "gemini": {"api_key": "k", "model": "gemini-3-flash-preview"},
+    "moonshot": {"api_key": "k", "model": "moonshot-v1-8k"},
+    "default": "grok",
+}
+
+
+@pytest.fixture(autouse=True)
+def _empty_call_log():
+    call_log.reset()
+    yield
+    call_log.reset()
+
+
+def _row(**fields):
+    values = {
+        "created_at": 1000.0,
+        "run_id": "run-1",
+        "stage": "planning",
+        "news_id": 1,
+        "provider": "grok",
+        "model": "grok-3-beta",
+        "prompt_type": "article",
+        "input_tokens": 1000,
+        "output_tokens": 200,
+        "usage_reported": True,
+        "latency_seconds": 1.0,
+        "retries": 0,
+        "cache_hit": False,
+        "outcome": "ok",
+    }
+    return CallRecord(**{**values, **fields})
+
+
+def _write(db_path, rows):
+    log = CallLog(db_path)
+    for row in rows:
+        log.record(row)
+    assert log.flush() == len(rows)
+
+
+def test_call_llm_records_reported_usage_with_context():
+    from src.llm.llm_utils import call_llm
+
+    def _grok(*args, **kwargs):
+        report_usage({"usage": {"prompt_tokens": 11, "completion_tokens": 7}})
+        return "summary"
+
+    with (
+        patch("src.llm.llm_utils.load_llm_config", return_value=CONFIG),
+        patch("src.llm.llm_utils.call_grok_api", side_effect=_grok),
+        llm_call_context(stage="planning", run_id="run-1"),
+        llm_call_context(news_id=42),
+    ):
+        assert call_llm("prompt", llm_type="grok", prompt_type="article", use_cache=False) == "summary"
+
+    (row,) = call_log.pending()
+    assert (row.stage, row.run_id, row.news_id) == ("planning", "run-1", 42)
+    assert (row.provider, row.model, row.prompt_type, row.outcome) == ("grok", "grok-3-beta", "article", "ok")
+    assert (row.input_tokens, row.output_tokens, row.usage_reported) == (11, 7, True)
+
+
+def test_call_llm_async_falls_back_to_estimated_tokens():
+    def _provider(name):
+        provider = MagicMock()
+
+        async def _acall(prompt, **kwargs):
+            if name == "grok":
+                raise ConnectionError("502")
+            return "word " * 40
+
+        provider.acall = _acall
+        return provider
+
+    with (
+        patch("src.llm.config.load_llm_config", return_value=CONFIG),
+        patch.object(async_client, "get_provider", side_effect=_provider),
+    ):
+        asyncio.run(async_client.call_llm_async("a prompt " * 20, use_cache=False, stream=False))
+
+    failed, answered = call_log.pending()
+    assert (failed.provider, failed.outcome) == ("grok", "error")
+    assert (answered.provider, answered.outcome) == ("gemini", "ok")
+    assert not answered.usage_reported
+    assert answered.input_tokens > 0 and answered.output_tokens > 0
+
+
+def test_retries_are_counted_per_attempt():
+    attempts = []
+
+    @with_retry(max_retries=3, backoff_base=0.0, backoff_max=0.0)
+    def _flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError("reset")
+        return "done"
+
+    with track_call("grok", "grok-3-beta", "title", 5) as call:
+        call.finish(_flaky())
+
+    (row,) = call_log.pending()
+    assert (row.retries, row.outcome, row.input_tokens) == (2, "ok", 5)
+
+
+def test_exception_marks_the_attempt_as_error():
+    with pytest.raises(RuntimeError), track_call("moonshot", "kimi", None, 3):
+        raise RuntimeError("boom")
+
+    assert call_log.pending()[0].outcome == "error"
+
+
+def test_call_stats_percentiles_tokens_and_cost(tmp_path, monkeypatch):
+    monkeypatch.delenv(DISABLE_ENV, raising=False)
+    db_path = str(tmp_path / "calls.db")
+    rows = [_row(news_id=i % 2, latency_seconds=float(i)) for i in range(1, 11)]
+    rows += [
+        _row(outcome="error", latency_seconds=60.0),
+        _row(cache_hit=True, outcome="cache_hit"),
+        _row(outcome="circuit_open", input_tokens=0, output_tokens=0),
+        _row(run_id="run-2", stage="audit", model="unknown-model"),
+    ]
+    _write(db_path, rows)
+
+    stats = call_stats(run_id="run-1", db_path=db_path)
+
+    model = stats["models"]["grok/grok-3-beta"]
+    assert (model["calls"], model["ok"], model["cache_hits"]) == (11, 10, 1)
+    assert model["p50_latency_seconds"] == 6.0
+    assert model["p95_latency_seconds"] == 10.0
+    assert model["tokens_per_story"] == 11 * 1200 // 2
+    # 11 calls × (1000 × $3 + 200 × $15) per million tokens
+    assert model["cost_usd"] == pytest.approx(11 * 0.006)
+    assert set(stats["runs"]) == {"run-1"}
+
+    everything = call_stats(db_path=db_path, prices={"unknown-model": [1.0, 1.0]})
+    assert everything["stages"]["audit"]["cost_usd"] == pytest.approx(0.0012)
+    assert everything["total"]["unpriced_calls"] == 0
+
+
+def test_flush_is_a_no_op_when_disabled(tmp_path):
+    log = CallLog(str(tmp_path / "calls.db"))
+    log.record(_row())
+
+    assert log.flush() == 0
+    assert len(log.pending()) == 1
+
+
+def test_rows_recorded_while_disabled_are_never_written(tmp_path, monkeypatch):
+    log = CallLog(str(tmp_path / "calls.db"))
+    log.record(_row())
+
+    monkeypatch.delenv(DISABLE_ENV)
+    log.record(_row(news_id=2))
+
+    assert log.flush() == 1
+    assert [row.news_id for row in log.pending()] == [1]
+
+
+def test_llm_stats_command(tmp_path, monkeypatch):
+    from hn2md.cli import main
+
+    monkeypatch.delenv(DISABLE_ENV, raising=False)
+    (tmp_path / "data").mkdir()
+    _write(str(tmp_path / "data" / "hacknews.db"), [_row(), _row(news_id=2, latency_seconds=3.0)])
+
+    runner = CliRunner()
+    result = runner.invoke(main, ["--project-root", str(tmp_path), "llm-stats", "--days", "0", "--json"])
+    assert result.exit_code == 0, result.output
+    stats = json.loads(result.output)
+    assert stats["total"]["calls"] == 2
+    assert stats["stages"]["planning"]["stories"] == 2
+
+    result = runner.invoke(main, ["--project-root", str(tmp_path), "llm-stats", "--days", "0"])
+    assert result.exit_code == 0, result.output
+    assert "grok/grok-3-beta" in result.output
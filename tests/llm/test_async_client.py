@@ -0,0 +1,178 @@
+"""Tests for src/llm/async_client.py and the async provider paths."""
+
+import asyncio
+import json
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+
+from src.llm import async_client
+from src.llm.async_client import call_llm_async, get_async_http_client, get_genai_client, get_provider
+from src.llm.providers.base import LLMProvider
+from src.llm.providers.grok import GrokProvider
+from src.llm.providers.moonshot import MoonshotProvider
+
+GROK_CONFIG = {
+    "api_key": "test-key",
+    "api_url": "https://grok.test/v1/chat/completions",
+    "model": "grok-test",
+    "temperature": 0.5,
+    "max_tokens": 100,
+}
+
+
+@pytest.fixture(autouse=True)
+def _llm_config():
+    config = {"grok": GROK_CONFIG, "gemini": {"model": "gemini-test"}, "moonshot": GROK_CONFIG, "default": "grok"}
+    with patch("src.llm.config.load_llm_config", return_value=config):
+        yield config
+
+
+def _completion(text):
+    return httpx.Response(200, json={"choices": [{"message": {"content": text}}]})
+
+
+@pytest.fixture
+def mock_transport():
+    """Route the pooled async client through an in-memory transport."""
+    requests_seen = []
+    clients = []
+
+    def handler(request):
+        requests_seen.append(request)
+        body = json.loads(request.content)
+        return _completion(f"echo:{body['messages'][-1]['content']}")
+
+    def _client():
+        loop = asyncio.get_running_loop()
+        client = async_client._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            async_client._async_clients[loop] = client
+            clients.append(client)
+        return client
+
+    with patch.object(async_client, "get_async_http_client", _client):
+        yield requests_seen, clients
+
+
+def test_async_client_is_reused_within_a_loop_and_replaced_across_loops():
+    async def _two_lookups():
+        first = get_async_http_client()
+        second = get_async_http_client()
+        await async_client.aclose_llm_clients()
+        return first, second
+
+    first, second = asyncio.run(_two_lookups())
+    third, _ = asyncio.run(_two_lookups())
+
+    assert first is second
+    assert third is not first
+    assert first.is_closed
+
+
+def test_genai_client_is_cached_per_api_key():
+    fake_genai = MagicMock()
+    fake_genai.Client.side_effect = lambda api_key: object()
+    fake_google = MagicMock(genai=fake_genai)
+
+    with patch.dict("sys.modules", {"google": fake_google, "google.genai": fake_genai}):
+        async_client._genai_clients.clear()
+        try:
+            first = get_genai_client("key-a")
+            assert get_genai_client("key-a") is first
+            assert get_genai_client("key-b") is not first
+        finally:
+            async_client._genai_clients.clear()
+
+    assert fake_genai.Client.call_count == 2
+
+
+def test_grok_acall_posts_chat_completion_over_pooled_client(mock_transport):
+    requests_seen, clients = mock_transport
+    provider = GrokProvider()
+
+    with patch.object(GrokProvider, "_load_config", return_value=GROK_CONFIG):
+        result = asyncio.run(provider.acall("hello", system_content="sys", max_tokens=20))
+
+    assert result == "echo:hello"
+    body = json.loads(requests_seen[0].content)
+    assert str(requests_seen[0].url) == GROK_CONFIG["api_url"]
+    assert requests_seen[0].headers["Authorization"] == "Bearer test-key"
+    assert body["model"] == "grok-test"
+    assert body["max_tokens"] == 20
+    assert body["messages"][0] == {"role": "system", "content": "sys"}
+    assert len(clients) == 1
+
+
+def test_concurrent_calls_share_one_client(mock_transport):
+    requests_seen, clients = mock_transport
+    provider = MoonshotProvider()
+
+    async def _many():
+        return await asyncio.gather(*(provider.acall(f"p{i}") for i in range(10)))
+
+    with patch.object(MoonshotProvider, "_load_config", return_value=GROK_CONFIG):
+        results = asyncio.run(_many())
+
+    assert results == [f"echo:p{i}" for i in range(10)]
+    assert len(requests_seen) == 10
+    assert len(clients) == 1
+
+
+def test_default_acall_runs_blocking_call_in_a_thread():
+    class BlockingProvider(LLMProvider):
+        name = "blocking"
+
+        def call(self, prompt, **kwargs):
+            return f"sync:{prompt}:{kwargs['max_tokens']}"
+
+    assert asyncio.run(BlockingProvider().acall("x", max_tokens=7)) == "sync:x:7"
+
+
+def test_call_llm_async_falls_back_in_call_llm_order():
+    calls = []
+
+    def _provider(name):
+        provider = MagicMock()
+
+        async def _acall(prompt, **kwargs):
+            calls.append((name, kwargs["model"]))
+            if name == "grok":
+                raise httpx.ConnectError("down")
+            return "" if name == "gemini" else "from-moonshot"
+
+        provider.acall = _acall
+        return provider
+
+    with patch.object(async_client, "get_provider", side_effect=_provider):
+        result = asyncio.run(call_llm_async("hi", llm_type="grok", model="grok-x"))
+
+    assert result == "from-moonshot"
+    assert calls == [("grok", "grok-x"), ("gemini", None), ("moonshot", None)]
+
+
+def test_call_llm_async_limits_image_requests_to_image_providers():
+    calls = []
+
+    def _provider(name):
+        provider = MagicMock()
+
+        async def _acall(prompt, **kwargs):
+            calls.append(name)
+            return ""
+
+        provider.acall = _acall
+        return provider
+
+    with patch.object(async_client, "get_provider", side_effect=_provider):
+        result = asyncio.run(call_llm_async("describe", llm_type="moonshot", image_data="aGk="))
+
+    assert result == ""
+    assert calls == ["gemini"]
+
+
+def test_get_provider_rejects_unknown_name():
+    with pytest.raises(ValueError):
+        get_provider("unknown")
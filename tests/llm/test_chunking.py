@@ -0,0 +1,59 @@
+"""Tests for src/llm/chunking.py."""
+
+from src.llm.chunking import chunk_text, truncate_tokens
+from src.llm.router import estimate_tokens
+
+
+def _squash(text):
+    return "".join(text.split())
+
+
+def test_short_text_is_one_chunk():
+    assert chunk_text("Hello world.", 100) == ["Hello world."]
+    assert chunk_text("   ", 100) == []
+
+
+def test_chunks_respect_budget_and_keep_all_text():
+    text = "\n\n".join(f"Sentence {i} of a long article. " * 30 for i in range(8))
+
+    chunks = chunk_text(text, 200)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 200 for chunk in chunks)
+    assert _squash("".join(chunks)) == _squash(text)
+
+
+def test_paragraphs_are_kept_whole_when_they_fit():
+    text = "First paragraph here.\n\nSecond paragraph here.\n\nThird paragraph here."
+
+    assert chunk_text(text, 12) == ["First paragraph here.\n\nSecond paragraph here.", "Third paragraph here."]
+
+
+def test_cjk_text_is_split_at_sentence_ends():
+    text = "这是一个很长的中文句子，用来测试分段。" * 50
+
+    chunks = chunk_text(text, 100)
+
+    assert all(estimate_tokens(chunk) <= 100 for chunk in chunks)
+    assert all(chunk.endswith("。") for chunk in chunks)
+    assert "".join(chunks) == text
+
+
+def test_overlong_sentence_is_cut_at_whitespace():
+    text = " ".join(["word"] * 1_000)
+
+    chunks = chunk_text(text, 50)
+
+    assert all(estimate_tokens(chunk) <= 50 for chunk in chunks)
+    assert all(chunk.split() == ["word"] * len(chunk.split()) for chunk in chunks)
+
+
+def test_truncate_tokens_keeps_leading_sentences():
+    text = "One sentence here. " * 100
+
+    truncated = truncate_tokens(text, 40)
+
+    assert text.startswith(truncated)
+    assert truncated.endswith(".")
+    assert estimate_tokens(truncated) <= 40
+    assert truncate_tokens("short", 40) == "short"
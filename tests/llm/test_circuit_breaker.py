@@ -0,0 +1,201 @@
+"""Tests for src/llm/circuit_breaker.py and its use in call_llm / call_llm_async."""
+
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.llm import async_client
+from src.llm.circuit_breaker import CLOSED, HALF_OPEN, MIN_CALLS, OPEN, OPEN_SECONDS, CircuitBreakers
+
+MODEL = ("grok", "grok-3-beta")
+CONFIG = {
+    "grok": {"api_key": "k", "model": "grok-3-beta"},
+    "gemini": {"api_key": "k", "model": "gemini-3-flash-preview"},
+    "moonshot": {"api_key": "k", "model": "moonshot-v1-8k"},
+    "default": "grok",
+}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def breakers(clock):
+    return CircuitBreakers(clock)
+
+
+def _state(breakers):
+    return breakers.snapshot()["grok/grok-3-beta"]["state"]
+
+
+def _trip(breakers):
+    for _ in range(MIN_CALLS):
+        assert breakers.allow(*MODEL)
+        breakers.record(*MODEL, False)
+
+
+def test_opens_on_failure_rate_and_rejects_fast(breakers):
+    breakers.record(*MODEL, True)
+    breakers.record(*MODEL, False)
+    assert _state(breakers) == CLOSED
+
+    # 2 of 3 calls failed
+    breakers.record(*MODEL, False)
+
+    assert _state(breakers) == OPEN
+    assert not breakers.allow(*MODEL)
+    assert breakers.snapshot()["grok/grok-3-beta"]["rejected"] == 1
+
+
+def test_half_open_lets_a_single_probe_through(breakers, clock):
+    _trip(breakers)
+    clock.now += OPEN_SECONDS
+
+    probe = breakers.allow(*MODEL)
+    assert probe
+    assert _state(breakers) == HALF_OPEN
+    assert not breakers.allow(*MODEL)
+
+    breakers.record(*MODEL, True, probe)
+    assert _state(breakers) == CLOSED
+    assert breakers.allow(*MODEL)
+
+
+def test_failed_probe_doubles_the_open_period(breakers, clock):
+    _trip(breakers)
+    clock.now += OPEN_SECONDS
+    probe = breakers.allow(*MODEL)
+    breakers.record(*MODEL, False, probe)
+
+    clock.now += OPEN_SECONDS
+    assert not breakers.allow(*MODEL)
+    clock.now += OPEN_SECONDS
+    assert breakers.allow(*MODEL)
+
+
+def test_released_probe_can_be_retried_at_once(breakers, clock):
+    _trip(breakers)
+    clock.now += OPEN_SECONDS
+    probe = breakers.allow(*MODEL)
+
+    breakers.release(*MODEL, probe)
+
+    assert breakers.allow(*MODEL)
+
+
+def test_late_outcomes_do_not_decide_the_probe(breakers, clock):
+    slow = [breakers.allow(*MODEL) for _ in range(2)]
+    _trip(breakers)
+    clock.now += OPEN_SECONDS
+    probe = breakers.allow(*MODEL)
+
+    breakers.record(*MODEL, True, slow[0])
+    breakers.record(*MODEL, False, slow[1])
+    breakers.release(*MODEL, slow[0])
+    breakers.record(*MODEL, True)
+
+    assert _state(breakers) == HALF_OPEN
+    assert not breakers.allow(*MODEL)
+    breakers.record(*MODEL, True, probe)
+    assert _state(breakers) == CLOSED
+
+
+def test_stale_probe_outcome_is_ignored_after_replacement(breakers, clock):
+    _trip(breakers)
+    clock.now += OPEN_SECONDS
+    stale = breakers.allow(*MODEL)
+    clock.now += OPEN_SECONDS
+    probe = breakers.allow(*MODEL)
+
+    breakers.record(*MODEL, False, stale)
+
+    assert _state(breakers) == HALF_OPEN
+    breakers.record(*MODEL, True, probe)
+    assert _state(breakers) == CLOSED
+
+
+def test_old_failures_leave_the_window(breakers, clock):
+    breakers.record(*MODEL, False)
+    breakers.record(*MODEL, False)
+    clock.now += 1000
+    breakers.record(*MODEL, False)
+
+    assert _state(breakers) == CLOSED
+
+
+def test_call_llm_skips_an_open_provider():
+    from src.llm.circuit_breaker import circuit_breakers
+    from src.llm.llm_utils import call_llm
+
+    with (
+        patch("src.llm.llm_utils.load_llm_config", return_value=CONFIG),
+        patch("src.llm.llm_utils.call_grok_api", return_value="") as grok,
+        patch("src.llm.llm_utils.call_gemini_api", return_value="from gemini"),
+    ):
+        for _ in range(MIN_CALLS + 2):
+            assert call_llm("prompt", llm_type="grok", use_cache=False) == "from gemini"
+
+    assert grok.call_count == MIN_CALLS
+    assert circuit_breakers.snapshot()["grok/grok-3-beta"] == {"state": OPEN, "rejected": 2}
+
+
+def test_call_llm_async_skips_an_open_provider():
+    calls = []
+
+    def _provider(name):
+        provider = MagicMock()
+
+        async def _acall(prompt, **kwargs):
+            calls.append(name)
+            if name == "grok":
+                raise ConnectionError("502")
+            return "from gemini"
+
+        provider.acall = _acall
+        return provider
+
+    async def _run():
+        return [await async_client.call_llm_async("hi", use_cache=False) for _ in range(MIN_CALLS + 2)]
+
+    with (
+        patch("src.llm.config.load_llm_config", return_value=CONFIG),
+        patch.object(async_client, "get_provider", side_effect=_provider),
+    ):
+        results = asyncio.run(_run())
+
+    assert set(results) == {"from gemini"}
+    assert calls.count("grok") == MIN_CALLS
+
+
+def test_attempt_cancelled_while_queueing_does_not_hold_the_probe(breakers, clock):
+    from src.llm.request_slots import request_slot, request_slots
+
+    _trip(breakers)
+    clock.now += OPEN_SECONDS
+
+    async def _run():
+        with request_slots(1):
+            async with request_slot():
+                attempt = asyncio.create_task(
+                    async_client._attempt_async(CONFIG, "grok", None, "hi", {}, None, 1, False)
+                )
+                await asyncio.sleep(0)
+                attempt.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await attempt
+
+    with patch("src.llm.circuit_breaker.circuit_breakers", breakers):
+        asyncio.run(_run())
+
+    assert breakers.allow(*MODEL)
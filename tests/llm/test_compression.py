@@ -0,0 +1,109 @@
+"""Tests for src/llm/compression.py."""
+
+from src.llm.compression import (
+    CompressionStats,
+    compress_text,
+    extractive_summary,
+    strip_boilerplate,
+    textrank_scores,
+)
+
+ARTICLE = [
+    "The new database engine stores time series data in compressed columnar blocks.",
+    "Benchmarks show the engine answering range queries ten times faster than before.",
+    "Its authors explain that the columnar blocks are decoded lazily during range queries.",
+]
+PAGE = "\n".join(
+    [
+        "Home",
+        "Products",
+        "Skip to content",
+        "We use cookies to improve your experience. Accept all",
+        *ARTICLE,
+        "Share this article",
+        "Subscribe to our newsletter",
+        "Page 1 of 3",
+        "Page 2 of 3",
+        "© 2026 Example Corp. All rights reserved.",
+    ]
+)
+
+
+def test_boilerplate_and_menu_lines_are_removed():
+    assert strip_boilerplate(PAGE) == ARTICLE
+
+
+def test_repeated_short_blocks_are_dropped_and_long_repeats_kept_once():
+    long_line = ARTICLE[0] + " " + ARTICLE[1]
+    text = "\n".join(["Top stories today.", long_line, "Top stories today.", ARTICLE[2], long_line])
+
+    assert strip_boilerplate(text) == [long_line, ARTICLE[2]]
+
+
+def test_compression_reports_token_reduction():
+    result = compress_text(PAGE)
+
+    assert result.text == "\n".join(ARTICLE)
+    assert result.output_tokens < result.input_tokens
+    assert 0 < result.ratio < 1
+
+
+def test_textrank_prefers_central_sentences():
+    sentences = [
+        "Columnar storage compresses time series data well.",
+        "The weather was pleasant on the day of the launch party.",
+        "Time series queries benefit from columnar storage and compression.",
+        "Compression of columnar time series data speeds up queries.",
+    ]
+
+    scores = textrank_scores(sentences)
+
+    assert scores[1] == min(scores)
+
+
+def test_budget_keeps_informative_sentences_in_order():
+    filler = [f"Unrelated remark number {word} about lunch menus." for word in ("one", "two", "three", "four")]
+    text = " ".join([ARTICLE[0], *filler[:2], ARTICLE[1], *filler[2:], ARTICLE[2]])
+
+    result = compress_text(text, max_tokens=70)
+
+    assert result.output_tokens <= 70
+    kept = [sentence for sentence in ARTICLE if sentence in result.text]
+    assert len(kept) >= 2
+    assert result.text.index(kept[0]) < result.text.index(kept[1])
+
+
+def test_text_without_content_lines_is_returned_unchanged():
+    assert compress_text("Home\nAbout").text == "Home\nAbout"
+
+
+def test_stats_total_reduction_ratio():
+    stats = CompressionStats()
+    stats.record(compress_text(PAGE))
+    stats.record(compress_text("\n".join(ARTICLE)))
+
+    snapshot = stats.snapshot()
+
+    assert snapshot["texts"] == 2
+    assert snapshot["output_tokens"] < snapshot["input_tokens"]
+    assert 0 < snapshot["reduction_ratio"] < 1
+
+
+def test_extractive_summary_keeps_the_lede_and_recurring_keywords():
+    filler = ["The weather was pleasant on the day of the launch party.", "Lunch came late and nobody minded much."]
+    text = "\n".join([PAGE, *filler, "Range queries on columnar blocks of time series data stay fast under load."])
+
+    summary = extractive_summary(text, max_chars=250, lead=1)
+
+    assert len(summary) <= 250
+    assert summary.startswith(ARTICLE[0])
+    assert "columnar blocks of time series" in summary
+    assert "weather" not in summary and "cookies" not in summary
+
+
+def test_extractive_summary_clips_a_single_long_sentence():
+    summary = extractive_summary("word " * 200, max_chars=60)
+
+    assert len(summary) <= 60
+    assert summary.endswith("…")
+    assert extractive_summary("") == extractive_summary(None) == ""
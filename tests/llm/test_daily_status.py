@@ -0,0 +1,119 @@
+"""Tests for the in-memory quota ledger in src/llm/daily_status.py."""
+
+import sqlite3
+from contextlib import contextmanager
+from unittest.mock import patch
+
+import pytest
+
+from src.llm import daily_status
+from src.llm.daily_status import QuotaLedger
+
+MODEL = ("gemini", "gemini-3-flash-preview")
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Route daily_status.get_db to a temp database and count connections."""
+    db_path = str(tmp_path / "quota.db")
+    opened = []
+
+    @contextmanager
+    def _get_db(db_path_arg=None):
+        opened.append(1)
+        conn = sqlite3.connect(db_path)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    with patch("src.llm.daily_status.get_db", _get_db):
+        yield db_path, opened
+
+
+def _ledger(**kwargs):
+    # A long check interval keeps the version query out of the way unless a test wants it
+    return QuotaLedger(**{"version_check_seconds": 3600, **kwargs})
+
+
+def _stored_count(db_path):
+    with sqlite3.connect(db_path) as conn:
+        row = conn.execute("SELECT request_count FROM llm_model_daily_usage WHERE provider = ? AND model = ?", MODEL).fetchone()
+    return row[0] if row else 0
+
+
+def test_hot_path_stays_in_memory_after_first_load(db):
+    _, opened = db
+    ledger = _ledger()
+    with patch.object(ledger, "_schedule_flush"):
+        assert ledger.reserve(*MODEL, 3)
+        loaded = len(opened)
+        assert ledger.reserve(*MODEL, 3)
+        assert not ledger.is_disabled(*MODEL)
+        assert ledger.reserve(*MODEL, 3)
+        assert not ledger.reserve(*MODEL, 3)
+
+    assert len(opened) == loaded
+
+
+def test_flush_writes_behind_and_adopts_other_processes_counts(db):
+    db_path, _ = db
+    ledger, other = _ledger(), _ledger()
+    with patch.object(QuotaLedger, "_schedule_flush"):
+        ledger.reserve(*MODEL, 20)
+        ledger.reserve(*MODEL, 20)
+        other.reserve(*MODEL, 20)
+        assert _stored_count(db_path) == 0
+
+        other.flush()
+        ledger.flush()
+
+    assert _stored_count(db_path) == 3
+    # RETURNING brought the other process's reservation into memory
+    assert ledger.status()[1][MODEL] == 3
+
+
+def test_version_change_invalidates_other_ledgers(db):
+    ledger, other = _ledger(version_check_seconds=0), _ledger()
+    with patch.object(QuotaLedger, "_schedule_flush"):
+        assert not ledger.is_disabled(*MODEL)
+        other.disable(*MODEL, "quota_exhausted", "429")
+        other.flush()
+
+        assert ledger.is_disabled(*MODEL)
+
+
+def test_own_writes_do_not_force_a_reload(db):
+    ledger = _ledger(version_check_seconds=0)
+    with patch.object(ledger, "_schedule_flush"):
+        ledger.reserve(*MODEL, 20)
+        ledger.flush()
+        with patch.object(ledger, "_load", wraps=ledger._load) as load:
+            ledger.reserve(*MODEL, 20)
+
+    load.assert_not_called()
+
+
+def test_failed_flush_is_requeued(db):
+    db_path, _ = db
+    ledger = _ledger()
+    with patch.object(ledger, "_schedule_flush"):
+        ledger.reserve(*MODEL, 20)
+        with patch("src.llm.daily_status._ensure_llm_status_table", side_effect=sqlite3.OperationalError("locked")):
+            ledger.flush()
+        assert _stored_count(db_path) == 0
+
+        ledger.flush()
+
+    assert _stored_count(db_path) == 1
+
+
+def test_module_functions_write_through_the_ledger(db):
+    db_path, _ = db
+    daily_status.disable_model_for_today(*MODEL, "quota_exhausted", "429")
+    daily_status.quota_ledger.flush()
+
+    with sqlite3.connect(db_path) as conn:
+        row = conn.execute("SELECT is_disabled, reason FROM llm_model_daily_status").fetchone()
+    assert row == (1, "quota_exhausted")
@@ -0,0 +1,112 @@
+"""Tests for hedged requests (src/llm/hedging.py) in call_llm_async."""
+
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.llm import async_client
+from src.llm.hedging import HEDGE_PRIOR_FACTOR, HedgeBudget, hedge_budget, hedge_delay
+from src.llm.router import PRIOR_LATENCY_SECONDS, ModelRouter
+
+CONFIG = {
+    "grok": {"api_key": "k", "model": "grok-3-beta"},
+    "gemini": {"api_key": "k", "model": "gemini-3-flash-preview"},
+    "moonshot": {"api_key": "k", "model": "moonshot-v1-8k"},
+    "default": "grok",
+    "hedge_budget": 1.0,
+}
+
+
+@pytest.fixture
+def router():
+    router = ModelRouter()
+    hedge_budget.reset()
+    with patch("src.llm.router.model_router", router):
+        yield router
+    hedge_budget.reset()
+
+
+def _providers(latencies, calls, cancelled):
+    """Fake providers answering ``from-<name>`` after ``latencies[name]`` seconds."""
+
+    def _provider(name):
+        provider = MagicMock()
+
+        async def _acall(prompt, **kwargs):
+            calls.append(name)
+            try:
+                await asyncio.sleep(latencies[name])
+            except asyncio.CancelledError:
+                cancelled.append(name)
+                raise
+            return f"from-{name}"
+
+        provider.acall = _acall
+        return provider
+
+    return _provider
+
+
+def _call(latencies, config=CONFIG, delay=0.01):
+    calls, cancelled = [], []
+    with (
+        patch("src.llm.config.load_llm_config", return_value=config),
+        patch.object(async_client, "get_provider", side_effect=_providers(latencies, calls, cancelled)),
+        patch("src.llm.hedging.hedge_delay", return_value=delay),
+    ):
+        result = asyncio.run(async_client.call_llm_async("hi", prompt_type="tags"))
+    return result, calls, cancelled
+
+
+def test_delay_is_learned_p90_with_prior_fallback(router):
+    assert hedge_delay(router, "grok", "grok-3-beta", "tags") == PRIOR_LATENCY_SECONDS["grok"] * HEDGE_PRIOR_FACTOR
+
+    for seconds in range(1, 11):
+        router.record("grok", "grok-3-beta", "tags", float(seconds), True)
+    router.record("grok", "grok-3-beta", "tags", 60.0, False)
+
+    assert hedge_delay(router, "grok", "grok-3-beta", "tags") == 10.0
+
+
+def test_budget_caps_hedges_at_a_share_of_requests():
+    budget = HedgeBudget()
+    for _ in range(9):
+        budget.record_request()
+
+    assert not budget.try_spend(0.1)
+    budget.record_request()
+    assert budget.try_spend(0.1)
+    assert not budget.try_spend(0.1)
+    assert not budget.try_spend(0.0)
+    assert budget.snapshot() == {"requests": 11, "hedges": 1, "hedge_wins": 0, "hedges_denied": 2}
+
+
+def test_slow_primary_is_hedged_and_cancelled(router):
+    hedge_budget.record_request()
+
+    result, calls, cancelled = _call({"grok": 5.0, "gemini": 0.01, "moonshot": 0.01})
+
+    assert result == "from-gemini"
+    assert calls == ["grok", "gemini"]
+    assert cancelled == ["grok"]
+    assert hedge_budget.snapshot()["hedge_wins"] == 1
+    # The cancelled loser is not counted as a failure
+    assert "grok/grok-3-beta" not in router.snapshot()["models"]
+
+
+def test_fast_primary_is_not_hedged(router):
+    hedge_budget.record_request()
+
+    result, calls, _ = _call({"grok": 0.0, "gemini": 0.0, "moonshot": 0.0}, delay=1.0)
+
+    assert result == "from-grok"
+    assert calls == ["grok"]
+    assert hedge_budget.snapshot()["hedges"] == 0
+
+
+def test_no_hedging_without_budget(router):
+    result, calls, _ = _call({"grok": 0.05, "gemini": 0.0, "moonshot": 0.0}, config={**CONFIG, "hedge_budget": 0.0})
+
+    assert result == "from-grok"
+    assert calls == ["grok"]
@@ -0,0 +1,96 @@
+"""Tests for vision payload preparation (src/llm/image_payload.py)."""
+
+import base64
+import io
+import random
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+from src.llm import image_payload
+from src.llm.image_payload import (
+    FOLD_MAX_RATIO,
+    MAX_EDGE_PX,
+    image_mime_type,
+    image_payload_stats,
+    prepare_image,
+    prepare_image_b64,
+)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_payload_cache():
+    image_payload._cache.clear()
+    image_payload_stats.reset()
+    yield
+    image_payload._cache.clear()
+
+
+def _png(width, height, mode="RGB"):
+    rng = random.Random(width * height)
+    # Noisy pixels, like text-heavy screenshots that PNG cannot shrink much
+    image = Image.frombytes(mode, (width, height), rng.randbytes(width * height * len(mode)))
+    out = io.BytesIO()
+    image.save(out, format="PNG")
+    return out.getvalue()
+
+
+def _decoded(payload):
+    return Image.open(io.BytesIO(base64.b64decode(payload.data)))
+
+
+def test_full_page_capture_is_cropped_and_downsampled():
+    payload = prepare_image(_png(1600, 4000))
+
+    assert payload.mime_type == "image/jpeg"
+    assert payload.payload_bytes * 4 < payload.original_bytes
+    width, height = _decoded(payload).size
+    assert height == MAX_EDGE_PX
+    assert width == pytest.approx(MAX_EDGE_PX / FOLD_MAX_RATIO, abs=1)
+
+
+def test_transparent_images_become_jpeg():
+    payload = prepare_image(_png(800, 600, mode="RGBA"))
+
+    assert payload.mime_type == "image/jpeg"
+    assert _decoded(payload).mode == "RGB"
+
+
+def test_payload_is_cached_by_content_hash():
+    raw = _png(1600, 900)
+    with patch.object(image_payload, "_encode", wraps=image_payload._encode) as encode:
+        first = prepare_image(raw)
+        second = prepare_image(raw)
+
+    assert first is second
+    assert encode.call_count == 1
+    stats = image_payload_stats.snapshot()
+    assert (stats["images"], stats["cache_hits"]) == (2, 1)
+    assert stats["saved_bytes"] == 2 * first.saved_bytes
+
+
+def test_undecodable_bytes_are_sent_unchanged():
+    payload = prepare_image_b64("aGk=")
+
+    assert payload.data == "aGk="
+    assert payload.saved_bytes == 0
+    assert prepare_image_b64("not base64!") is None
+
+
+def test_mime_type_follows_the_payload_bytes():
+    assert image_mime_type(base64.b64encode(_png(4, 4)).decode()) == "image/png"
+    assert image_mime_type(prepare_image(_png(640, 480)).data) == "image/jpeg"
+    assert image_mime_type("aGk=") == "image/png"
+
+
+def test_image_summary_sends_the_prepared_jpeg():
+    from src.llm.llm_business import generate_summary_from_image
+
+    raw = _png(1600, 2400)
+    with patch("src.llm.llm_business.call_llm", return_value="摘要") as call:
+        assert generate_summary_from_image(base64.b64encode(raw).decode(), "describe", "grok") == "摘要"
+
+    sent = call.call_args.kwargs["image_data"]
+    assert image_mime_type(sent) == "image/jpeg"
+    assert len(base64.b64decode(sent)) < len(raw) // 4
@@ -1,6 +1,6 @@
 """Tests for src/llm/llm_business.py."""
 
-from unittest.mock import patch, MagicMock
+from unittest.mock import MagicMock, patch
 
 import pytest
 
@@ -72,3 +72,245 @@ class TestGenerateSummaryFromImage:
         result = generate_summary_from_image("", "describe this", "grok")
         assert result == ""
         mock_llm.assert_not_called()
+
+
+def _story(news_id, article="word " * 50, discussion="comment " * 30):
+    return {
+        "id": news_id,
+        "title": f"Story {news_id}",
+        "article_content": article,
+        "discussion_content": discussion,
+    }
+
+
+def _batch_item(news_id, summary=None):
+    return {
+        "id": news_id,
+        "content_summary": summary or f"第{news_id}条新闻的中文摘要，内容足够长，可以通过长度校验。第二句会被截掉",
+        "discuss_summary": f"社区对第{news_id}条新闻的讨论摘要。",
+        "title_chs": f"中文标题{news_id}",
+    }
+
+
+class TestStoryBatches:
+    """Tests for batch planning and generate_story_batch."""
+
+    def test_batches_respect_story_limit(self):
+        from src.llm.llm_business import plan_story_batches
+        stories = [_story(i) for i in range(1, 8)]
+        batches = plan_story_batches(stories, max_stories=3, context_tokens=100_000)
+        assert [[s["id"] for s in batch] for batch in batches] == [[1, 2, 3], [4, 5, 6], [7]]
+
+    def test_batches_respect_context_budget(self):
+        from src.llm.llm_business import BATCH_OUTPUT_TOKENS_PER_STORY, plan_story_batches
+        stories = [_story(i) for i in range(1, 5)]
+        batches = plan_story_batches(stories, max_stories=10, context_tokens=2 * BATCH_OUTPUT_TOKENS_PER_STORY + 600)
+        assert all(len(batch) == 1 for batch in batches)
+        assert len(batches) == 4
+
+    def test_context_tokens_from_config(self):
+        from src.llm.llm_business import batch_context_tokens
+        config = {"grok": {"context_tokens": 4096}, "gemini": {}, "default": "grok"}
+        with patch("src.llm.llm_business.load_llm_config", return_value=config):
+            assert batch_context_tokens() == 4096
+            assert batch_context_tokens("gemini") == 1_048_576
+
+    @patch("src.llm.llm_business.call_llm")
+    def test_one_request_for_whole_batch(self, mock_llm):
+        import json
+
+        from src.llm.llm_business import generate_story_batch
+        mock_llm.return_value = "```json\n" + json.dumps({"items": [_batch_item(1), _batch_item(2)]}) + "\n```"
+        results = generate_story_batch([_story(1), _story(2)], llm_type="grok")
+        assert mock_llm.call_count == 1
+        assert mock_llm.call_args.kwargs["response_format"] == {"type": "json_object"}
+        assert results[1] == {
+            "content_summary": "第1条新闻的中文摘要，内容足够长，可以通过长度校验。",
+            "discuss_summary": "社区对第1条新闻的讨论摘要。",
+            "title_chs": "中文标题1",
+        }
+        assert results[2]["title_chs"] == "中文标题2"
+
+    @patch("src.llm.llm_business.call_llm")
+    def test_only_invalid_items_are_requested_again(self, mock_llm):
+        import json
+
+        from src.llm.llm_business import generate_story_batch
+        mock_llm.side_effect = [
+            json.dumps({"items": [_batch_item(1), _batch_item(2, summary="As an AI, I cannot summarize this.")]}),
+            json.dumps({"items": [_batch_item(2)]}),
+        ]
+        results = generate_story_batch([_story(1), _story(2)])
+        retry_prompt = mock_llm.call_args_list[1].args[0]
+        assert '"id": 2' in retry_prompt
+        assert '"id": 1' not in retry_prompt
+        assert results[2]["content_summary"] == "第2条新闻的中文摘要，内容足够长，可以通过长度校验。"
+
+    @patch("src.llm.llm_business.call_llm")
+    def test_unparseable_response_leaves_fields_empty(self, mock_llm):
+        from src.llm.llm_business import BATCH_RETRY_ROUNDS, generate_story_batch
+        mock_llm.return_value = "not json"
+        results = generate_story_batch([_story(1, discussion="")])
+        assert results[1] == {"content_summary": "", "discuss_summary": "", "title_chs": ""}
+        assert mock_llm.call_count == 1 + BATCH_RETRY_ROUNDS
+
+    def test_invalid_batch_is_retried_past_the_cache(self, tmp_path, monkeypatch):
+        import json
+
+        from src.llm import response_cache
+        from src.llm.llm_business import BATCH_RETRY_ROUNDS, generate_story_batch
+        monkeypatch.delenv(response_cache.BYPASS_ENV, raising=False)
+        cache = response_cache.LLMResponseCache(db_path=str(tmp_path / "cache.db"))
+        monkeypatch.setattr(response_cache, "_default_cache", cache)
+        config = {"grok": {"api_key": "key", "model": "grok-3-beta"}, "default": "grok"}
+        invalid = json.dumps({"items": [_batch_item(1, summary="太短。")]})
+        with (
+            patch("src.llm.llm_utils.load_llm_config", return_value=config),
+            patch("src.llm.llm_utils.call_grok_api", return_value=invalid) as mock_grok,
+        ):
+            generate_story_batch([_story(1)], llm_type="grok")
+            assert mock_grok.call_count == 1 + BATCH_RETRY_ROUNDS
+            assert cache.stats()["entries"] == 0
+
+            mock_grok.return_value = json.dumps({"items": [_batch_item(1)]})
+            results = generate_story_batch([_story(1)], llm_type="grok")
+        assert results[1]["title_chs"] == "中文标题1"
+        assert mock_grok.call_count == 2 + BATCH_RETRY_ROUNDS
+        assert cache.stats()["entries"] == 1
+
+    def test_invalid_batch_is_retried_with_single_flight_enabled(self, tmp_path, monkeypatch):
+        import asyncio
+        import json
+
+        from src.llm import async_client, response_cache
+        from src.llm.llm_business import BATCH_RETRY_ROUNDS, generate_story_batch, generate_story_batch_async
+        from src.llm.single_flight import FlightLease, SingleFlight
+        monkeypatch.delenv(response_cache.BYPASS_ENV, raising=False)
+        monkeypatch.delenv("HN2MD_NO_LLM_SINGLE_FLIGHT", raising=False)
+        monkeypatch.setattr(response_cache, "_default_cache", response_cache.LLMResponseCache(str(tmp_path / "c.db")))
+        flights = SingleFlight(FlightLease(str(tmp_path / "flight.db")))
+        monkeypatch.setattr("src.llm.llm_utils.single_flight", flights)
+        monkeypatch.setattr("src.llm.single_flight.single_flight", flights)
+        config = {"grok": {"api_key": "key", "model": "grok-3-beta"}, "default": "grok"}
+        invalid = json.dumps({"items": [_batch_item(1, summary="太短。")]})
+        provider = MagicMock()
+        provider.acall.side_effect = lambda *args, **kwargs: asyncio.sleep(0, invalid)
+
+        with (
+            patch("src.llm.llm_utils.load_llm_config", return_value=config),
+            patch("src.llm.config.load_llm_config", return_value=config),
+            patch("src.llm.llm_utils.call_grok_api", return_value=invalid) as mock_grok,
+            patch.object(async_client, "get_provider", return_value=provider),
+        ):
+            generate_story_batch([_story(1)], llm_type="grok")
+            asyncio.run(generate_story_batch_async([_story(2)], llm_type="grok"))
+
+        assert mock_grok.call_count == 1 + BATCH_RETRY_ROUNDS
+        assert provider.acall.call_count == 1 + BATCH_RETRY_ROUNDS
+
+
+def _long_article(paragraphs=12):
+    return "\n\n".join(f"Paragraph {i} explains one part of the story in detail. " * 60 for i in range(paragraphs))
+
+
+class TestMapReduceSummary:
+    """Tests for chunked map-reduce summarisation of long sources."""
+
+    @patch("src.llm.llm_business.summary_chunk_tokens", return_value=1_000)
+    @patch("src.llm.llm_business.call_llm")
+    def test_long_text_is_summarised_per_chunk_then_reduced(self, mock_llm, _chunk_tokens):
+        from src.llm.llm_business import generate_summary
+        mock_llm.side_effect = lambda prompt, **kwargs: (
+            "合并后的最终摘要。多余的半句" if "分段要点" in prompt else "这一段的要点。"
+        )
+        result = generate_summary(_long_article(), prompt_type="article", llm_type="grok")
+        prompts = [c.args[0] for c in mock_llm.call_args_list]
+        map_prompts = [p for p in prompts if "分段要点" not in p]
+        assert len(map_prompts) == 6
+        assert all(f"/{len(map_prompts)}部分" in p for p in map_prompts)
+        assert prompts[-1].count("这一段的要点") == 6
+        assert result == "合并后的最终摘要。"
+
+    @patch("src.llm.llm_business.summary_chunk_tokens", return_value=1_000)
+    @patch("src.llm.llm_business.call_llm")
+    def test_chunks_beyond_limit_are_dropped(self, mock_llm, _chunk_tokens):
+        from src.llm.llm_business import MAP_REDUCE_MAX_CHUNKS, generate_summary
+        mock_llm.return_value = "要点。"
+        generate_summary(_long_article(paragraphs=30), prompt_type="discussion")
+        assert mock_llm.call_count == MAP_REDUCE_MAX_CHUNKS + 1
+
+    @patch("src.llm.llm_business.summary_chunk_tokens", return_value=1_000)
+    @patch("src.llm.llm_business.call_llm", return_value="null")
+    def test_no_reduce_when_every_chunk_fails(self, mock_llm, _chunk_tokens):
+        from src.llm.llm_business import generate_summary
+        assert generate_summary(_long_article(paragraphs=3)) == ""
+        assert mock_llm.call_count == 3
+
+    @patch("src.llm.llm_business.summary_chunk_tokens", return_value=1_000)
+    @patch("src.llm.llm_business.call_llm")
+    def test_map_requests_keep_the_callers_context(self, mock_llm, _chunk_tokens):
+        from src.llm.accounting import _context, llm_call_context
+        from src.llm.llm_business import generate_summary
+        from src.llm.retry import run_deadline, time_left
+
+        seen = []
+        mock_llm.side_effect = lambda prompt, **kwargs: seen.append((time_left(), _context.get())) or "要点。"
+        with run_deadline(60), llm_call_context(stage="plan", news_id=7):
+            generate_summary(_long_article(paragraphs=3), prompt_type="article")
+        assert len(seen) == 4
+        assert all(left is not None and 0 < left <= 60 for left, _ in seen)
+        assert all(context["news_id"] == 7 and context["stage"] == "plan" for _, context in seen)
+
+    @patch("src.llm.llm_business.call_llm_async")
+    def test_async_map_reduce(self, mock_llm):
+        import asyncio
+
+        from src.llm.llm_business import generate_summary_async
+
+        async def _call(prompt, **kwargs):
+            return "最终摘要。结尾" if "分段要点" in prompt else "要点。"
+
+        mock_llm.side_effect = _call
+        with patch("src.llm.llm_business.summary_chunk_tokens", return_value=1_000):
+            result = asyncio.run(generate_summary_async(_long_article(paragraphs=3), prompt_type="article"))
+        assert result == "最终摘要。"
+        assert mock_llm.call_count == 4
+
+    def test_chunk_size_follows_context_window(self):
+        from src.llm.llm_business import SUMMARY_CHUNK_TOKENS, SUMMARY_INPUT_TOKENS, summary_chunk_tokens
+        with patch("src.llm.llm_business.batch_context_tokens", return_value=1_048_576):
+            assert summary_chunk_tokens("gemini") == SUMMARY_CHUNK_TOKENS
+        with patch("src.llm.llm_business.batch_context_tokens", return_value=4_096):
+            assert SUMMARY_INPUT_TOKENS <= summary_chunk_tokens("moonshot") < 4_096
+
+    @patch("src.llm.llm_business.call_llm")
+    def test_mid_length_text_is_sent_whole(self, mock_llm):
+        from src.llm.llm_business import generate_summary
+        mock_llm.return_value = "摘要。"
+        text = "词" * 3_000
+        with patch("src.llm.llm_business.batch_context_tokens", return_value=131_072):
+            generate_summary(text)
+        assert mock_llm.call_count == 1
+        assert text in mock_llm.call_args.args[0]
+
+
+class TestArticlePreCompression:
+    """Scraped article text is compressed locally before summarisation."""
+
+    @patch("src.llm.llm_business.call_llm", return_value="摘要。")
+    def test_boilerplate_is_not_sent(self, mock_llm):
+        from src.llm.compression import compression_stats
+        from src.llm.llm_business import generate_summary
+        compression_stats.reset()
+        article = "Accept all cookies\nMenu\nThe engine compresses columnar blocks to speed up range queries.\nFollow us"
+        generate_summary(article, prompt_type="article")
+        prompt = mock_llm.call_args.args[0]
+        assert "columnar blocks" in prompt
+        assert "cookies" not in prompt and "Follow us" not in prompt
+        assert compression_stats.snapshot()["reduction_ratio"] > 0
+
+    @patch("src.llm.llm_business.call_llm", return_value="摘要。")
+    def test_discussions_are_not_compressed(self, mock_llm):
+        from src.llm.llm_business import generate_summary
+        generate_summary("Menu\nI agree.", prompt_type="discussion")
+        assert "Menu" in mock_llm.call_args.args[0]
@@ -0,0 +1,121 @@
+"""Tests for src/llm/mock_server.py."""
+
+import json
+import random
+
+import httpx
+import pytest
+
+from src.llm.config import invalidate_llm_config_cache
+from src.llm.daily_status import is_gemini_quota_exceeded_error
+from src.llm.llm_business import _parse_batch_response
+from src.llm.llm_tag_extractor import parse_tags_from_text
+from src.llm.mock_server import LatencyModel, MockLLMServer, MockSettings, canned_reply
+from src.llm.prompts import BATCH_STORY_PROMPT, NEWS_ATTRACTION_PROMPT
+from src.llm.retry import retry_after_seconds
+from src.llm.streaming import gemini_delta, iter_sse_json, openai_delta
+
+
+@pytest.fixture
+def server():
+    with MockLLMServer(MockSettings(seed=1)) as mock:
+        yield mock
+
+
+def _chat(server, **body):
+    return httpx.post(
+        server.openai_url,
+        json={"model": "grok-3-beta", "messages": [{"role": "user", "content": "Summarise this"}], **body},
+        trust_env=False,
+    )
+
+
+def test_latency_specs_parse_and_sample():
+    rng = random.Random(0)
+
+    assert LatencyModel.parse("fixed:0.25").sample(rng) == 0.25
+    assert 0.1 <= LatencyModel.parse("uniform:0.1,0.2").sample(rng) <= 0.2
+    assert LatencyModel.parse("normal:0,0.001").sample(rng) >= 0.0
+    assert str(LatencyModel.parse("lognormal:0.3,0.5")) == "lognormal:0.3,0.5"
+    with pytest.raises(ValueError, match="unknown latency"):
+        LatencyModel.parse("pareto:1")
+    with pytest.raises(ValueError, match="2 parameter"):
+        LatencyModel.parse("uniform:1")
+
+
+def test_canned_replies_parse_like_real_ones():
+    batch = BATCH_STORY_PROMPT.format(stories=json.dumps([{"id": 7, "title": "T", "article": "a", "discussion": ""}]))
+    parsed = _parse_batch_response(canned_reply(batch))
+    assert parsed[7]["content_summary"] and parsed[7]["title_chs"] and parsed[7]["discuss_summary"] == ""
+
+    ratings = json.loads(canned_reply(NEWS_ATTRACTION_PROMPT.format(titles_text="1. 甲\n摘要: x\n\n2. 乙\n摘要: y\n")))
+    assert [rating["id"] for rating in ratings["ratings"]] == [1, 2]
+
+    assert len(parse_tags_from_text(canned_reply('只返回tag列表，格式为"- TAG"\n1. 标题\n'))) == 4
+
+
+def test_openai_completion_and_stream(server):
+    plain = _chat(server).json()
+    assert plain["choices"][0]["message"]["content"]
+    assert plain["usage"]["completion_tokens"] > 0
+
+    with httpx.stream(
+        "POST",
+        server.openai_url,
+        json={"model": "grok-3-beta", "stream": True, "messages": [{"role": "user", "content": "Summarise this"}]},
+        trust_env=False,
+    ) as response:
+        events = list(iter_sse_json(response.iter_lines()))
+    assert "".join(openai_delta(event) for event in events) == plain["choices"][0]["message"]["content"]
+    assert events[-1]["usage"] == plain["usage"]
+
+    stats = server.stats()
+    assert (stats["requests"], stats["streams"], stats["quota_used"]) == (2, 1, {"grok-3-beta": 2})
+
+
+def test_gemini_stream(server):
+    url = server.gemini_url("gemini-3-flash-preview").replace(":generateContent", ":streamGenerateContent")
+    body = {"contents": [{"parts": [{"text": "Summarise this"}]}]}
+
+    with httpx.stream("POST", url, params={"alt": "sse"}, json=body, trust_env=False) as response:
+        events = list(iter_sse_json(response.iter_lines()))
+
+    assert len(events) == server.settings.stream_chunks
+    assert "".join(gemini_delta(event) for event in events) == canned_reply("Summarise this")
+    assert events[-1]["usageMetadata"]["candidatesTokenCount"] > 0
+
+
+def test_injected_faults_and_quota_exhaustion():
+    with MockLLMServer(MockSettings(error_429=1.0, retry_after=2)) as mock:
+        limited = _chat(mock)
+    assert limited.status_code == 429
+    assert retry_after_seconds(limited) == 2.0
+
+    with MockLLMServer(MockSettings(quota=1)) as mock:
+        url = mock.gemini_url("gemini-3-flash-preview")
+        body = {"contents": [{"parts": [{"text": "hi"}]}]}
+        assert httpx.post(url, json=body, trust_env=False).status_code == 200
+        exhausted = httpx.post(url, json=body, trust_env=False)
+        stats = mock.stats()
+    assert exhausted.status_code == 429
+    assert is_gemini_quota_exceeded_error(exhausted.text)
+    assert (stats["quota_rejections"], stats["statuses"]) == (1, {"200": 1, "429": 1})
+
+
+def test_call_llm_runs_against_the_mock(server, tmp_path, monkeypatch):
+    from src.llm.llm_utils import call_llm
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "config").mkdir()
+    (tmp_path / "config" / "config.json").write_text(
+        json.dumps({"GROK_API_KEY": "mock-key", "GROK_API_URL": server.openai_url}), encoding="utf-8"
+    )
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    invalidate_llm_config_cache()
+    try:
+        text = call_llm("Summarise this", llm_type="grok", prompt_type="article")
+    finally:
+        invalidate_llm_config_cache()
+
+    assert text == canned_reply("Summarise this")
+    assert server.stats()["routes"] == {"openai": 1}
@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
 """Tests for LLM provider base class and concrete providers."""
 
+import asyncio
 import pytest
 from abc import ABC
+from unittest.mock import AsyncMock, MagicMock, patch
 
 from src.llm.providers.base import LLMProvider
 from src.llm.providers.moonshot import MoonshotProvider
@@ -137,6 +139,36 @@ class TestGeminiProvider:
     def test_has_process_error(self):
         assert hasattr(GeminiProvider, "_process_error")
 
+    @pytest.fixture
+    def gemini(self):
+        model = "gemini-3.1-flash-lite-preview"
+        balancer = MagicMock()
+        balancer.get_next_model.side_effect = lambda preferred_model=None: preferred_model
+        limiter = MagicMock(acquire_async=AsyncMock(return_value=0.0))
+        with (
+            patch("src.llm.llm_utils.gemini_balancer", balancer),
+            patch("src.llm.llm_utils.rate_limiter", limiter),
+            patch.object(GeminiProvider, "_load_config", return_value={"api_key": "mock-key", "model": model}),
+            patch.object(GeminiProvider, "_try_genai_sdk", return_value="answer"),
+        ):
+            yield GeminiProvider(), limiter, f"gemini-{model}"
+
+    def test_async_call_waits_for_its_token_on_the_event_loop(self, gemini):
+        provider, limiter, key = gemini
+
+        assert asyncio.run(provider.acall("prompt")) == "answer"
+
+        limiter.acquire_async.assert_awaited_once_with(key, max_requests=15, window_seconds=60)
+        limiter.acquire.assert_not_called()
+
+    def test_blocking_call_takes_its_token_itself(self, gemini):
+        provider, limiter, key = gemini
+
+        assert provider.call("prompt") == "answer"
+
+        limiter.acquire.assert_called_once_with(key, max_requests=15, window_seconds=60)
+        limiter.acquire_async.assert_not_called()
+
 
 class TestProvidersExports:
     """Test that all providers are properly exported."""
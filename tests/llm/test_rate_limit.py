@@ -0,0 +1,159 @@
+"""Tests for src/llm/rate_limit.py."""
+
+import asyncio
+import sqlite3
+from unittest.mock import patch
+
+import pytest
+
+from src.llm.rate_limit import RateLimiter, TokenBucketLimiter, retry_delay_hint
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "rate.db")
+
+
+class _Clock:
+    def __init__(self, now=1_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    clock = _Clock()
+    with patch("src.llm.rate_limit.time.time", clock):
+        yield clock
+
+
+def test_requests_are_spaced_across_the_window(db_path, clock):
+    limiter = TokenBucketLimiter(db_path)
+
+    assert limiter.try_acquire("gemini-x", max_requests=5, window_seconds=60) == 0
+    assert limiter.try_acquire("gemini-x", max_requests=5, window_seconds=60) == pytest.approx(12.0)
+    clock.now += 12
+    assert limiter.try_acquire("gemini-x", max_requests=5, window_seconds=60) == 0
+
+
+def test_burst_never_exceeds_window_budget(db_path, clock):
+    limiter = TokenBucketLimiter(db_path)
+    granted = []
+    while clock.now < 1_060:
+        while limiter.try_acquire("k", max_requests=5, window_seconds=60, burst=3) == 0:
+            granted.append(clock.now)
+        clock.now += 0.5
+
+    assert granted == [1_000.0, 1_000.0, 1_000.0, 1_020.0, 1_040.0]
+
+
+def test_processes_share_one_bucket(db_path, clock):
+    first, second = TokenBucketLimiter(db_path), TokenBucketLimiter(db_path)
+
+    assert first.try_acquire("gemini-x", max_requests=2, window_seconds=60) == 0
+    assert second.try_acquire("gemini-x", max_requests=2, window_seconds=60) > 0
+    assert second.try_acquire("other", max_requests=2, window_seconds=60) == 0
+
+
+def test_defer_blocks_every_limiter_until_retry_delay(db_path, clock):
+    TokenBucketLimiter(db_path).defer("gemini-x", 43)
+    limiter = TokenBucketLimiter(db_path)
+
+    assert limiter.try_acquire("gemini-x", max_requests=100, window_seconds=60) == pytest.approx(43)
+    clock.now += 43
+    assert limiter.try_acquire("gemini-x", max_requests=100, window_seconds=60) == 0
+
+
+def test_acquire_sleeps_outside_the_transaction(db_path):
+    limiter = TokenBucketLimiter(db_path)
+    sleeps = []
+
+    def _sleep(seconds):
+        # The bucket row must be writable by others while we wait
+        with sqlite3.connect(db_path, timeout=0) as conn:
+            conn.execute("UPDATE llm_rate_buckets SET tokens = tokens")
+        sleeps.append(seconds)
+
+    with patch("src.llm.rate_limit.time.sleep", side_effect=_sleep):
+        limiter.acquire("k", max_requests=600, window_seconds=60)
+        waited = limiter.acquire("k", max_requests=600, window_seconds=60)
+
+    assert sleeps and waited == pytest.approx(sum(sleeps))
+
+
+def test_waiting_is_answered_without_a_transaction(db_path, clock):
+    limiter = TokenBucketLimiter(db_path)
+    assert limiter.try_acquire("k", max_requests=5, window_seconds=60) == 0
+
+    with patch.object(limiter, "_connect", side_effect=AssertionError("no transaction while waiting")):
+        assert limiter.try_acquire("k", max_requests=5, window_seconds=60) == pytest.approx(12.0)
+        clock.now += 6
+        assert limiter.try_acquire("k", max_requests=5, window_seconds=60) == pytest.approx(6.0)
+
+    clock.now += 6
+    assert limiter.try_acquire("k", max_requests=5, window_seconds=60) == 0
+
+
+def test_cached_state_never_grants_past_another_process(db_path, clock):
+    first, second = TokenBucketLimiter(db_path), TokenBucketLimiter(db_path)
+    assert first.try_acquire("k", max_requests=5, window_seconds=60) == 0
+    clock.now += 12
+    assert second.try_acquire("k", max_requests=5, window_seconds=60) == 0
+
+    # first's cache says a token is ready; the shared row says otherwise
+    assert first.try_acquire("k", max_requests=5, window_seconds=60) == pytest.approx(12.0)
+
+
+def test_acquire_async_lets_other_coroutines_run(db_path):
+    limiter = TokenBucketLimiter(db_path)
+    ticks = []
+
+    async def _ticker():
+        for _ in range(3):
+            ticks.append("tick")
+            await asyncio.sleep(0.01)
+
+    async def _main():
+        await limiter.acquire_async("k", max_requests=20, window_seconds=1)
+        ticker = asyncio.create_task(_ticker())
+        waited = await limiter.acquire_async("k", max_requests=20, window_seconds=1)
+        await ticker
+        return waited
+
+    waited = asyncio.run(_main())
+
+    assert waited > 0
+    assert ticks == ["tick"] * 3
+
+
+def test_falls_back_to_process_local_bucket(db_path, clock):
+    limiter = TokenBucketLimiter(db_path)
+
+    with patch.object(limiter, "_connect", side_effect=sqlite3.OperationalError("database is locked")):
+        assert limiter.try_acquire("k", max_requests=1, window_seconds=60) == 0
+        assert limiter.try_acquire("k", max_requests=1, window_seconds=60) == pytest.approx(60)
+
+
+def test_retry_delay_hint_formats():
+    assert retry_delay_hint("{'retryDelay': '43s'}") == 43
+    assert retry_delay_hint("Please retry in 7.5s.") == 7.5
+    assert retry_delay_hint("retry_delay { seconds: 12 }") == 12
+    assert retry_delay_hint("503 unavailable") is None
+
+
+def test_sliding_window_limiter_does_not_sleep_holding_the_lock():
+    limiter = RateLimiter()
+    held = []
+
+    def _sleep(seconds):
+        held.append(limiter.locks["k"].locked())
+        limiter.request_times["k"].clear()
+
+    with patch("src.llm.rate_limit.time.sleep", side_effect=_sleep):
+        limiter.wait_if_needed("k", max_requests=1, window_seconds=60)
+        limiter.wait_if_needed("k", max_requests=1, window_seconds=60)
+
+    assert held == [False]
+    assert len(limiter.request_times["k"]) == 1
@@ -0,0 +1,42 @@
+"""Tests for src/llm/request_slots.py."""
+
+import asyncio
+import threading
+import time
+
+from src.llm.request_slots import request_slot, request_slots, to_thread_in_slot
+
+
+def test_slots_cap_requests_and_blocking_calls_together():
+    lock = threading.Lock()
+    state = {"now": 0, "peak": 0}
+
+    def _busy():
+        with lock:
+            state["now"] += 1
+            state["peak"] = max(state["peak"], state["now"])
+        time.sleep(0.01)
+        with lock:
+            state["now"] -= 1
+
+    async def _request():
+        async with request_slot():
+            await asyncio.to_thread(_busy)
+
+    async def _run():
+        with request_slots(3) as slots:
+            await asyncio.gather(*(_request() for _ in range(8)), *(to_thread_in_slot(_busy) for _ in range(8)))
+        return slots
+
+    slots = asyncio.run(_run())
+
+    assert state["peak"] == slots.peak == 3
+    assert slots.snapshot() == {"limit": 3, "peak": 3}
+
+
+def test_requests_outside_a_run_are_not_limited():
+    async def _run():
+        async with request_slot():
+            return await to_thread_in_slot(lambda: "ok")
+
+    assert asyncio.run(_run()) == "ok"
@@ -0,0 +1,158 @@
+"""Tests for src/llm/response_cache.py and its call_llm integration."""
+
+from unittest.mock import patch
+
+import pytest
+
+from src.llm import response_cache
+from src.llm.response_cache import LLMResponseCache, bypass_llm_cache, cache_bypassed, cache_key
+
+CONFIG = {
+    "grok": {"api_key": "key", "model": "grok-3-beta"},
+    "gemini": {"api_key": "key", "model": "gemini-3-flash-preview"},
+    "default": "grok",
+}
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """A cache on a temporary database, installed as the module default."""
+    monkeypatch.delenv(response_cache.BYPASS_ENV, raising=False)
+    instance = LLMResponseCache(db_path=str(tmp_path / "cache.db"))
+    monkeypatch.setattr(response_cache, "_default_cache", instance)
+    return instance
+
+
+def test_key_covers_every_request_parameter():
+    base = cache_key("grok", "grok-3", "prompt", "sys", 0.2, 100)
+
+    assert cache_key("GROK", "grok-3", "prompt", "sys", 0.2, 100) == base
+    assert cache_key("grok", "grok-4", "prompt", "sys", 0.2, 100) != base
+    assert cache_key("grok", "grok-3", "prompt!", "sys", 0.2, 100) != base
+    assert cache_key("grok", "grok-3", "prompt", "other", 0.2, 100) != base
+    assert cache_key("grok", "grok-3", "prompt", "sys", 0.7, 100) != base
+    assert cache_key("grok", "grok-3", "prompt", "sys", 0.2, 200) != base
+    assert cache_key("grok", "grok-3", "prompt", "sys", 0.2, 100, image_data="aGk=") != base
+
+
+def test_request_key_resolves_default_model():
+    explicit = response_cache.request_cache_key(CONFIG, "grok", "grok-3-beta", "p")
+
+    assert response_cache.request_cache_key(CONFIG, "grok", None, "p") == explicit
+    assert response_cache.request_cache_key(CONFIG, "grok", "grok-4", "p") != explicit
+
+
+def test_put_then_get_counts_hits(cache):
+    assert cache.get("k") is None
+
+    cache.put("k", "summary", "grok", "grok-3", "article")
+
+    assert cache.get("k") == "summary"
+    assert cache.get("k") == "summary"
+    assert cache.stats()["hits"] == 2
+
+
+def test_expired_entries_are_misses(cache):
+    with patch("src.llm.response_cache.time.time", return_value=1_000.0):
+        cache.put("k", "discussion", "grok", None, "discussion")
+    with patch("src.llm.response_cache.time.time", return_value=1_000.0 + response_cache.ttl_for("discussion")):
+        assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_ttl_depends_on_prompt_type():
+    assert response_cache.ttl_for("article") > response_cache.ttl_for("discussion")
+    assert response_cache.ttl_for("unknown") == response_cache.DEFAULT_TTL_SECONDS
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = LLMResponseCache(db_path=str(tmp_path / "cache.db"), max_bytes=250)
+    clock = iter(range(1, 100))
+    with patch("src.llm.response_cache.time.time", side_effect=lambda: float(next(clock))):
+        cache.put("a", "x" * 100, "grok", None, "article")
+        cache.put("b", "x" * 100, "grok", None, "article")
+        assert cache.get("a") is not None  # b is now least recently used
+        cache.put("c", "x" * 100, "grok", None, "article")
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+    assert cache.stats()["bytes"] <= 250
+
+
+def test_bypass_context_and_env(cache, monkeypatch):
+    with bypass_llm_cache():
+        assert cache_bypassed()
+        response_cache.store("k", "v", "grok", None, "article")
+    assert not cache_bypassed()
+    assert response_cache.lookup("k") is None
+
+    response_cache.store("k", "v", "grok", None, "article")
+    monkeypatch.setenv(response_cache.BYPASS_ENV, "1")
+    assert response_cache.lookup("k") is None
+    monkeypatch.delenv(response_cache.BYPASS_ENV)
+    assert response_cache.lookup("k") == "v"
+
+
+def test_empty_responses_are_not_stored(cache):
+    response_cache.store("k", "", "grok", None, "article")
+
+    assert cache.stats()["entries"] == 0
+
+
+def test_call_llm_serves_repeat_requests_from_cache(cache):
+    from src.llm.llm_utils import call_llm
+
+    with (
+        patch("src.llm.llm_utils.load_llm_config", return_value=CONFIG),
+        patch("src.llm.llm_utils.call_grok_api", return_value="grok response") as mock_grok,
+    ):
+        first = call_llm("prompt", llm_type="grok", prompt_type="article")
+        second = call_llm("prompt", llm_type="grok", prompt_type="article")
+        third = call_llm("prompt", llm_type="grok", prompt_type="article", use_cache=False)
+
+    assert first == second == third == "grok response"
+    assert mock_grok.call_count == 2
+
+
+def test_image_summary_is_cached(cache):
+    from src.llm.llm_business import generate_summary_from_image
+
+    with (
+        patch("src.llm.llm_utils.load_llm_config", return_value=CONFIG),
+        patch("src.llm.llm_utils.call_grok_api", return_value="一张图") as mock_grok,
+    ):
+        first = generate_summary_from_image("aGk=", "describe", "grok")
+        second = generate_summary_from_image("aGk=", "describe", "grok")
+
+    assert first == second
+    assert mock_grok.call_count == 1
+
+
+def test_refusals_are_not_stored(cache):
+    response_cache.store("k", "I'm sorry, but I cannot access that page.", "grok", None, "article")
+
+    assert cache.stats()["entries"] == 0
+
+
+def test_rejected_responses_are_not_stored_and_stale_entries_are_dropped(cache):
+    response_cache.store("k", "too short", "grok", None, "article", validate=lambda text: len(text) > 20)
+    assert cache.stats()["entries"] == 0
+
+    cache.put("k", "too short", "grok", None, "article")
+    assert response_cache.lookup("k", validate=lambda text: len(text) > 20) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_short_article_summary_is_retried_on_the_next_call(cache):
+    from src.llm.llm_business import generate_summary
+
+    with (
+        patch("src.llm.llm_utils.load_llm_config", return_value=CONFIG),
+        patch("src.llm.llm_utils.call_grok_api", return_value="太短了。") as mock_grok,
+    ):
+        generate_summary("short article text", "article", llm_type="grok")
+        generate_summary("short article text", "article", llm_type="grok")
+
+    assert mock_grok.call_count == 2
+    assert cache.stats()["entries"] == 0
@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-"""Tests for the retry decorator in src.llm.retry."""
+"""Tests for the retry engine and decorators in src.llm.retry."""
 
 import pytest
 from unittest.mock import patch
@@ -181,3 +181,79 @@ class TestWithRetryBackoff:
 
         assert documented.__name__ == "documented"
         assert documented.__doc__ == "This is a docstring."
+
+
+class TestRetryEngine:
+    """Server hints, run deadlines and per-host budgets in src.llm.retry."""
+
+    def test_retry_after_header_replaces_backoff(self):
+        """A Retry-After header on the error's response sets the wait."""
+        from types import SimpleNamespace
+
+        from src.llm.retry import RetryPolicy
+
+        error = ConnectionError("429")
+        error.response = SimpleNamespace(headers={"Retry-After": "7"})
+
+        assert RetryPolicy(backoff_base=100.0).next_delay(0, error) == 7.0
+        assert RetryPolicy().next_delay(0, ConnectionError('"retryDelay": "12s"')) == 12.0
+        error.response.headers["Retry-After"] = "3600"
+        assert RetryPolicy().next_delay(0, error) is None
+
+    def test_deadline_stops_retries_that_would_wait_past_it(self):
+        """Inside run_deadline a wait longer than the time left is not taken."""
+        from src.llm.retry import RetryPolicy, retry_call, run_deadline, time_left
+
+        calls = []
+
+        def fail():
+            calls.append(1)
+            raise ConnectionError("reset")
+
+        with (
+            patch("src.llm.retry.time.sleep") as mock_sleep,
+            patch("src.llm.retry.random.uniform", return_value=0.0),
+            run_deadline(5),
+        ):
+            with run_deadline(60):
+                # Nested deadlines can only shorten the outer one
+                assert time_left() <= 5
+            with pytest.raises(ConnectionError):
+                retry_call(fail, policy=RetryPolicy(backoff_base=2.0))
+
+        # Waits of 2 s then 4 s fit; 8 s does not
+        assert len(calls) == 3
+        assert mock_sleep.call_count == 2
+        assert time_left() is None
+
+    def test_host_budget_is_shared_across_callers(self):
+        """Once a host's retry budget is spent, other loops stop retrying it."""
+        from src.llm.retry import RetryBudget, RetryPolicy, retry_budget
+
+        with patch.object(retry_budget, "limit", 2):
+            policy = RetryPolicy(backoff_base=0.0, jitter=0.0)
+            assert policy.next_delay(0, host="api.example") == 0.0
+            assert policy.next_delay(0, host="api.example") == 0.0
+            assert policy.next_delay(0, host="api.example") is None
+            assert policy.next_delay(0, host="other.example") == 0.0
+
+        assert retry_budget.snapshot()["api.example"] == {"retries": 2, "denied": 1}
+        assert RetryBudget().snapshot() == {}
+
+    def test_async_retry_on_result_returns_the_last_result(self):
+        """aretry_call retries unusable results and returns the last one when retries run out."""
+        import asyncio
+
+        from src.llm.retry import RetryPolicy, aretry_call
+
+        results = iter(["", "", "body"])
+
+        async def fetch():
+            return next(results)
+
+        async def main():
+            return await aretry_call(
+                fetch, policy=RetryPolicy(max_retries=1, backoff_base=0.0, jitter=0.0), retry_result=lambda r: not r
+            )
+
+        assert asyncio.run(main()) == ""
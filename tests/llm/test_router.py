@@ -0,0 +1,194 @@
+"""Tests for src/llm/router.py and the llm_type="auto" call path."""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from src.llm.router import GEMINI_MODELS, ModelRouter, context_tokens
+
+CONFIG = {
+    "grok": {"api_key": "k", "model": "grok-3-beta"},
+    "gemini": {"api_key": "k", "model": "gemini-3-flash-preview"},
+    "moonshot": {"api_key": "k", "model": "moonshot-v1-8k"},
+    "default": "auto",
+}
+
+
+@pytest.fixture
+def quota():
+    """Daily status as read from SQLite: (disabled pairs, request counts)."""
+    state = {"disabled": set(), "usage": {}}
+    with patch("src.llm.router.get_daily_model_status", side_effect=lambda: (state["disabled"], state["usage"])):
+        yield state
+
+
+@pytest.fixture
+def router(quota):
+    return ModelRouter()
+
+
+def _names(routes):
+    return [f"{r.provider}/{r.model}" for r in routes]
+
+
+def test_without_history_keeps_quota_rich_models_first(router):
+    routes = router.route(CONFIG, "article", "hello")
+
+    # Priors only; the 20/day model pays a little for its scarce quota
+    assert _names(routes) == [
+        "gemini/gemini-3.1-flash-lite-preview",
+        "gemini/gemini-3-flash-preview",
+        "grok/grok-3-beta",
+        "moonshot/moonshot-v1-8k",
+    ]
+
+
+def test_prefers_lowest_expected_completion_time_per_class(router):
+    for _ in range(5):
+        router.record("grok", "grok-3-beta", "title", 1.0, True)
+        router.record("gemini", GEMINI_MODELS[1], "title", 6.0, True)
+        router.record("grok", "grok-3-beta", "article", 30.0, True)
+        router.record("gemini", GEMINI_MODELS[1], "article", 8.0, True)
+
+    assert router.route(CONFIG, "title", "x")[0].provider == "grok"
+    assert router.route(CONFIG, "article", "x")[0].model == GEMINI_MODELS[1]
+
+
+def test_errors_push_a_model_down(router):
+    for _ in range(10):
+        router.record("gemini", GEMINI_MODELS[1], "tags", 2.0, False)
+        router.record("grok", "grok-3-beta", "tags", 4.0, True)
+
+    assert router.route(CONFIG, "tags", "x")[0].provider == "grok"
+
+
+def test_skips_models_without_quota_today(router, quota):
+    quota["usage"] = {("gemini", "gemini-3-flash-preview"): 20}
+    quota["disabled"] = {("gemini", GEMINI_MODELS[1])}
+
+    assert not any(r.provider == "gemini" for r in router.route(CONFIG, "article", "x"))
+    assert router.remaining_quota("gemini", "gemini-3-flash-preview") == 0
+
+
+def test_quota_is_cached_and_counted_locally(router, quota):
+    router.route(CONFIG, "article", "x")
+    router.record("gemini", "gemini-3-flash-preview", "article", 1.0, True)
+    quota["usage"] = {("gemini", "gemini-3-flash-preview"): 20}
+
+    # Still within QUOTA_REFRESH_SECONDS: no re-read, local count applied
+    assert router.remaining_quota("gemini", "gemini-3-flash-preview") == 19
+    router.route(CONFIG, "article", "x")
+    assert router.remaining_quota("gemini", "gemini-3-flash-preview") == 19
+
+
+def test_skips_models_whose_context_is_too_small(router):
+    long_prompt = "字" * 9_000
+
+    routes = router.route(CONFIG, "article", long_prompt)
+
+    assert "moonshot/moonshot-v1-8k" not in _names(routes)
+    assert context_tokens("moonshot", "moonshot-v1-8k") == 8_192
+    assert context_tokens("grok", "grok-3-beta", {"grok": {"context_tokens": 4096}}) == 4096
+
+
+def test_images_only_go_to_vision_providers(router):
+    assert {r.provider for r in router.route(CONFIG, "image", "x", image=True)} == {"grok", "gemini"}
+
+
+def test_skips_providers_without_api_key(router):
+    config = {**CONFIG, "moonshot": {"api_key": None, "model": "moonshot-v1-8k"}}
+
+    assert "moonshot" not in {r.provider for r in router.route(config, "article", "x")}
+
+
+def test_snapshot_reports_decisions_and_statistics(router):
+    router.record("grok", "grok-3-beta", "title", 2.0, True)
+    router.record("grok", "grok-3-beta", "title", 4.0, False)
+    router.route(CONFIG, "title", "x")
+
+    snapshot = router.snapshot()
+
+    assert sum(snapshot["decisions"]["title"].values()) == 1
+    assert snapshot["models"]["grok/grok-3-beta"] == {
+        "calls": 2,
+        "error_rate": 0.5,
+        "mean_latency_seconds": 2.0,
+        "remaining_quota": None,
+    }
+
+
+def test_call_llm_auto_follows_route_and_records(router):
+    from src.llm.llm_utils import call_llm
+
+    with (
+        patch("src.llm.llm_utils.model_router", router),
+        patch("src.llm.llm_utils.load_llm_config", return_value=CONFIG),
+        patch("src.llm.llm_utils.call_gemini_api", return_value="") as gemini,
+        patch("src.llm.llm_utils.call_grok_api", return_value="from grok") as grok,
+    ):
+        result = call_llm("prompt", llm_type="auto", prompt_type="title")
+
+    assert result == "from grok"
+    assert [c.args[1] for c in gemini.call_args_list] == [GEMINI_MODELS[1], GEMINI_MODELS[0]]
+    assert grok.call_args.args[2] == "grok-3-beta"
+    calls = router.snapshot()["models"]
+    assert calls[f"gemini/{GEMINI_MODELS[1]}"]["error_rate"] == 1.0
+    assert calls["grok/grok-3-beta"]["calls"] == 1
+
+
+def test_explicit_llm_type_keeps_fixed_chain(router):
+    from src.llm.llm_utils import call_llm
+
+    with (
+        patch("src.llm.llm_utils.model_router", router),
+        patch("src.llm.llm_utils.load_llm_config", return_value=CONFIG),
+        patch("src.llm.llm_utils.call_moonshot_api", return_value="") as moonshot,
+        patch("src.llm.llm_utils.call_gemini_api", return_value="") as gemini,
+        patch("src.llm.llm_utils.call_grok_api", return_value="") as grok,
+    ):
+        assert call_llm("prompt", llm_type="moonshot") == ""
+
+    assert moonshot.call_count == gemini.call_count == grok.call_count == 1
+    assert router.snapshot()["decisions"] == {}
+
+
+def test_call_llm_async_auto_uses_router_models(router):
+    from src.llm import async_client
+
+    calls = []
+
+    def _provider(name):
+        class _Provider:
+            async def acall(self, prompt, **kwargs):
+                calls.append((name, kwargs["model"]))
+                return "ok"
+
+            async def astream(self, prompt, validator=None, **kwargs):
+                return await self.acall(prompt, **kwargs)
+
+        return _Provider()
+
+    with (
+        patch("src.llm.router.model_router", router),
+        patch("src.llm.config.load_llm_config", return_value=CONFIG),
+        patch.object(async_client, "get_provider", side_effect=_provider),
+    ):
+        result = asyncio.run(async_client.call_llm_async("prompt", prompt_type="article"))
+
+    assert result == "ok"
+    assert calls == [("gemini", GEMINI_MODELS[1])]
+
+
+def test_input_tokens_are_totalled_per_model(router):
+    from src.llm.llm_utils import call_llm
+
+    with (
+        patch("src.llm.llm_utils.model_router", router),
+        patch("src.llm.llm_utils.load_llm_config", return_value=CONFIG),
+        patch("src.llm.llm_utils.call_grok_api", return_value="ok"),
+    ):
+        call_llm("x" * 400, llm_type="grok", system_content="字" * 10)
+        call_llm("x" * 400, llm_type="grok", system_content="字" * 10)
+
+    assert router.snapshot()["input_tokens"] == {"grok/grok-3-beta": 220}
@@ -0,0 +1,210 @@
+"""Tests for single-flight request coalescing (src/llm/single_flight.py)."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from src.llm.single_flight import DONE, LEADER, WAIT, FlightLease, SingleFlight, flight_key
+
+CONFIG = {"grok": {"api_key": "k", "model": "grok-3-beta"}, "default": "grok"}
+
+
+@pytest.fixture
+def lease(tmp_path):
+    return FlightLease(str(tmp_path / "flight.db"))
+
+
+def _slow(result, calls, seconds=0.1):
+    def _fn():
+        calls.append(1)
+        time.sleep(seconds)
+        return result
+
+    return _fn
+
+
+def test_key_ignores_whitespace_layout_only():
+    assert flight_key(CONFIG, "grok", None, "Summarise\n\n  this ") == flight_key(
+        CONFIG, "grok", None, "Summarise this"
+    )
+    assert flight_key(CONFIG, "grok", None, "a") != flight_key(CONFIG, "grok", None, "b")
+    assert flight_key(CONFIG, "grok", None, "a") != flight_key(CONFIG, "grok", None, "a", max_tokens=10)
+
+
+def test_concurrent_threads_share_one_call():
+    flights, calls = SingleFlight(), []
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        results = list(pool.map(lambda _: flights.do("k", _slow("answer", calls)), range(5)))
+
+    assert results == ["answer"] * 5
+    assert len(calls) == 1
+    assert flights.snapshot() == {"leaders": 1, "coalesced": 4, "shared": 0}
+
+
+def test_leader_error_reaches_followers():
+    flights, started = SingleFlight(), threading.Event()
+
+    def _fail():
+        started.set()
+        time.sleep(0.1)
+        raise ValueError("boom")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flights.do, "k", _fail)
+        started.wait()
+        follower = pool.submit(flights.do, "k", lambda: "unused")
+        with pytest.raises(ValueError):
+            leader.result()
+        with pytest.raises(ValueError):
+            follower.result()
+
+
+def test_concurrent_coroutines_share_one_call():
+    flights, calls = SingleFlight(), []
+
+    async def _request():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def _many():
+        return await asyncio.gather(*(flights.ado("k", _request) for _ in range(4)))
+
+    assert asyncio.run(_many()) == ["answer"] * 4
+    assert len(calls) == 1
+
+
+def test_cancelled_leader_hands_the_request_to_a_waiter():
+    flights, calls = SingleFlight(), []
+
+    async def _request():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def _run():
+        leader = asyncio.create_task(flights.ado("k", _request))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(flights.ado("k", _request)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await asyncio.gather(*waiters), leader.cancelled()
+
+    assert asyncio.run(_run()) == (["answer"] * 3, True)
+    assert len(calls) == 2
+
+
+def test_waiter_stops_polling_at_the_run_deadline(lease, monkeypatch):
+    from src.llm.retry import run_deadline
+
+    monkeypatch.delenv("HN2MD_NO_LLM_SINGLE_FLIGHT")
+    flights, calls = SingleFlight(lease, poll_seconds=0.05), []
+    lease.acquire("k", "other-process")
+
+    async def _request():
+        calls.append(1)
+        return "own"
+
+    async def _wait():
+        with run_deadline(0.2):
+            return await flights.ado("k", _request)
+
+    started = time.monotonic()
+    with run_deadline(0.2):
+        assert flights.do("k", _slow("own", calls)) == ""
+    assert asyncio.run(_wait()) == ""
+    assert time.monotonic() - started < 1.0
+    assert calls == []
+
+
+def test_lease_hands_result_to_other_owners(lease):
+    assert lease.acquire("k", "a") == (LEADER, None)
+    assert lease.acquire("k", "b") == (WAIT, None)
+
+    lease.finish("k", "a", "answer")
+
+    assert lease.acquire("k", "b", joined=True) == (DONE, "answer")
+
+
+def test_caller_arriving_after_the_leader_finished_leads_again(lease):
+    lease.acquire("k", "a")
+    lease.finish("k", "a", "answer")
+
+    assert lease.acquire("k", "late") == (LEADER, None)
+    assert lease.acquire("k", "b") == (WAIT, None)
+
+
+def test_rejected_result_is_not_published(lease, monkeypatch):
+    monkeypatch.delenv("HN2MD_NO_LLM_SINGLE_FLIGHT")
+    flights = SingleFlight(lease)
+    lease.acquire("k", "other-process")
+
+    flights._finish("k", "other-process", "I'm sorry, I cannot help with that.")
+
+    assert lease.acquire("k", "b", joined=True) == (LEADER, None)
+
+
+def test_failed_or_expired_lease_is_taken_over(lease):
+    lease.acquire("k", "a")
+    lease.finish("k", "a", "")
+    assert lease.acquire("k", "b") == (LEADER, None)
+
+    lease.acquire("x", "a", lease_seconds=-1)
+    assert lease.acquire("x", "b") == (LEADER, None)
+
+
+def test_waiter_takes_answer_from_another_process(lease, monkeypatch):
+    monkeypatch.delenv("HN2MD_NO_LLM_SINGLE_FLIGHT")
+    flights, calls = SingleFlight(lease, poll_seconds=0.01), []
+    lease.acquire("k", "other-process")
+    finisher = threading.Timer(0.05, lease.finish, args=("k", "other-process", "from elsewhere"))
+    finisher.start()
+
+    result = flights.do("k", _slow("own", calls))
+
+    finisher.join()
+    assert result == "from elsewhere"
+    assert calls == []
+    assert flights.snapshot()["shared"] == 1
+
+
+def test_call_llm_coalesces_identical_prompts():
+    from src.llm.llm_utils import call_llm
+
+    calls = []
+
+    def _grok(*args, **kwargs):
+        calls.append(args[0])
+        time.sleep(0.1)
+        return "summary"
+
+    with (
+        patch("src.llm.llm_utils.load_llm_config", return_value=CONFIG),
+        patch("src.llm.llm_utils.call_grok_api", side_effect=_grok),
+        ThreadPoolExecutor(max_workers=3) as pool,
+    ):
+        prompts = ["Summarise this", "Summarise  this", "Summarise\nthis"]
+        results = list(pool.map(lambda p: call_llm(p, llm_type="grok"), prompts))
+
+    assert results == ["summary"] * 3
+    assert len(calls) == 1
+
+
+def test_sequential_call_llm_requests_do_not_replay_the_lease(lease, monkeypatch):
+    from src.llm.llm_utils import call_llm
+
+    monkeypatch.delenv("HN2MD_NO_LLM_SINGLE_FLIGHT")
+    with (
+        patch("src.llm.llm_utils.single_flight", SingleFlight(lease)),
+        patch("src.llm.llm_utils.load_llm_config", return_value=CONFIG),
+        patch("src.llm.llm_utils.call_grok_api", side_effect=["first", "second"]) as grok,
+    ):
+        assert call_llm("prompt", llm_type="grok", use_cache=False) == "first"
+        assert call_llm("prompt", llm_type="grok", use_cache=False) == "second"
+
+    assert grok.call_count == 2
@@ -0,0 +1,152 @@
+"""Tests for streamed completions with early abort (src/llm/streaming.py)."""
+
+import asyncio
+import json
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+
+from src.llm import async_client
+from src.llm.providers.grok import GrokProvider
+from src.llm.retry import with_retry
+from src.llm.streaming import StreamRejected, StreamValidator, gemini_delta, iter_sse_json
+
+GROK_CONFIG = {
+    "api_key": "test-key",
+    "api_url": "https://grok.test/v1/chat/completions",
+    "model": "grok-test",
+    "temperature": 0.5,
+    "max_tokens": 100,
+}
+
+
+def _sse(*deltas):
+    events = [{"choices": [{"delta": {"content": delta}}]} for delta in deltas]
+    return "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+
+
+@pytest.fixture
+def sse_transport():
+    """Serve *body* as an SSE response from the pooled async client."""
+    seen = []
+    state = {"body": ""}
+
+    def handler(request):
+        seen.append(json.loads(request.content))
+        return httpx.Response(200, text=state["body"], headers={"content-type": "text/event-stream"})
+
+    def _client():
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    with (
+        patch.object(async_client, "get_async_http_client", _client),
+        patch.object(GrokProvider, "_load_config", return_value=GROK_CONFIG),
+    ):
+        yield state, seen
+
+
+def test_validator_catches_marker_split_across_deltas():
+    validator = StreamValidator()
+    validator.feed("Summary: the release adds X. As an")
+
+    with pytest.raises(StreamRejected) as excinfo:
+        validator.feed(" ai language model I")
+
+    assert excinfo.value.marker == "as an ai"
+    assert excinfo.value.partial.endswith("language model I")
+
+
+def test_validator_accepts_clean_text_and_resets():
+    validator = StreamValidator()
+    for delta in ("这是", "一段", "正常的摘要。"):
+        validator.feed(delta)
+    assert validator.text == "这是一段正常的摘要。"
+
+    validator.reset()
+    assert validator.text == ""
+
+
+def test_sse_parsing_stops_at_done():
+    lines = _sse("a", "b").splitlines() + ['data: {"choices": [{"delta": {"content": "late"}}]}']
+
+    assert [event["choices"][0]["delta"]["content"] for event in iter_sse_json(lines)] == ["a", "b"]
+    assert gemini_delta({"candidates": [{"content": {"parts": [{"text": "x"}, {"text": "y"}]}}]}) == "xy"
+
+
+def test_grok_astream_assembles_deltas(sse_transport):
+    state, seen = sse_transport
+    state["body"] = _sse("Hello", ", ", "world")
+
+    result = asyncio.run(GrokProvider().astream("hi", validator=StreamValidator()))
+
+    assert result == "Hello, world"
+    assert seen[0]["stream"] is True
+
+
+def test_grok_astream_rejection_is_not_retried(sse_transport):
+    state, seen = sse_transport
+    state["body"] = _sse("I'm sorry, ", "but I can't help")
+
+    with pytest.raises(StreamRejected):
+        asyncio.run(GrokProvider().astream("hi", validator=StreamValidator()))
+
+    assert len(seen) == 1
+
+
+def test_sync_retry_skips_non_retryable_errors():
+    calls = []
+
+    @with_retry(max_retries=3, backoff_base=0)
+    def _call():
+        calls.append(1)
+        raise StreamRejected("i cannot", "I cannot")
+
+    with pytest.raises(StreamRejected):
+        _call()
+    assert len(calls) == 1
+
+
+def test_call_llm_async_moves_to_next_model_on_rejection():
+    config = {"grok": GROK_CONFIG, "gemini": {"model": "gemini-test"}, "moonshot": GROK_CONFIG, "default": "grok"}
+    calls = []
+
+    def _provider(name):
+        provider = MagicMock()
+
+        async def _astream(prompt, validator=None, **kwargs):
+            calls.append(name)
+            validator.feed("As an AI model" if name == "grok" else "fine")
+            return validator.text
+
+        provider.astream = _astream
+        return provider
+
+    with (
+        patch("src.llm.config.load_llm_config", return_value=config),
+        patch.object(async_client, "get_provider", side_effect=_provider),
+    ):
+        result = asyncio.run(async_client.call_llm_async("hi", prompt_type="article"))
+
+    assert result == "fine"
+    assert calls == ["grok", "gemini"]
+
+
+def test_structured_requests_are_not_streamed():
+    config = {"grok": GROK_CONFIG, "gemini": {"model": "gemini-test"}, "moonshot": GROK_CONFIG, "default": "grok"}
+    provider = MagicMock()
+
+    async def _acall(prompt, **kwargs):
+        return '{"tags": []}'
+
+    provider.acall = _acall
+    with (
+        patch("src.llm.config.load_llm_config", return_value=config),
+        patch.object(async_client, "get_provider", return_value=provider),
+    ):
+        result = asyncio.run(
+            async_client.call_llm_async("hi", prompt_type="article", response_format={"type": "json_object"})
+        )
+
+    assert result == '{"tags": []}'
+    provider.astream.assert_not_called()
@@ -0,0 +1,86 @@
+"""Tests for src/utils/text_normalize.py."""
+
+import re
+
+import pytest
+
+from src.utils.text_normalize import (
+    collapse_whitespace,
+    html_fragment_to_text,
+    join_text_segments,
+    normalize_crawled_text,
+    normalize_pdf_text,
+    strip_unprintable,
+)
+
+
+def _legacy_strip(text: str) -> str:
+    return "".join(ch for ch in text if ch.isprintable() or ch.isspace())
+
+
+SAMPLES = [
+    "",
+    "plain ascii text",
+    "tabs\tand\nnewlines\r\n\x0bvertical\x0cfeed",
+    "nul\x00bell\x07escape\x1bdel\x7f",
+    "file separators \x1c\x1d\x1e\x1f are whitespace",
+    "中文内容，全角空格　与零宽​字符",
+    "emoji 🚀 and soft­hyphen and bidi‮text",
+    "line separator and nbsp here",
+    "private  use and unassigned \U000e0001 tags",
+]
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_strip_unprintable_matches_legacy_filter(text: str) -> None:
+    assert strip_unprintable(text) == _legacy_strip(text)
+
+
+def test_strip_unprintable_matches_legacy_filter_on_every_bmp_code_point() -> None:
+    text = "".join(chr(code) for code in range(0x10000) if not 0xD800 <= code <= 0xDFFF)
+
+    assert strip_unprintable(text) == _legacy_strip(text)
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_normalize_pdf_text_matches_legacy_cleanup(text: str) -> None:
+    legacy = _legacy_strip(re.sub(r"\s+", " ", text).strip())
+
+    assert normalize_pdf_text(text) == legacy
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_normalize_crawled_text_matches_legacy_cleanup(text: str) -> None:
+    # Legacy order (collapse, then filter) could leave double spaces where a
+    # control character sat between two spaces; filter first to compare.
+    legacy = re.sub(r"\s{2,}", " ", _legacy_strip(text))
+    legacy = re.sub(r"(\n\s*){2,}", "\n\n", legacy).strip()
+
+    assert normalize_crawled_text(text) == legacy
+
+
+def test_normalize_crawled_text_keeps_single_newlines() -> None:
+    assert normalize_crawled_text("  Title\nBody\n\n\nMore  ") == "Title\nBody More"
+
+
+def test_normalize_crawled_text_collapses_whitespace_left_by_control_characters() -> None:
+    assert normalize_crawled_text("a \x00 b") == "a b"
+
+
+def test_collapse_whitespace_handles_multi_megabyte_input() -> None:
+    text = ("word \t\n" * 500_000) + "\x00"
+
+    result = collapse_whitespace(text)
+
+    assert result.startswith("word word")
+    assert result.endswith("word \x00")
+
+
+def test_join_text_segments_skips_empty_segments() -> None:
+    assert join_text_segments(["  Hello\n", "", "   ", "world\tagain "]) == "Hello world again"
+
+
+def test_html_fragment_to_text_converts_breaks_and_entities() -> None:
+    value = "<p>Hello <b>there</b><br/>second &amp; line</p><P>next</P >"
+
+    assert html_fragment_to_text(value) == "Hello there\nsecond & line\nnext"
@@ -0,0 +1,55 @@
+"""Tests for src/utils/url_canonical.py."""
+
+import pytest
+
+from src.utils.url_canonical import canonicalize_url
+
+
+@pytest.mark.parametrize(
+    ("variant", "expected"),
+    [
+        ("http://example.com/post", "https://example.com/post"),
+        ("https://www.example.com/post/", "https://example.com/post"),
+        ("https://m.example.com/post", "https://example.com/post"),
+        ("https://Example.COM:443/post#comments", "https://example.com/post"),
+        ("https://example.com/post?utm_source=hn&utm_medium=social", "https://example.com/post"),
+        ("https://example.com/post?b=2&fbclid=x&a=1", "https://example.com/post?a=1&b=2"),
+        ("https://example.com/", "https://example.com"),
+    ],
+)
+def test_folds_common_url_variants(variant: str, expected: str) -> None:
+    assert canonicalize_url(variant) == expected
+
+
+def test_keeps_short_hosts_that_only_look_like_aliases() -> None:
+    assert canonicalize_url("https://m.com/post") == "https://m.com/post"
+
+
+@pytest.mark.parametrize(
+    "variant",
+    [
+        "https://arxiv.org/abs/2401.12345",
+        "https://arxiv.org/abs/2401.12345v3",
+        "http://arxiv.org/pdf/2401.12345v2.pdf",
+        "https://export.arxiv.org/pdf/2401.12345",
+    ],
+)
+def test_arxiv_abs_and_pdf_share_a_key(variant: str) -> None:
+    assert canonicalize_url(variant) == "https://arxiv.org/abs/2401.12345"
+
+
+@pytest.mark.parametrize(
+    "variant",
+    [
+        "https://github.com/org/repo/blob/main/docs/paper.pdf",
+        "https://github.com/org/repo/raw/main/docs/paper.pdf",
+        "https://raw.githubusercontent.com/org/repo/main/docs/paper.pdf",
+    ],
+)
+def test_github_blob_and_raw_share_a_key(variant: str) -> None:
+    assert canonicalize_url(variant) == "https://github.com/org/repo/blob/main/docs/paper.pdf"
+
+
+@pytest.mark.parametrize("value", ["", "   ", "ftp://example.com/file", "item?id=1", None])
+def test_non_http_values_have_no_key(value) -> None:
+    assert canonicalize_url(value) == ""